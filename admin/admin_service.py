@@ -1,26 +1,49 @@
 from typing import List, Dict, Any, Optional
-from db.database import Database
+from db.database import Database, read_only
+from db.reporting import ReportingSession
+from db.records import record_type, TransactionRecord
+from db.shard_router import route_by
+from db.accounts import balance_assignment, BalanceAdjustmentLog
+from config.settings import Settings
+from monitoring.tracing import trace_methods
+from archive.archive_service import ArchiveService
+from transactions.hot_account_service import HotAccountService
+from events.outbox_service import OutboxService
 
+PendingAccountRecord = record_type('PendingAccountRecord', ('account_number', 'name', 'created_at'))
+AdminUserRecord = record_type('AdminUserRecord',
+                              ('account_number', 'name', 'balance', 'is_approved', 'created_at', 'version'),
+                              balance=float)
+DeclinedAccountRecord = record_type('DeclinedAccountRecord', ('account_number', 'reason', 'declined_at'))
+DisplayTransactionRecord = record_type('DisplayTransactionRecord', TransactionRecord._fields, derived={
+    'formatted_amount': lambda tx: f"₱{tx['amount']:,.2f}",
+    'type_display': lambda tx: AdminService._format_transaction_type(tx['type'])
+}, amount=float)
+
+@trace_methods
 class AdminService:
-    def __init__(self, database: Database):
+    def __init__(self, database: Database, hot_accounts: HotAccountService = None):
         self.db = database
+        self.archive = ArchiveService(database)
+        self.hot_accounts = hot_accounts or HotAccountService(database)
+        self.outbox = OutboxService(database)
+        self.adjustments = BalanceAdjustmentLog(database)
+        # Listings and statistics run on their own connections in a consistent snapshot
+        self.reports = ReportingSession(database)
+        self.report_hot_accounts = self.hot_accounts.on(self.reports.db)
 
-    def get_pending_accounts(self) -> List[Dict[str, Any]]:
-        """Get all pending accounts"""
-        query = """
+    def get_pending_accounts(self, account_numbers: List[str] = None) -> List[Dict[str, Any]]:
+        """Get all pending accounts (or just those among account_numbers)"""
+        scope, params = self.account_scope('account_number', account_numbers)
+        query = f"""
             SELECT account_number, name, created_at 
             FROM accounts 
-            WHERE is_approved = 0 AND account_number != '0000000001'
+            WHERE is_approved = 0 AND account_number != '0000000001'{scope}
             ORDER BY created_at ASC
         """
-        results = self.db.fetch_all(query)
-        
-        return [{
-            'account_number': row['account_number'],
-            'name': row['name'],
-            'created_at': row['created_at']
-        } for row in results]
+        return self.scan(query, params, account_numbers, 'created_at', record=PendingAccountRecord)
 
+    @route_by()
     def approve_account(self, account_number: str) -> bool:
         """Approve a pending account"""
         query = """
@@ -28,27 +51,26 @@ class AdminService:
             SET is_approved = 1 
             WHERE account_number = %s AND is_approved = 0
         """
-        return self.db.execute_query(query, (account_number,))
+        return self._change_account(account_number, query, (account_number,))
 
 
-    def get_all_users(self) -> List[Dict[str, Any]]:
-        """Get all users (excluding admin)"""
-        query = """
-            SELECT account_number, name, balance, is_approved, created_at 
+    def get_all_users(self, account_numbers: List[str] = None) -> List[Dict[str, Any]]:
+        """Get all users excluding admin (or just those among account_numbers)"""
+        version = "version" if Settings.ACCOUNT_VERSIONING else "NULL as version"
+        scope, params = self.account_scope('account_number', account_numbers)
+        query = f"""
+            SELECT account_number, name, balance, is_approved, created_at, {version} 
             FROM accounts 
-            WHERE account_number != '0000000001'
+            WHERE account_number != '0000000001'{scope}
             ORDER BY created_at DESC
         """
-        results = self.db.fetch_all(query)
-        
-        return [{
-            'account_number': row['account_number'],
-            'name': row['name'],
-            'balance': float(row['balance']),
-            'is_approved': row['is_approved'],
-            'created_at': row['created_at']
-        } for row in results]
+        with self.reports.snapshot() as db:
+            results = db.gather(lambda: self.report_hot_accounts.with_pending_credits(
+                db.fetch_records(AdminUserRecord, query, params)), account_numbers)
+        return self._in_order(results, 'created_at', descending=True)
 
+    @route_by()
+    @read_only
     def get_user_details(self, account_number: str) -> Optional[Dict[str, Any]]:
         """Get detailed user information"""
         query = """
@@ -61,94 +83,121 @@ class AdminService:
         if not user:
             return None
         
-        # Get transaction count
-        query = "SELECT COUNT(*) as transaction_count FROM transactions WHERE account_number = %s"
-        result = self.db.fetch_one(query, (account_number,))
+        # Get transaction count (hot rows newer than the archive, plus the archived ones)
+        window, window_params = self.archive.hot_window()
+        query = f"SELECT COUNT(*) as transaction_count FROM transactions WHERE account_number = %s{window}"
+        result = self.db.fetch_one(query, (account_number,) + window_params)
         transaction_count = result['transaction_count'] if result else 0
+        transaction_count += len(self.archive.get_archived_transactions(account_number))
         
         return {
             'account_number': user['account_number'],
             'name': user['name'],
-            'balance': float(user['balance']),
+            'balance': float(user['balance']) + self.hot_accounts.pending_credits(account_number),
             'is_approved': user['is_approved'],
             'created_at': user['created_at'],
             'transaction_count': transaction_count
         }
 
     def get_system_statistics(self) -> Dict[str, Any]:
-        """Get system-wide statistics"""
+        """Get system-wide statistics (summed over the shards, each from one snapshot)"""
+        totals = {}
+        with self.reports.snapshot() as db:
+            for shard_stats in db.gather(lambda: [self._shard_statistics(db)]):
+                for key, value in shard_stats.items():
+                    totals[key] = totals.get(key, 0) + value
+            # Money between shards has left its sender but not reached its recipient yet
+            totals['total_balance'] = totals.get('total_balance', 0.0) + self._in_transit(db)
+        return totals
+
+    def _in_transit(self, db: Database) -> float:
+        """Cross-shard transfers a reporting snapshot sees debited from the sender but not credited"""
+        if len(db.shards) < 2:
+            return 0.0
+        debited = {row['id']: float(row['amount']) for row in db.gather(lambda: db.fetch_all(
+            "SELECT id, amount FROM transfer_sagas WHERE status = 'debited'"))}
+        if not debited:
+            return 0.0
+        placeholders = ', '.join(['%s'] * len(debited))
+        credited = {row['saga_id'] for row in db.gather(lambda: db.fetch_all(
+            f"SELECT saga_id FROM saga_credits WHERE saga_id IN ({placeholders})", tuple(debited)))}
+        return sum(amount for saga_id, amount in debited.items() if saga_id not in credited)
+
+    def _shard_statistics(self, db: Database) -> Dict[str, Any]:
+        """Statistics for the current shard of a reporting snapshot"""
         stats = {}
         
         # Total users
         query = "SELECT COUNT(*) as total FROM accounts WHERE account_number != '0000000001'"
-        result = self.db.fetch_one(query)
+        result = db.fetch_one(query)
         stats['total_users'] = result['total'] if result else 0
         
         # Approved users
         query = "SELECT COUNT(*) as approved FROM accounts WHERE is_approved = 1 AND account_number != '0000000001'"
-        result = self.db.fetch_one(query)
+        result = db.fetch_one(query)
         stats['approved_users'] = result['approved'] if result else 0
         
         # Pending users
         query = "SELECT COUNT(*) as pending FROM accounts WHERE is_approved = 0"
-        result = self.db.fetch_one(query)
+        result = db.fetch_one(query)
         stats['pending_users'] = result['pending'] if result else 0
         
-        # Total transactions
-        query = "SELECT COUNT(*) as total FROM transactions"
-        result = self.db.fetch_one(query)
-        stats['total_transactions'] = result['total'] if result else 0
+        # Total transactions (hot rows newer than the archive, plus the archived ones)
+        archive = ArchiveService(db)
+        window, window_params = archive.hot_window()
+        query = f"SELECT COUNT(*) as total FROM transactions WHERE 1 = 1{window}"
+        result = db.fetch_one(query, window_params)
+        stats['total_transactions'] = (result['total'] if result else 0) + archive.archived_row_count()
         
         # Total system balance
         query = "SELECT SUM(balance) as total_balance FROM accounts WHERE account_number != '0000000001'"
-        result = self.db.fetch_one(query)
+        result = db.fetch_one(query)
         stats['total_balance'] = float(result['total_balance']) if result and result['total_balance'] else 0.0
+        stats['total_balance'] += sum(self.report_hot_accounts.pending_credits_by_account().values())
         
         return stats
 
+    @route_by()
     def reject_account(self, account_number: str, reason: str) -> bool:
         """Reject a pending account and record reason with full account data"""
         try:
-            self.db.begin_transaction()
-            
-            # Get full account info before deletion
-            check_query = """
-                SELECT name, hashed_pin, balance 
-                FROM accounts 
-                WHERE account_number = %s AND is_approved = 0
-            """
-            account_info = self.db.fetch_one(check_query, (account_number,))
-            
-            if not account_info:
-                self.db.rollback_transaction()
-                return False
-            
-            # Record rejection with full account data (if schema is enhanced)
-            decline_query = """
-                INSERT INTO account_declines (account_number, name, hashed_pin, original_balance, reason) 
-                VALUES (%s, %s, %s, %s, %s)
-            """
-            if not self.db.execute_query(decline_query, (
-                account_number, 
-                account_info['name'], 
-                account_info['hashed_pin'],
-                account_info['balance'],
-                reason
-            )):
-                raise Exception("Failed to record rejection reason")
-            
-            # Delete the account
-            delete_query = "DELETE FROM accounts WHERE account_number = %s AND is_approved = 0"
-            if not self.db.execute_query(delete_query, (account_number,)):
-                raise Exception("Failed to delete account")
-            
-            self.db.commit_transaction()
+            with self.db.unit_of_work():
+                # Get full account info before deletion
+                check_query = """
+                    SELECT name, hashed_pin, balance 
+                    FROM accounts 
+                    WHERE account_number = %s AND is_approved = 0
+                """
+                account_info = self.db.fetch_one(check_query, (account_number,))
+            
+                if not account_info:
+                    return False
+            
+                # Record rejection with full account data (if schema is enhanced)
+                decline_query = """
+                    INSERT INTO account_declines (account_number, name, hashed_pin, original_balance, reason) 
+                    VALUES (%s, %s, %s, %s, %s)
+                """
+                if not self.db.execute_query(decline_query, (
+                    account_number, 
+                    account_info['name'], 
+                    account_info['hashed_pin'],
+                    account_info['balance'],
+                    reason
+                )):
+                    raise Exception("Failed to record rejection reason")
+            
+                # Delete the account
+                delete_query = "DELETE FROM accounts WHERE account_number = %s AND is_approved = 0"
+                if not self.db.execute_query(delete_query, (account_number,)):
+                    raise Exception("Failed to delete account")
+                self._publish_change(account_number, declined=True)
             return True
             
         except Exception as e:
-            self.db.rollback_transaction()
             return False
 
+    @route_by()
     def suspend_account(self, account_number: str) -> bool:
         """Suspend an account (set approval to 0)"""
         query = """
@@ -156,8 +205,9 @@ class AdminService:
             SET is_approved = 0 
             WHERE account_number = %s AND account_number != '0000000001'
         """
-        return self.db.execute_query(query, (account_number,))
+        return self._change_account(account_number, query, (account_number,))
 
+    @route_by()
     def reactivate_account(self, account_number: str) -> bool:
         """Reactivate a suspended account"""
         query = """
@@ -165,34 +215,44 @@ class AdminService:
             SET is_approved = 1 
             WHERE account_number = %s AND account_number != '0000000001'
         """
-        return self.db.execute_query(query, (account_number,))
+        return self._change_account(account_number, query, (account_number,))
 
+    @route_by()
     def delete_account(self, account_number: str) -> bool:
         """Delete an account and all its transactions"""
         if account_number == '0000000001':
             return False  # Cannot delete admin account
         
         try:
-            self.db.begin_transaction()
-            
-            # Delete transactions first
-            query = "DELETE FROM transactions WHERE account_number = %s"
-            self.db.execute_query(query, (account_number,))
-            
-            # Delete account
-            query = "DELETE FROM accounts WHERE account_number = %s"
-            if not self.db.execute_query(query, (account_number,)):
-                raise Exception("Failed to delete account")
-            
-            self.db.commit_transaction()
+            with self.db.unit_of_work():
+                # Delete transactions first
+                query = "DELETE FROM transactions WHERE account_number = %s"
+                self.db.execute_query(query, (account_number,))
+            
+                # Leave hot mode (if enabled) so no balance slots are left behind
+                self.hot_accounts.disable(account_number)
+            
+                # Delete account
+                query = "DELETE FROM accounts WHERE account_number = %s"
+                if not self.db.execute_query(query, (account_number,)):
+                    raise Exception("Failed to delete account")
+                self._publish_change(account_number)
             return True
             
         except Exception as e:
-            self.db.rollback_transaction()
             return False
 
-    def update_user_details(self, account_number: str, name: str = None, balance: float = None) -> bool:
-        """Update user details (name and/or balance)"""
+    @route_by()
+    def update_user_details(self, account_number: str, name: str = None, balance: float = None,
+                            expected_version: int = None, expected_balance: float = None) -> bool:
+        """Update user details (name and/or balance)
+        
+        With account versioning on, pass the version the edit was based on; the
+        update is refused if a deposit or withdrawal changed the account since.
+        Credits to a hot account's balance slots do not touch the version, so
+        also pass the balance the edit was based on (slot credits included):
+        the update is refused if the balance plus slots no longer matches it.
+        """
         if account_number == '0000000001':
             return False  # Cannot update admin account
         
@@ -205,89 +265,125 @@ class AdminService:
                 params.append(name)
             
             if balance is not None:
-                updates.append("balance = %s")
+                updates.append(balance_assignment('%s'))
                 params.append(balance)
             
             if not updates:
                 return False  # Nothing to update
             
+            conditions = "account_number = %s AND account_number != '0000000001'"
+            params.append(account_number)
+            versioned = Settings.ACCOUNT_VERSIONING and balance is not None and expected_version is not None
+            
             query = f"""
                 UPDATE accounts 
                 SET {', '.join(updates)} 
-                WHERE account_number = %s AND account_number != '0000000001'
+                WHERE {conditions}
             """
-            params.append(account_number)
             
-            return self.db.execute_query(query, tuple(params))
+            if balance is not None and not self.adjustments.ensure_schema():
+                return False
+            with self.db.unit_of_work():
+                previous_balance = None
+                if balance is not None:
+                    previous = self.db.fetch_one(f"""
+                        SELECT balance{', version' if versioned else ''} FROM accounts
+                        WHERE account_number = %s FOR UPDATE
+                    """, (account_number,))
+                    if not previous:
+                        return False
+                    # A hot account's slot credits would otherwise be added on top of the new balance
+                    previous_balance = round(float(previous['balance']) + self.hot_accounts.fold(account_number), 2)
+                    # Checked before the fold's own version bump; the slots count through the balance
+                    if versioned and (previous['version'] != expected_version or
+                                      (expected_balance is not None and
+                                       previous_balance != round(float(expected_balance), 2))):
+                        return False
+                rows = self.db.execute_update(query, tuple(params))
+                if rows is None:
+                    return False
+                if balance is not None and rows:
+                    if not self.adjustments.post(account_number, previous_balance, balance):
+                        raise Exception("Failed to record the balance adjustment")
+                    # Absolute, not a delta: consumers replace their view of the balance
+                    self.outbox.record('balance_set', account_number, balance)
+                elif rows:
+                    self._publish_change(account_number)
+                return True
             
         except Exception as e:
             return False
 
+    @route_by()
     def delete_user_account(self, account_number: str) -> bool:
         """Delete a user account and all related data (enhanced version of existing delete_account)"""
         if account_number == '0000000001':
             return False  # Cannot delete admin account
         
         try:
-            self.db.begin_transaction()
-            
-            # Delete loan payments first (due to foreign key constraints)
-            query = "DELETE FROM loan_payments WHERE account_number = %s"
-            self.db.execute_query(query, (account_number,))
-            
-            # Delete loans
-            query = "DELETE FROM loans WHERE account_number = %s"
-            self.db.execute_query(query, (account_number,))
-            
-            # Delete loan applications
-            query = "DELETE FROM loan_applications WHERE account_number = %s"
-            self.db.execute_query(query, (account_number,))
-            
-            # Delete transactions
-            query = "DELETE FROM transactions WHERE account_number = %s"
-            self.db.execute_query(query, (account_number,))
-            
-            # Delete account declines (if any)
-            query = "DELETE FROM account_declines WHERE account_number = %s"
-            self.db.execute_query(query, (account_number,))
-            
-            # Delete the account itself
-            query = "DELETE FROM accounts WHERE account_number = %s"
-            if not self.db.execute_query(query, (account_number,)):
-                raise Exception("Failed to delete account")
-            
-            self.db.commit_transaction()
+            with self.db.unit_of_work():
+                # Delete loan payments first (due to foreign key constraints)
+                query = "DELETE FROM loan_payments WHERE account_number = %s"
+                self.db.execute_query(query, (account_number,))
+            
+                # Delete loans
+                query = "DELETE FROM loans WHERE account_number = %s"
+                self.db.execute_query(query, (account_number,))
+            
+                # Delete loan applications
+                query = "DELETE FROM loan_applications WHERE account_number = %s"
+                self.db.execute_query(query, (account_number,))
+            
+                # Delete transactions
+                query = "DELETE FROM transactions WHERE account_number = %s"
+                self.db.execute_query(query, (account_number,))
+            
+                # Delete account declines (if any)
+                query = "DELETE FROM account_declines WHERE account_number = %s"
+                self.db.execute_query(query, (account_number,))
+            
+                # Leave hot mode (if enabled) so no balance slots are left behind
+                self.hot_accounts.disable(account_number)
+            
+                # Delete the account itself
+                query = "DELETE FROM accounts WHERE account_number = %s"
+                if not self.db.execute_query(query, (account_number,)):
+                    raise Exception("Failed to delete account")
+                self._publish_change(account_number, declined=True)
             return True
             
         except Exception as e:
-            self.db.rollback_transaction()
             return False
 
+    @route_by()
     def toggle_user_status(self, account_number: str) -> bool:
         """Toggle user approval status (approved <-> suspended)"""
         if account_number == '0000000001':
             return False  # Cannot modify admin account
         
         try:
-            # Get current status
-            query = "SELECT is_approved FROM accounts WHERE account_number = %s"
-            result = self.db.fetch_one(query, (account_number,))
+            with self.db.unit_of_work():
+                # Get current status
+                query = "SELECT is_approved FROM accounts WHERE account_number = %s FOR UPDATE"
+                result = self.db.fetch_one(query, (account_number,))
             
-            if not result:
-                return False
+                if not result:
+                    return False
             
-            new_status = 0 if result['is_approved'] else 1
+                new_status = 0 if result['is_approved'] else 1
             
-            query = """
-                UPDATE accounts 
-                SET is_approved = %s 
-                WHERE account_number = %s AND account_number != '0000000001'
-            """
-            return self.db.execute_query(query, (new_status, account_number))
+                query = """
+                    UPDATE accounts 
+                    SET is_approved = %s 
+                    WHERE account_number = %s AND account_number != '0000000001'
+                """
+                return self._change_account(account_number, query, (new_status, account_number))
             
         except Exception as e:
             return False
 
+    @route_by()
+    @read_only
     def get_user_transaction_summary(self, account_number: str) -> Dict[str, Any]:
         """Get user's transaction summary with counts by period"""
         from datetime import datetime, timedelta
@@ -296,61 +392,75 @@ class AdminService:
         month_start = today.replace(day=1)
         year_start = today.replace(month=1, day=1)
         
-        # Get transaction counts by period
-        query = """
+        # Get transaction counts by period (hot rows newer than the archive)
+        window, window_params = self.archive.hot_window()
+        query = f"""
             SELECT 
                 COUNT(CASE WHEN DATE(timestamp) = %s THEN 1 END) as today_count,
                 COUNT(CASE WHEN DATE(timestamp) >= %s THEN 1 END) as month_count,
                 COUNT(CASE WHEN DATE(timestamp) >= %s THEN 1 END) as year_count,
                 COUNT(*) as total_count
             FROM transactions 
-            WHERE account_number = %s
+            WHERE account_number = %s{window}
         """
-        result = self.db.fetch_one(query, (today, month_start, year_start, account_number))
+        result = self.db.fetch_one(query, (today, month_start, year_start, account_number) + window_params)
         
+        # Archived months are closed, so they only add to this year's count and the total
+        archived = self.archive.get_archived_transactions(account_number)
+        year_begin = datetime.combine(year_start, datetime.min.time())
         return {
             'today': result['today_count'] if result else 0,
             'this_month': result['month_count'] if result else 0,
-            'this_year': result['year_count'] if result else 0,
-            'total': result['total_count'] if result else 0
+            'this_year': (result['year_count'] if result else 0) + sum(1 for tx in archived
+                                                                        if tx['timestamp'] >= year_begin),
+            'total': (result['total_count'] if result else 0) + len(archived)
         }
 
+    @route_by()
+    @read_only
     def get_user_transactions_by_period(self, account_number: str, period: str) -> List[Dict[str, Any]]:
         """Get user transactions filtered by period (today/month/year/all)"""
         from datetime import datetime
         
-        today = datetime.now().date()
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
         
-        # Define period filters
-        period_filters = {
-            'today': f"DATE(timestamp) = '{today}'",
-            'month': f"DATE(timestamp) >= '{today.replace(day=1)}'",
-            'year': f"DATE(timestamp) >= '{today.replace(month=1, day=1)}'",
-            'all': "1=1"  # No filter
+        # Define period start boundaries (range predicates allow partition pruning)
+        period_starts = {
+            'today': today,
+            'month': today.replace(day=1),
+            'year': today.replace(month=1, day=1),
+            'all': None  # No filter
         }
         
-        where_clause = period_filters.get(period, period_filters['all'])
+        start = period_starts.get(period)
+        limit = 100
         
-        query = f"""
-            SELECT id, type, amount, timestamp
-            FROM transactions 
-            WHERE account_number = %s AND {where_clause}
-            ORDER BY timestamp DESC
-            LIMIT 100
-        """
+        if start is not None:
+            query = """
+                SELECT id, type, amount, timestamp
+                FROM transactions 
+                WHERE account_number = %s AND timestamp >= %s
+                ORDER BY timestamp DESC
+                LIMIT %s
+            """
+            params = (account_number, start, limit)
+        else:
+            query = """
+                SELECT id, type, amount, timestamp
+                FROM transactions 
+                WHERE account_number = %s
+                ORDER BY timestamp DESC
+                LIMIT %s
+            """
+            params = (account_number, limit)
         
-        results = self.db.fetch_all(query, (account_number,))
+        transactions = self.db.fetch_records(TransactionRecord, query, params)
+        transactions = self.archive.merge_with_archive(transactions, account_number, start, limit=limit)
         
-        return [{
-            'id': row['id'],
-            'type': row['type'],
-            'amount': float(row['amount']),
-            'timestamp': row['timestamp'],
-            'formatted_amount': f"₱{float(row['amount']):,.2f}",
-            'type_display': self._format_transaction_type(row['type'])
-        } for row in results]
+        return [DisplayTransactionRecord._make(tx) for tx in transactions]
 
-    def _format_transaction_type(self, transaction_type: str) -> str:
+    @staticmethod
+    def _format_transaction_type(transaction_type: str) -> str:
         """Format transaction type for display"""
         type_map = {
             'deposit': '💰 Deposit',
@@ -362,64 +472,100 @@ class AdminService:
         }
         return type_map.get(transaction_type, transaction_type.title())
 
-    def get_declined_accounts(self) -> List[Dict[str, Any]]:
-        """Get all declined/suspended accounts from account_declines table"""
-        query = """
+    def get_declined_accounts(self, account_numbers: List[str] = None) -> List[Dict[str, Any]]:
+        """Get all declined/suspended accounts from account_declines table (or just those among account_numbers)"""
+        scope, params = self.account_scope('account_number', account_numbers)
+        query = f"""
             SELECT account_number, reason, declined_at 
             FROM account_declines 
+            WHERE 1 = 1{scope}
             ORDER BY declined_at DESC
         """
-        results = self.db.fetch_all(query)
-        
-        return [{
-            'account_number': row['account_number'],
-            'reason': row['reason'],
-            'declined_at': row['declined_at']
-        } for row in results]
+        return self.scan(query, params, account_numbers, 'declined_at', descending=True,
+                         record=DeclinedAccountRecord)
 
+    @route_by()
     def reactivate_declined_account(self, account_number: str) -> bool:
         """Reactivate a declined account by moving it back to accounts table"""
         try:
-            self.db.begin_transaction()
-            
-            # Get full declined account info (enhanced schema)
-            check_query = """
-                SELECT account_number, name, hashed_pin, original_balance, reason 
-                FROM account_declines 
-                WHERE account_number = %s
-            """
-            declined_record = self.db.fetch_one(check_query, (account_number,))
-            
-            if not declined_record:
-                self.db.rollback_transaction()
-                return False
-            
-            # Restore account with original data and approved status
-            insert_query = """
-                INSERT INTO accounts (account_number, name, hashed_pin, balance, is_approved) 
-                VALUES (%s, %s, %s, %s, 1)
-            """
-            if not self.db.execute_query(insert_query, (
-                declined_record['account_number'],
-                declined_record['name'],
-                declined_record['hashed_pin'],
-                declined_record['original_balance']
-            )):
-                raise Exception("Failed to reactivate account")
-            
-            # Remove from declines table
-            delete_query = "DELETE FROM account_declines WHERE account_number = %s"
-            if not self.db.execute_query(delete_query, (account_number,)):
-                raise Exception("Failed to remove from declines table")
-            
-            self.db.commit_transaction()
+            with self.db.unit_of_work():
+                # Get full declined account info (enhanced schema)
+                check_query = """
+                    SELECT account_number, name, hashed_pin, original_balance, reason 
+                    FROM account_declines 
+                    WHERE account_number = %s
+                """
+                declined_record = self.db.fetch_one(check_query, (account_number,))
+            
+                if not declined_record:
+                    return False
+            
+                # Restore account with original data and approved status
+                insert_query = """
+                    INSERT INTO accounts (account_number, name, hashed_pin, balance, is_approved) 
+                    VALUES (%s, %s, %s, %s, 1)
+                """
+                if not self.db.execute_query(insert_query, (
+                    declined_record['account_number'],
+                    declined_record['name'],
+                    declined_record['hashed_pin'],
+                    declined_record['original_balance']
+                )):
+                    raise Exception("Failed to reactivate account")
+            
+                # Remove from declines table
+                delete_query = "DELETE FROM account_declines WHERE account_number = %s"
+                if not self.db.execute_query(delete_query, (account_number,)):
+                    raise Exception("Failed to remove from declines table")
+                self._publish_change(account_number, declined=True)
             return True
             
         except Exception as e:
-            self.db.rollback_transaction()
             return False
 
+    @route_by()
     def delete_declined_account_permanently(self, account_number: str) -> bool:
         """Permanently delete a declined account from account_declines table"""
         query = "DELETE FROM account_declines WHERE account_number = %s"
-        return self.db.execute_query(query, (account_number,))
\ No newline at end of file
+        return self._change_account(account_number, query, (account_number,), declined=True)
+
+    def _publish_change(self, account_number: str, declined: bool = False) -> bool:
+        """Tell live views (here, and in other processes through the outbox) that the account changed"""
+        return self.outbox.record('account_changed', account_number, 0, declined=declined)
+
+    def _change_account(self, account_number: str, query: str, params: tuple, declined: bool = False) -> bool:
+        """Run one account statement and publish the change in the same unit of work"""
+        try:
+            with self.db.unit_of_work():
+                if not self.db.execute_query(query, params):
+                    return False
+                return self._publish_change(account_number, declined)
+        except Exception as e:
+            return False
+
+    def scan(self, query: str, params: tuple = (), account_numbers: List[str] = None, order_by: str = None,
+             descending: bool = False, record: Any = None) -> List[Any]:
+        """
+        Run a listing query on every shard (or just those owning account_numbers)
+        in a reporting snapshot and merge the rows, re-sorted on order_by to
+        match the query's ORDER BY
+        """
+        with self.reports.snapshot() as db:
+            rows = db.gather(lambda: db.fetch_records(record, query, params) if record is not None
+                             else db.fetch_all(query, params), account_numbers)
+        return self._in_order(rows, order_by, descending) if order_by else rows
+
+    @staticmethod
+    def _in_order(rows: List[Any], order_by: str, descending: bool = False) -> List[Any]:
+        # NULLs first ascending and last descending, as MySQL orders them
+        return sorted(rows, key=lambda row: (row[order_by] is not None, row[order_by]), reverse=descending)
+
+    @staticmethod
+    def account_scope(column: str, account_numbers: Optional[List[str]]) -> tuple:
+        """Extra WHERE condition and params limiting a listing to account_numbers (none when None)"""
+        if account_numbers is None:
+            return "", ()
+        if not account_numbers:
+            return " AND 1 = 0", ()
+        placeholders = ', '.join(['%s'] * len(account_numbers))
+        return f" AND {column} IN ({placeholders})", tuple(account_numbers)
\ No newline at end of file
@@ -0,0 +1,339 @@
+# banking_app/analytics/analytics_service.py
+"""
+Analytics service
+Hourly, daily and monthly series of ledger volume by transaction type,
+and transaction size percentiles, across all accounts.
+
+Every closed hour is rolled up once into analytics_hourly (count, total
+and a log-scale size histogram per type) and never recomputed. Day and
+month series are sums of those rows and percentiles come from merged
+histograms, so only the still-open hour is read from transactions on a
+request. Rollups are built in chunks that never cross a month (one
+partition per scan) and resume from a stored watermark, the first hour
+not yet rolled up. Scans select by timestamp only: ids are not assumed
+to follow timestamps (imports and generated data back-date rows). When sharded,
+each shard keeps its own rollups and reads merge them.
+"""
+
+import math
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from db.database import Database
+from db.columns import TRANSACTION_TYPES, TYPE_CODE_SQL, INT, SMALL_INT, FLOAT, np, sum_by, count_by
+from monitoring.tracing import trace_methods
+from config.settings import Settings
+
+GRANULARITIES = ('hour', 'day', 'month')
+
+# Size histogram: log-spaced bins from ₱0.01 to ₱100,000,000 (a bin spans about 12%)
+SIZE_BINS_PER_DECADE = 20
+SIZE_MINIMUM = 0.01
+SIZE_BINS = SIZE_BINS_PER_DECADE * 10
+
+_TYPE_COUNT = len(TRANSACTION_TYPES)
+
+
+@trace_methods
+class AnalyticsService:
+    def __init__(self, database: Database, eod: Optional[Any] = None):
+        self.db = database
+        # Optional EndOfDayService: daily series then carry the closed days' total closing balance
+        self.eod = eod
+        self._schema_ready = False
+
+    def ensure_schema(self) -> bool:
+        """Create the rollup tables on every shard if needed (DDL; never call inside a unit of work)"""
+        if not self._schema_ready:
+            self._schema_ready = all([node.execute_query("""
+                CREATE TABLE IF NOT EXISTS analytics_hourly (
+                    bucket_start DATETIME NOT NULL,
+                    type_code TINYINT UNSIGNED NOT NULL,
+                    tx_count INT UNSIGNED NOT NULL,
+                    total_amount DECIMAL(20, 2) NOT NULL,
+                    size_histogram TEXT NOT NULL,
+                    PRIMARY KEY (bucket_start, type_code)
+                ) ENGINE=InnoDB
+            """) and node.execute_query("""
+                CREATE TABLE IF NOT EXISTS analytics_state (
+                    name VARCHAR(32) NOT NULL PRIMARY KEY,
+                    closed_until DATETIME NOT NULL
+                ) ENGINE=InnoDB
+            """) for node in self.db.shards])
+        return self._schema_ready
+
+    def refresh(self) -> int:
+        """Roll up every hour closed since the last refresh, on every shard; returns how many hours were added"""
+        if not self.ensure_schema():
+            return 0
+        return sum(self.db.gather(lambda: [self._refresh_shard()]))
+
+    def _refresh_shard(self) -> int:
+        # An hour is closed once no transaction stamped inside it can still commit
+        now = self._now()
+        target = _floor_hour(now - timedelta(seconds=Settings.ANALYTICS_CLOSE_DELAY_SECONDS))
+        added = 0
+        while True:
+            hours = self._roll_up_chunk(target)
+            if not hours:
+                return added
+            added += hours
+
+    def _roll_up_chunk(self, target: datetime) -> int:
+        """Roll up the next chunk of closed hours in one unit of work (0 when up to date)"""
+        with self.db.unit_of_work():
+            start = self._watermark(lock=True)
+            if start is None or start >= target:
+                return 0
+
+            end = min(start + timedelta(hours=Settings.ANALYTICS_CHUNK_HOURS), _month_start(start, 1), target)
+            hours = int((end - start).total_seconds() // 3600)
+            columns = self._scan(start, end)
+            rows = [(start + timedelta(hours=hour), type_code, count, round(total, 2), _encode_histogram(histogram))
+                    for hour, type_code, count, total, histogram in _aggregate(columns, hours)]
+            if not self.db.execute_many("""
+                INSERT INTO analytics_hourly (bucket_start, type_code, tx_count, total_amount, size_histogram)
+                VALUES (%s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE tx_count = VALUES(tx_count), total_amount = VALUES(total_amount),
+                                        size_histogram = VALUES(size_histogram)
+            """, rows):
+                raise Exception("Failed to store analytics rollups")
+            if not self.db.execute_query("""
+                INSERT INTO analytics_state (name, closed_until) VALUES ('hourly', %s)
+                ON DUPLICATE KEY UPDATE closed_until = VALUES(closed_until)
+            """, (end,)):
+                raise Exception("Failed to advance the analytics watermark")
+        return hours
+
+    def _watermark(self, lock: bool = False) -> Optional[datetime]:
+        """The first hour not rolled up, or None before the first transaction"""
+        state = self.db.fetch_one(f"""
+            SELECT closed_until FROM analytics_state WHERE name = 'hourly'{' FOR UPDATE' if lock else ''}
+        """)
+        if state:
+            return state['closed_until']
+        first = self.db.fetch_one("SELECT MIN(timestamp) as first_ts FROM transactions")
+        return _floor_hour(first['first_ts']) if first and first['first_ts'] else None
+
+    def _scan(self, start: datetime, end: Optional[datetime]) -> Dict[str, Any]:
+        """Hour offset from start, type code and amount of every transaction in [start, end)"""
+        # The timestamp range prunes to the month's partition
+        end_filter = "AND timestamp < %s" if end is not None else ""
+        params = (start, start) + ((end,) if end is not None else ())
+        return self.db.fetch_columns({'hour': INT, 'type_code': SMALL_INT, 'amount': FLOAT}, f"""
+            SELECT TIMESTAMPDIFF(HOUR, %s, timestamp), {TYPE_CODE_SQL}, CAST(amount AS DOUBLE)
+            FROM transactions
+            WHERE timestamp >= %s {end_filter}
+        """, params)
+
+    def _open_hours(self) -> List[Tuple[datetime, int, int, float, List[int]]]:
+        """Aggregates of the hours after the watermark, straight from transactions"""
+        start = self._watermark()
+        if start is None:
+            return []
+        columns = self._scan(start, None)
+        hours = int((self._now() - start).total_seconds() // 3600) + 2
+        return [(start + timedelta(hours=hour), type_code, count, total, histogram)
+                for hour, type_code, count, total, histogram in _aggregate(columns, hours)]
+
+    def get_series(self, granularity: str, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        """
+        Count and total per transaction type for every bucket in [start, end),
+        oldest first; empty buckets are included with zeros. Daily buckets
+        also carry closing_balance (None until the day is closed) when an
+        EndOfDayService is attached.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Granularity must be one of {', '.join(GRANULARITIES)}")
+        self.refresh()
+        start = _bucket_start(start, granularity)
+
+        series: Dict[datetime, Dict[str, Any]] = {}
+        bucket = start
+        while bucket < end:
+            series[bucket] = {'bucket': bucket,
+                              'counts': dict.fromkeys(TRANSACTION_TYPES, 0),
+                              'totals': dict.fromkeys(TRANSACTION_TYPES, 0.0)}
+            bucket = _next_bucket(bucket, granularity)
+
+        for bucket, type_code, count, total in self.db.gather(lambda: self._series_rows(granularity, start, end)):
+            entry = series.get(bucket)
+            if entry is not None:
+                entry['counts'][TRANSACTION_TYPES[type_code]] += count
+                entry['totals'][TRANSACTION_TYPES[type_code]] += total
+
+        if granularity == 'day' and self.eod is not None:
+            closing = self.eod.get_daily_totals(start.date(), end.date())
+            for entry in series.values():
+                day = closing.get(entry['bucket'].date())
+                entry['closing_balance'] = day['closing_balance'] if day else None
+        return list(series.values())
+
+    def _series_rows(self, granularity: str, start: datetime, end: datetime) -> List[Tuple[datetime, int, int, float]]:
+        """The current shard's (bucket, type code, count, total) rows for [start, end), open hours included"""
+        bucket_sql = {
+            'hour': "bucket_start",
+            'day': "TIMESTAMP(DATE(bucket_start))",
+            'month': "TIMESTAMP(DATE_FORMAT(bucket_start, '%%Y-%%m-01'))"
+        }[granularity]
+        rows = self.db.fetch_all(f"""
+            SELECT {bucket_sql} as bucket, type_code, SUM(tx_count) as tx_count, SUM(total_amount) as total_amount
+            FROM analytics_hourly
+            WHERE bucket_start >= %s AND bucket_start < %s
+            GROUP BY bucket, type_code
+        """, (start, end))
+        merged = [(row['bucket'], row['type_code'], int(row['tx_count']), float(row['total_amount']))
+                  for row in rows]
+        merged += [(_bucket_start(hour, granularity), type_code, count, total)
+                   for hour, type_code, count, total, _ in self._open_hours() if start <= hour < end]
+        return merged
+
+    def get_size_percentiles(self, start: datetime, end: datetime,
+                             percentiles: Sequence[float] = (50, 90, 99)) -> Dict[str, Dict[float, Optional[float]]]:
+        """
+        Transaction size percentiles per type (and 'all') for [start, end).
+        Values are histogram bin midpoints, accurate to about 6%.
+        """
+        self.refresh()
+        histograms = [[0] * SIZE_BINS for _ in TRANSACTION_TYPES]
+        for shard_histograms in self.db.gather(lambda: [self._shard_histograms(start, end)]):
+            for counts, shard_counts in zip(histograms, shard_histograms):
+                for i, count in enumerate(shard_counts):
+                    counts[i] += count
+
+        combined = [sum(counts) for counts in zip(*histograms)]
+        result = {name: {p: _percentile(histograms[code], p) for p in percentiles}
+                  for code, name in enumerate(TRANSACTION_TYPES)}
+        result['all'] = {p: _percentile(combined, p) for p in percentiles}
+        return result
+
+    def _shard_histograms(self, start: datetime, end: datetime) -> List[List[int]]:
+        """The current shard's size histogram per type for [start, end)"""
+        histograms = [[0] * SIZE_BINS for _ in TRANSACTION_TYPES]
+        for row in self.db.fetch_all("""
+            SELECT type_code, size_histogram FROM analytics_hourly
+            WHERE bucket_start >= %s AND bucket_start < %s
+        """, (_floor_hour(start), end)):
+            _decode_into(row['size_histogram'], histograms[row['type_code']])
+        for hour, type_code, _, _, histogram in self._open_hours():
+            if start <= hour < end:
+                for i, count in enumerate(histogram):
+                    histograms[type_code][i] += count
+        return histograms
+
+    def recent_range(self, granularity: str, buckets: int) -> Tuple[datetime, datetime]:
+        """[start, end) covering the last `buckets` buckets, including the current one"""
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Granularity must be one of {', '.join(GRANULARITIES)}")
+        end = _next_bucket(_bucket_start(self._now(), granularity), granularity)
+        if granularity == 'hour':
+            return end - timedelta(hours=buckets), end
+        if granularity == 'day':
+            return end - timedelta(days=buckets), end
+        return _month_start(end, -buckets), end
+
+    def _now(self) -> datetime:
+        """Database clock, which stamps the transactions"""
+        result = self.db.fetch_one("SELECT NOW() as now")
+        return result['now'] if result else datetime.now()
+
+
+def _aggregate(columns: Dict[str, Any], hours: int) -> List[Tuple[int, int, int, float, List[int]]]:
+    """(hour, type code, count, total, size histogram) for every hour and type with transactions"""
+    size = hours * _TYPE_COUNT
+    keys = _combine(columns['hour'], columns['type_code'], _TYPE_COUNT)
+    counts = count_by(keys, size)
+    totals = sum_by(keys, columns['amount'], size)
+    histograms = count_by(_combine(keys, _size_bins(columns['amount']), SIZE_BINS), size * SIZE_BINS)
+    return [(key // _TYPE_COUNT, key % _TYPE_COUNT, counts[key], totals[key],
+             histograms[key * SIZE_BINS:(key + 1) * SIZE_BINS])
+            for key in range(size) if counts[key]]
+
+
+def _combine(major, minor, minor_size: int):
+    """major * minor_size + minor, elementwise"""
+    if np is not None:
+        return np.asarray(major, dtype=np.int64) * minor_size + np.asarray(minor, dtype=np.int64)
+    return [a * minor_size + b for a, b in zip(major, minor)]
+
+
+def _size_bins(amounts):
+    """Histogram bin of each amount"""
+    if np is not None:
+        scaled = np.maximum(np.asarray(amounts, dtype=np.float64), SIZE_MINIMUM) / SIZE_MINIMUM
+        return np.minimum(np.floor(np.log10(scaled) * SIZE_BINS_PER_DECADE), SIZE_BINS - 1).astype(np.int64)
+    return [min(int(math.log10(max(amount, SIZE_MINIMUM) / SIZE_MINIMUM) * SIZE_BINS_PER_DECADE), SIZE_BINS - 1)
+            for amount in amounts]
+
+
+def _encode_histogram(counts: Sequence[int]) -> str:
+    return ','.join(f"{i}:{count}" for i, count in enumerate(counts) if count)
+
+
+def _decode_into(text: str, counts: List[int]):
+    for pair in text.split(','):
+        if pair:
+            i, count = pair.split(':')
+            counts[int(i)] += int(count)
+
+
+def _percentile(histogram: Sequence[int], p: float) -> Optional[float]:
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = p / 100 * total
+    running = 0
+    for i, count in enumerate(histogram):
+        running += count
+        if count and running >= rank:
+            return round(SIZE_MINIMUM * 10 ** ((i + 0.5) / SIZE_BINS_PER_DECADE), 2)
+    return None
+
+
+def _floor_hour(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _month_start(moment: datetime, months_ahead: int = 0) -> datetime:
+    index = moment.year * 12 + moment.month - 1 + months_ahead
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def _bucket_start(moment: datetime, granularity: str) -> datetime:
+    if granularity == 'hour':
+        return _floor_hour(moment)
+    if granularity == 'day':
+        return datetime.combine(moment.date(), datetime.min.time())
+    return _month_start(moment)
+
+
+def _next_bucket(bucket: datetime, granularity: str) -> datetime:
+    if granularity == 'hour':
+        return bucket + timedelta(hours=1)
+    if granularity == 'day':
+        return bucket + timedelta(days=1)
+    return _month_start(bucket, 1)
+
+
+if __name__ == "__main__":
+    import argparse
+    from db.shard_router import open_database
+
+    parser = argparse.ArgumentParser(description="Ledger analytics")
+    parser.add_argument('command', choices=['refresh', 'series', 'percentiles'])
+    parser.add_argument('--granularity', choices=GRANULARITIES, default='day')
+    parser.add_argument('--buckets', type=int, default=30)
+    args = parser.parse_args()
+
+    service = AnalyticsService(open_database())
+    if args.command == 'refresh':
+        print(f"Rolled up {service.refresh()} hours")
+    elif args.command == 'series':
+        for entry in service.get_series(args.granularity, *service.recent_range(args.granularity, args.buckets)):
+            flows = '  '.join(f"{name}={entry['counts'][name]}/₱{entry['totals'][name]:,.2f}"
+                              for name in TRANSACTION_TYPES if entry['counts'][name])
+            print(f"{entry['bucket']:%Y-%m-%d %H:%M}  {flows}")
+    else:
+        for name, values in service.get_size_percentiles(
+                *service.recent_range(args.granularity, args.buckets)).items():
+            print(f"{name:<18} " + '  '.join(f"p{p:g}=" + (f"₱{v:,.2f}" if v is not None else '-')
+                                            for p, v in values.items()))
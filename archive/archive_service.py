@@ -0,0 +1,485 @@
+# banking_app/archive/archive_service.py
+"""
+Archive service
+Handles monthly partitioning of the transactions table (hot tier) and
+moving closed months into compressed columnar files on disk (cold tier)
+
+Each archived month has an ACCOUNTS.json index naming the segments (and
+row spans) holding each account, so an account's archived reads only
+decode the segments that actually contain it.
+"""
+
+import os
+import gzip
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, date
+from typing import List, Dict, Any, Optional, Tuple
+from db.database import Database
+from db.records import TransactionRecord
+from analytics.analytics_service import AnalyticsService
+from monitoring.tracing import trace_methods
+from config.settings import Settings
+
+SEGMENT_FORMAT_VERSION = 1
+MANIFEST_NAME = "MANIFEST.json"
+ACCOUNTS_NAME = "ACCOUNTS.json"
+
+
+def _month_start(year: int, month: int) -> date:
+    return date(year, month, 1)
+
+
+def _next_month(year: int, month: int) -> Tuple[int, int]:
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def _partition_name(year: int, month: int) -> str:
+    return f"p{year:04d}{month:02d}"
+
+
+class _FileCache:
+    """LRU cache of decoded archive files bounded by total weight (rows or index entries)"""
+
+    def __init__(self, max_weight: int):
+        self.max_weight = max_weight
+        self._entries: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._weight = 0
+        self._lock = threading.Lock()
+
+    def get(self, path: str, load, weigh) -> Any:
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                self._entries.move_to_end(path)
+                return entry[0]
+        value = load(path)
+        weight = weigh(value)
+        with self._lock:
+            if weight <= self.max_weight and path not in self._entries:
+                self._entries[path] = (value, weight)
+                self._weight += weight
+                while self._weight > self.max_weight:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self._weight -= evicted
+        return value
+
+
+# Archive files are immutable once written, so caching them is safe
+_segments = _FileCache(Settings.ARCHIVE_CACHE_ROWS)
+_account_indexes = _FileCache(Settings.ARCHIVE_CACHE_ACCOUNTS)
+
+
+def _read_segment_file(path: str) -> Dict[str, Any]:
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _load_segment(path: str) -> Dict[str, Any]:
+    """Load a segment file through the row-bounded cache"""
+    return _segments.get(path, _read_segment_file, lambda segment: segment['row_count'])
+
+
+@trace_methods
+class ArchiveService:
+    def __init__(self, database: Database, archive_dir: str = None):
+        self.db = database
+        self._archive_root = archive_dir or Settings.ARCHIVE_DIR
+        self._expression = None
+
+    @property
+    def archive_dir(self) -> str:
+        """Cold tier directory of the current shard (each shard archives its own rows)"""
+        shard = self.db.node.name
+        return os.path.join(self._archive_root, shard) if shard else self._archive_root
+
+    # Hot tier: monthly range partitioning
+
+    def is_partitioned(self) -> bool:
+        """Check whether the transactions table is already partitioned"""
+        query = """
+            SELECT COUNT(*) as partitions
+            FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'transactions'
+            AND PARTITION_NAME IS NOT NULL
+        """
+        result = self.db.fetch_one(query)
+        return bool(result and result['partitions'])
+
+    def partition_transactions_table(self, months_ahead: int = 3) -> bool:
+        """
+        Migrate the existing transactions table to monthly range partitions.
+        Existing rows are redistributed by MySQL while the table is rebuilt,
+        so run this during a maintenance window on large tables.
+        """
+        if self.is_partitioned():
+            return self.ensure_future_partitions(months_ahead)
+
+        # Partitioned InnoDB tables cannot carry foreign keys
+        fk_query = """
+            SELECT CONSTRAINT_NAME
+            FROM information_schema.TABLE_CONSTRAINTS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'transactions'
+            AND CONSTRAINT_TYPE = 'FOREIGN KEY'
+        """
+        for fk in self.db.fetch_all(fk_query):
+            if not self.db.execute_query(
+                f"ALTER TABLE transactions DROP FOREIGN KEY `{fk['CONSTRAINT_NAME']}`"
+            ):
+                raise Exception(f"Failed to drop foreign key {fk['CONSTRAINT_NAME']}")
+
+        # Every unique key must include the partitioning column
+        if not self.db.execute_query("""
+            ALTER TABLE transactions
+            DROP PRIMARY KEY,
+            ADD PRIMARY KEY (id, timestamp),
+            ADD INDEX idx_transactions_account_time (account_number, timestamp)
+        """):
+            raise Exception("Failed to rebuild primary key for partitioning")
+
+        result = self.db.fetch_one("SELECT MIN(timestamp) as first_ts FROM transactions")
+        first = result['first_ts'] if result and result['first_ts'] else datetime.now()
+        today = datetime.now().date()
+
+        year, month = first.year, first.month
+        last_year, last_month = today.year, today.month
+        for _ in range(months_ahead):
+            last_year, last_month = _next_month(last_year, last_month)
+
+        definitions = []
+        while (year, month) <= (last_year, last_month):
+            definitions.append(self._partition_definition(year, month))
+            year, month = _next_month(year, month)
+        definitions.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+
+        query = f"""
+            ALTER TABLE transactions
+            PARTITION BY RANGE ({self._partition_expression()}) (
+                {', '.join(definitions)}
+            )
+        """
+        if not self.db.execute_query(query):
+            raise Exception("Failed to partition transactions table")
+        return True
+
+    def ensure_future_partitions(self, months_ahead: int = 3) -> bool:
+        """Split the catch-all partition so upcoming months get their own partition"""
+        existing = set(self.get_partition_names())
+        today = datetime.now().date()
+        year, month = today.year, today.month
+
+        definitions = []
+        for _ in range(months_ahead + 1):
+            if _partition_name(year, month) not in existing:
+                definitions.append(self._partition_definition(year, month))
+            year, month = _next_month(year, month)
+
+        if not definitions:
+            return True
+
+        definitions.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+        query = f"""
+            ALTER TABLE transactions
+            REORGANIZE PARTITION pmax INTO ({', '.join(definitions)})
+        """
+        return self.db.execute_query(query)
+
+    def get_partition_names(self) -> List[str]:
+        """Get monthly partition names in order"""
+        query = """
+            SELECT PARTITION_NAME as name
+            FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'transactions'
+            AND PARTITION_NAME IS NOT NULL AND PARTITION_NAME != 'pmax'
+            ORDER BY PARTITION_ORDINAL_POSITION
+        """
+        return [row['name'] for row in self.db.fetch_all(query)]
+
+    def _partition_expression(self) -> str:
+        """Partitioning expression valid for the timestamp column's type"""
+        if self._expression:
+            return self._expression
+
+        query = """
+            SELECT DATA_TYPE as data_type
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'transactions'
+            AND COLUMN_NAME = 'timestamp'
+        """
+        result = self.db.fetch_one(query)
+        if result and result['data_type'].lower() == 'timestamp':
+            self._expression = "UNIX_TIMESTAMP(timestamp)"
+        else:
+            self._expression = "TO_DAYS(timestamp)"
+        return self._expression
+
+    def _partition_definition(self, year: int, month: int) -> str:
+        next_year, next_month = _next_month(year, month)
+        boundary = _month_start(next_year, next_month)
+        if self._partition_expression().startswith("UNIX_TIMESTAMP"):
+            bound = f"UNIX_TIMESTAMP('{boundary} 00:00:00')"
+        else:
+            bound = f"TO_DAYS('{boundary}')"
+        return f"PARTITION {_partition_name(year, month)} VALUES LESS THAN ({bound})"
+
+    # Cold tier: columnar archive files
+
+    def archive_closed_periods(self, hot_months: int = None) -> List[str]:
+        """Archive every partition older than the hot window and return archived months"""
+        hot_months = Settings.ARCHIVE_HOT_MONTHS if hot_months is None else hot_months
+        today = datetime.now().date()
+        year, month = today.year, today.month
+        for _ in range(hot_months):
+            year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+        cutoff = _partition_name(year, month)
+
+        # Roll the months up for analytics while their rows are still in the hot table
+        AnalyticsService(self.db).refresh()
+
+        archived = []
+        for name in self.get_partition_names():
+            if name < cutoff:
+                period_year, period_month = int(name[1:5]), int(name[5:7])
+                self.archive_month(period_year, period_month)
+                archived.append(f"{period_year:04d}-{period_month:02d}")
+        return archived
+
+    def archive_month(self, year: int, month: int) -> int:
+        """Copy one closed month to the cold tier, then drop its partition"""
+        today = datetime.now().date()
+        if (year, month) >= (today.year, today.month):
+            raise ValueError("Only closed months can be archived")
+
+        partition = _partition_name(year, month)
+        month_dir = self._month_dir(year, month)
+
+        if not os.path.exists(os.path.join(month_dir, MANIFEST_NAME)):
+            os.makedirs(month_dir, exist_ok=True)
+            segments, row_count, accounts = self._write_segments(partition, month_dir)
+
+            count = self.db.fetch_one(
+                f"SELECT COUNT(*) as total FROM transactions PARTITION ({partition})"
+            )
+            if not count or count['total'] != row_count:
+                raise Exception(f"Archive verification failed for {partition}")
+
+            # The manifest is written last: it marks the month as complete
+            self._write_json_atomic(os.path.join(month_dir, ACCOUNTS_NAME), accounts)
+            self._write_json_atomic(os.path.join(month_dir, MANIFEST_NAME), {
+                'version': SEGMENT_FORMAT_VERSION,
+                'month': f"{year:04d}-{month:02d}",
+                'segments': segments,
+                'row_count': row_count,
+                'archived_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            })
+        else:
+            row_count = self._read_manifest(month_dir)['row_count']
+
+        if partition in self.get_partition_names():
+            if not self.db.execute_query(f"ALTER TABLE transactions DROP PARTITION {partition}"):
+                raise Exception(f"Failed to drop partition {partition}")
+
+        return row_count
+
+    def _write_segments(self, partition: str, month_dir: str) -> Tuple[List[str], int, Dict[str, list]]:
+        """
+        Stream a partition into segment files using keyset pagination on id;
+        also returns the month's account index ({account: [[segment, start, end], ...]})
+        """
+        query = f"""
+            SELECT id, account_number, type, amount, timestamp
+            FROM transactions PARTITION ({partition})
+            WHERE id > %s
+            ORDER BY id
+            LIMIT %s
+        """
+        segments = []
+        row_count = 0
+        last_id = 0
+        accounts: Dict[str, list] = {}
+
+        while True:
+            rows = self.db.fetch_all(query, (last_id, Settings.ARCHIVE_SEGMENT_ROWS))
+            if not rows:
+                break
+
+            last_id = rows[-1]['id']
+            name = f"seg-{len(segments) + 1:06d}.json.gz"
+            account_index = self._write_segment(os.path.join(month_dir, name), rows)
+            for account_number, (start, end) in account_index.items():
+                accounts.setdefault(account_number, []).append([name, start, end])
+            segments.append(name)
+            row_count += len(rows)
+
+        return segments, row_count, accounts
+
+    def _write_segment(self, path: str, rows: List[Dict[str, Any]]) -> Dict[str, Tuple[int, int]]:
+        """Write rows as a dictionary-encoded, account-clustered columnar segment; returns its account index"""
+        rows = sorted(rows, key=lambda r: (r['account_number'], r['id']))
+
+        type_dictionary = sorted({row['type'] for row in rows})
+        type_codes = {name: code for code, name in enumerate(type_dictionary)}
+
+        account_index = {}
+        for position, row in enumerate(rows):
+            start, _ = account_index.get(row['account_number'], (position, position))
+            account_index[row['account_number']] = (start, position + 1)
+
+        segment = {
+            'version': SEGMENT_FORMAT_VERSION,
+            'row_count': len(rows),
+            'type_dictionary': type_dictionary,
+            'account_index': account_index,
+            'columns': {
+                'id': [row['id'] for row in rows],
+                'type': [type_codes[row['type']] for row in rows],
+                'amount': [str(row['amount']) for row in rows],
+                'timestamp': [row['timestamp'].strftime('%Y-%m-%d %H:%M:%S') for row in rows]
+            }
+        }
+
+        tmp_path = path + ".tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(segment, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+        return account_index
+
+    def _write_json_atomic(self, path: str, data: Dict[str, Any]):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def _month_dir(self, year: int, month: int) -> str:
+        return os.path.join(self.archive_dir, f"{year:04d}-{month:02d}")
+
+    def _read_manifest(self, month_dir: str) -> Dict[str, Any]:
+        with open(os.path.join(month_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+
+    def _account_index(self, month_dir: str) -> Dict[str, list]:
+        """The month's account index, built once from its segments for months archived without one"""
+        path = os.path.join(month_dir, ACCOUNTS_NAME)
+        if not os.path.exists(path):
+            accounts: Dict[str, list] = {}
+            for name in self._read_manifest(month_dir)['segments']:
+                segment = _read_segment_file(os.path.join(month_dir, name))
+                for account_number, (start, end) in segment['account_index'].items():
+                    accounts.setdefault(account_number, []).append([name, start, end])
+            self._write_json_atomic(path, accounts)
+
+        def load(index_path: str) -> Dict[str, list]:
+            with open(index_path, encoding='utf-8') as f:
+                return json.load(f)
+        return _account_indexes.get(path, load, len)
+
+    # Reading the cold tier
+
+    def get_archived_months(self) -> List[Tuple[int, int]]:
+        """Get (year, month) pairs that are fully archived"""
+        if not os.path.isdir(self.archive_dir):
+            return []
+
+        months = []
+        for name in os.listdir(self.archive_dir):
+            if os.path.exists(os.path.join(self.archive_dir, name, MANIFEST_NAME)):
+                try:
+                    year, month = name.split('-')
+                    months.append((int(year), int(month)))
+                except ValueError:
+                    continue
+        return sorted(months)
+
+    def archived_until(self) -> Optional[datetime]:
+        """Get the exclusive upper bound of archived data, or None if nothing is archived"""
+        months = self.get_archived_months()
+        if not months:
+            return None
+        year, month = _next_month(*months[-1])
+        return datetime(year, month, 1)
+
+    def hot_window(self, column: str = 'timestamp') -> Tuple[str, tuple]:
+        """
+        SQL condition (and params) limiting a hot-tier query to rows newer than
+        the archive, for totals that add the archived rows separately. Months
+        are archived oldest first, so older hot rows are only ever copies left
+        by an interrupted archive run.
+        """
+        boundary = self.archived_until()
+        if boundary is None:
+            return "", ()
+        return f" AND {column} >= %s", (boundary,)
+
+    def archived_row_count(self) -> int:
+        """Rows this shard has moved to the cold tier"""
+        return sum(self._read_manifest(self._month_dir(year, month))['row_count']
+                   for year, month in self.get_archived_months())
+
+    def get_archived_transactions(self, account_number: str, start: datetime = None,
+                                  end: datetime = None) -> List[Dict[str, Any]]:
+        """Get archived transactions for account in [start, end), newest first"""
+        boundary = self.archived_until()
+        if boundary is None or (start is not None and start >= boundary):
+            return []
+
+        results = []
+        for year, month in self.get_archived_months():
+            month_begin = datetime(year, month, 1)
+            month_end = datetime(*_next_month(year, month), 1)
+            if (start is not None and month_end <= start) or (end is not None and month_begin >= end):
+                continue
+
+            month_dir = self._month_dir(year, month)
+            for segment_name, span_start, span_end in self._account_index(month_dir).get(account_number, []):
+                segment = _load_segment(os.path.join(month_dir, segment_name))
+                columns = segment['columns']
+                type_dictionary = segment['type_dictionary']
+                for i in range(span_start, span_end):
+                    timestamp = datetime.fromisoformat(columns['timestamp'][i])
+                    if (start is not None and timestamp < start) or (end is not None and timestamp >= end):
+                        continue
+                    results.append(TransactionRecord(columns['id'][i], type_dictionary[columns['type'][i]],
+                                                     columns['amount'][i], timestamp))
+
+        results.sort(key=lambda r: r['timestamp'], reverse=True)
+        return results
+
+    def merge_with_archive(self, hot_rows: List[Dict[str, Any]], account_number: str,
+                           start: datetime = None, end: datetime = None,
+                           limit: int = None) -> List[Dict[str, Any]]:
+        """Merge hot-tier rows with matching cold-tier rows, newest first"""
+        if limit is not None and len(hot_rows) >= limit:
+            return hot_rows
+
+        cold_rows = self.get_archived_transactions(account_number, start, end)
+        if not cold_rows:
+            return hot_rows
+
+        # A crash between writing the manifest and dropping the partition
+        # can leave a month in both tiers until the archiver is re-run
+        hot_ids = {row['id'] for row in hot_rows if 'id' in row}
+        merged = hot_rows + [row for row in cold_rows if row['id'] not in hot_ids]
+        merged.sort(key=lambda r: r['timestamp'], reverse=True)
+        return merged[:limit] if limit is not None else merged
+
+
+if __name__ == "__main__":
+    import argparse
+    from db.shard_router import open_database
+
+    parser = argparse.ArgumentParser(description="Transactions table tiering")
+    parser.add_argument('command', choices=['partition', 'extend', 'archive'])
+    parser.add_argument('--months-ahead', type=int, default=3)
+    args = parser.parse_args()
+
+    # Each shard partitions and archives its own transactions table
+    for node in open_database().shards:
+        service = ArchiveService(node)
+        if args.command == 'partition':
+            service.partition_transactions_table(args.months_ahead)
+        elif args.command == 'extend':
+            service.ensure_future_partitions(args.months_ahead)
+        else:
+            label = f" on {node.name}" if node.name else ""
+            print(f"Archived months{label}: {service.archive_closed_periods()}")
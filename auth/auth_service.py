@@ -9,10 +9,18 @@ import random
 import string
 from typing import Optional, Dict, Any
 from db.database import Database
+from db.shard_router import route_by
+from transactions.hot_account_service import HotAccountService
+from events.outbox_service import OutboxService
+from monitoring.metrics import track_operation
+from monitoring.tracing import trace_methods
 
+@trace_methods
 class AuthService:
-    def __init__(self, database: Database):
+    def __init__(self, database: Database, hot_accounts: HotAccountService = None):
         self.db = database
+        self.hot_accounts = hot_accounts or HotAccountService(database)
+        self.outbox = OutboxService(database)
 
     def register_user(self, name: str, password: str) -> str:
         """Register a new user and return account number"""
@@ -36,11 +44,16 @@ class AuthService:
         """
         params = (account_number, name, hashed_password, 0.00, 0)
         
-        if self.db.execute_query(query, params):
-            return account_number
-        else:
-            raise Exception("Failed to create account")
+        # The new account lives on the shard its number hashes to
+        with self.db.routed(account_number), self.db.unit_of_work():
+            if self.db.execute_query(query, params):
+                self.outbox.record('account_changed', account_number, 0, declined=False)
+                return account_number
+            else:
+                raise Exception("Failed to create account")
 
+    @track_operation('login')
+    @route_by()
     def login(self, account_number: str, password: str) -> Dict[str, Any]:
         """Authenticate user and return user data"""
         if not account_number or not password:
@@ -81,7 +94,7 @@ class AuthService:
         return {
             'account_number': user['account_number'],
             'name': user['name'],
-            'balance': float(user['balance']),
+            'balance': float(user['balance']) + self.hot_accounts.pending_credits(account_number),
             'is_approved': user['is_approved'],
             'created_at': user['created_at']
         }
@@ -98,8 +111,9 @@ class AuthService:
             
             # Check if account number already exists
             query = "SELECT account_number FROM accounts WHERE account_number = %s"
-            if not self.db.fetch_one(query, (account_number,)):
-                return account_number
+            with self.db.routed(account_number):
+                if not self.db.fetch_one(query, (account_number,)):
+                    return account_number
 
     def _hash_password(self, password: str) -> str:
         """Hash password using bcrypt"""
@@ -111,6 +125,7 @@ class AuthService:
         """Verify password against hash"""
         return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
 
+    @route_by()
     def change_password(self, account_number: str, old_password: str, new_password: str) -> bool:
         """Change user password"""
         # Verify old password
@@ -0,0 +1,70 @@
+# banking_app/benchmarks/compare.py
+"""
+Compare two benchmark result files
+
+Usage:
+    python -m benchmarks.compare baseline.json candidate.json [--threshold 10]
+
+Exits with status 1 when any benchmark's p95 regresses by more than the
+threshold percentage.
+"""
+
+import sys
+import json
+import argparse
+from typing import Dict, Any, List
+
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms')
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def change(before: float, after: float) -> float:
+    """Percentage change (positive means slower)"""
+    if not before:
+        return 0.0
+    return (after - before) / before * 100
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare benchmark results")
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10.0, help="allowed p95 regression in percent")
+    args = parser.parse_args(argv)
+
+    baseline = load(args.baseline)
+    candidate = load(args.candidate)
+
+    if baseline['meta'].get('scale') != candidate['meta'].get('scale'):
+        print("Warning: runs used different data scales; comparison may be misleading")
+
+    print(f"{'Benchmark':<32} " + ' '.join(f"{m.replace('_ms', ''):>25}" for m in METRICS))
+    regressions = []
+    for name in sorted(set(baseline['results']) | set(candidate['results'])):
+        before = baseline['results'].get(name)
+        after = candidate['results'].get(name)
+        if not before or not after:
+            print(f"{name:<32} {'only in ' + ('baseline' if before else 'candidate'):>25}")
+            continue
+
+        cells = []
+        for metric in METRICS:
+            delta = change(before[metric], after[metric])
+            cells.append(f"{before[metric]:>8.2f}->{after[metric]:>8.2f} {delta:+5.0f}%")
+        print(f"{name:<32} " + ' '.join(cells))
+
+        if change(before['p95_ms'], after['p95_ms']) > args.threshold:
+            regressions.append(name)
+
+    if regressions:
+        print(f"\np95 regressions over {args.threshold:.0f}%: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+# banking_app/benchmarks/data_generator.py
+"""
+Synthetic data generator
+Seeds accounts, ledger rows and active loans at a configurable scale.
+Output is deterministic for a given seed so runs are comparable.
+"""
+
+import random
+import time
+import mysql.connector
+from datetime import datetime, timedelta, date
+from typing import Dict, Any, Iterator, List, Tuple
+
+BENCH_PASSWORD = 'Bench1234'
+ACCOUNT_BASE = 1000000000
+
+# Ledger mix roughly matching a retail branch
+TRANSACTION_TYPES = ('deposit', 'withdrawal', 'transfer_in', 'transfer_out', 'loan_disbursement', 'loan_payment')
+TRANSACTION_WEIGHTS = (0.35, 0.30, 0.15, 0.15, 0.01, 0.04)
+
+
+def account_number(index: int) -> str:
+    """Deterministic 10-digit account number for the index-th synthetic account"""
+    return str(ACCOUNT_BASE + index)
+
+
+class SyntheticDataGenerator:
+    def __init__(self, config: Dict[str, Any], seed: int = 42, batch_size: int = 10000):
+        self.config = config
+        self.seed = seed
+        self.batch_size = batch_size
+
+    def generate(self, accounts: int, transactions: int, loans: int = 1000,
+                 history_days: int = 730, reset: bool = True) -> Dict[str, Any]:
+        """Seed the database and return a description of what was generated"""
+        rng = random.Random(self.seed)
+        connection = mysql.connector.connect(**self.config, autocommit=False)
+        started = time.perf_counter()
+
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SET unique_checks = 0")
+            cursor.execute("SET foreign_key_checks = 0")
+
+            if reset:
+                for table in ('loan_payments', 'loans', 'loan_applications',
+                              'account_declines', 'transactions', 'accounts'):
+                    cursor.execute(f"TRUNCATE TABLE {table}")
+
+            self._insert_batches(cursor, connection, """
+                INSERT INTO accounts (account_number, name, hashed_pin, balance, is_approved, created_at)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, self._account_rows(rng, accounts, history_days))
+
+            self._insert_batches(cursor, connection, """
+                INSERT INTO transactions (account_number, type, amount, timestamp)
+                VALUES (%s, %s, %s, %s)
+            """, self._transaction_rows(rng, accounts, transactions, history_days))
+
+            loans = min(loans, accounts)
+            self._insert_batches(cursor, connection, """
+                INSERT INTO loan_applications (id, account_number, amount, purpose, monthly_income,
+                    employment_status, status, interest_rate, term_months, monthly_payment,
+                    applied_at, processed_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, self._application_rows(rng, accounts, loans))
+
+            self._insert_batches(cursor, connection, """
+                INSERT INTO loans (application_id, account_number, principal_amount, interest_rate,
+                    term_months, monthly_payment, remaining_balance, next_payment_date)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """, self._loan_rows(rng, accounts, loans))
+
+            cursor.execute("SET unique_checks = 1")
+            cursor.execute("SET foreign_key_checks = 1")
+            cursor.execute("ANALYZE TABLE accounts, transactions, loans, loan_applications")
+            cursor.fetchall()
+            cursor.close()
+        finally:
+            connection.close()
+
+        return {
+            'seed': self.seed,
+            'accounts': accounts,
+            'transactions': transactions,
+            'loans': loans,
+            'history_days': history_days,
+            'seed_seconds': round(time.perf_counter() - started, 1)
+        }
+
+    def _insert_batches(self, cursor, connection, query: str, rows: Iterator[Tuple]):
+        """Insert rows in multi-row batches, committing per batch"""
+        batch: List[Tuple] = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                cursor.executemany(query, batch)
+                connection.commit()
+                batch = []
+        if batch:
+            cursor.executemany(query, batch)
+            connection.commit()
+
+    def _account_rows(self, rng: random.Random, accounts: int, history_days: int) -> Iterator[Tuple]:
+        # Hash once: bcrypt per account would dominate seeding time
+        import bcrypt
+        hashed_pin = bcrypt.hashpw(BENCH_PASSWORD.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        now = datetime.now()
+
+        for i in range(accounts):
+            created_at = now - timedelta(days=history_days, seconds=rng.randint(0, 86400 * 30))
+            # Generous balances keep withdrawals and transfers from failing mid-run
+            yield (account_number(i), f"Bench Customer {i}", hashed_pin,
+                   round(rng.uniform(500000, 900000), 2), 1, created_at)
+
+    def _transaction_rows(self, rng: random.Random, accounts: int, transactions: int,
+                          history_days: int) -> Iterator[Tuple]:
+        now = datetime.now()
+        horizon = history_days * 86400
+        for _ in range(transactions):
+            txn_type = rng.choices(TRANSACTION_TYPES, TRANSACTION_WEIGHTS)[0]
+            yield (account_number(rng.randrange(accounts)), txn_type,
+                   round(rng.lognormvariate(6.5, 1.2), 2),
+                   now - timedelta(seconds=rng.randint(0, horizon)))
+
+    def _application_rows(self, rng: random.Random, accounts: int, loans: int) -> Iterator[Tuple]:
+        now = datetime.now()
+        for i in range(loans):
+            amount = round(rng.uniform(10000, 500000), 2)
+            yield (i + 1, account_number(i), amount, 'Benchmark loan',
+                   round(rng.uniform(20000, 150000), 2), 'employed', 'approved', 12.0, 36,
+                   round(amount / 30, 2), now - timedelta(days=60), now - timedelta(days=59))
+
+    def _loan_rows(self, rng: random.Random, accounts: int, loans: int) -> Iterator[Tuple]:
+        next_payment = date.today() + timedelta(days=30)
+        for i in range(loans):
+            principal = round(rng.uniform(10000, 500000), 2)
+            yield (i + 1, account_number(i), principal, 12.0, 36,
+                   round(principal / 30, 2), principal, next_payment)
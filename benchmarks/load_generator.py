@@ -0,0 +1,459 @@
+# banking_app/benchmarks/load_generator.py
+"""
+Concurrent mixed-workload load generator
+Drives BankingApp deposits, withdrawals and transfers, logins and statement
+views from many threads (optionally across processes) against a seeded
+benchmark database, and reports throughput, latency percentiles and
+deadlock / lock-wait failures per reporting interval.
+
+Usage (from the repository root, after seeding with run_benchmarks):
+    python -m benchmarks.load_generator --threads 32 --duration 120 --zipf 1.2
+    python -m benchmarks.load_generator --rate 400 --processes 4 --threads 16
+    python -m benchmarks.load_generator --shared-app --threads 8
+
+--rate > 0 runs open-loop: arrivals follow a Poisson process at that total
+rate and latency is measured from each request's scheduled arrival, so
+queueing behind a saturated server shows up instead of being hidden by
+slower clients. --rate 0 runs closed-loop (each thread issues its next
+request as soon as the previous one returns).
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import random
+import bisect
+import logging
+import argparse
+import itertools
+import threading
+import multiprocessing
+from datetime import datetime
+from typing import Dict, Any, List, Tuple, Optional
+
+from benchmarks.data_generator import account_number, BENCH_PASSWORD
+from benchmarks.run_benchmarks import percentile, git_revision
+
+OPERATIONS = ('deposit', 'withdrawal', 'transfer', 'login', 'statement')
+DEFAULT_MIX = 'deposit=30,withdrawal=25,transfer=25,login=5,statement=15'
+STATEMENT_VIEWS = ('daily', 'monthly', 'yearly', 'summary')
+
+# MySQL error codes surfaced separately in the report
+DEADLOCK = 1213
+LOCK_WAIT_TIMEOUT = 1205
+
+OUTCOMES = ('ok', 'rejected', 'deadlock', 'lock_wait_timeout', 'error')
+
+# Business-rule failures that are expected under load and not counted as errors
+REJECTIONS = ('insufficient balance', 'not found', 'not approved', 'invalid account number or password')
+
+# One completed request: (finished_at seconds since start, operation, latency_ms, outcome)
+Sample = Tuple[float, str, float, str]
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """Parse 'deposit=30,transfer=20,...' into normalized operation weights"""
+    mix = {}
+    for part in filter(None, (p.strip() for p in text.split(','))):
+        name, _, weight = part.partition('=')
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{name}' (expected one of {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError("Operation mix must have a positive weight")
+    return {name: weight / total for name, weight in mix.items() if weight > 0}
+
+
+class ZipfSampler:
+    """Account index sampler where rank k is drawn with probability proportional to 1/k^s
+
+    s = 0 is uniform; s around 1 concentrates traffic on a few hot accounts
+    (the lowest-numbered ones), which is what produces lock contention.
+    """
+
+    def __init__(self, accounts: int, s: float):
+        self.accounts = accounts
+        self.s = s
+        if s > 0:
+            self._cdf = list(itertools.accumulate(1.0 / (k ** s) for k in range(1, accounts + 1)))
+        else:
+            self._cdf = None
+
+    def sample(self, rng: random.Random) -> int:
+        if self._cdf is None:
+            return rng.randrange(self.accounts)
+        return min(bisect.bisect_left(self._cdf, rng.random() * self._cdf[-1]), self.accounts - 1)
+
+    def hot_share(self, top: int) -> float:
+        """Fraction of traffic going to the `top` hottest accounts"""
+        if self._cdf is None:
+            return min(top, self.accounts) / self.accounts
+        return self._cdf[min(top, self.accounts) - 1] / self._cdf[-1]
+
+
+class Workload:
+    """Draws operations and their arguments according to the mix and account skew"""
+
+    def __init__(self, mix: Dict[str, float], sampler: ZipfSampler):
+        self.operations = list(mix)
+        self.weights = list(itertools.accumulate(mix.values()))
+        self.sampler = sampler
+
+    def next(self, rng: random.Random) -> Tuple[str, tuple]:
+        operation = self.operations[bisect.bisect_left(self.weights, rng.random() * self.weights[-1])]
+        account = account_number(self.sampler.sample(rng))
+
+        if operation in ('deposit', 'withdrawal'):
+            return operation, (account, round(rng.uniform(10, 500), 2))
+        if operation == 'transfer':
+            recipient = account
+            while recipient == account and self.sampler.accounts > 1:
+                recipient = account_number(self.sampler.sample(rng))
+            return operation, (account, recipient, round(rng.uniform(10, 500), 2))
+        if operation == 'statement':
+            return operation, (account, rng.choice(STATEMENT_VIEWS))
+        return operation, (account,)
+
+
+def build_app():
+    """Create a headless BankingApp (imported late so DB_* overrides apply)"""
+    from main import BankingApp
+    return BankingApp(headless=True)
+
+
+def execute(app, operation: str, args: tuple) -> Tuple[bool, str]:
+    """Run one operation through the same entry points the GUI uses"""
+    try:
+        if operation == 'deposit':
+            return app.perform_deposit(*args)
+        if operation == 'withdrawal':
+            return app.perform_withdrawal(*args)
+        if operation == 'transfer':
+            return app.perform_transfer(*args)
+        if operation == 'login':
+            app.auth_service.login(args[0], BENCH_PASSWORD)
+            return True, "ok"
+
+        account, view = args
+        if view == 'summary':
+            app.statement_service.get_statement_summary(account, 'monthly')
+        else:
+            getattr(app.statement_service, f"get_{view}_statement")(account)
+        return True, "ok"
+    except Exception as e:
+        return False, str(e)
+
+
+def classify(ok: bool, message: str, new_error_codes: Dict[int, int]) -> str:
+    """Map an operation result to an outcome label
+
+    Deadlocks that the retry policy absorbed still appear in the database
+    error counts, but the operation itself counts as ok.
+    """
+    if ok:
+        return 'ok'
+    if new_error_codes.get(DEADLOCK):
+        return 'deadlock'
+    if new_error_codes.get(LOCK_WAIT_TIMEOUT):
+        return 'lock_wait_timeout'
+
+    lowered = message.lower()
+    if 'deadlock' in lowered:
+        return 'deadlock'
+    if 'lock wait timeout' in lowered:
+        return 'lock_wait_timeout'
+    if any(reason in lowered for reason in REJECTIONS):
+        return 'rejected'
+    return 'error'
+
+
+def _error_code_delta(before: Dict[int, int], after: Dict[int, int]) -> Dict[int, int]:
+    return {code: count - before.get(code, 0) for code, count in after.items() if count != before.get(code, 0)}
+
+
+class LoadRun:
+    """Threads of one process generating load until the run ends"""
+
+    def __init__(self, config: Dict[str, Any], worker_offset: int = 0):
+        self.config = config
+        self.worker_offset = worker_offset
+        self.workload = Workload(config['mix'], ZipfSampler(config['accounts'], config['zipf']))
+        self.samples: List[Sample] = []
+        self.dropped = 0
+        self.apps = []
+        self._lock = threading.Lock()
+        self._arrivals: Optional[queue.Queue] = None
+
+    def run(self, start_at: float) -> Dict[str, Any]:
+        """Build apps, wait until the shared start time, generate load and return samples"""
+        threads = self.config['threads']
+        if self.config['shared_app']:
+            shared = build_app()
+            self.apps = [shared] * threads
+        else:
+            self.apps = [build_app() for _ in range(threads)]
+
+        duration = self.config['duration']
+        end_at = start_at + duration
+        rate = self.config['rate']
+
+        workers = []
+        if rate > 0:
+            self._arrivals = queue.Queue()
+            workers.append(threading.Thread(target=self._dispatch, args=(start_at, end_at, rate),
+                                            name='load-dispatcher', daemon=True))
+        for index in range(threads):
+            target = self._open_loop_worker if rate > 0 else self._closed_loop_worker
+            workers.append(threading.Thread(target=target, args=(index, start_at, end_at),
+                                            name=f'load-worker-{index}', daemon=True))
+
+        time.sleep(max(0.0, start_at - time.time()))
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        if self._arrivals is not None:
+            self.dropped += self._arrivals.qsize()
+
+        return {'samples': self.samples, 'dropped': self.dropped, 'db_error_codes': self.db_error_codes()}
+
+    def db_error_codes(self) -> Dict[int, int]:
+        """MySQL error codes seen by this process's Database instances"""
+        totals: Dict[int, int] = {}
+        for db in {id(app.db): app.db for app in self.apps}.values():
+            for code, count in db.query_stats.error_counts().items():
+                totals[code] = totals.get(code, 0) + count
+        return totals
+
+    def _rng(self, index: int) -> random.Random:
+        return random.Random(self.config['seed'] * 1000003 + self.worker_offset + index)
+
+    def _measure(self, app, operation: str, args: tuple, scheduled: float, start_at: float):
+        before = app.db.query_stats.error_counts()
+        ok, message = execute(app, operation, args)
+        finished = time.time()
+        outcome = classify(ok, message, _error_code_delta(before, app.db.query_stats.error_counts()))
+        self.samples.append((finished - start_at, operation, (finished - scheduled) * 1000, outcome))
+
+    def _closed_loop_worker(self, index: int, start_at: float, end_at: float):
+        rng = self._rng(index)
+        app = self.apps[index]
+        while time.time() < end_at:
+            operation, args = self.workload.next(rng)
+            self._measure(app, operation, args, time.time(), start_at)
+
+    def _dispatch(self, start_at: float, end_at: float, rate: float):
+        """Enqueue Poisson arrivals at this process's share of the total rate"""
+        rng = self._rng(-1)
+        scheduled = start_at
+        while True:
+            scheduled += rng.expovariate(rate)
+            if scheduled >= end_at:
+                break
+            delay = scheduled - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            operation, args = self.workload.next(rng)
+            self._arrivals.put((scheduled, operation, args))
+        for _ in range(self.config['threads']):
+            self._arrivals.put(None)
+
+    def _open_loop_worker(self, index: int, start_at: float, end_at: float):
+        app = self.apps[index]
+        give_up_at = end_at + self.config['drain_timeout']
+        while True:
+            item = self._arrivals.get()
+            if item is None:
+                return
+            if time.time() > give_up_at:
+                with self._lock:
+                    self.dropped += 1
+                continue
+            scheduled, operation, args = item
+            self._measure(app, operation, args, scheduled, start_at)
+
+
+def _run_process(config: Dict[str, Any], worker_offset: int, start_at: float) -> Dict[str, Any]:
+    _quiet_logging(config['verbose'])
+    return LoadRun(config, worker_offset).run(start_at)
+
+
+def _quiet_logging(verbose: bool):
+    # BankingApp logs every operation at INFO; at load-test rates that is the bottleneck
+    import main  # noqa: F401  (applies the app's logging configuration first)
+    logging.getLogger().setLevel(logging.INFO if verbose else logging.CRITICAL)
+
+
+def summarize(samples: List[Sample], elapsed: float) -> Dict[str, Any]:
+    """Throughput, latency percentiles and outcome counts for a set of samples"""
+    latencies = sorted(sample[2] for sample in samples)
+    outcomes = {outcome: 0 for outcome in OUTCOMES}
+    for sample in samples:
+        outcomes[sample[3]] += 1
+    return {
+        'requests': len(samples),
+        'throughput_per_sec': round(len(samples) / elapsed, 2) if elapsed > 0 else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'max_ms': round(latencies[-1], 3) if latencies else 0.0,
+        'outcomes': outcomes
+    }
+
+
+def time_series(samples: List[Sample], interval: float, duration: float) -> List[Dict[str, Any]]:
+    """Per-interval summaries keyed by completion time"""
+    buckets: Dict[int, List[Sample]] = {}
+    for sample in samples:
+        buckets.setdefault(int(sample[0] // interval), []).append(sample)
+
+    last = max(buckets) if buckets else -1
+    series = []
+    for index in range(max(last + 1, int(duration // interval))):
+        entry = summarize(buckets.get(index, []), interval)
+        entry['t_start'] = round(index * interval, 3)
+        series.append(entry)
+    return series
+
+
+def format_row(label: str, summary: Dict[str, Any]) -> str:
+    outcomes = summary['outcomes']
+    return (f"{label:>9} {summary['requests']:>8} {summary['throughput_per_sec']:>9.1f} "
+            f"{summary['p50_ms']:>9.1f} {summary['p95_ms']:>9.1f} {summary['p99_ms']:>9.1f} "
+            f"{outcomes['deadlock']:>9} {outcomes['lock_wait_timeout']:>9} "
+            f"{outcomes['rejected']:>9} {outcomes['error']:>7}")
+
+
+HEADER = (f"{'t':>9} {'requests':>8} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'deadlock':>9} {'lockwait':>9} {'rejected':>9} {'error':>7}")
+
+
+def _report_live(run: LoadRun, start_at: float, interval: float, stop: threading.Event):
+    """Print one row per interval while a single-process run is in progress"""
+    seen = 0
+    tick = 1
+    while not stop.wait(max(0.0, start_at + tick * interval - time.time())):
+        current = len(run.samples)
+        window = [s for s in run.samples[seen:current] if (tick - 1) * interval <= s[0] < tick * interval]
+        seen = current
+        print(format_row(f"{tick * interval:.0f}s", summarize(window, interval)), flush=True)
+        tick += 1
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="IRN Vault concurrent load generator")
+    parser.add_argument('--threads', type=int, default=8, help="worker threads per process")
+    parser.add_argument('--processes', type=int, default=1, help="worker processes (each runs --threads)")
+    parser.add_argument('--duration', type=float, default=60.0, help="seconds of load")
+    parser.add_argument('--rate', type=float, default=0.0,
+                        help="total open-loop arrival rate per second (0 = closed loop)")
+    parser.add_argument('--drain-timeout', type=float, default=30.0,
+                        help="open loop: seconds to keep serving queued arrivals after the run ends")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="operation weights, e.g. deposit=30,transfer=20")
+    parser.add_argument('--zipf', type=float, default=1.1, help="account skew exponent (0 = uniform)")
+    parser.add_argument('--accounts', type=int, default=10000, help="number of seeded benchmark accounts")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--interval', type=float, default=5.0, help="reporting interval in seconds")
+    parser.add_argument('--shared-app', action='store_true',
+                        help="share one BankingApp (and its single connection) between a process's threads")
+    parser.add_argument('--verbose', action='store_true', help="keep the application's INFO logging")
+    parser.add_argument('--output', default='load_results.json')
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('DB_NAME', 'irnvault_bench')
+    # Zipf-skewed hot accounts would trip the velocity limits within seconds
+    os.environ.setdefault('VELOCITY_ENABLED', '0')
+    # Limits high enough never to refuse, so the counter updates stay in the measured path
+    for limit in ('DAILY_WITHDRAWAL_LIMIT', 'ROLLING_WITHDRAWAL_LIMIT', 'DAILY_TRANSFER_LIMIT', 'ROLLING_TRANSFER_LIMIT'):
+        os.environ.setdefault(limit, '1e15')
+    mix = parse_mix(args.mix)
+    config = {
+        'threads': args.threads,
+        'duration': args.duration,
+        'rate': args.rate / args.processes,
+        'drain_timeout': args.drain_timeout,
+        'mix': mix,
+        'zipf': args.zipf,
+        'accounts': args.accounts,
+        'seed': args.seed,
+        'shared_app': args.shared_app,
+        'verbose': args.verbose
+    }
+
+    sampler = ZipfSampler(args.accounts, args.zipf)
+    print(f"{args.processes} process(es) x {args.threads} thread(s), "
+          f"{'open loop at %.0f req/s' % args.rate if args.rate > 0 else 'closed loop'}, "
+          f"{args.duration:.0f}s, top 10 accounts receive {sampler.hot_share(10):.1%} of requests")
+    print(HEADER)
+
+    # Give every process time to connect before the shared start instant
+    start_at = time.time() + 2.0 + 0.1 * args.threads * args.processes
+    if args.processes > 1:
+        with multiprocessing.Pool(args.processes) as pool:
+            results = pool.starmap(_run_process, [(config, i * args.threads, start_at)
+                                                  for i in range(args.processes)])
+        samples = [sample for result in results for sample in result['samples']]
+        samples.sort(key=lambda sample: sample[0])
+        for entry in time_series(samples, args.interval, args.duration):
+            print(format_row(f"{entry['t_start'] + args.interval:.0f}s", entry))
+    else:
+        _quiet_logging(args.verbose)
+        run = LoadRun(config)
+        stop = threading.Event()
+        reporter = threading.Thread(target=_report_live, args=(run, start_at, args.interval, stop), daemon=True)
+        reporter.start()
+        results = [run.run(start_at)]
+        stop.set()
+        reporter.join()
+        samples = sorted(run.samples, key=lambda sample: sample[0])
+
+    elapsed = max((sample[0] for sample in samples), default=args.duration)
+    db_error_codes: Dict[str, int] = {}
+    for result in results:
+        for code, count in result['db_error_codes'].items():
+            db_error_codes[str(code)] = db_error_codes.get(str(code), 0) + count
+
+    total = summarize(samples, elapsed)
+    print('-' * len(HEADER))
+    print(format_row('total', total))
+    print(f"Database errors by code: {db_error_codes or 'none'}; "
+          f"dropped arrivals: {sum(r['dropped'] for r in results)}")
+
+    report = {
+        'meta': {
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'git_revision': git_revision(),
+            'processes': args.processes,
+            'threads': args.threads,
+            'mode': 'open' if args.rate > 0 else 'closed',
+            'rate': args.rate,
+            'duration': args.duration,
+            'mix': mix,
+            'zipf': args.zipf,
+            'accounts': args.accounts,
+            'seed': args.seed,
+            'shared_app': args.shared_app
+        },
+        'total': total,
+        'by_operation': {operation: summarize([s for s in samples if s[1] == operation], elapsed)
+                         for operation in mix},
+        'db_error_codes': db_error_codes,
+        'dropped': sum(r['dropped'] for r in results),
+        'series': time_series(samples, args.interval, args.duration)
+    }
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
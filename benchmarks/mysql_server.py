@@ -0,0 +1,161 @@
+# banking_app/benchmarks/mysql_server.py
+"""
+Local MySQL for benchmarks
+Starts a throwaway MySQL (or MariaDB) container, or points at an existing
+server through the usual DB_* environment variables, and applies the
+benchmark schema. LocalMySQLShards starts several containers on
+consecutive ports for trying DB_SHARDS locally:
+
+    python -m benchmarks.mysql_server --shards 3
+"""
+
+import os
+import time
+import subprocess
+import mysql.connector
+from mysql.connector import Error
+from typing import Dict, Any
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema.sql')
+
+
+class LocalMySQL:
+    def __init__(self, image: str = 'mysql:8.0', port: int = 3307, name: str = 'irnvault-bench',
+                 password: str = 'bench', database: str = 'irnvault_bench',
+                 buffer_pool: str = '1G'):
+        self.image = image
+        self.port = port
+        self.name = name
+        self.password = password
+        self.database = database
+        self.buffer_pool = buffer_pool
+        self.started = False
+
+    def start(self, timeout: float = 120.0):
+        """Start the container and wait until it accepts connections"""
+        subprocess.run(['docker', 'rm', '-f', self.name], capture_output=True)
+        subprocess.run([
+            'docker', 'run', '-d', '--rm',
+            '--name', self.name,
+            '-e', f'MYSQL_ROOT_PASSWORD={self.password}',
+            '-e', f'MYSQL_DATABASE={self.database}',
+            '-p', f'{self.port}:3306',
+            self.image,
+            '--local-infile=1',
+            f'--innodb-buffer-pool-size={self.buffer_pool}',
+            '--max-connections=1000'
+        ], check=True, capture_output=True)
+        self.started = True
+        wait_until_ready(self.config(), timeout)
+
+    def stop(self):
+        """Stop and remove the container"""
+        if self.started:
+            subprocess.run(['docker', 'stop', self.name], capture_output=True)
+            self.started = False
+
+    def config(self) -> Dict[str, Any]:
+        return {
+            'host': '127.0.0.1',
+            'port': self.port,
+            'user': 'root',
+            'password': self.password,
+            'database': self.database
+        }
+
+    def apply_environment(self):
+        """Point Database() instances created in this process at the container"""
+        os.environ.update({
+            'DB_HOST': '127.0.0.1',
+            'DB_PORT': str(self.port),
+            'DB_USER': 'root',
+            'DB_PASSWORD': self.password,
+            'DB_NAME': self.database
+        })
+
+
+class LocalMySQLShards:
+    """One LocalMySQL container per shard, on consecutive ports"""
+
+    def __init__(self, count: int, base_port: int = 3307, name: str = 'irnvault-shard', **options):
+        self.servers = [LocalMySQL(port=base_port + index, name=f"{name}-{index}", **options)
+                        for index in range(count)]
+
+    def start(self, timeout: float = 120.0):
+        for server in self.servers:
+            server.start(timeout)
+            apply_schema(server.config())
+
+    def stop(self):
+        for server in self.servers:
+            server.stop()
+
+    def shards_setting(self) -> str:
+        """DB_SHARDS value naming every container"""
+        return ','.join(f"127.0.0.1:{server.port}/{server.database}" for server in self.servers)
+
+    def apply_environment(self):
+        """Point open_database() calls in this process at the shards"""
+        self.servers[0].apply_environment()
+        os.environ['DB_SHARDS'] = self.shards_setting()
+
+
+def config_from_environment() -> Dict[str, Any]:
+    """Connection settings for an already-running server (same variables as Database)"""
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': int(os.getenv('DB_PORT', 3306)),
+        'user': os.getenv('DB_USER', 'root'),
+        'password': os.getenv('DB_PASSWORD', ''),
+        'database': os.getenv('DB_NAME', 'irnvault_bench')
+    }
+
+
+def wait_until_ready(config: Dict[str, Any], timeout: float = 120.0):
+    """Poll until the server accepts connections"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            connection = mysql.connector.connect(**config)
+            connection.close()
+            return
+        except Error:
+            if time.monotonic() > deadline:
+                raise TimeoutError("MySQL did not become ready in time")
+            time.sleep(1)
+
+
+def apply_schema(config: Dict[str, Any], path: str = SCHEMA_PATH):
+    """Create the benchmark tables if they do not exist"""
+    with open(path, encoding='utf-8') as f:
+        statements = [s.strip() for s in f.read().split(';')]
+
+    connection = mysql.connector.connect(**config)
+    try:
+        cursor = connection.cursor()
+        for statement in statements:
+            lines = [line for line in statement.splitlines() if not line.strip().startswith('--')]
+            sql = '\n'.join(lines).strip()
+            if sql:
+                cursor.execute(sql)
+        connection.commit()
+        cursor.close()
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local MySQL containers for benchmarks and sharding")
+    parser.add_argument('--shards', type=int, default=1, help="number of containers (one per shard)")
+    parser.add_argument('--base-port', type=int, default=3307)
+    parser.add_argument('--image', default='mysql:8.0')
+    args = parser.parse_args()
+
+    cluster = LocalMySQLShards(args.shards, args.base_port, image=args.image)
+    cluster.start()
+    first = cluster.servers[0]
+    print("Started; the containers keep running until stopped with docker stop.")
+    print(f"export DB_USER=root DB_PASSWORD={first.password}")
+    print(f"export DB_SHARDS={cluster.shards_setting()}")
@@ -0,0 +1,230 @@
+# banking_app/benchmarks/run_benchmarks.py
+"""
+Service-layer benchmark suite
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmarks --docker --accounts 100000 --transactions 50000000
+    python -m benchmarks.run_benchmarks --skip-seed --output results/after.json
+    python -m benchmarks.compare results/before.json results/after.json
+
+Without --docker the suite uses the server named by the DB_* environment
+variables (DB_NAME defaults to irnvault_bench). Seeding TRUNCATEs the
+benchmark tables, so never point it at a real database.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import platform
+import subprocess
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Any, List
+
+from benchmarks.mysql_server import LocalMySQL, config_from_environment, apply_schema
+from benchmarks.data_generator import SyntheticDataGenerator, account_number, BENCH_PASSWORD
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class BenchmarkContext:
+    def __init__(self, accounts: int, loans: int, seed: int):
+        # Services read DB_* at construction time, so import them after the
+        # environment points at the benchmark server
+        from db.database import Database
+        from auth.auth_service import AuthService
+        from transactions.transaction_service import TransactionService
+        from statements.statement_service import StatementService
+        from admin.admin_service import AdminService
+        from loans.loan_service import LoanService
+
+        self.db = Database()
+        self.auth_service = AuthService(self.db)
+        self.transaction_service = TransactionService(self.db)
+        self.statement_service = StatementService(self.db)
+        self.admin_service = AdminService(self.db)
+        self.loan_service = LoanService(self.db)
+
+        self.accounts = accounts
+        self.loans = loans
+        self.rng = random.Random(seed)
+
+    def random_account(self) -> str:
+        return account_number(self.rng.randrange(self.accounts))
+
+    def random_pair(self):
+        first = self.rng.randrange(self.accounts)
+        second = (first + 1 + self.rng.randrange(self.accounts - 1)) % self.accounts
+        return account_number(first), account_number(second)
+
+    def random_loan(self):
+        index = self.rng.randrange(self.loans)
+        return index + 1, account_number(index)
+
+
+def build_benchmarks(ctx: BenchmarkContext) -> Dict[str, Callable[[], Any]]:
+    """Benchmark name -> zero-argument callable performing one operation"""
+    today = datetime.now().date()
+
+    def date_range():
+        end = today - timedelta(days=ctx.rng.randrange(365))
+        return ctx.statement_service.get_statement_by_date_range(
+            ctx.random_account(), str(end - timedelta(days=30)), str(end))
+
+    def loan_payment():
+        loan_id, owner = ctx.random_loan()
+        return ctx.loan_service.make_loan_payment(loan_id, owner, 100.0)
+
+    return {
+        'auth.login': lambda: ctx.auth_service.login(ctx.random_account(), BENCH_PASSWORD),
+        'transaction.deposit': lambda: ctx.transaction_service.deposit(ctx.random_account(), 125.50),
+        'transaction.withdraw': lambda: ctx.transaction_service.withdraw(ctx.random_account(), 75.25),
+        'transaction.transfer': lambda: ctx.transaction_service.transfer(*ctx.random_pair(), 50.00),
+        'statement.daily': lambda: ctx.statement_service.get_daily_statement(ctx.random_account()),
+        'statement.monthly': lambda: ctx.statement_service.get_monthly_statement(ctx.random_account()),
+        'statement.yearly': lambda: ctx.statement_service.get_yearly_statement(ctx.random_account()),
+        'statement.all': lambda: ctx.statement_service.get_all_transactions(ctx.random_account()),
+        'statement.date_range': date_range,
+        'statement.summary_monthly': lambda: ctx.statement_service.get_statement_summary(ctx.random_account(), 'monthly'),
+        'statement.summary_yearly': lambda: ctx.statement_service.get_statement_summary(ctx.random_account(), 'yearly'),
+        'admin.get_system_statistics': lambda: ctx.admin_service.get_system_statistics(),
+        'loan.make_loan_payment': loan_payment,
+    }
+
+
+def run_benchmark(func: Callable[[], Any], iterations: int, warmup: int) -> Dict[str, Any]:
+    """Time one benchmark and summarize latency in milliseconds"""
+    for _ in range(warmup):
+        try:
+            func()
+        except Exception:
+            pass
+
+    samples = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        op_started = time.perf_counter()
+        try:
+            func()
+        except Exception:
+            errors += 1
+            continue
+        samples.append((time.perf_counter() - op_started) * 1000)
+    wall = time.perf_counter() - started
+
+    samples.sort()
+    return {
+        'iterations': iterations,
+        'errors': errors,
+        'p50_ms': round(percentile(samples, 0.50), 3),
+        'p95_ms': round(percentile(samples, 0.95), 3),
+        'p99_ms': round(percentile(samples, 0.99), 3),
+        'mean_ms': round(sum(samples) / len(samples), 3) if samples else 0.0,
+        'min_ms': round(samples[0], 3) if samples else 0.0,
+        'max_ms': round(samples[-1], 3) if samples else 0.0,
+        'ops_per_sec': round(len(samples) / wall, 2) if wall > 0 else 0.0
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="IRN Vault service-layer benchmarks")
+    parser.add_argument('--docker', action='store_true', help="start a throwaway MySQL container")
+    parser.add_argument('--image', default='mysql:8.0', help="container image (e.g. mariadb:11)")
+    parser.add_argument('--port', type=int, default=3307)
+    parser.add_argument('--accounts', type=int, default=10000)
+    parser.add_argument('--transactions', type=int, default=1000000)
+    parser.add_argument('--loans', type=int, default=1000)
+    parser.add_argument('--history-days', type=int, default=730)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--skip-seed', action='store_true', help="reuse previously seeded data")
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--login-iterations', type=int, default=50, help="bcrypt makes login slow by design")
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--only', nargs='*', help="run only these benchmarks")
+    parser.add_argument('--output', default='bench_results.json')
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.docker:
+        server = LocalMySQL(image=args.image, port=args.port)
+        print(f"Starting {args.image} on port {args.port}...")
+        server.start()
+        server.apply_environment()
+        config = server.config()
+    else:
+        os.environ.setdefault('DB_NAME', 'irnvault_bench')
+        config = config_from_environment()
+
+    try:
+        seeding = None
+        if not args.skip_seed:
+            apply_schema(config)
+            print(f"Seeding {args.accounts:,} accounts and {args.transactions:,} transactions...")
+            seeding = SyntheticDataGenerator(config, seed=args.seed).generate(
+                args.accounts, args.transactions, args.loans, args.history_days)
+            print(f"Seeded in {seeding['seed_seconds']}s")
+
+        ctx = BenchmarkContext(args.accounts, min(args.loans, args.accounts), args.seed)
+        benchmarks = build_benchmarks(ctx)
+        if args.only:
+            benchmarks = {name: func for name, func in benchmarks.items() if name in args.only}
+
+        results = {}
+        for name, func in benchmarks.items():
+            iterations = args.login_iterations if name == 'auth.login' else args.iterations
+            results[name] = run_benchmark(func, iterations, args.warmup)
+            r = results[name]
+            print(f"{name:<32} p50 {r['p50_ms']:>9.3f}ms  p95 {r['p95_ms']:>9.3f}ms  "
+                  f"p99 {r['p99_ms']:>9.3f}ms  errors {r['errors']}")
+
+        report = {
+            'meta': {
+                'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'git_revision': git_revision(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'image': args.image if args.docker else None,
+                'scale': {
+                    'accounts': args.accounts,
+                    'transactions': args.transactions,
+                    'loans': args.loans,
+                    'history_days': args.history_days,
+                    'seed': args.seed
+                },
+                'seeding': seeding
+            },
+            'results': results
+        }
+
+        output_dir = os.path.dirname(args.output)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+        return 0
+    finally:
+        if server:
+            server.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+-- banking_app/benchmarks/schema.sql
+-- Schema used to bootstrap benchmark databases. Mirrors the tables the
+-- services query; keep it in step with production migrations.
+
+CREATE TABLE IF NOT EXISTS accounts (
+    account_number VARCHAR(10) NOT NULL PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    hashed_pin VARCHAR(255) NOT NULL,
+    balance DECIMAL(15, 2) NOT NULL DEFAULT 0.00,
+    is_approved TINYINT(1) NOT NULL DEFAULT 0,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    -- Bumped on balance writes when ACCOUNT_VERSIONING=1
+    version INT UNSIGNED NOT NULL DEFAULT 0,
+    INDEX idx_accounts_created (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS transactions (
+    id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    account_number VARCHAR(10) NOT NULL,
+    type ENUM('deposit', 'withdrawal', 'transfer_in', 'transfer_out',
+              'loan_disbursement', 'loan_payment') NOT NULL,
+    amount DECIMAL(15, 2) NOT NULL,
+    timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_transactions_account_time (account_number, timestamp)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Absolute balance edits as signed differences (kept out of the customer ledger)
+CREATE TABLE IF NOT EXISTS balance_adjustments (
+    id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    account_number VARCHAR(10) NOT NULL,
+    amount DECIMAL(15, 2) NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_adjustments_account_time (account_number, created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS account_declines (
+    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    account_number VARCHAR(10) NOT NULL,
+    name VARCHAR(100),
+    hashed_pin VARCHAR(255),
+    original_balance DECIMAL(15, 2) DEFAULT 0.00,
+    reason TEXT NOT NULL,
+    declined_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_declines_account (account_number, declined_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS loan_applications (
+    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    account_number VARCHAR(10) NOT NULL,
+    amount DECIMAL(15, 2) NOT NULL,
+    purpose VARCHAR(255) NOT NULL,
+    monthly_income DECIMAL(15, 2) NOT NULL,
+    employment_status VARCHAR(50) NOT NULL,
+    status ENUM('pending', 'approved', 'rejected') NOT NULL DEFAULT 'pending',
+    interest_rate DECIMAL(5, 2),
+    term_months INT,
+    monthly_payment DECIMAL(15, 2),
+    admin_notes TEXT,
+    applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    processed_at TIMESTAMP NULL,
+    INDEX idx_loan_applications_account (account_number, applied_at),
+    INDEX idx_loan_applications_status (status, applied_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS loans (
+    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    application_id INT NOT NULL,
+    account_number VARCHAR(10) NOT NULL,
+    principal_amount DECIMAL(15, 2) NOT NULL,
+    interest_rate DECIMAL(5, 2) NOT NULL,
+    term_months INT NOT NULL,
+    monthly_payment DECIMAL(15, 2) NOT NULL,
+    remaining_balance DECIMAL(15, 2) NOT NULL,
+    next_payment_date DATE NOT NULL,
+    status ENUM('active', 'paid_off', 'defaulted') NOT NULL DEFAULT 'active',
+    disbursed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_loans_account (account_number, status),
+    INDEX idx_loans_status (status, next_payment_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS loan_payments (
+    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    loan_id INT NOT NULL,
+    account_number VARCHAR(10) NOT NULL,
+    payment_amount DECIMAL(15, 2) NOT NULL,
+    principal_portion DECIMAL(15, 2) NOT NULL,
+    interest_portion DECIMAL(15, 2) NOT NULL,
+    remaining_balance DECIMAL(15, 2) NOT NULL,
+    payment_type VARCHAR(20) NOT NULL DEFAULT 'regular',
+    payment_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_loan_payments_account (account_number, payment_date),
+    INDEX idx_loan_payments_loan (loan_id, payment_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Opt-in split balances for hot accounts (python -m transactions.hot_account_service enable <account>)
+CREATE TABLE IF NOT EXISTS hot_accounts (
+    account_number VARCHAR(10) NOT NULL PRIMARY KEY,
+    slots SMALLINT NOT NULL,
+    enabled_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS account_balance_slots (
+    account_number VARCHAR(10) NOT NULL,
+    slot SMALLINT NOT NULL,
+    balance DECIMAL(15, 2) NOT NULL DEFAULT 0.00,
+    PRIMARY KEY (account_number, slot)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    idempotency_key VARCHAR(64) NOT NULL PRIMARY KEY,
+    operation VARCHAR(32) NOT NULL,
+    request_hash CHAR(64) NOT NULL,
+    expires_at TIMESTAMP NOT NULL,
+    INDEX idx_idempotency_expires (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS outbox_events (
+    id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    event_type VARCHAR(32) NOT NULL,
+    account_number VARCHAR(10) NOT NULL,
+    amount DECIMAL(15, 2) NOT NULL,
+    payload TEXT NULL,
+    created_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS outbox_checkpoints (
+    consumer VARCHAR(64) NOT NULL PRIMARY KEY,
+    last_event_id BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS analytics_hourly (
+    bucket_start DATETIME NOT NULL,
+    type_code TINYINT UNSIGNED NOT NULL,
+    tx_count INT UNSIGNED NOT NULL,
+    total_amount DECIMAL(20, 2) NOT NULL,
+    size_histogram TEXT NOT NULL,
+    PRIMARY KEY (bucket_start, type_code)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS analytics_state (
+    name VARCHAR(32) NOT NULL PRIMARY KEY,
+    closed_until DATETIME NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS transaction_limit_counters (
+    account_number VARCHAR(10) NOT NULL,
+    kind VARCHAR(16) NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    total_amount DECIMAL(17, 2) NOT NULL,
+    tx_count INT UNSIGNED NOT NULL,
+    PRIMARY KEY (account_number, kind, bucket_start)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS daily_balance_snapshots (
+    account_number VARCHAR(10) NOT NULL,
+    business_date DATE NOT NULL,
+    closing_balance DECIMAL(15, 2) NOT NULL,
+    tx_count INT UNSIGNED NOT NULL DEFAULT 0,
+    deposit_total DECIMAL(17, 2) NOT NULL DEFAULT 0.00,
+    withdrawal_total DECIMAL(17, 2) NOT NULL DEFAULT 0.00,
+    transfer_in_total DECIMAL(17, 2) NOT NULL DEFAULT 0.00,
+    transfer_out_total DECIMAL(17, 2) NOT NULL DEFAULT 0.00,
+    loan_disbursement_total DECIMAL(17, 2) NOT NULL DEFAULT 0.00,
+    loan_payment_total DECIMAL(17, 2) NOT NULL DEFAULT 0.00,
+    PRIMARY KEY (account_number, business_date),
+    INDEX idx_snapshots_date (business_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS eod_days (
+    business_date DATE NOT NULL PRIMARY KEY,
+    ranges INT UNSIGNED NOT NULL,
+    started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS eod_ranges (
+    business_date DATE NOT NULL,
+    range_start VARCHAR(10) NOT NULL,
+    range_end VARCHAR(10) NULL,
+    accounts INT UNSIGNED NULL,
+    completed_at TIMESTAMP NULL,
+    PRIMARY KEY (business_date, range_start)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS transfer_sagas (
+    id CHAR(32) NOT NULL PRIMARY KEY,
+    from_account VARCHAR(10) NOT NULL,
+    to_account VARCHAR(10) NOT NULL,
+    amount DECIMAL(15, 2) NOT NULL,
+    status ENUM('debited', 'completed', 'compensated') NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_sagas_status (status, created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS saga_credits (
+    saga_id CHAR(32) NOT NULL PRIMARY KEY,
+    credited_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -16,6 +16,41 @@ class Settings:
         'port': int(os.getenv('DB_PORT', 3306)),
     }
     
+    # Connection timeouts in seconds (0 = none). Read/write timeouts need mysql-connector-python 9.2+
+    # (older connectors run without them); the default outlasts InnoDB's 50 s lock wait, so a
+    # statement waiting on a lock still fails with a retryable error rather than a dropped connection
+    DB_CONNECT_TIMEOUT_SECONDS = int(os.getenv('DB_CONNECT_TIMEOUT_SECONDS', 5))
+    DB_READ_TIMEOUT_SECONDS = int(os.getenv('DB_READ_TIMEOUT_SECONDS', 60))
+    # Circuit breaker: after this many connection failures in a row calls fail fast with
+    # DatabaseUnavailableError, probing again after a backoff that doubles per failed probe
+    DB_BREAKER_FAILURE_THRESHOLD = int(os.getenv('DB_BREAKER_FAILURE_THRESHOLD', 3))
+    DB_RECONNECT_BASE_DELAY_MS = float(os.getenv('DB_RECONNECT_BASE_DELAY_MS', 500))
+    DB_RECONNECT_MAX_DELAY_MS = float(os.getenv('DB_RECONNECT_MAX_DELAY_MS', 30000))
+    
+    # Read replicas of the DB_* primary: comma-separated host:port entries. Reads marked
+    # read-only use one once it has applied this session's writes (needs gtid_mode=ON).
+    DB_REPLICAS = [entry.strip() for entry in os.getenv('DB_REPLICAS', '').split(',') if entry.strip()]
+    # How long a read may wait for a replica to catch up before using the primary (0 = no wait)
+    REPLICA_WAIT_SECONDS = float(os.getenv('REPLICA_WAIT_SECONDS', 0))
+    # A replica that could not be reached is skipped for this long
+    REPLICA_RETRY_SECONDS = float(os.getenv('REPLICA_RETRY_SECONDS', 30))
+    
+    # Sharding: comma-separated host:port/database nodes (empty = the single DB_* database),
+    # each optionally followed by |host:port entries for its read replicas.
+    # The shard list is fixed once accounts exist (see db/shard_router.py): there is no rebalancing.
+    DB_SHARDS = [entry.strip() for entry in os.getenv('DB_SHARDS', '').split(',') if entry.strip()]
+    SHARD_VIRTUAL_NODES = int(os.getenv('SHARD_VIRTUAL_NODES', 64))
+    # Cross-shard transfers left half-done this long are finished by the saga recovery,
+    # which runs in the background every SAGA_RECOVERY_INTERVAL_SECONDS (0 = only at startup)
+    SAGA_RECOVERY_AFTER_SECONDS = int(os.getenv('SAGA_RECOVERY_AFTER_SECONDS', 60))
+    SAGA_RECOVERY_INTERVAL_SECONDS = float(os.getenv('SAGA_RECOVERY_INTERVAL_SECONDS', 30))
+    
+    # Admin reports run in a consistent snapshot on their own connections; each
+    # SELECT in a report is stopped after this many milliseconds (0 = no limit)
+    REPORT_MAX_EXECUTION_MS = int(os.getenv('REPORT_MAX_EXECUTION_MS', 30000))
+    # Read/write timeout in seconds for report connections (0 = none)
+    REPORT_READ_TIMEOUT_SECONDS = int(os.getenv('REPORT_READ_TIMEOUT_SECONDS', 300))
+    
     # Security settings
     MIN_PASSWORD_LENGTH = 6
     ADMIN_ACCOUNT_NUMBER = '0000000001'
@@ -24,6 +59,80 @@ class Settings:
     MAX_TRANSACTION_AMOUNT = 1000000.00
     MIN_TRANSACTION_AMOUNT = 0.01
     
+    # Per-account limits per calendar day and per rolling 24 hours (0 = no limit)
+    # (purge old counters with python -m transactions.limit_service purge)
+    DAILY_WITHDRAWAL_LIMIT = float(os.getenv('DAILY_WITHDRAWAL_LIMIT', 500000))
+    ROLLING_WITHDRAWAL_LIMIT = float(os.getenv('ROLLING_WITHDRAWAL_LIMIT', 500000))
+    DAILY_TRANSFER_LIMIT = float(os.getenv('DAILY_TRANSFER_LIMIT', 1000000))
+    ROLLING_TRANSFER_LIMIT = float(os.getenv('ROLLING_TRANSFER_LIMIT', 1000000))
+    LIMIT_CACHE_SECONDS = float(os.getenv('LIMIT_CACHE_SECONDS', 30))
+    LIMIT_CACHE_ACCOUNTS = int(os.getenv('LIMIT_CACHE_ACCOUNTS', 50000))
+    
+    # Transaction archive (cold tier) settings
+    ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', 'transaction_archive')
+    ARCHIVE_HOT_MONTHS = int(os.getenv('ARCHIVE_HOT_MONTHS', 3))
+    ARCHIVE_SEGMENT_ROWS = int(os.getenv('ARCHIVE_SEGMENT_ROWS', 100000))
+    # Decoded archive files kept in memory: segment rows, and accounts across month indexes
+    ARCHIVE_CACHE_ROWS = int(os.getenv('ARCHIVE_CACHE_ROWS', 200000))
+    ARCHIVE_CACHE_ACCOUNTS = int(os.getenv('ARCHIVE_CACHE_ACCOUNTS', 1000000))
+    
+    # Deadlock / lock wait timeout retries for units of work
+    DB_RETRY_MAX_ATTEMPTS = int(os.getenv('DB_RETRY_MAX_ATTEMPTS', 5))
+    DB_RETRY_BASE_DELAY_MS = float(os.getenv('DB_RETRY_BASE_DELAY_MS', 10))
+    DB_RETRY_MAX_DELAY_MS = float(os.getenv('DB_RETRY_MAX_DELAY_MS', 500))
+    
+    # Hot accounts: credits spread over balance slots, folded back periodically
+    HOT_ACCOUNT_SLOTS = int(os.getenv('HOT_ACCOUNT_SLOTS', 16))
+    HOT_ACCOUNT_COMPACTION_SECONDS = float(os.getenv('HOT_ACCOUNT_COMPACTION_SECONDS', 5))
+    HOT_ACCOUNT_REFRESH_SECONDS = float(os.getenv('HOT_ACCOUNT_REFRESH_SECONDS', 30))
+    
+    # Optimistic concurrency: bump accounts.version on every balance write
+    # (needs the column from benchmarks/schema.sql; slot credits bump it when they are folded in)
+    ACCOUNT_VERSIONING = os.getenv('ACCOUNT_VERSIONING', '0') == '1'
+    
+    # Group commit for deposits (requests buffered up to the delay, or until the batch is full)
+    DEPOSIT_BATCHING = os.getenv('DEPOSIT_BATCHING', '0') == '1'
+    DEPOSIT_BATCH_MAX_DELAY_MS = float(os.getenv('DEPOSIT_BATCH_MAX_DELAY_MS', 5))
+    DEPOSIT_BATCH_MAX_SIZE = int(os.getenv('DEPOSIT_BATCH_MAX_SIZE', 200))
+    
+    # Idempotency keys are kept this long (purge with python -m db.idempotency purge)
+    IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv('IDEMPOTENCY_KEY_TTL_HOURS', 24))
+    
+    # Ledger event outbox (tail with python -m events.outbox_service tail --consumer <name>)
+    OUTBOX_ENABLED = os.getenv('OUTBOX_ENABLED', '1') == '1'
+    OUTBOX_GAP_WAIT_SECONDS = float(os.getenv('OUTBOX_GAP_WAIT_SECONDS', 5))
+    
+    # Analytics rollups (hours close this long after they end; a refresh scans at most a chunk per statement)
+    ANALYTICS_CLOSE_DELAY_SECONDS = int(os.getenv('ANALYTICS_CLOSE_DELAY_SECONDS', 300))
+    ANALYTICS_CHUNK_HOURS = int(os.getenv('ANALYTICS_CHUNK_HOURS', 24))
+    
+    # Velocity checks on withdrawals and transfers (limits per account per sliding window;
+    # a transfer to a recipient not paid within the pair memory counts as a new recipient)
+    VELOCITY_ENABLED = os.getenv('VELOCITY_ENABLED', '1') == '1'
+    VELOCITY_WINDOW_SECONDS = int(os.getenv('VELOCITY_WINDOW_SECONDS', 600))
+    VELOCITY_MAX_WITHDRAWALS = int(os.getenv('VELOCITY_MAX_WITHDRAWALS', 10))
+    VELOCITY_MAX_WITHDRAWAL_AMOUNT = float(os.getenv('VELOCITY_MAX_WITHDRAWAL_AMOUNT', 500000))
+    VELOCITY_MAX_TRANSFERS = int(os.getenv('VELOCITY_MAX_TRANSFERS', 10))
+    VELOCITY_MAX_TRANSFER_AMOUNT = float(os.getenv('VELOCITY_MAX_TRANSFER_AMOUNT', 500000))
+    VELOCITY_MAX_NEW_RECIPIENTS = int(os.getenv('VELOCITY_MAX_NEW_RECIPIENTS', 5))
+    VELOCITY_PAIR_MEMORY_DAYS = int(os.getenv('VELOCITY_PAIR_MEMORY_DAYS', 30))
+    VELOCITY_FLAG_SCORE = int(os.getenv('VELOCITY_FLAG_SCORE', 80))
+    # Memory bounds (least recently active accounts and pairs are evicted first)
+    VELOCITY_MAX_ACCOUNTS = int(os.getenv('VELOCITY_MAX_ACCOUNTS', 100000))
+    VELOCITY_MAX_PAIRS = int(os.getenv('VELOCITY_MAX_PAIRS', 500000))
+    VELOCITY_ALERT_HISTORY = int(os.getenv('VELOCITY_ALERT_HISTORY', 200))
+    
+    # End-of-day close (python -m eod.eod_service close): days close this long after midnight,
+    # in account ranges of this size processed by this many parallel connections
+    EOD_CLOSE_DELAY_SECONDS = int(os.getenv('EOD_CLOSE_DELAY_SECONDS', 300))
+    EOD_RANGE_ACCOUNTS = int(os.getenv('EOD_RANGE_ACCOUNTS', 5000))
+    EOD_WORKERS = int(os.getenv('EOD_WORKERS', 4))
+    
+    # How often dashboards apply queued change events
+    LIVE_UPDATE_INTERVAL_MS = int(os.getenv('LIVE_UPDATE_INTERVAL_MS', 250))
+    # How often changes made by other processes are read from the outbox (needs OUTBOX_ENABLED)
+    LIVE_UPDATE_POLL_SECONDS = float(os.getenv('LIVE_UPDATE_POLL_SECONDS', 1))
+    
     # Application settings
     APP_NAME = "IRN Vault Banking System"
     APP_VERSION = "1.0.0"
@@ -32,6 +141,23 @@ class Settings:
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FILE = os.getenv('LOG_FILE', 'banking_app.log')
     
+    # Query instrumentation settings
+    QUERY_STATS_ENABLED = os.getenv('QUERY_STATS_ENABLED', '1') == '1'
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 200))
+    SLOW_QUERY_LOG_FILE = os.getenv('SLOW_QUERY_LOG_FILE', 'slow_queries.log')
+    
+    # Metrics exposition (port 0 disables the HTTP endpoint)
+    METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+    METRICS_FILE = os.getenv('METRICS_FILE', '')
+    
+    # Request tracing
+    TRACE_ENABLED = os.getenv('TRACE_ENABLED', '0') == '1'
+    TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', 0.01))
+    TRACE_SLOW_THRESHOLD_MS = float(os.getenv('TRACE_SLOW_THRESHOLD_MS', 500))
+    TRACE_FILE = os.getenv('TRACE_FILE', 'traces.json')
+    TRACE_FORMAT = os.getenv('TRACE_FORMAT', 'chrome')  # 'chrome' or 'otlp'
+    TRACE_MAX_SPANS_PER_TRACE = int(os.getenv('TRACE_MAX_SPANS_PER_TRACE', 1000))
+    
     @classmethod
     def get_database_config(cls) -> Dict[str, Any]:
         """Get database configuration"""
@@ -0,0 +1,59 @@
+# banking_app/db/accounts.py
+"""
+Accounts table helpers
+SQL fragments shared by every service that writes accounts rows, and the
+log of absolute balance edits
+"""
+
+from config.settings import Settings
+
+
+def balance_assignment(expression: str, alias: str = '') -> str:
+    """SET clause for an accounts balance write, bumping the row version when versioning is on"""
+    if Settings.ACCOUNT_VERSIONING:
+        return f"{alias}balance = {expression}, {alias}version = {alias}version + 1"
+    return f"{alias}balance = {expression}"
+
+
+class BalanceAdjustmentLog:
+    """
+    Absolute balance edits (the admin balance edit, UserService.update_balance)
+    as signed differences, kept apart from the customer ledger so statements,
+    velocity, limits and analytics never see them. Readers that rebuild a
+    balance from the ledger (end-of-day closing, the loan balance repair) add
+    these too, so they still agree with the accounts row.
+    """
+
+    def __init__(self, database):
+        self.db = database
+        self._schema_ready = False
+
+    def ensure_schema(self) -> bool:
+        """Create the adjustment table on every shard if needed (DDL; call before opening the unit of work)"""
+        if not self._schema_ready:
+            self._schema_ready = all([node.execute_query("""
+                CREATE TABLE IF NOT EXISTS balance_adjustments (
+                    id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+                    account_number VARCHAR(10) NOT NULL,
+                    amount DECIMAL(15, 2) NOT NULL,
+                    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    INDEX idx_adjustments_account_time (account_number, created_at)
+                ) ENGINE=InnoDB
+            """) for node in self.db.shards])
+        return self._schema_ready
+
+    def post(self, account_number: str, previous: float, balance: float) -> bool:
+        """Record an edit from previous to balance, inside the unit of work that writes the balance"""
+        difference = round(float(balance) - float(previous), 2)
+        if not difference:
+            return True
+        return self.db.execute_query("""
+            INSERT INTO balance_adjustments (account_number, amount) VALUES (%s, %s)
+        """, (account_number, difference))
+
+    def total(self, account_number: str) -> float:
+        """Net of every adjustment to the account"""
+        result = self.db.fetch_one("""
+            SELECT COALESCE(SUM(amount), 0) as total FROM balance_adjustments WHERE account_number = %s
+        """, (account_number,))
+        return float(result['total']) if result else 0.0
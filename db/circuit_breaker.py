@@ -0,0 +1,109 @@
+# banking_app/db/circuit_breaker.py
+"""
+Circuit breaker for database connections
+After DB_BREAKER_FAILURE_THRESHOLD connection failures in a row the
+breaker for that server opens: connects, and so statements, fail at once
+with DatabaseUnavailableError instead of each waiting out a connect
+timeout. Once a backoff has passed (doubling with every failed probe from
+DB_RECONNECT_BASE_DELAY_MS up to DB_RECONNECT_MAX_DELAY_MS) it goes
+half-open and lets one caller try to reconnect: success closes it, failure
+opens it again for longer.
+
+Breakers are shared per host:port, so clones (compactor, reporting
+connections) and every other Database for a server see the same outage.
+"""
+
+import time
+import random
+import threading
+from typing import Any, Dict
+from config.settings import Settings
+from monitoring.metrics import registry
+
+CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+DB_CIRCUIT_STATE = registry.gauge(
+    'irnvault_db_circuit_state', 'Database circuit breaker state (0 closed, 1 half-open, 2 open)', ('server',))
+DB_CIRCUIT_OPENS = registry.counter(
+    'irnvault_db_circuit_opens_total', 'Times a database circuit breaker opened', ('server',))
+
+
+class CircuitBreaker:
+    def __init__(self, server: str, failure_threshold: int = None, base_delay_ms: float = None,
+                 max_delay_ms: float = None):
+        self.server = server
+        self.failure_threshold = max(1, Settings.DB_BREAKER_FAILURE_THRESHOLD
+                                     if failure_threshold is None else failure_threshold)
+        self.base_delay_ms = Settings.DB_RECONNECT_BASE_DELAY_MS if base_delay_ms is None else base_delay_ms
+        self.max_delay_ms = Settings.DB_RECONNECT_MAX_DELAY_MS if max_delay_ms is None else max_delay_ms
+        self.state = CLOSED
+        self.failures = 0
+        # Opens since the last success: the backoff exponent
+        self.opens = 0
+        self.retry_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a connect may be tried now (while half-open, by one caller at a time)"""
+        if self.state == CLOSED:
+            return True
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() < self.retry_at:
+                    return False
+                self._set_state(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        if self.state == CLOSED and not self.failures:
+            return
+        with self._lock:
+            self.failures = 0
+            self.opens = 0
+            self._probing = False
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._probing = False
+            if self.state == OPEN:
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opens += 1
+                self.retry_at = time.monotonic() + self.backoff(self.opens)
+                self._set_state(OPEN)
+                DB_CIRCUIT_OPENS.labels(self.server).inc()
+
+    def backoff(self, opens: int) -> float:
+        """Seconds to stay open after the breaker's opens-th consecutive opening (equal jitter)"""
+        ceiling = min(self.max_delay_ms, self.base_delay_ms * (2 ** (opens - 1)))
+        return random.uniform(ceiling / 2, ceiling) / 1000
+
+    def retry_in(self) -> float:
+        """Seconds until the next reconnect attempt is allowed"""
+        return max(0.0, self.retry_at - time.monotonic()) if self.state == OPEN else 0.0
+
+    def _set_state(self, state: str):
+        self.state = state
+        DB_CIRCUIT_STATE.labels(self.server).set(STATE_VALUES[state])
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(config: Dict[str, Any]) -> CircuitBreaker:
+    """The shared breaker for the server a connection config points at"""
+    server = f"{config.get('host')}:{config.get('port')}"
+    with _breakers_lock:
+        if server not in _breakers:
+            _breakers[server] = CircuitBreaker(server)
+        return _breakers[server]
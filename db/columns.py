@@ -0,0 +1,68 @@
+# banking_app/db/columns.py
+"""
+Columnar result sets
+Database.fetch_columns streams a query into one typed array per column
+instead of a dict per row. Columns are NumPy arrays when NumPy is
+installed and array.array otherwise; the group-by helpers here use
+bincount on the former and a plain loop on the latter, so callers work
+the same either way.
+"""
+
+from array import array
+from typing import Dict, List, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # Optional; the pure-Python fallback is just slower
+    np = None
+
+# Ledger types; TYPE_CODE_SQL yields a type's position here (by name, so the ENUM order does not matter)
+TRANSACTION_TYPES = ('deposit', 'withdrawal', 'transfer_in', 'transfer_out', 'loan_disbursement', 'loan_payment')
+TYPE_CODES = {name: code for code, name in enumerate(TRANSACTION_TYPES)}
+TYPE_CODE_SQL = f"FIELD(type, {', '.join(repr(name) for name in TRANSACTION_TYPES)}) - 1"
+
+# Types that add to the balance; the rest take from it
+CREDIT_TYPES = ('deposit', 'transfer_in', 'loan_disbursement')
+
+# Column type codes accepted by fetch_columns (array.array codes, also valid NumPy dtypes)
+FLOAT = 'd'
+INT = 'q'
+SMALL_INT = 'b'
+
+
+def new_columns(columns: Dict[str, str]) -> Dict[str, array]:
+    """Empty growable typed buffers, one per column"""
+    return {name: array(typecode) for name, typecode in columns.items()}
+
+
+def finish_columns(buffers: Dict[str, array]):
+    """Hand the filled buffers out as NumPy arrays (zero-copy) when NumPy is available"""
+    if np is None:
+        return buffers
+    return {name: np.frombuffer(buffer, dtype=buffer.typecode) if len(buffer) else np.empty(0, buffer.typecode)
+            for name, buffer in buffers.items()}
+
+
+def sum_by(codes: Sequence[int], values: Sequence[float], size: int) -> List[float]:
+    """Sum of values per code 0..size-1 (other codes are ignored)"""
+    if np is not None:
+        codes = np.asarray(codes)
+        keep = (codes >= 0) & (codes < size)
+        return np.bincount(codes[keep], weights=np.asarray(values)[keep], minlength=size).tolist()
+    totals = [0.0] * size
+    for code, value in zip(codes, values):
+        if 0 <= code < size:
+            totals[code] += value
+    return totals
+
+
+def count_by(codes: Sequence[int], size: int) -> List[int]:
+    """Number of rows per code 0..size-1 (other codes are ignored)"""
+    if np is not None:
+        codes = np.asarray(codes)
+        return np.bincount(codes[(codes >= 0) & (codes < size)], minlength=size).tolist()
+    counts = [0] * size
+    for code in codes:
+        if 0 <= code < size:
+            counts[code] += 1
+    return counts
@@ -2,10 +2,76 @@
 import mysql.connector
 from mysql.connector import Error
 import os
-from typing import Dict, List, Optional, Any
+import time
+import functools
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Any, Callable
+from db.query_stats import QueryStats
+from db.columns import new_columns, finish_columns
+from db.errors import (TransientDatabaseError, QueryCancelledError, DatabaseUnavailableError,
+                       RETRYABLE_ERRNOS, CANCELLED_ERRNOS, CONNECTION_ERRNOS)
+from db.circuit_breaker import breaker_for
+from config.settings import Settings
+from monitoring.tracing import tracer
+
+
+def _traced_db_call(operation: str):
+    """Record a Database call as a leaf span of the active trace"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled or tracer.current_span() is None:
+                return func(*args, **kwargs)
+            start_ns = time.perf_counter_ns()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                tracer.record_span(f"db.{operation}", start_ns, error=str(e))
+                raise
+            tracer.record_span(f"db.{operation}", start_ns)
+            return result
+        return wrapper
+    return decorator
+
+
+def parse_address(entry: str) -> Dict[str, Any]:
+    """Connection overrides for a host[:port][/database] setting entry"""
+    address, _, database = entry.strip().partition('/')
+    host, _, port = address.partition(':')
+    config = {'host': host or 'localhost', 'port': int(port or 3306)}
+    if database:
+        config['database'] = database
+    return config
+
+
+# Connector-side read/write timeouts arrived in mysql-connector-python 9.2
+_IO_TIMEOUTS_SUPPORTED = tuple(getattr(mysql.connector, '__version_info__', (0,))[:2]) >= (9, 2)
+
+
+def set_io_timeout(config: Dict[str, Any], seconds: int):
+    """Set (or, for 0, clear) a connection config's read and write timeouts"""
+    for key in ('read_timeout', 'write_timeout'):
+        config.pop(key, None)
+        if seconds and _IO_TIMEOUTS_SUPPORTED:
+            config[key] = seconds
+
+
+def read_only(func):
+    """Service method decorator: the method only reads, so its fetches may go to a read replica"""
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        with self.db.replica_reads():
+            return func(self, *args, **kwargs)
+    return wrapper
+
 
 class Database:
-    def __init__(self):
+    def __init__(self, config: Dict[str, Any] = None, session_statements: List[str] = None, name: str = None,
+                 replicas: List[Dict[str, Any]] = None):
+        """
+        config overrides the DB_* environment settings (e.g. for one shard);
+        replicas are overrides for its read replicas (default DB_REPLICAS)
+        """
         self.config = {
             'host': os.getenv('DB_HOST', 'localhost'),
             'database': os.getenv('DB_NAME', 'se1project'),
@@ -13,16 +79,58 @@ class Database:
             'password': os.getenv('DB_PASSWORD', ''),
             'port': int(os.getenv('DB_PORT', 3306)),
             'charset': 'utf8mb4',
-            'autocommit': True
+            'autocommit': True,
+            'connection_timeout': Settings.DB_CONNECT_TIMEOUT_SECONDS
         }
+        set_io_timeout(self.config, Settings.DB_READ_TIMEOUT_SECONDS)
+        self.config.update(config or {})
+        # Shared with every other Database for the same server
+        self.breaker = breaker_for(self.config)
+        # Run on every new connection (a shard's auto-increment interleave)
+        self.session_statements = list(session_statements or [])
+        # Shard name (None when unsharded); keeps per-shard files such as the archive apart
+        self.name = name
         self.connection = None
+        self.query_stats = QueryStats()
+        self._unit_depth = 0
+        self._after_commit: List[Callable[[], None]] = []
+
+        # Read replicas, used for fetches inside replica_reads() once they have
+        # applied this session's writes (tracked as the primary's GTID set)
+        if replicas is None:
+            replicas = [parse_address(entry) for entry in Settings.DB_REPLICAS] if config is None else []
+        self.replica_configs = replicas
+        self._replicas = [Database(dict(self.config, **replica), ["SET SESSION TRANSACTION READ ONLY"],
+                                   f"{name or 'primary'}-replica-{index}", replicas=[])
+                          for index, replica in enumerate(replicas)]
+        for replica in self._replicas:
+            replica.query_stats = self.query_stats
+        self._replica_depth = 0
+        self._next_replica = 0
+        self._wrote = False
+        # '' before the first write; None when the position is unknown (only the primary is safe)
+        self._write_gtids: Optional[str] = ''
+        # On a replica: the newest session GTID set it is known to have applied, and when to retry it after a failure
+        self._applied_gtids = ''
+        self._retry_at = 0.0
 
+    @_traced_db_call('connect')
     def connect(self) -> bool:
-        """Establish database connection"""
+        """Establish database connection (False at once while the circuit breaker is open)"""
+        if not self.breaker.allow():
+            return False
         try:
             self.connection = mysql.connector.connect(**self.config)
+            if self.session_statements:
+                cursor = self.connection.cursor()
+                for statement in self.session_statements:
+                    cursor.execute(statement)
+                cursor.close()
+            self.breaker.record_success()
             return True
         except Error as e:
+            self.connection = None
+            self.breaker.record_failure()
             print(f"Database connection error: {e}")
             return False
 
@@ -30,64 +138,386 @@ class Database:
         """Close database connection"""
         if self.connection and self.connection.is_connected():
             self.connection.close()
+        for replica in self._replicas:
+            replica.disconnect()
+
+    def _ensure_connection(self):
+        """
+        Connect if needed; a lost connection inside a unit of work cannot be
+        silently replaced. Raises DatabaseUnavailableError when the server
+        cannot be reached or its circuit breaker is open.
+        """
+        if self.connection and self.connection.is_connected():
+            return
+        if self._unit_depth:
+            raise Error(msg="Connection lost inside a unit of work")
+        if not self.connect():
+            raise DatabaseUnavailableError(self.breaker.server, self.breaker.retry_in())
+
+    @property
+    def in_unit_of_work(self) -> bool:
+        """Whether statements are currently deferred to a unit of work commit"""
+        return self._unit_depth > 0
+
+    def on_commit(self, callback: Callable[[], None]):
+        """Run callback after the current unit of work commits (now, outside one); dropped on rollback"""
+        if self._unit_depth:
+            self._after_commit.append(callback)
+        else:
+            callback()
+
+    # Shard routing (see db/shard_router.py): a single database owns every account
+
+    @property
+    def shards(self) -> List['Database']:
+        return [self]
+
+    @property
+    def node(self) -> 'Database':
+        """The database statements currently go to"""
+        return self
+
+    def for_account(self, account_number: str) -> 'Database':
+        return self
+
+    @contextmanager
+    def routed(self, account_number: str):
+        """Send the enclosed statements to the shard owning an account"""
+        yield self
+
+    def gather(self, func: Callable[[], List[Any]], account_numbers: List[str] = None) -> List[Any]:
+        """Run func on every shard (or those owning account_numbers) and concatenate the results"""
+        return list(func())
+
+    def clone(self) -> 'Database':
+        """A new, unconnected Database for the same server (for work on another connection)"""
+        return Database(self.config, self.session_statements, self.name, self.replica_configs)
+
+    # Read replicas
+
+    @contextmanager
+    def replica_reads(self):
+        """
+        Let fetches in the enclosed block go to a read replica that has applied
+        this session's writes. Writes, and everything inside a unit of work,
+        still go to the primary, as do reads when no replica has caught up.
+        """
+        self._replica_depth += 1
+        try:
+            yield self
+        finally:
+            self._replica_depth -= 1
+
+    def mark_written(self):
+        """Count a write committed for this session on another connection (safe from any thread)"""
+        self._wrote = True
+
+    def _reader(self) -> 'Database':
+        """Where a fetch goes: a caught-up replica inside replica_reads(), otherwise the primary"""
+        if not self._replica_depth or self._unit_depth or not self._replicas:
+            return self
+        if self._wrote:
+            self._wrote = False
+            self._write_gtids = self._executed_gtids()
+        if self._write_gtids is None:
+            return self
+        now = time.monotonic()
+        for _ in range(len(self._replicas)):
+            self._next_replica = (self._next_replica + 1) % len(self._replicas)
+            replica = self._replicas[self._next_replica]
+            if replica._retry_at <= now and replica._caught_up(self._write_gtids):
+                return replica
+        return self
+
+    def _executed_gtids(self) -> Optional[str]:
+        """The primary's executed GTID set, which includes this session's committed writes"""
+        depth, self._replica_depth = self._replica_depth, 0
+        try:
+            result = self.fetch_one("SELECT @@GLOBAL.gtid_executed as gtids")
+        finally:
+            self._replica_depth = depth
+        # Empty when GTIDs are off: replicas cannot be checked, so reads stay on the primary
+        return result['gtids'] or None if result else None
+
+    def _caught_up(self, gtids: str) -> bool:
+        """On a replica: whether it has applied gtids (waiting up to REPLICA_WAIT_SECONDS)"""
+        if not (self.connection and self.connection.is_connected()) and not self.connect():
+            # Unreachable: leave it out for a while instead of paying a connect per read
+            self._retry_at = time.monotonic() + Settings.REPLICA_RETRY_SECONDS
+            return False
+        if gtids == self._applied_gtids:
+            return True
+        if Settings.REPLICA_WAIT_SECONDS > 0:
+            result = self.fetch_one("SELECT WAIT_FOR_EXECUTED_GTID_SET(%s, %s) = 0 as caught_up",
+                                    (gtids, Settings.REPLICA_WAIT_SECONDS))
+        else:
+            result = self.fetch_one("SELECT GTID_SUBSET(%s, @@GLOBAL.gtid_executed) as caught_up", (gtids,))
+        if result is None:
+            self._retry_at = time.monotonic() + Settings.REPLICA_RETRY_SECONDS
+            return False
+        if result['caught_up']:
+            self._applied_gtids = gtids
+            return True
+        return False
+
+    @contextmanager
+    def unit_of_work(self, consistent_snapshot: bool = False, read_only: bool = False):
+        """Run the enclosed statements as one transaction on one connection
+
+        execute_query stops committing per statement; the outermost unit commits
+        once on exit and rolls back if the block raises. Nested units join the
+        enclosing one (and its snapshot and access mode).
+        """
+        if self._unit_depth:
+            self._unit_depth += 1
+            try:
+                yield self
+            finally:
+                self._unit_depth -= 1
+            return
+
+        self.begin_transaction(consistent_snapshot, read_only)
+        self._unit_depth = 1
+        try:
+            yield self
+        except BaseException as e:
+            self._unit_depth = 0
+            self._after_commit = []
+            try:
+                self.rollback_transaction()
+            except Error:
+                pass
+            if isinstance(e, TransientDatabaseError):
+                e.rolled_back = True
+            raise
+        self._unit_depth = 0
+        callbacks, self._after_commit = self._after_commit, []
+        try:
+            self.commit_transaction()
+        except Error:
+            try:
+                self.rollback_transaction()
+            except Error:
+                pass
+            raise
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"After-commit callback error: {e}")
 
     def execute_query(self, query: str, params: tuple = None) -> bool:
         """Execute a query that doesn't return results (INSERT, UPDATE, DELETE)"""
+        return self.execute_update(query, params) is not None
+
+    def execute_update(self, query: str, params: tuple = None) -> Optional[int]:
+        """Execute a statement and return the number of rows it changed (None if it failed)"""
+        started = time.perf_counter()
+        rows_affected = 0
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
+            self._ensure_connection()
             
             cursor = self.connection.cursor()
             cursor.execute(query, params or ())
-            self.connection.commit()
+            rows_affected = cursor.rowcount
+            self._wrote = True
+            if not self._unit_depth:
+                self.connection.commit()
+            cursor.close()
+            self._record('execute_query', query, started, rows_affected=rows_affected, params=params)
+            return rows_affected
+        except Error as e:
+            self._record('execute_query', query, started, rows_affected=rows_affected, error=True, params=params,
+                         error_code=e.errno)
+            print(f"Query execution error: {e}")
+            self._raise_if_transient(e)
+            # Inside a unit of work the caller's failure rolls back the whole unit
+            if self.connection and not self._unit_depth:
+                self.connection.rollback()
+            return None
+
+    def execute_many(self, query: str, params_list: List[tuple]) -> bool:
+        """Execute one statement for many parameter sets (INSERTs are sent as a single multi-row statement)"""
+        if not params_list:
+            return True
+        started = time.perf_counter()
+        rows_affected = 0
+        try:
+            self._ensure_connection()
+
+            cursor = self.connection.cursor()
+            cursor.executemany(query, params_list)
+            rows_affected = cursor.rowcount
+            self._wrote = True
+            if not self._unit_depth:
+                self.connection.commit()
             cursor.close()
+            self._record('execute_many', query, started, rows_affected=rows_affected, params=params_list[0])
             return True
         except Error as e:
+            self._record('execute_many', query, started, rows_affected=rows_affected, error=True,
+                         params=params_list[0], error_code=e.errno)
             print(f"Query execution error: {e}")
-            if self.connection:
+            self._raise_if_transient(e)
+            if self.connection and not self._unit_depth:
                 self.connection.rollback()
             return False
 
     def fetch_one(self, query: str, params: tuple = None) -> Optional[Dict[str, Any]]:
         """Fetch a single row from the database"""
+        reader = self._reader()
+        if reader is not self:
+            return reader.fetch_one(query, params)
+        started = time.perf_counter()
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
+            self._ensure_connection()
             
             cursor = self.connection.cursor(dictionary=True)
             cursor.execute(query, params or ())
             result = cursor.fetchone()
             cursor.close()
+            self._record('fetch_one', query, started, rows_returned=1 if result else 0, params=params)
             return result
         except Error as e:
+            self._record('fetch_one', query, started, error=True, params=params,
+                         error_code=e.errno)
             print(f"Fetch error: {e}")
+            self._raise_if_transient(e)
             return None
 
     def fetch_all(self, query: str, params: tuple = None) -> List[Dict[str, Any]]:
         """Fetch all rows from the database"""
+        reader = self._reader()
+        if reader is not self:
+            return reader.fetch_all(query, params)
+        started = time.perf_counter()
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
+            self._ensure_connection()
             
             cursor = self.connection.cursor(dictionary=True)
             cursor.execute(query, params or ())
             results = cursor.fetchall()
             cursor.close()
+            self._record('fetch_all', query, started, rows_returned=len(results), params=params)
+            return results
+        except Error as e:
+            self._record('fetch_all', query, started, error=True, params=params,
+                         error_code=e.errno)
+            print(f"Fetch all error: {e}")
+            self._raise_if_transient(e)
+            return []
+
+    def fetch_records(self, record: type, query: str, params: tuple = None) -> List[Any]:
+        """Fetch all rows as record objects (see db.records); columns must be selected in field order"""
+        reader = self._reader()
+        if reader is not self:
+            return reader.fetch_records(record, query, params)
+        started = time.perf_counter()
+        try:
+            self._ensure_connection()
+            
+            cursor = self.connection.cursor()
+            cursor.execute(query, params or ())
+            results = list(map(record._make, cursor.fetchall()))
+            cursor.close()
+            self._record('fetch_all', query, started, rows_returned=len(results), params=params)
             return results
         except Error as e:
+            self._record('fetch_all', query, started, error=True, params=params,
+                         error_code=e.errno)
             print(f"Fetch all error: {e}")
+            self._raise_if_transient(e)
             return []
 
-    def begin_transaction(self):
-        """Start a database transaction"""
+    def fetch_columns(self, columns: Dict[str, str], query: str, params: tuple = None,
+                      batch_size: int = 10000) -> Dict[str, Any]:
+        """
+        Stream a result set into one typed array per column (see db.columns).
+        columns maps names, in SELECT order, to a type code; the query must not
+        return NULLs. Rows are pulled in batches, so only the arrays are held.
+        """
+        reader = self._reader()
+        if reader is not self:
+            return reader.fetch_columns(columns, query, params, batch_size)
+        started = time.perf_counter()
+        buffers = new_columns(columns)
+        targets = list(buffers.values())
+        rows_returned = 0
+        try:
+            self._ensure_connection()
+
+            cursor = self.connection.cursor()
+            cursor.execute(query, params or ())
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                rows_returned += len(rows)
+                for i, target in enumerate(targets):
+                    target.extend([row[i] for row in rows])
+            cursor.close()
+            self._record('fetch_columns', query, started, rows_returned=rows_returned, params=params)
+        except Error as e:
+            self._record('fetch_columns', query, started, error=True, params=params,
+                         error_code=e.errno)
+            print(f"Fetch columns error: {e}")
+            self._raise_if_transient(e)
+            buffers = new_columns(columns)
+        return finish_columns(buffers)
+
+    def _raise_if_transient(self, error: Error):
+        """
+        Inside a unit of work, turn deadlocks and lock wait timeouts into a
+        retryable error; a statement stopped by its time limit or KILL QUERY
+        always raises, so a cut-short report is never taken as empty
+        """
+        if self._unit_depth and error.errno in RETRYABLE_ERRNOS:
+            raise TransientDatabaseError(str(error), error.errno) from error
+        if error.errno in CANCELLED_ERRNOS:
+            raise QueryCancelledError(str(error), error.errno) from error
+        # A dropped connection counts towards opening the circuit breaker
+        if error.errno in CONNECTION_ERRNOS:
+            self.breaker.record_failure()
+
+    def _record(self, operation: str, query: str, started: float, rows_returned: int = 0,
+                rows_affected: int = 0, error: bool = False, params: tuple = None,
+                error_code: int = None):
+        """Record statement timing in the query statistics and the active trace"""
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.query_stats.record(query, elapsed_ms, rows_returned, rows_affected, error, params, error_code)
+        
+        if tracer.enabled and tracer.current_span() is not None:
+            tracer.record_span(
+                f"db.{operation}",
+                int(started * 1e9),
+                sql=self.query_stats.fingerprint(query),
+                error="statement failed" if error else None,
+                rows=rows_returned or rows_affected
+            )
+
+    def get_query_stats(self) -> List[Dict[str, Any]]:
+        """Get per-statement timing statistics, most expensive first"""
+        return self.query_stats.snapshot()
+
+    def dump_query_stats(self, path: str = None) -> str:
+        """Dump per-statement timing statistics as JSON (optionally to a file)"""
+        return self.query_stats.dump(path)
+
+    def reset_query_stats(self):
+        """Reset per-statement timing statistics"""
+        self.query_stats.reset()
+
+    @_traced_db_call('begin_transaction')
+    def begin_transaction(self, consistent_snapshot: bool = False, read_only: bool = False):
+        """Start a database transaction (optionally WITH CONSISTENT SNAPSHOT and READ ONLY)"""
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
-            self.connection.start_transaction()
+            self._ensure_connection()
+            self.connection.start_transaction(consistent_snapshot=consistent_snapshot, readonly=read_only or None)
         except Error as e:
             print(f"Transaction start error: {e}")
             raise
 
+    @_traced_db_call('commit_transaction')
     def commit_transaction(self):
         """Commit the current transaction"""
         try:
@@ -96,6 +526,7 @@ class Database:
             print(f"Transaction commit error: {e}")
             raise
 
+    @_traced_db_call('rollback_transaction')
     def rollback_transaction(self):
         """Rollback the current transaction"""
         try:
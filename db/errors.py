@@ -0,0 +1,59 @@
+# banking_app/db/errors.py
+"""
+Database error types
+Typed errors raised by Database where callers need to react to the cause
+rather than a generic failure.
+"""
+
+# MySQL error codes that abort a transaction but succeed when it is retried
+DEADLOCK = 1213
+LOCK_WAIT_TIMEOUT = 1205
+RETRYABLE_ERRNOS = {DEADLOCK: 'deadlock', LOCK_WAIT_TIMEOUT: 'lock_timeout'}
+
+
+class TransientDatabaseError(Exception):
+    """A statement inside a unit of work failed with a retryable error (deadlock, lock wait timeout)"""
+
+    def __init__(self, message: str, errno: int):
+        super().__init__(message)
+        self.errno = errno
+        # Set by the outermost unit of work once the whole transaction is rolled back
+        self.rolled_back = False
+
+    @property
+    def reason(self) -> str:
+        return RETRYABLE_ERRNOS.get(self.errno, 'transient')
+
+# MySQL error codes for a statement stopped by MAX_EXECUTION_TIME or KILL QUERY
+QUERY_TIMEOUT = 3024
+QUERY_INTERRUPTED = 1317
+CANCELLED_ERRNOS = {QUERY_TIMEOUT: 'timeout', QUERY_INTERRUPTED: 'cancelled'}
+
+
+class QueryCancelledError(Exception):
+    """A report statement hit its execution time limit or was cancelled (see db/reporting.py)"""
+
+    def __init__(self, message: str, errno: int = QUERY_INTERRUPTED):
+        super().__init__(message)
+        self.errno = errno
+
+    @property
+    def reason(self) -> str:
+        return CANCELLED_ERRNOS.get(self.errno, 'cancelled')
+
+# MySQL client error codes for a server that cannot be reached or dropped the connection
+CANT_CONNECT = 2003
+UNKNOWN_HOST = 2005
+SERVER_GONE = 2006
+LOST_CONNECTION = 2013
+CONNECTION_ERRNOS = {CANT_CONNECT, UNKNOWN_HOST, SERVER_GONE, LOST_CONNECTION}
+
+
+class DatabaseUnavailableError(Exception):
+    """The database's circuit breaker is open or a reconnect failed (see db/circuit_breaker.py)"""
+
+    def __init__(self, server: str, retry_in: float = 0.0):
+        super().__init__(f"Database {server} is unavailable" +
+                         (f" (retrying in {retry_in:.1f}s)" if retry_in else ""))
+        self.server = server
+        self.retry_in = retry_in
@@ -0,0 +1,116 @@
+# banking_app/db/idempotency.py
+"""
+Idempotency keys
+Lets callers retry a money-moving request after a timeout without risking
+a double post. The key is claimed with INSERT IGNORE inside the request's
+own unit of work, so it commits or rolls back together with the posting:
+a committed key always means the request succeeded. A concurrent duplicate
+blocks on the key's row lock until the first request finishes.
+"""
+
+import hashlib
+from decimal import Decimal
+from db.database import Database
+from config.settings import Settings
+
+
+class IdempotencyStore:
+    def __init__(self, database: Database):
+        self.db = database
+        self._schema_ready = False
+
+    def ensure_schema(self) -> bool:
+        """Create the key table on every shard if needed (DDL; call before opening the unit of work)"""
+        if not self._schema_ready:
+            self._schema_ready = all([node.execute_query("""
+                CREATE TABLE IF NOT EXISTS idempotency_keys (
+                    idempotency_key VARCHAR(64) NOT NULL PRIMARY KEY,
+                    operation VARCHAR(32) NOT NULL,
+                    request_hash CHAR(64) NOT NULL,
+                    expires_at TIMESTAMP NOT NULL,
+                    INDEX idx_idempotency_expires (expires_at)
+                ) ENGINE=InnoDB
+            """) for node in self.db.shards])
+        return self._schema_ready
+
+    def seen(self, key: str, operation: str, *params) -> bool:
+        """
+        Claim key for this request inside the caller's unit of work.
+        Returns True if a request with this key already committed, in which
+        case the caller returns its original (successful) result instead of
+        posting again. Reusing a key for a different request is an error.
+        """
+        if not key or len(key) > 64:
+            raise ValueError("Idempotency key must be 1-64 characters")
+        request_hash = self._fingerprint(operation, params)
+        claimed = self.db.execute_update("""
+            INSERT IGNORE INTO idempotency_keys (idempotency_key, operation, request_hash, expires_at)
+            VALUES (%s, %s, %s, NOW() + INTERVAL %s HOUR)
+        """, (key, operation, request_hash, Settings.IDEMPOTENCY_KEY_TTL_HOURS))
+        if claimed is None:
+            raise Exception("Failed to record idempotency key")
+        if claimed:
+            return False
+
+        original = self.db.fetch_one("""
+            SELECT operation, request_hash FROM idempotency_keys WHERE idempotency_key = %s
+        """, (key,))
+        if not original or original['operation'] != operation or original['request_hash'] != request_hash:
+            raise ValueError("Idempotency key was already used for a different request")
+        return True
+
+    def committed(self, key: str, operation: str, *params) -> bool:
+        """
+        Whether a request with this key has already committed (a plain read,
+        outside any unit of work). Lets a retry skip the checks its own first
+        posting would now fail; seen() still decides inside the unit of work.
+        """
+        if not key or len(key) > 64:
+            raise ValueError("Idempotency key must be 1-64 characters")
+        original = self.db.fetch_one("""
+            SELECT operation, request_hash FROM idempotency_keys WHERE idempotency_key = %s
+        """, (key,))
+        if not original:
+            return False
+        if original['operation'] != operation or original['request_hash'] != self._fingerprint(operation, params):
+            raise ValueError("Idempotency key was already used for a different request")
+        return True
+
+    def purge_expired(self, batch_size: int = 1000) -> int:
+        """Delete expired keys in small index-ordered batches so the purge never holds long locks"""
+        purged = 0
+        while True:
+            deleted = self.db.execute_update("""
+                DELETE FROM idempotency_keys
+                WHERE expires_at < NOW()
+                ORDER BY expires_at
+                LIMIT %s
+            """, (batch_size,))
+            if not deleted:
+                return purged
+            purged += deleted
+            if deleted < batch_size:
+                return purged
+
+    @staticmethod
+    def _fingerprint(operation: str, params: tuple) -> str:
+        # Numbers compare by value to the cent, so 100, 100.0 and Decimal('100.00') match
+        payload = '|'.join([operation] + [str(Decimal(str(value)).quantize(Decimal('0.01')))
+                                          if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+                                          else str(value) for value in params])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+if __name__ == "__main__":
+    import argparse
+    from db.shard_router import open_database
+
+    parser = argparse.ArgumentParser(description="Idempotency key maintenance")
+    parser.add_argument('command', choices=['purge'])
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    db = open_database()
+    store = IdempotencyStore(db)
+    purged = sum(db.gather(lambda: [store.purge_expired(args.batch_size)]))
+    print(f"Purged {purged} expired idempotency keys")
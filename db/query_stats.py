@@ -0,0 +1,212 @@
+# banking_app/db/query_stats.py
+"""
+Query statistics
+Per-statement latency histograms, row counts and slow-query logging
+for the Database class
+"""
+
+import re
+import sys
+import json
+import time
+import logging
+import threading
+from typing import Dict, List, Any, Optional
+from config.settings import Settings
+
+# Histogram bucket upper bounds in milliseconds
+LATENCY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+
+_COMMENT_RE = re.compile(r"/\*.*?\*/|--[^\n]*", re.S)
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_RE = re.compile(r"%s|%\(\w+\)s")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_LIST_RE = re.compile(r"(VALUES\s*\([^)]*\))(?:\s*,\s*\([^)]*\))+", re.I)
+_SPACE_RE = re.compile(r"\s+")
+
+slow_query_logger = logging.getLogger('db.slow_query')
+
+
+def fingerprint(query: str) -> str:
+    """Normalize a SQL statement so queries differing only in literals group together"""
+    normalized = _COMMENT_RE.sub(" ", query)
+    normalized = _STRING_RE.sub("?", normalized)
+    normalized = _PARAM_RE.sub("?", normalized)
+    normalized = _NUMBER_RE.sub("?", normalized)
+    normalized = _IN_LIST_RE.sub("(...)", normalized)
+    normalized = _VALUES_LIST_RE.sub(r"\1, ...", normalized)
+    return _SPACE_RE.sub(" ", normalized).strip()
+
+
+def find_caller(max_depth: int = 12) -> str:
+    """Find the first calling method outside the db package (e.g. 'StatementService.get_daily_statement')"""
+    frame = sys._getframe(2)
+    depth = 0
+    while frame is not None and depth < max_depth:
+        module = frame.f_globals.get('__name__', '')
+        if not module.startswith('db.') and module != 'contextlib':
+            owner = frame.f_locals.get('self')
+            if owner is not None:
+                return f"{type(owner).__name__}.{frame.f_code.co_name}"
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+        depth += 1
+    return "unknown"
+
+
+class _StatementStats:
+    __slots__ = ('count', 'errors', 'total_ms', 'min_ms', 'max_ms', 'buckets',
+                 'rows_returned', 'rows_affected', 'callers')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.min_ms = float('inf')
+        self.max_ms = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS_MS)
+        self.rows_returned = 0
+        self.rows_affected = 0
+        self.callers = {}
+
+    def percentile(self, fraction: float) -> float:
+        """Estimate a percentile from the histogram (upper bound of the matching bucket)"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for bound, hits in zip(LATENCY_BUCKETS_MS, self.buckets):
+            seen += hits
+            if seen >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+
+class QueryStats:
+    def __init__(self, slow_query_threshold_ms: float = None):
+        self.slow_query_threshold_ms = (Settings.SLOW_QUERY_THRESHOLD_MS
+                                        if slow_query_threshold_ms is None
+                                        else slow_query_threshold_ms)
+        self.enabled = Settings.QUERY_STATS_ENABLED
+        self._stats: Dict[str, _StatementStats] = {}
+        self._fingerprints: Dict[str, str] = {}
+        self._error_codes: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._started_at = time.time()
+
+        if Settings.SLOW_QUERY_LOG_FILE and not slow_query_logger.handlers:
+            handler = logging.FileHandler(Settings.SLOW_QUERY_LOG_FILE)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            slow_query_logger.addHandler(handler)
+
+    def fingerprint(self, query: str) -> str:
+        """Get the (cached) fingerprint of a statement"""
+        # Query strings are mostly module constants, so cache their fingerprints
+        key = self._fingerprints.get(query)
+        if key is None:
+            key = fingerprint(query)
+            if len(self._fingerprints) < 10000:
+                self._fingerprints[query] = key
+        return key
+
+    def record(self, query: str, elapsed_ms: float, rows_returned: int = 0,
+               rows_affected: int = 0, error: bool = False, params: tuple = None,
+               error_code: int = None):
+        """Record one statement execution"""
+        if error_code is not None:
+            with self._lock:
+                self._error_codes[error_code] = self._error_codes.get(error_code, 0) + 1
+
+        if not self.enabled:
+            return
+
+        key = self.fingerprint(query)
+        caller = find_caller()
+        bucket = 0
+        while elapsed_ms > LATENCY_BUCKETS_MS[bucket]:
+            bucket += 1
+
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _StatementStats()
+            stats.count += 1
+            stats.errors += 1 if error else 0
+            stats.total_ms += elapsed_ms
+            stats.min_ms = min(stats.min_ms, elapsed_ms)
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.buckets[bucket] += 1
+            stats.rows_returned += rows_returned
+            stats.rows_affected += max(rows_affected, 0)
+            stats.callers[caller] = stats.callers.get(caller, 0) + 1
+
+        if elapsed_ms >= self.slow_query_threshold_ms:
+            slow_query_logger.warning(json.dumps({
+                'event': 'slow_query',
+                'fingerprint': key,
+                'elapsed_ms': round(elapsed_ms, 3),
+                'rows_returned': rows_returned,
+                'rows_affected': rows_affected,
+                'caller': caller,
+                'error': error,
+                'error_code': error_code,
+                'param_count': len(params) if params else 0,
+                'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+            }))
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Get per-fingerprint statistics, most expensive first"""
+        with self._lock:
+            items = list(self._stats.items())
+
+        results = []
+        for key, stats in items:
+            results.append({
+                'fingerprint': key,
+                'count': stats.count,
+                'errors': stats.errors,
+                'total_ms': round(stats.total_ms, 3),
+                'mean_ms': round(stats.total_ms / stats.count, 3) if stats.count else 0.0,
+                'min_ms': round(stats.min_ms, 3) if stats.count else 0.0,
+                'max_ms': round(stats.max_ms, 3),
+                'p50_ms': stats.percentile(0.50),
+                'p95_ms': stats.percentile(0.95),
+                'p99_ms': stats.percentile(0.99),
+                'histogram': {
+                    ('+Inf' if bound == float('inf') else str(bound)): hits
+                    for bound, hits in zip(LATENCY_BUCKETS_MS, stats.buckets)
+                },
+                'rows_returned': stats.rows_returned,
+                'rows_affected': stats.rows_affected,
+                'callers': dict(sorted(stats.callers.items(), key=lambda c: c[1], reverse=True))
+            })
+
+        results.sort(key=lambda r: r['total_ms'], reverse=True)
+        return results
+
+    def error_counts(self) -> Dict[int, int]:
+        """Get failed statement counts by MySQL error code (e.g. 1213 deadlock, 1205 lock wait timeout)"""
+        with self._lock:
+            return dict(self._error_codes)
+
+    def dump(self, path: Optional[str] = None) -> str:
+        """Dump statistics as JSON, optionally writing them to a file"""
+        data = json.dumps({
+            'since': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self._started_at)),
+            'slow_query_threshold_ms': self.slow_query_threshold_ms,
+            'error_codes': self.error_counts(),
+            'statements': self.snapshot()
+        }, indent=2)
+
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(data)
+        return data
+
+    def reset(self):
+        """Clear all collected statistics"""
+        with self._lock:
+            self._stats.clear()
+            self._error_codes.clear()
+            self._started_at = time.time()
@@ -0,0 +1,70 @@
+# banking_app/db/records.py
+"""
+Compact result records
+Read methods return rows as tuple-backed records instead of building a
+second dict per row: values stay as the cursor returned them and are
+converted (e.g. DECIMAL to float) only when read. Records still answer
+row['name'], row.get('name') and 'name' in row, so code written against
+the old dict results keeps working.
+"""
+
+from collections import namedtuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+def optional_float(value) -> Optional[float]:
+    """float() for nullable columns (NULL and zero read as None, as before)"""
+    return float(value) if value else None
+
+
+class Record(tuple):
+    """Dict-style read access for record_type classes"""
+
+    __slots__ = ()
+    _index: Dict[str, int] = {}
+    _derived: Dict[str, Callable] = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key in self._index or key in self._derived:
+                return getattr(self, key)
+            raise KeyError(key)
+        return tuple.__getitem__(self, key)
+
+    def __contains__(self, key) -> bool:
+        return key in self._index or key in self._derived
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+    def keys(self) -> List[str]:
+        return list(self._index) + list(self._derived)
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(key, self[key]) for key in self.keys()]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Converted copy as a plain dict (e.g. for JSON)"""
+        return dict(self.items())
+
+
+def record_type(name: str, fields: Iterable[str], derived: Dict[str, Callable[[Record], Any]] = None,
+                **converters: Callable[[Any], Any]) -> type:
+    """
+    Build a record class over a tuple of fields (in SELECT column order).
+    converters map a field to the function applied each time it is read;
+    derived maps extra names to functions of the record, computed on read
+    and never stored.
+    """
+    fields = tuple(fields)
+    index = {field: i for i, field in enumerate(fields)}
+    namespace = {'__slots__': (), '_index': index, '_derived': dict(derived or {})}
+    for field, convert in converters.items():
+        namespace[field] = property(lambda self, i=index[field], convert=convert: convert(tuple.__getitem__(self, i)))
+    for field, compute in (derived or {}).items():
+        namespace[field] = property(compute)
+    return type(name, (Record, namedtuple(name, fields)), namespace)
+
+
+# Ledger rows as read by statements, the admin console and the archive
+TransactionRecord = record_type('TransactionRecord', ('id', 'type', 'amount', 'timestamp'), amount=float)
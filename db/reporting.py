@@ -0,0 +1,92 @@
+# banking_app/db/reporting.py
+"""
+Reporting sessions
+Long admin reads (user listings, system statistics, loan histories) run on
+their own connection, one per shard, instead of the teller connection.
+Each report is one read-only START TRANSACTION WITH CONSISTENT SNAPSHOT
+per shard, so totals never catch a transfer half-applied and teller
+statements never queue behind a report. Every SELECT is bounded by the
+session's MAX_EXECUTION_TIME, and cancel() stops a running report from
+another thread with KILL QUERY. Report connections get their own, longer
+client read timeout (REPORT_READ_TIMEOUT_SECONDS) than teller ones.
+
+A snapshot is per shard: reports summed over several shards are each
+consistent on their own shard. A cross-shard transfer (a saga) can be
+seen debited on the sender's shard before it is credited on the
+recipient's, so balance totals add those in-flight amounts back (see
+AdminService.get_system_statistics).
+"""
+
+import threading
+from contextlib import contextmanager, ExitStack
+from typing import Dict, Tuple
+from db.database import Database, set_io_timeout
+from db.errors import QueryCancelledError, DatabaseUnavailableError
+from config.settings import Settings
+
+
+class ReportingSession:
+    def __init__(self, database: Database, max_execution_ms: int = None):
+        """database is the application's Database or ShardRouter; its connections are never used"""
+        max_execution_ms = Settings.REPORT_MAX_EXECUTION_MS if max_execution_ms is None else max_execution_ms
+        self.db = database.clone()
+        for node, source in zip(self.db.shards, database.shards):
+            node.query_stats = source.query_stats
+            set_io_timeout(node.config, Settings.REPORT_READ_TIMEOUT_SECONDS)
+            if max_execution_ms:
+                node.session_statements.append(f"SET SESSION MAX_EXECUTION_TIME = {int(max_execution_ms)}")
+        self.cancelled = False
+        # One report at a time: they share the session's connections
+        self._lock = threading.Lock()
+        # shard position -> (connection, its CONNECTION_ID()) for the report in progress
+        self._connection_ids: Dict[int, Tuple[object, int]] = {}
+        self._running = False
+
+    @contextmanager
+    def snapshot(self):
+        """
+        Run one report: yields the session's database with every shard in a
+        read-only consistent snapshot. Raises QueryCancelledError if the
+        report was cancelled, even between statements.
+        """
+        with self._lock:
+            self.cancelled = False
+            with ExitStack() as stack:
+                for index, node in enumerate(self.db.shards):
+                    stack.enter_context(node.unit_of_work(consistent_snapshot=True, read_only=True))
+                    self._remember_connection(index, node)
+                self._running = True
+                try:
+                    yield self.db
+                finally:
+                    self._running = False
+                if self.cancelled:
+                    raise QueryCancelledError("Report cancelled")
+
+    def _remember_connection(self, index: int, node: Database):
+        cached = self._connection_ids.get(index)
+        if cached is None or cached[0] is not node.connection:
+            row = node.fetch_one("SELECT CONNECTION_ID() as id")
+            if row:
+                self._connection_ids[index] = (node.connection, int(row['id']))
+
+    def cancel(self) -> bool:
+        """Stop the report in progress (safe from any thread); False if none was running"""
+        if not self._running:
+            return False
+        self.cancelled = True
+        for index, (_, connection_id) in list(self._connection_ids.items()):
+            # KILL must come from another connection; the report's own is busy
+            killer = Database(self.db.shards[index].config, name=self.db.shards[index].name, replicas=[])
+            try:
+                killer.execute_query(f"KILL QUERY {int(connection_id)}")
+            except DatabaseUnavailableError:
+                # The server is unreachable, so the report's statement is failing anyway
+                continue
+            finally:
+                killer.disconnect()
+        return True
+
+    def close(self):
+        self.db.disconnect()
+        self._connection_ids.clear()
@@ -0,0 +1,58 @@
+# banking_app/db/retry.py
+"""
+Retry policy for units of work
+Re-runs a whole unit of work when MySQL aborts it with a deadlock (1213)
+or lock wait timeout (1205), backing off exponentially with full jitter
+between attempts.
+"""
+
+import time
+import random
+from typing import Callable, Any
+from config.settings import Settings
+from db.errors import TransientDatabaseError
+from monitoring.metrics import registry
+from monitoring.tracing import tracer
+
+DB_RETRIES = registry.counter(
+    'irnvault_db_retries_total', 'Units of work retried after a transient database error',
+    ('operation', 'reason'))
+DB_RETRIES_EXHAUSTED = registry.counter(
+    'irnvault_db_retries_exhausted_total', 'Units of work that failed after the last retry attempt',
+    ('operation', 'reason'))
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts: int = None, base_delay_ms: float = None, max_delay_ms: float = None):
+        self.max_attempts = max(1, Settings.DB_RETRY_MAX_ATTEMPTS if max_attempts is None else max_attempts)
+        self.base_delay_ms = Settings.DB_RETRY_BASE_DELAY_MS if base_delay_ms is None else base_delay_ms
+        self.max_delay_ms = Settings.DB_RETRY_MAX_DELAY_MS if max_delay_ms is None else max_delay_ms
+
+    def backoff(self, attempt: int) -> float:
+        """Seconds to wait before retry number `attempt` (full jitter)"""
+        ceiling = min(self.max_delay_ms, self.base_delay_ms * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling) / 1000
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Call func, which must open its own unit of work, retrying transient failures.
+        Errors raised inside an enclosing unit of work are not retried here: the
+        enclosing transaction is still open, so only its owner can start over.
+        """
+        operation = getattr(func, '__name__', 'unit_of_work').lstrip('_').replace('apply_', '', 1)
+        attempt = 1
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except TransientDatabaseError as e:
+                if not e.rolled_back:
+                    raise
+                if attempt >= self.max_attempts:
+                    DB_RETRIES_EXHAUSTED.labels(operation, e.reason).inc()
+                    raise
+                DB_RETRIES.labels(operation, e.reason).inc()
+                span = tracer.current_span()
+                if span is not None:
+                    span.set_attribute('db.retries', attempt)
+                time.sleep(self.backoff(attempt))
+                attempt += 1
@@ -0,0 +1,182 @@
+# banking_app/db/shard_router.py
+"""
+Shard router
+Spreads accounts, and everything keyed by them (ledger, loans, limits,
+outbox), over several MySQL nodes listed in DB_SHARDS. An account's shard
+comes from a consistent-hash ring over the shard positions. Each node
+interleaves its auto-increment ids (offset i, step N), which keeps ids
+unique across shards; rows are always found through their account
+number, never their id.
+
+The shard set is fixed once accounts exist: there is no rebalancing
+command, and adding, removing or reordering DB_SHARDS entries would send
+some accounts to a shard that does not hold their rows (and change the
+id interleaving). Growing the cluster means exporting and re-importing
+the data under the new layout.
+
+ShardRouter stands in for Database. Services run per-account work inside
+routed(account_number), which pins the calling thread to that shard: every Database method called on the router, units
+of work included, goes to the pinned shard, so the code inside needs no
+changes. Outside a routed block statements go to the first shard. Admin
+listings use gather(), which runs the same query on each shard in
+parallel and concatenates the rows. Transfers between shards run as a
+saga (see transactions/transfer_saga.py).
+"""
+
+import bisect
+import hashlib
+import inspect
+import functools
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, ExitStack
+from typing import Any, Callable, Dict, List, Tuple
+from db.database import Database, parse_address
+from config.settings import Settings
+
+
+def _ring_hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+def parse_shards(spec: List[str]) -> List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """(connection overrides, replica overrides) for each host:port/database|replica... entry of DB_SHARDS"""
+    shards = []
+    for entry in spec:
+        primary, *replicas = entry.split('|')
+        shards.append((parse_address(primary), [parse_address(replica) for replica in replicas if replica.strip()]))
+    return shards
+
+
+class ShardRouter:
+    def __init__(self, nodes: List[Database], virtual_nodes: int = None):
+        if not nodes:
+            raise ValueError("At least one shard is required")
+        self.nodes = nodes
+        # Ring positions are derived from the shard index (see the module docstring: the set is fixed)
+        virtual_nodes = virtual_nodes or Settings.SHARD_VIRTUAL_NODES
+        ring: List[Tuple[int, int]] = sorted((_ring_hash(f"shard-{index}#{replica}"), index)
+                                             for index in range(len(nodes)) for replica in range(virtual_nodes))
+        self._ring_keys = [key for key, _ in ring]
+        self._ring_shards = [index for _, index in ring]
+        self._local = threading.local()
+
+    @classmethod
+    def from_settings(cls) -> 'ShardRouter':
+        """One node per DB_SHARDS entry, each interleaving its auto-increment ids"""
+        shards = parse_shards(Settings.DB_SHARDS)
+        count = len(shards)
+        return cls([Database(config, [f"SET SESSION auto_increment_increment = {count}, "
+                                      f"auto_increment_offset = {index + 1}"], f"shard-{index}", replicas)
+                    for index, (config, replicas) in enumerate(shards)])
+
+    @property
+    def shards(self) -> List[Database]:
+        return list(self.nodes)
+
+    @property
+    def node(self) -> Database:
+        """The shard the calling thread is pinned to (the first shard when not pinned)"""
+        stack = getattr(self._local, 'stack', None)
+        return stack[-1] if stack else self.nodes[0]
+
+    def shard_index(self, account_number: str) -> int:
+        position = bisect.bisect(self._ring_keys, _ring_hash(str(account_number))) % len(self._ring_keys)
+        return self._ring_shards[position]
+
+    def for_account(self, account_number: str) -> Database:
+        return self.nodes[self.shard_index(account_number)]
+
+    @contextmanager
+    def routed(self, account_number: str):
+        """Pin the calling thread to the shard owning an account for the enclosed block"""
+        node = self.for_account(account_number)
+        with self._pinned(node):
+            yield node
+
+    @contextmanager
+    def _pinned(self, node: Database):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(node)
+        try:
+            yield node
+        finally:
+            stack.pop()
+
+    def gather(self, func: Callable[[], List[Any]], account_numbers: List[str] = None) -> List[Any]:
+        """
+        Run func on every shard (or just those owning account_numbers), each
+        in its own thread pinned to that shard, and concatenate the results
+        in shard order. Never call it inside a unit of work or another gather
+        (a reporting snapshot is fine: every shard has its own, see db/reporting.py).
+        """
+        if getattr(self._local, 'gathering', False):
+            raise RuntimeError("gather() cannot be nested")
+        if account_numbers is None:
+            nodes = self.nodes
+        else:
+            owners = {self.shard_index(account_number) for account_number in account_numbers}
+            nodes = [node for index, node in enumerate(self.nodes) if index in owners]
+        if not nodes:
+            return []
+
+        def run(node: Database) -> List[Any]:
+            self._local.gathering = True
+            try:
+                with self._pinned(node):
+                    return list(func())
+            finally:
+                self._local.gathering = False
+
+        if len(nodes) == 1:
+            return run(nodes[0])
+        # Each worker runs in its own copy of the caller's context (the current tracing span)
+        with ThreadPoolExecutor(max_workers=len(nodes)) as pool:
+            futures = [pool.submit(contextvars.copy_context().run, run, node) for node in nodes]
+            return [row for future in futures for row in future.result()]
+
+    @contextmanager
+    def replica_reads(self):
+        """Let fetches in the enclosed block use caught-up read replicas, on whichever shard they go to"""
+        with ExitStack() as stack:
+            for node in self.nodes:
+                stack.enter_context(node.replica_reads())
+            yield self
+
+    def connect(self) -> bool:
+        return all([node.connect() for node in self.nodes])
+
+    def disconnect(self):
+        for node in self.nodes:
+            node.disconnect()
+
+    def clone(self) -> 'ShardRouter':
+        return ShardRouter([node.clone() for node in self.nodes])
+
+    def __getattr__(self, name: str):
+        # Everything else (queries, units of work, on_commit, stats) goes to the pinned shard
+        return getattr(self.node, name)
+
+
+def open_database():
+    """The application's database: a ShardRouter when DB_SHARDS is set, else a single Database"""
+    return ShardRouter.from_settings() if Settings.DB_SHARDS else Database()
+
+
+def route_by(argument: str = 'account_number'):
+    """Method decorator: run the method routed to the shard owning the account named by one of its arguments"""
+    def decorator(func):
+        code = inspect.unwrap(func).__code__
+        names = code.co_varnames[:code.co_argcount]
+        position = names.index(argument)
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            value = kwargs[argument] if argument in kwargs else args[position - 1]
+            with self.db.routed(value):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,376 @@
+# banking_app/eod/eod_service.py
+"""
+End-of-day service
+Closes business days into daily_balance_snapshots: each account's closing
+balance and per-type count and total for the day, so statements, charts
+and reports read one row per account-day instead of the ledger.
+
+A day is closed in account ranges, in parallel, each range on its own
+connection and in one unit of work. A range makes one pass over its
+accounts' ledger rows from the start of the day: rows inside the day give
+the totals, and rows after it are taken back off the live balance (read
+in the same snapshot) to give the closing balance. Closing is anchored to
+the live balance rather than chained from the previous day, so it never
+drifts and needs no earlier snapshot. That holds because every balance
+change is recorded: postings in the ledger, and absolute edits (the admin
+balance edit, UserService.update_balance) as their difference in
+balance_adjustments, which is taken off the same way but is not a
+customer posting, so it never shows in a day's counts or totals. A
+balance repair only brings the row back to that sum. The plan of
+ranges is stored in eod_ranges and each range is marked done in its own
+unit of work, so an interrupted run picks up where it stopped. When sharded, every shard
+closes its own accounts and cross-shard reads count a day as closed once
+every shard has closed it.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from db.database import Database
+from db.accounts import BalanceAdjustmentLog
+from db.columns import TRANSACTION_TYPES, CREDIT_TYPES, TYPE_CODE_SQL, INT, SMALL_INT, FLOAT, np, sum_by, count_by
+from transactions.hot_account_service import HotAccountService
+from archive.archive_service import ArchiveService
+from monitoring.tracing import trace_methods
+from config.settings import Settings
+
+_TYPE_COUNT = len(TRANSACTION_TYPES)
+
+_SIGNS = [1.0 if name in CREDIT_TYPES else -1.0 for name in TRANSACTION_TYPES]
+
+# Snapshot columns holding each type's day total, in TRANSACTION_TYPES order
+TOTAL_COLUMNS = tuple(f"{name}_total" for name in TRANSACTION_TYPES)
+
+
+@trace_methods
+class EndOfDayService:
+    def __init__(self, database: Database, database_factory: Callable[[], Database] = None):
+        self.db = database
+        # Each parallel range worker opens its own connection
+        self.database_factory = database_factory or database.clone
+        self._schema_ready = False
+
+    def ensure_schema(self) -> bool:
+        """Create the snapshot and run tables on every shard if needed (DDL; never call inside a unit of work)"""
+        if not self._schema_ready:
+            totals = ',\n'.join(f"                    {column} DECIMAL(17, 2) NOT NULL DEFAULT 0.00"
+                                for column in TOTAL_COLUMNS)
+            self._schema_ready = all([node.execute_query(f"""
+                CREATE TABLE IF NOT EXISTS daily_balance_snapshots (
+                    account_number VARCHAR(10) NOT NULL,
+                    business_date DATE NOT NULL,
+                    closing_balance DECIMAL(15, 2) NOT NULL,
+                    tx_count INT UNSIGNED NOT NULL DEFAULT 0,
+{totals},
+                    PRIMARY KEY (account_number, business_date),
+                    INDEX idx_snapshots_date (business_date)
+                ) ENGINE=InnoDB
+            """) and node.execute_query("""
+                CREATE TABLE IF NOT EXISTS eod_days (
+                    business_date DATE NOT NULL PRIMARY KEY,
+                    ranges INT UNSIGNED NOT NULL,
+                    started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    completed_at TIMESTAMP NULL
+                ) ENGINE=InnoDB
+            """) and node.execute_query("""
+                CREATE TABLE IF NOT EXISTS eod_ranges (
+                    business_date DATE NOT NULL,
+                    range_start VARCHAR(10) NOT NULL,
+                    range_end VARCHAR(10) NULL,
+                    accounts INT UNSIGNED NULL,
+                    completed_at TIMESTAMP NULL,
+                    PRIMARY KEY (business_date, range_start)
+                ) ENGINE=InnoDB
+            """) for node in self.db.shards]) and BalanceAdjustmentLog(self.db).ensure_schema()
+        return self._schema_ready
+
+    def close_pending_days(self, workers: int = None) -> List[date]:
+        """Close every day since the last closed one (yesterday only on the first run)"""
+        if len(self.db.shards) > 1:
+            closed = set()
+            for node in self.db.shards:
+                closed.update(EndOfDayService(node).close_pending_days(workers))
+            return sorted(closed)
+        last_day = self.last_closable_day()
+        latest = self.db.fetch_one("SELECT MAX(business_date) as latest FROM eod_days WHERE completed_at IS NOT NULL") \
+            if self.ensure_schema() else None
+        day = latest['latest'] + timedelta(days=1) if latest and latest['latest'] else last_day
+        closed = []
+        while day <= last_day:
+            self.close_day(day, workers)
+            closed.append(day)
+            day += timedelta(days=1)
+        return closed
+
+    def close_day(self, business_date: date, workers: int = None) -> int:
+        """Close one day (resuming an interrupted run); returns the number of accounts snapshotted"""
+        if len(self.db.shards) > 1:
+            return sum(EndOfDayService(node).close_day(business_date, workers) for node in self.db.shards)
+        if business_date > self.last_closable_day():
+            raise ValueError(f"{business_date} is not closed yet")
+        archived_until = ArchiveService(self.db).archived_until()
+        if archived_until is not None and datetime.combine(business_date, datetime.min.time()) < archived_until:
+            raise ValueError(f"{business_date} is already archived; close days before archiving their month")
+        if not self.ensure_schema():
+            raise Exception("Could not create the end-of-day tables")
+
+        ranges = self._plan(business_date)
+        pending = [(start, end) for start, end, done in ranges if not done]
+        with ThreadPoolExecutor(max_workers=workers or Settings.EOD_WORKERS) as pool:
+            list(pool.map(lambda bounds: self._close_range_on_own_connection(business_date, *bounds), pending))
+
+        if not self.db.execute_query("""
+            UPDATE eod_days SET completed_at = CURRENT_TIMESTAMP
+            WHERE business_date = %s AND completed_at IS NULL
+        """, (business_date,)):
+            raise Exception("Failed to mark the day closed")
+        result = self.db.fetch_one("""
+            SELECT COALESCE(SUM(accounts), 0) as accounts FROM eod_ranges WHERE business_date = %s
+        """, (business_date,))
+        return int(result['accounts']) if result else 0
+
+    def _plan(self, business_date: date) -> List[Tuple[str, Optional[str], bool]]:
+        """The day's account ranges, split every EOD_RANGE_ACCOUNTS accounts on the first run"""
+        ranges = self.db.fetch_all("""
+            SELECT range_start, range_end, completed_at FROM eod_ranges
+            WHERE business_date = %s ORDER BY range_start
+        """, (business_date,))
+        if not ranges:
+            boundaries = [row['account_number'] for row in self.db.fetch_all("""
+                SELECT account_number FROM (
+                    SELECT account_number, ROW_NUMBER() OVER (ORDER BY account_number) as position
+                    FROM accounts
+                ) numbered
+                WHERE MOD(position - 1, %s) = 0 AND position > 1
+                ORDER BY account_number
+            """, (Settings.EOD_RANGE_ACCOUNTS,))]
+            starts = [''] + boundaries
+            plan = [(business_date, start, end) for start, end in zip(starts, boundaries + [None])]
+            with self.db.unit_of_work():
+                if not self.db.execute_many("""
+                    INSERT IGNORE INTO eod_ranges (business_date, range_start, range_end) VALUES (%s, %s, %s)
+                """, plan) or not self.db.execute_query("""
+                    INSERT IGNORE INTO eod_days (business_date, ranges) VALUES (%s, %s)
+                """, (business_date, len(plan))):
+                    raise Exception("Failed to plan the end-of-day run")
+            return self._plan(business_date)
+        return [(row['range_start'], row['range_end'], row['completed_at'] is not None) for row in ranges]
+
+    def _close_range_on_own_connection(self, business_date: date, range_start: str, range_end: Optional[str]):
+        database = self.database_factory()
+        try:
+            EndOfDayService(database).close_range(business_date, range_start, range_end)
+        finally:
+            database.disconnect()
+
+    def close_range(self, business_date: date, range_start: str, range_end: Optional[str]) -> int:
+        """Snapshot one account range and mark it done, in one unit of work"""
+        day_start = datetime.combine(business_date, datetime.min.time())
+        day_end = day_start + timedelta(days=1)
+        range_filter = "account_number >= %s" + (" AND account_number < %s" if range_end is not None else "")
+        range_params = (range_start,) + ((range_end,) if range_end is not None else ())
+
+        with self.db.unit_of_work():
+            # All reads below share the transaction's snapshot, so later rows
+            # and the balance they were posted to agree with each other
+            accounts = self.db.fetch_all(f"""
+                SELECT account_number, balance FROM accounts
+                WHERE {range_filter} AND created_at < %s
+                ORDER BY account_number
+            """, range_params + (day_end,))
+            pending = HotAccountService(self.db).pending_credits_by_account()
+            columns = self.db.fetch_columns(
+                {'account': INT, 'after': SMALL_INT, 'type_code': SMALL_INT, 'amount': FLOAT}, f"""
+                SELECT CAST(account_number AS UNSIGNED), timestamp >= %s, {TYPE_CODE_SQL}, CAST(amount AS DOUBLE)
+                FROM transactions
+                WHERE {range_filter} AND timestamp >= %s
+            """, (day_end,) + range_params + (day_start,))
+            # Balance edits after the day come off the live balance like later postings
+            adjusted = {row['account_number']: float(row['total']) for row in self.db.fetch_all(f"""
+                SELECT account_number, SUM(amount) as total
+                FROM balance_adjustments
+                WHERE {range_filter} AND created_at >= %s
+                GROUP BY account_number
+            """, range_params + (day_end,))}
+
+            rows = [(account['account_number'], business_date,
+                     round(float(account['balance']) + pending.get(account['account_number'], 0.0) - later
+                           - adjusted.get(account['account_number'], 0.0), 2),
+                     count) + tuple(round(total, 2) for total in totals)
+                    for account, (count, totals, later) in zip(accounts, _day_figures(accounts, columns))]
+            updates = ', '.join(f"{column} = VALUES({column})" for column in ('closing_balance', 'tx_count') +
+                                TOTAL_COLUMNS)
+            if not self.db.execute_many(f"""
+                INSERT INTO daily_balance_snapshots
+                    (account_number, business_date, closing_balance, tx_count, {', '.join(TOTAL_COLUMNS)})
+                VALUES (%s, %s, %s, %s, {', '.join(['%s'] * _TYPE_COUNT)})
+                ON DUPLICATE KEY UPDATE {updates}
+            """, rows):
+                raise Exception("Failed to store daily balance snapshots")
+            if not self.db.execute_query("""
+                UPDATE eod_ranges SET completed_at = CURRENT_TIMESTAMP, accounts = %s
+                WHERE business_date = %s AND range_start = %s
+            """, (len(rows), business_date, range_start)):
+                raise Exception("Failed to mark the account range done")
+        return len(rows)
+
+    def last_closable_day(self) -> date:
+        """Latest day whose transactions can no longer change (the close delay has passed)"""
+        result = self.db.fetch_one("SELECT NOW() as now")
+        now = result['now'] if result else datetime.now()
+        return (now - timedelta(seconds=Settings.EOD_CLOSE_DELAY_SECONDS)).date() - timedelta(days=1)
+
+    def closed_days(self, start: date = None, end: date = None) -> List[date]:
+        """Closed days in [start, end), oldest first"""
+        if not self.ensure_schema():
+            return []
+        conditions, params = ["completed_at IS NOT NULL"], []
+        if start is not None:
+            conditions.append("business_date >= %s")
+            params.append(start)
+        if end is not None:
+            conditions.append("business_date < %s")
+            params.append(end)
+        rows = self.db.fetch_all(f"""
+            SELECT business_date FROM eod_days WHERE {' AND '.join(conditions)} ORDER BY business_date
+        """, tuple(params))
+        return [row['business_date'] for row in rows]
+
+    def get_account_days(self, account_number: str, start: date, end: date) -> List[Dict[str, Any]]:
+        """An account's snapshots for business dates in [start, end), oldest first"""
+        rows = self.db.fetch_all(f"""
+            SELECT business_date, closing_balance, tx_count, {', '.join(TOTAL_COLUMNS)}
+            FROM daily_balance_snapshots
+            WHERE account_number = %s AND business_date >= %s AND business_date < %s
+            ORDER BY business_date
+        """, (account_number, start, end))
+        return [_snapshot(row) for row in rows]
+
+    def get_daily_totals(self, start: date, end: date) -> Dict[date, Dict[str, Any]]:
+        """Closing balance summed over all accounts, per day in [start, end) closed on every shard"""
+        shard_totals = self.db.gather(lambda: [self._shard_daily_totals(start, end)])
+        if not shard_totals:
+            return {}
+        closed_everywhere = set.intersection(*(set(totals) for totals in shard_totals))
+        merged = {day: {'closing_balance': 0.0, 'accounts': 0} for day in closed_everywhere}
+        for totals in shard_totals:
+            for day in closed_everywhere:
+                merged[day]['closing_balance'] += totals[day]['closing_balance']
+                merged[day]['accounts'] += totals[day]['accounts']
+        return merged
+
+    def _shard_daily_totals(self, start: date, end: date) -> Dict[date, Dict[str, Any]]:
+        """The current shard's totals for each of its closed days in [start, end)"""
+        days = self.closed_days(start, end)
+        if not days:
+            return {}
+        rows = self.db.fetch_all("""
+            SELECT business_date, SUM(closing_balance) as closing_balance, COUNT(*) as accounts
+            FROM daily_balance_snapshots
+            WHERE business_date >= %s AND business_date <= %s
+            GROUP BY business_date
+        """, (days[0], days[-1]))
+        # A closed day with no accounts yet still counts as closed
+        totals = {day: {'closing_balance': 0.0, 'accounts': 0} for day in days}
+        for row in rows:
+            if row['business_date'] in totals:
+                totals[row['business_date']] = {'closing_balance': float(row['closing_balance']),
+                                                'accounts': int(row['accounts'])}
+        return totals
+
+    def get_status(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Most recent runs with their range progress (summed over the shards)"""
+        if not self.ensure_schema():
+            return []
+        runs: Dict[date, Dict[str, Any]] = {}
+        shards: Dict[date, int] = {}
+        for run in self.db.gather(lambda: self._shard_status(limit)):
+            day = run['business_date']
+            shards[day] = shards.get(day, 0) + 1
+            if day not in runs:
+                runs[day] = dict(run)
+                continue
+            merged = runs[day]
+            for key in ('ranges', 'ranges_done', 'accounts'):
+                merged[key] += run[key]
+            merged['started_at'] = min(merged['started_at'], run['started_at'])
+            merged['completed_at'] = None if merged['completed_at'] is None or run['completed_at'] is None \
+                else max(merged['completed_at'], run['completed_at'])
+        for day, run in runs.items():
+            # Not closed until every shard has closed it
+            if shards[day] < len(self.db.shards):
+                run['completed_at'] = None
+        return sorted(runs.values(), key=lambda run: run['business_date'], reverse=True)[:limit]
+
+    def _shard_status(self, limit: int) -> List[Dict[str, Any]]:
+        return self.db.fetch_all("""
+            SELECT d.business_date, d.ranges, COUNT(r.completed_at) as ranges_done,
+                   COALESCE(SUM(r.accounts), 0) as accounts, d.started_at, d.completed_at
+            FROM eod_days d
+            LEFT JOIN eod_ranges r ON r.business_date = d.business_date
+            GROUP BY d.business_date, d.ranges, d.started_at, d.completed_at
+            ORDER BY d.business_date DESC
+            LIMIT %s
+        """, (limit,))
+
+
+def _snapshot(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {'business_date': row['business_date'],
+            'closing_balance': float(row['closing_balance']),
+            'count': int(row['tx_count']),
+            'totals': {name: float(row[column]) for name, column in zip(TRANSACTION_TYPES, TOTAL_COLUMNS)}}
+
+
+def _day_figures(accounts: List[Dict[str, Any]], columns: Dict[str, Any]) -> List[Tuple[int, List[float], float]]:
+    """
+    For each account (in order): the day's row count, the day's total per
+    type, and the net amount posted after the day
+    """
+    # Account numbers are 10-digit strings, so their numeric order is their string order
+    numbers = [int(account['account_number']) for account in accounts]
+    width = 2 * _TYPE_COUNT
+    size = len(accounts) * width
+    if np is not None:
+        positions = np.searchsorted(np.asarray(numbers, dtype=np.int64), columns['account'])
+        known = positions < len(numbers)
+        known[known] = np.asarray(numbers, dtype=np.int64)[positions[known]] == columns['account'][known]
+        keys = np.where(known, positions * width + columns['after'] * _TYPE_COUNT + columns['type_code'], -1)
+    else:
+        index = {number: i for i, number in enumerate(numbers)}
+        keys = [index[account] * width + after * _TYPE_COUNT + type_code if account in index else -1
+                for account, after, type_code in zip(columns['account'], columns['after'], columns['type_code'])]
+    totals = sum_by(keys, columns['amount'], size)
+    counts = count_by(keys, size)
+
+    figures = []
+    for i in range(len(accounts)):
+        day = slice(i * width, i * width + _TYPE_COUNT)
+        after = slice(i * width + _TYPE_COUNT, (i + 1) * width)
+        later = sum(sign * total for sign, total in zip(_SIGNS, totals[after]))
+        figures.append((sum(counts[day]), totals[day], later))
+    return figures
+
+
+if __name__ == "__main__":
+    import argparse
+    from db.shard_router import open_database
+
+    parser = argparse.ArgumentParser(description="End-of-day close")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    close_parser = subparsers.add_parser('close', help="close pending days, or one --date (resumes a stopped run)")
+    close_parser.add_argument('--date', type=date.fromisoformat)
+    close_parser.add_argument('--workers', type=int, default=None)
+    subparsers.add_parser('status', help="show recent runs")
+    args = parser.parse_args()
+
+    service = EndOfDayService(open_database())
+    if args.command == 'close':
+        if args.date:
+            print(f"Closed {args.date}: {service.close_day(args.date, args.workers)} accounts")
+        else:
+            print(f"Closed days: {', '.join(str(day) for day in service.close_pending_days(args.workers)) or 'none'}")
+    else:
+        for run in service.get_status():
+            state = f"closed {run['completed_at']}" if run['completed_at'] else "in progress"
+            print(f"{run['business_date']}  {run['ranges_done']}/{run['ranges']} ranges  "
+                  f"{run['accounts']} accounts  {state}")
@@ -0,0 +1,70 @@
+# banking_app/events/change_feed.py
+"""
+Change feed
+Brings changes committed by other processes (other tellers, users, the
+admin console) onto this process's event bus, so live views patch them
+as they patch local ones. A daemon thread tails each shard's outbox from
+its newest event with a non-durable OutboxTailer and republishes every
+event written by another process; this process's own events already
+reached the bus at commit.
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Optional
+from db.database import Database
+from db.errors import DatabaseUnavailableError
+from config.settings import Settings
+from events.event_bus import bus
+from events.outbox_service import OutboxTailer, PROCESS_ORIGIN
+
+
+class ChangeFeed:
+    def __init__(self, database: Database, interval: float = None):
+        self.database = database
+        self.interval = interval or Settings.LIVE_UPDATE_POLL_SECONDS
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Tail the outbox from a daemon thread on its own connections"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='change-feed', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        # Database connections are not thread-safe, so the feed never shares ours
+        db = self.database.clone()
+        tailers = [OutboxTailer(node, 'live-updates', durable=False) for node in db.shards]
+        try:
+            while not self._stop.wait(self.interval):
+                for tailer in tailers:
+                    # A failed batch is not acknowledged, so it is read again after the interval
+                    try:
+                        events = tailer.poll()
+                        for event in events:
+                            if event['payload'].get('origin') != PROCESS_ORIGIN:
+                                bus.publish(self._bus_event(event))
+                        tailer.ack(events)
+                    except DatabaseUnavailableError:
+                        continue
+                    except Exception as e:
+                        logging.warning(f"Change feed failed on {tailer.db.name or 'the database'}: {e}")
+                        continue
+        finally:
+            db.disconnect()
+
+    @staticmethod
+    def _bus_event(event: Dict[str, Any]) -> Dict[str, Any]:
+        """The outbox row as the bus event its writer published locally"""
+        fields = {key: value for key, value in event['payload'].items() if key != 'origin'}
+        return dict(fields, type=event['event_type'], account_number=event['account_number'],
+                    amount=event['amount'])
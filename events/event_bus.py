@@ -0,0 +1,46 @@
+# banking_app/events/event_bus.py
+"""
+In-process event bus
+Services publish change events (ledger postings, account and loan
+application changes) once their unit of work has committed; dashboards
+subscribe and patch only the rows the events name.
+"""
+
+import threading
+from typing import Callable, Dict, Any, List
+from db.database import Database
+
+
+class EventBus:
+    def __init__(self):
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]) -> Callable[[], None]:
+        """Register callback for every event; returns a function that unsubscribes it"""
+        with self._lock:
+            self._subscribers = self._subscribers + [callback]
+
+        def unsubscribe():
+            with self._lock:
+                self._subscribers = [cb for cb in self._subscribers if cb is not callback]
+        return unsubscribe
+
+    def publish(self, event: Dict[str, Any]):
+        """Deliver an event synchronously on the publishing thread"""
+        for callback in self._subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Event subscriber error: {e}")
+
+    def publish_after_commit(self, database: Database, event_type: str, **fields):
+        """Publish once the current unit of work commits (immediately outside one)"""
+        if not self._subscribers:
+            return
+        event = dict(fields, type=event_type)
+        database.on_commit(lambda: self.publish(event))
+
+
+# Default process-wide event bus
+bus = EventBus()
@@ -0,0 +1,244 @@
+# banking_app/events/outbox_service.py
+"""
+Outbox service
+Transactional outbox for ledger events. Every money-moving operation
+writes its events to outbox_events inside its own unit of work, so an
+event exists if and only if the posting committed. Consumers (reporting,
+notifications, the admin console) tail the outbox by id with a stored
+checkpoint instead of scanning the transactions table.
+
+Account and loan application changes go through the outbox too, so live
+views in other processes learn of them (see events/change_feed.py). Each
+stored payload names the writing process as 'origin'.
+"""
+
+import json
+import time
+import uuid
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+from db.database import Database
+from monitoring.tracing import trace_methods
+from config.settings import Settings
+from events.event_bus import bus
+
+# Written into every stored payload so a process can skip its own events when tailing
+PROCESS_ORIGIN = uuid.uuid4().hex[:12]
+
+
+@trace_methods
+class OutboxService:
+    def __init__(self, database: Database):
+        self.db = database
+        self._schema_ready = False
+
+    def ensure_schema(self) -> bool:
+        """Create the outbox tables on every shard if they do not exist (DDL; never call inside a unit of work)"""
+        if not self._schema_ready:
+            self._schema_ready = self._create_tables()
+        return self._schema_ready
+
+    def _create_tables(self) -> bool:
+        return all([node.execute_query("""
+            CREATE TABLE IF NOT EXISTS outbox_events (
+                id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+                event_type VARCHAR(32) NOT NULL,
+                account_number VARCHAR(10) NOT NULL,
+                amount DECIMAL(15, 2) NOT NULL,
+                payload TEXT NULL,
+                created_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+            ) ENGINE=InnoDB
+        """) and node.execute_query("""
+            CREATE TABLE IF NOT EXISTS outbox_checkpoints (
+                consumer VARCHAR(64) NOT NULL PRIMARY KEY,
+                last_event_id BIGINT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB
+        """) for node in self.db.shards])
+
+    def _prepare(self):
+        """
+        Create the tables on first use (say the database was down at startup).
+        Events are written inside the caller's unit of work, which DDL would
+        commit, so the tables are created on a connection of their own.
+        """
+        if self._schema_ready:
+            return
+        database = self.db.clone()
+        try:
+            self._schema_ready = OutboxService(database).ensure_schema()
+        finally:
+            database.disconnect()
+        if not self._schema_ready:
+            raise Exception("Could not create the outbox tables")
+
+    def record(self, event_type: str, account_number: str, amount: float, **payload) -> bool:
+        """Write one event; call inside the unit of work that makes the change"""
+        return self.record_many([(event_type, account_number, amount, payload)])
+
+    def record_many(self, events: List[Tuple[str, str, float, Dict[str, Any]]]) -> bool:
+        """Write (event_type, account_number, amount, payload) events with one multi-row INSERT"""
+        for event_type, account_number, amount, payload in events:
+            bus.publish_after_commit(self.db, event_type, account_number=account_number, amount=amount, **payload)
+        if not Settings.OUTBOX_ENABLED:
+            return True
+        self._prepare()
+        if not self.db.execute_many("""
+            INSERT INTO outbox_events (event_type, account_number, amount, payload)
+            VALUES (%s, %s, %s, %s)
+        """, [(event_type, account_number, amount, json.dumps(dict(payload, origin=PROCESS_ORIGIN), default=str))
+              for event_type, account_number, amount, payload in events]):
+            raise Exception("Failed to record ledger event")
+        return True
+
+    def get_checkpoints(self) -> List[Dict[str, Any]]:
+        """Consumers with their checkpoint and how many events they have yet to process"""
+        return self.db.fetch_all("""
+            SELECT c.consumer, c.last_event_id, c.updated_at,
+                   (SELECT COUNT(*) FROM outbox_events e WHERE e.id > c.last_event_id) as lag
+            FROM outbox_checkpoints c
+            ORDER BY c.consumer
+        """)
+
+    def purge_consumed(self, batch_size: int = 1000) -> int:
+        """Delete events every consumer has acknowledged, in small batches"""
+        result = self.db.fetch_one("SELECT MIN(last_event_id) as low_water FROM outbox_checkpoints")
+        if not result or result['low_water'] is None:
+            return 0
+        purged = 0
+        while True:
+            deleted = self.db.execute_update("""
+                DELETE FROM outbox_events WHERE id <= %s ORDER BY id LIMIT %s
+            """, (result['low_water'], batch_size))
+            if not deleted:
+                return purged
+            purged += deleted
+            if deleted < batch_size:
+                return purged
+
+
+@trace_methods
+class OutboxTailer:
+    """
+    Reads events for one named consumer in id order, starting after its
+    checkpoint. Ids are allocated at insert but become visible at commit,
+    so a lower id can appear after a higher one; the tailer stops at a gap
+    until it is filled or older than OUTBOX_GAP_WAIT_SECONDS (an id whose
+    transaction rolled back never appears). Shards interleave their ids, so
+    consecutive ids on one node are @@auto_increment_increment apart.
+    """
+
+    def __init__(self, database: Database, consumer: str, durable: bool = True):
+        """A consumer that is not durable starts at the newest event and keeps its position in memory"""
+        self.db = database
+        self.consumer = consumer
+        self.durable = durable
+        self.position: Optional[int] = None
+        self._step: Optional[int] = None
+
+    def step(self) -> int:
+        """Distance between consecutive ids on this node (the session's auto_increment_increment)"""
+        if self._step is None:
+            result = self.db.fetch_one("SELECT @@auto_increment_increment as step")
+            if not result:
+                return 1
+            self._step = max(int(result['step']), 1)
+        return self._step
+
+    def checkpoint(self) -> Optional[int]:
+        """Last acknowledged event id (0 for a new consumer; None while unknown)"""
+        if self.position is None:
+            if self.durable:
+                result = self.db.fetch_one("SELECT last_event_id FROM outbox_checkpoints WHERE consumer = %s",
+                                           (self.consumer,))
+                self.position = int(result['last_event_id']) if result else 0
+            else:
+                result = self.db.fetch_one("SELECT COALESCE(MAX(id), 0) as last_event_id FROM outbox_events")
+                self.position = int(result['last_event_id']) if result else None
+        return self.position
+
+    def poll(self, limit: int = 500) -> List[Dict[str, Any]]:
+        """Next events after the checkpoint, stopping at an unsettled id gap; does not acknowledge them"""
+        position = self.checkpoint()
+        if position is None:
+            return []
+        step = self.step()
+        rows = self.db.fetch_all("""
+            SELECT id, event_type, account_number, amount, payload, created_at,
+                   TIMESTAMPDIFF(MICROSECOND, created_at, NOW(6)) / 1000000 as age_seconds
+            FROM outbox_events
+            WHERE id > %s
+            ORDER BY id
+            LIMIT %s
+        """, (position, limit))
+
+        events = []
+        for row in rows:
+            # The next id on this node is at most one step on (the first one is its offset)
+            if row['id'] > position + step and float(row['age_seconds']) < Settings.OUTBOX_GAP_WAIT_SECONDS:
+                break
+            events.append({
+                'id': row['id'],
+                'event_type': row['event_type'],
+                'account_number': row['account_number'],
+                'amount': float(row['amount']),
+                'payload': json.loads(row['payload']) if row['payload'] else {},
+                'created_at': row['created_at']
+            })
+            position = row['id']
+        return events
+
+    def ack(self, events: List[Dict[str, Any]]) -> bool:
+        """Acknowledge a processed batch by moving the checkpoint to its last event"""
+        if not events:
+            return True
+        last_id = events[-1]['id']
+        if not self.durable:
+            self.position = max(self.position or 0, last_id)
+            return True
+        if not self.db.execute_query("""
+            INSERT INTO outbox_checkpoints (consumer, last_event_id) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE last_event_id = GREATEST(last_event_id, VALUES(last_event_id))
+        """, (self.consumer, last_id)):
+            return False
+        self.position = max(self.checkpoint(), last_id)
+        return True
+
+    def stream(self, batch_size: int = 500, idle_seconds: float = 1.0) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield batches forever. The previous batch is acknowledged when the
+        next one is requested, so a consumer that crashes mid-batch sees it again.
+        """
+        while True:
+            events = self.poll(batch_size)
+            if not events:
+                time.sleep(idle_seconds)
+                continue
+            yield events
+            self.ack(events)
+
+
+if __name__ == "__main__":
+    import argparse
+    from db.shard_router import open_database
+
+    parser = argparse.ArgumentParser(description="Ledger event outbox")
+    parser.add_argument('command', choices=['tail', 'checkpoints', 'purge'])
+    parser.add_argument('--consumer', default='cli')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--shard', type=int, default=0, help="shard to read (each shard has its own outbox)")
+    args = parser.parse_args()
+
+    db = open_database().shards[args.shard]
+    if args.command == 'tail':
+        try:
+            for batch in OutboxTailer(db, args.consumer).stream(args.batch_size):
+                for event in batch:
+                    print(f"{event['id']:>10}  {event['event_type']:<18} {event['account_number']}  "
+                          f"₱{event['amount']:,.2f}  {event['payload'] or ''}")
+        except KeyboardInterrupt:
+            pass
+    elif args.command == 'checkpoints':
+        for row in OutboxService(db).get_checkpoints():
+            print(f"{row['consumer']:<24} last={row['last_event_id']}  lag={row['lag']}")
+    else:
+        print(f"Purged {OutboxService(db).purge_consumed(args.batch_size)} consumed events")
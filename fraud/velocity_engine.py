@@ -0,0 +1,255 @@
+# banking_app/fraud/velocity_engine.py
+"""
+Velocity engine
+In-memory fraud/velocity scoring for withdrawals and transfers. Each
+account keeps ring-buffer sliding windows (withdrawals, transfers, and
+transfers to recipients it has not paid recently), and recipient pairs
+are remembered with their last payment time. Both live in LRU maps with
+a fixed capacity, so memory stays bounded and a check costs the same no
+matter how much history there is.
+
+Only committed postings are counted; the windows are rebuilt from the
+ledger when the application starts.
+"""
+
+import json
+import time
+import threading
+from collections import OrderedDict, deque, namedtuple
+from typing import Any, Dict, List, Optional, Tuple
+from db.database import Database
+from config.settings import Settings
+from events.event_bus import bus
+from monitoring.metrics import registry
+
+DECISIONS = registry.counter(
+    'irnvault_velocity_decisions_total', 'Velocity checks by operation and outcome', ('operation', 'outcome'))
+
+# Window resolution: the window is split into this many ring buckets
+WINDOW_BUCKETS = 10
+
+VelocityCheck = namedtuple('VelocityCheck', ['score', 'reasons', 'blocked'])
+
+
+class SlidingWindow:
+    """Event count and amount over the last WINDOW_BUCKETS time buckets"""
+
+    __slots__ = ('epochs', 'counts', 'amounts')
+
+    def __init__(self):
+        self.epochs = [-1] * WINDOW_BUCKETS
+        self.counts = [0] * WINDOW_BUCKETS
+        self.amounts = [0.0] * WINDOW_BUCKETS
+
+    def add(self, epoch: int, amount: float):
+        i = epoch % WINDOW_BUCKETS
+        if self.epochs[i] != epoch:
+            self.epochs[i], self.counts[i], self.amounts[i] = epoch, 0, 0.0
+        self.counts[i] += 1
+        self.amounts[i] += amount
+
+    def totals(self, epoch: int) -> Tuple[int, float]:
+        count, amount = 0, 0.0
+        for i in range(WINDOW_BUCKETS):
+            if epoch - WINDOW_BUCKETS < self.epochs[i] <= epoch:
+                count += self.counts[i]
+                amount += self.amounts[i]
+        return count, amount
+
+
+class _AccountActivity:
+    __slots__ = ('withdrawals', 'transfers', 'new_recipients')
+
+    def __init__(self):
+        self.withdrawals = SlidingWindow()
+        self.transfers = SlidingWindow()
+        self.new_recipients = SlidingWindow()
+
+
+class VelocityEngine:
+    def __init__(self, max_accounts: int = None, max_pairs: int = None):
+        self.max_accounts = max_accounts or Settings.VELOCITY_MAX_ACCOUNTS
+        self.max_pairs = max_pairs or Settings.VELOCITY_MAX_PAIRS
+        self.bucket_seconds = max(1.0, Settings.VELOCITY_WINDOW_SECONDS / WINDOW_BUCKETS)
+        self._accounts: "OrderedDict[str, _AccountActivity]" = OrderedDict()
+        self._pairs: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Flagged and blocked checks, newest last, for the admin dashboard
+        self.alerts: "deque[Dict[str, Any]]" = deque(maxlen=Settings.VELOCITY_ALERT_HISTORY)
+
+    def check_withdrawal(self, account_number: str, amount: float) -> VelocityCheck:
+        """Score a withdrawal before it is posted"""
+        epoch = self._epoch(time.time())
+        with self._lock:
+            activity = self._accounts.get(account_number)
+            count, total = activity.withdrawals.totals(epoch) if activity else (0, 0.0)
+        reasons = []
+        score = _ratio_score(count + 1, Settings.VELOCITY_MAX_WITHDRAWALS,
+                             f"{count + 1} withdrawals", reasons, self._window_text())
+        score = max(score, _ratio_score(total + amount, Settings.VELOCITY_MAX_WITHDRAWAL_AMOUNT,
+                                        f"₱{total + amount:,.2f} withdrawn", reasons, self._window_text()))
+        return self._decide('withdrawal', account_number, amount, score, reasons)
+
+    def check_transfer(self, from_account: str, to_account: str, amount: float) -> VelocityCheck:
+        """Score a transfer before it is posted"""
+        now = time.time()
+        epoch = self._epoch(now)
+        with self._lock:
+            activity = self._accounts.get(from_account)
+            count, total = activity.transfers.totals(epoch) if activity else (0, 0.0)
+            new_count, _ = activity.new_recipients.totals(epoch) if activity else (0, 0.0)
+            is_new = not self._known_pair(from_account, to_account, now)
+        reasons = []
+        score = _ratio_score(count + 1, Settings.VELOCITY_MAX_TRANSFERS,
+                             f"{count + 1} transfers", reasons, self._window_text())
+        score = max(score, _ratio_score(total + amount, Settings.VELOCITY_MAX_TRANSFER_AMOUNT,
+                                        f"₱{total + amount:,.2f} transferred", reasons, self._window_text()))
+        if is_new:
+            score = max(score, _ratio_score(new_count + 1, Settings.VELOCITY_MAX_NEW_RECIPIENTS,
+                                            f"{new_count + 1} new recipients", reasons, self._window_text()))
+        return self._decide('transfer', from_account, amount, score, reasons, to_account)
+
+    def record_withdrawal(self, account_number: str, amount: float, at: float = None):
+        """Count a committed withdrawal"""
+        epoch = self._epoch(time.time() if at is None else at)
+        with self._lock:
+            self._activity(account_number).withdrawals.add(epoch, amount)
+
+    def record_transfer(self, from_account: str, to_account: str, amount: Optional[float], at: float = None):
+        """Count a committed transfer and remember the recipient (amount None only updates the pair)"""
+        now = time.time() if at is None else at
+        epoch = self._epoch(now)
+        with self._lock:
+            is_new = not self._known_pair(from_account, to_account, now)
+            self._pairs[(from_account, to_account)] = now
+            self._pairs.move_to_end((from_account, to_account))
+            while len(self._pairs) > self.max_pairs:
+                self._pairs.popitem(last=False)
+            if amount is not None:
+                activity = self._activity(from_account)
+                activity.transfers.add(epoch, amount)
+                if is_new:
+                    activity.new_recipients.add(epoch, amount)
+
+    def scores(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Accounts with the highest current window usage (100 = at a limit)"""
+        epoch = self._epoch(time.time())
+        with self._lock:
+            snapshot = [(account_number, activity.withdrawals.totals(epoch), activity.transfers.totals(epoch),
+                         activity.new_recipients.totals(epoch)[0])
+                        for account_number, activity in self._accounts.items()]
+        results = []
+        window = self._window_text()
+        for account_number, (withdrawals, withdrawn), (transfers, transferred), new_recipients in snapshot:
+            # Only the score is listed here; the reasons are not kept
+            reasons = []
+            score = max(_ratio_score(withdrawals, Settings.VELOCITY_MAX_WITHDRAWALS, "withdrawals", reasons, window),
+                        _ratio_score(withdrawn, Settings.VELOCITY_MAX_WITHDRAWAL_AMOUNT, "withdrawn", reasons, window),
+                        _ratio_score(transfers, Settings.VELOCITY_MAX_TRANSFERS, "transfers", reasons, window),
+                        _ratio_score(transferred, Settings.VELOCITY_MAX_TRANSFER_AMOUNT, "transferred", reasons,
+                                     window),
+                        _ratio_score(new_recipients, Settings.VELOCITY_MAX_NEW_RECIPIENTS, "new recipients",
+                                     reasons, window))
+            if score > 0:
+                results.append({'account_number': account_number, 'score': round(score),
+                                'withdrawals': withdrawals, 'withdrawn': withdrawn,
+                                'transfers': transfers, 'transferred': transferred,
+                                'new_recipients': new_recipients})
+        results.sort(key=lambda entry: entry['score'], reverse=True)
+        return results[:limit]
+
+    def rebuild(self, database: Database) -> int:
+        """
+        Reload the windows from recent withdrawals and transfers, and recipient
+        pairs from the outbox's transfer events, on every shard; returns the rows replayed
+        """
+        with self._lock:
+            self._accounts.clear()
+            self._pairs.clear()
+        return sum(self._replay(node) for node in database.shards)
+
+    def _replay(self, database: Database) -> int:
+        # With the outbox on, its transfer events (oldest first) rebuild both the
+        # recipient pairs and the in-window transfers; the ledger supplies the rest
+        events = []
+        types = ('withdrawal', 'transfer_out')
+        if Settings.OUTBOX_ENABLED:
+            events = database.fetch_all("""
+                SELECT account_number, amount, payload, UNIX_TIMESTAMP(created_at) as epoch
+                FROM (
+                    SELECT id, account_number, amount, payload, created_at
+                    FROM outbox_events
+                    WHERE event_type = 'transfer_out' AND created_at >= NOW() - INTERVAL %s DAY
+                    ORDER BY id DESC
+                    LIMIT %s
+                ) recent
+                ORDER BY id
+            """, (Settings.VELOCITY_PAIR_MEMORY_DAYS, self.max_pairs))
+            types = ('withdrawal',)
+        window_start = time.time() - Settings.VELOCITY_WINDOW_SECONDS
+        for event in events:
+            counterparty = json.loads(event['payload'] or '{}').get('counterparty')
+            if counterparty:
+                at = float(event['epoch'])
+                self.record_transfer(event['account_number'], counterparty,
+                                     float(event['amount']) if at >= window_start else None, at=at)
+
+        placeholders = ', '.join(['%s'] * len(types))
+        rows = database.fetch_all(f"""
+            SELECT account_number, type, amount, UNIX_TIMESTAMP(timestamp) as epoch
+            FROM transactions
+            WHERE timestamp >= NOW() - INTERVAL %s SECOND AND type IN ({placeholders})
+            ORDER BY id
+        """, (int(Settings.VELOCITY_WINDOW_SECONDS),) + types)
+        for row in rows:
+            epoch = self._epoch(float(row['epoch']))
+            with self._lock:
+                activity = self._activity(row['account_number'])
+                window = activity.withdrawals if row['type'] == 'withdrawal' else activity.transfers
+                window.add(epoch, float(row['amount']))
+        return len(events) + len(rows)
+
+    def _decide(self, operation: str, account_number: str, amount: float, score: float,
+                reasons: List[str], counterparty: str = None) -> VelocityCheck:
+        blocked = score > 100
+        check = VelocityCheck(round(score), reasons, blocked)
+        outcome = 'blocked' if blocked else 'flagged' if score >= Settings.VELOCITY_FLAG_SCORE else 'allowed'
+        DECISIONS.labels(operation, outcome).inc()
+        if outcome != 'allowed':
+            self.alerts.append({
+                'account_number': account_number, 'operation': operation, 'amount': amount,
+                'counterparty': counterparty, 'score': check.score, 'outcome': outcome,
+                'reasons': reasons, 'at': time.time()
+            })
+            bus.publish({'type': 'velocity_alert', 'account_number': account_number, 'outcome': outcome})
+        return check
+
+    def _activity(self, account_number: str) -> _AccountActivity:
+        """Account windows, created on first use; evicts the least recently used account (lock held)"""
+        activity = self._accounts.get(account_number)
+        if activity is None:
+            activity = self._accounts[account_number] = _AccountActivity()
+            while len(self._accounts) > self.max_accounts:
+                self._accounts.popitem(last=False)
+        else:
+            self._accounts.move_to_end(account_number)
+        return activity
+
+    def _known_pair(self, from_account: str, to_account: str, now: float) -> bool:
+        last_paid = self._pairs.get((from_account, to_account))
+        return last_paid is not None and now - last_paid < Settings.VELOCITY_PAIR_MEMORY_DAYS * 86400
+
+    def _epoch(self, at: float) -> int:
+        return int(at // self.bucket_seconds)
+
+    def _window_text(self) -> str:
+        minutes = Settings.VELOCITY_WINDOW_SECONDS / 60
+        return f"{minutes:g} minutes"
+
+
+def _ratio_score(value: float, limit: float, description: str, reasons: List[str], window: str) -> float:
+    """Usage of one limit as a score (100 = exactly at the limit); notes it when it is close"""
+    score = 100 * value / limit if limit > 0 else 0
+    if score >= Settings.VELOCITY_FLAG_SCORE:
+        reasons.append(f"{description} in {window}")
+    return score
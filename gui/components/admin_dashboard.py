@@ -3,14 +3,32 @@ import customtkinter as ctk
 from typing import Dict, Callable, Any
 import tkinter.messagebox as messagebox
 import datetime
+from ..utils.live_updates import LiveUpdates, KeyedRows
+
+# Events that can change a borrower's loan applications or loans
+LOAN_EVENTS = ('loan_application_changed', 'loan_disbursement', 'loan_payment', 'account_changed')
+
+# Analytics views: granularity, buckets shown and bucket label format
+ANALYTICS_VIEWS = {
+    "Hourly": ('hour', 48, "%Y-%m-%d %H:00"),
+    "Daily": ('day', 31, "%Y-%m-%d"),
+    "Monthly": ('month', 12, "%Y-%m")
+}
 
 class AdminDashboard:
-    def __init__(self, parent, callbacks: Dict[str, Callable], admin_data: Dict[str, Any], admin_service):
+    def __init__(self, parent, callbacks: Dict[str, Callable], admin_data: Dict[str, Any], admin_service, loan_service,
+                 analytics_service, velocity=None):
         self.parent = parent
         self.callbacks = callbacks
         self.admin_data = admin_data
         self.admin_service = admin_service
+        self.loan_service = loan_service
+        self.analytics_service = analytics_service
+        self.velocity = velocity
+        self.analytics_loaded = False
+        self.shown_transactions = None
         self.setup_ui()
+        self.live_updates = LiveUpdates(self.main_frame, self.apply_changes)
     
     def setup_ui(self):
         self.main_frame = ctk.CTkFrame(self.parent)
@@ -41,22 +59,26 @@ class AdminDashboard:
         content_frame = ctk.CTkFrame(self.main_frame)
         content_frame.pack(fill="both", expand=True, padx=15, pady=(5, 15))
         
-        self.tabview = ctk.CTkTabview(content_frame)
+        self.tabview = ctk.CTkTabview(content_frame, command=self.on_tab_changed)
         self.tabview.pack(fill="both", expand=True, padx=10, pady=10)
         
         # Add the new tab here
-        for tab in ["⏳ Pending Accounts", "👥 All Users", "💰 Loan Management", "📊 User Transactions"]:
+        for tab in ["⏳ Pending Accounts", "👥 All Users", "💰 Loan Management", "📊 User Transactions", "📈 Analytics",
+                    "🚨 Risk"]:
             self.tabview.add(tab)
         
         self.setup_pending_accounts_tab()
         self.setup_all_users_tab()
         self.setup_loan_management_tab()
         self.setup_user_transactions_tab()
+        self.setup_analytics_tab()
+        self.setup_risk_tab()
         
         self.refresh_pending_accounts()
         self.refresh_all_users()
         self.refresh_loan_data()
         self.refresh_user_transactions()
+        self.refresh_risk()
     
     def create_tab_header(self, tab, title, refresh_func):
         header_frame = ctk.CTkFrame(tab)
@@ -64,12 +86,15 @@ class AdminDashboard:
         ctk.CTkLabel(header_frame, text=title, font=ctk.CTkFont(size=16, weight="bold")).pack(side="left", padx=15, pady=10)
         ctk.CTkButton(header_frame, text="🔄 Refresh", font=ctk.CTkFont(size=12), height=30, width=80, 
                      command=refresh_func).pack(side="right", padx=15, pady=10)
+        return header_frame
     
     def setup_pending_accounts_tab(self):
         tab = self.tabview.tab("⏳ Pending Accounts")
         self.create_tab_header(tab, "📋 Accounts Awaiting Approval", self.refresh_pending_accounts)
         self.pending_frame = ctk.CTkScrollableFrame(tab)
         self.pending_frame.pack(fill="both", expand=True, padx=10, pady=(5, 10))
+        self.pending_rows = KeyedRows(self.pending_frame, self._build_pending_account_row,
+                                      key=lambda account: account['account_number'])
     
     def setup_all_users_tab(self):
         """Setup All Users tab with sub-tabs for Accounts and Declined/Suspended Accounts"""
@@ -90,11 +115,15 @@ class AdminDashboard:
         accounts_tab = self.users_subtabview.tab("📋 Accounts")
         self.users_frame = ctk.CTkScrollableFrame(accounts_tab)
         self.users_frame.pack(fill="both", expand=True, padx=5, pady=5)
+        self.user_rows = KeyedRows(self.users_frame, self._build_user_row,
+                                   key=lambda user: user['account_number'], newest_first=True)
         
         # Setup Declined/Suspended Accounts sub-tab
         declined_tab = self.users_subtabview.tab("🚫 Declined/Suspended Accounts")
         self.declined_frame = ctk.CTkScrollableFrame(declined_tab)
         self.declined_frame.pack(fill="both", expand=True, padx=5, pady=5)
+        self.declined_rows = KeyedRows(self.declined_frame, self._build_declined_row,
+                                       key=lambda account: account['account_number'], newest_first=True)
 
     def refresh_all_users_data(self):
         """Refresh both accounts and declined accounts data"""
@@ -106,6 +135,7 @@ class AdminDashboard:
         try:
             for widget in self.declined_frame.winfo_children():
                 widget.destroy()
+            self.declined_rows.reset()
             
             declined_accounts = self.admin_service.get_declined_accounts()
             
@@ -122,56 +152,61 @@ class AdminDashboard:
             ctk.CTkLabel(header_frame, text=header_text, 
                         font=ctk.CTkFont(size=12, weight="bold", family="Courier"), 
                         text_color=("#495057", "#6c757d")).pack(pady=10, padx=15, anchor="w")
+            self.declined_rows.reset(anchor=header_frame)
             
             for account in declined_accounts:
-                account_frame = ctk.CTkFrame(self.declined_frame)
-                account_frame.pack(fill="x", padx=10, pady=2)
-                
-                # Left side: Account info
-                info_frame = ctk.CTkFrame(account_frame, fg_color="transparent")
-                info_frame.pack(side="left", fill="both", expand=True, padx=15, pady=8)
-                
-                # Format date for display
-                decline_date = account['declined_at'].strftime("%Y-%m-%d %H:%M") if account['declined_at'] else "Unknown"
-                
-                # Truncate long reasons for display
-                display_reason = account['reason'][:25] + "..." if len(account['reason']) > 25 else account['reason']
-                
-                info_text = f"{account['account_number']:<15} {display_reason:<30} {decline_date:<20}"
-                
-                ctk.CTkLabel(info_frame, text=info_text,
-                            font=ctk.CTkFont(size=11, family="Courier"),
-                            text_color=("#dc3545", "#e74c3c")).pack(anchor="w")
-                
-                # Show full reason as tooltip/secondary line if truncated
-                if len(account['reason']) > 25:
-                    ctk.CTkLabel(info_frame, text=f"Full reason: {account['reason']}",
-                                font=ctk.CTkFont(size=9),
-                                text_color=("gray60", "gray40")).pack(anchor="w", padx=(20, 0))
-                
-                # Right side: Action buttons
-                action_frame = ctk.CTkFrame(account_frame, fg_color="transparent")
-                action_frame.pack(side="right", padx=15, pady=5)
-                
-                # Reactivate button
-                ctk.CTkButton(action_frame, text="🔄 Reactivate", 
-                            font=ctk.CTkFont(size=10, weight="bold"),
-                            height=25, width=90,
-                            fg_color=("#28a745", "#20c997"),
-                            hover_color=("#218838", "#1dd1a1"),
-                            command=lambda acc=account['account_number']: self.reactivate_account(acc)).pack(side="left", padx=(0, 5))
-                
-                # Delete Permanently button
-                ctk.CTkButton(action_frame, text="🗑️ Delete",
-                            font=ctk.CTkFont(size=10, weight="bold"),
-                            height=25, width=70,
-                            fg_color=("#dc3545", "#e74c3c"),
-                            hover_color=("#c82333", "#c0392b"),
-                            command=lambda acc=account['account_number']: self.delete_declined_account(acc)).pack(side="left")
+                self.declined_rows.add(account)
                 
         except Exception as e:
             messagebox.showerror("Error", f"Error refreshing declined accounts: {str(e)}")
 
+    def _build_declined_row(self, account):
+        account_frame = ctk.CTkFrame(self.declined_frame)
+        account_frame.pack(fill="x", padx=10, pady=2)
+        
+        # Left side: Account info
+        info_frame = ctk.CTkFrame(account_frame, fg_color="transparent")
+        info_frame.pack(side="left", fill="both", expand=True, padx=15, pady=8)
+        
+        # Format date for display
+        decline_date = account['declined_at'].strftime("%Y-%m-%d %H:%M") if account['declined_at'] else "Unknown"
+        
+        # Truncate long reasons for display
+        display_reason = account['reason'][:25] + "..." if len(account['reason']) > 25 else account['reason']
+        
+        info_text = f"{account['account_number']:<15} {display_reason:<30} {decline_date:<20}"
+        
+        ctk.CTkLabel(info_frame, text=info_text,
+                    font=ctk.CTkFont(size=11, family="Courier"),
+                    text_color=("#dc3545", "#e74c3c")).pack(anchor="w")
+        
+        # Show full reason as tooltip/secondary line if truncated
+        if len(account['reason']) > 25:
+            ctk.CTkLabel(info_frame, text=f"Full reason: {account['reason']}",
+                        font=ctk.CTkFont(size=9),
+                        text_color=("gray60", "gray40")).pack(anchor="w", padx=(20, 0))
+        
+        # Right side: Action buttons
+        action_frame = ctk.CTkFrame(account_frame, fg_color="transparent")
+        action_frame.pack(side="right", padx=15, pady=5)
+        
+        # Reactivate button
+        ctk.CTkButton(action_frame, text="🔄 Reactivate", 
+                    font=ctk.CTkFont(size=10, weight="bold"),
+                    height=25, width=90,
+                    fg_color=("#28a745", "#20c997"),
+                    hover_color=("#218838", "#1dd1a1"),
+                    command=lambda acc=account['account_number']: self.reactivate_account(acc)).pack(side="left", padx=(0, 5))
+        
+        # Delete Permanently button
+        ctk.CTkButton(action_frame, text="🗑️ Delete",
+                    font=ctk.CTkFont(size=10, weight="bold"),
+                    height=25, width=70,
+                    fg_color=("#dc3545", "#e74c3c"),
+                    hover_color=("#c82333", "#c0392b"),
+                    command=lambda acc=account['account_number']: self.delete_declined_account(acc)).pack(side="left")
+        return account_frame
+
     def reactivate_account(self, account_number):
         """Reactivate a declined account"""
         if messagebox.askyesno("Confirm Reactivation", 
@@ -184,7 +219,6 @@ class AdminDashboard:
             try:
                 if self.admin_service.reactivate_declined_account(account_number):
                     messagebox.showinfo("Success", f"Account {account_number} reactivated successfully!")
-                    self.refresh_all_users_data()
                 else:
                     messagebox.showerror("Error", "Failed to reactivate account. Account may not exist in declined list.")
             except Exception as e:
@@ -201,7 +235,6 @@ class AdminDashboard:
             try:
                 if self.admin_service.delete_declined_account_permanently(account_number):
                     messagebox.showinfo("Success", f"Account {account_number} deleted permanently!")
-                    self.refresh_declined_accounts()
                 else:
                     messagebox.showerror("Error", "Failed to delete account. Account may not exist.")
             except Exception as e:
@@ -211,6 +244,7 @@ class AdminDashboard:
         try:
             for widget in self.pending_frame.winfo_children():
                 widget.destroy()
+            self.pending_rows.reset()
             
             pending_accounts = self.admin_service.get_pending_accounts()
             
@@ -220,41 +254,46 @@ class AdminDashboard:
                 return
             
             for account in pending_accounts:
-                account_frame = ctk.CTkFrame(self.pending_frame)
-                account_frame.pack(fill="x", padx=10, pady=5)
-                
-                info_frame = ctk.CTkFrame(account_frame, fg_color="transparent")
-                info_frame.pack(side="left", fill="both", expand=True, padx=15, pady=10)
-                
-                for text, size, color, pady in [
-                    (f"👤 {account['name']}", 14, None, 0),
-                    (f"Account: {account['account_number']}", 12, None, 0),
-                    (f"Created: {account['created_at']}", 11, ("gray60", "gray40"), 0)
-                ]:
-                    label = ctk.CTkLabel(info_frame, text=text, font=ctk.CTkFont(size=size, weight="bold" if size==14 else "normal"))
-                    if color: label.configure(text_color=color)
-                    label.pack(anchor="w", pady=(pady, 0))
-                
-                button_frame = ctk.CTkFrame(account_frame, fg_color="transparent")
-                button_frame.pack(side="right", padx=15, pady=10)
-                
-                for text, color, hover_color, func, side_pady in [
-                    ("✅ Approve", ("#28a745", "#20c997"), ("#218838", "#1dd1a1"), 
-                     lambda acc=account['account_number']: self.approve_account(acc), (0, 5)),
-                    ("❌ Reject", ("#dc3545", "#e74c3c"), ("#c82333", "#c0392b"), 
-                     lambda acc=account['account_number']: self.reject_account_with_reason(acc), (0, 0))
-                ]:
-                    ctk.CTkButton(button_frame, text=text, font=ctk.CTkFont(size=11, weight="bold"), 
-                                 height=30, width=80, fg_color=color, hover_color=hover_color, 
-                                 command=func).pack(side="top", pady=side_pady)
+                self.pending_rows.add(account)
                 
         except Exception as e:
             messagebox.showerror("Error", f"Error refreshing pending accounts: {str(e)}")
 
+    def _build_pending_account_row(self, account):
+        account_frame = ctk.CTkFrame(self.pending_frame)
+        account_frame.pack(fill="x", padx=10, pady=5)
+        
+        info_frame = ctk.CTkFrame(account_frame, fg_color="transparent")
+        info_frame.pack(side="left", fill="both", expand=True, padx=15, pady=10)
+        
+        for text, size, color, pady in [
+            (f"👤 {account['name']}", 14, None, 0),
+            (f"Account: {account['account_number']}", 12, None, 0),
+            (f"Created: {account['created_at']}", 11, ("gray60", "gray40"), 0)
+        ]:
+            label = ctk.CTkLabel(info_frame, text=text, font=ctk.CTkFont(size=size, weight="bold" if size==14 else "normal"))
+            if color: label.configure(text_color=color)
+            label.pack(anchor="w", pady=(pady, 0))
+        
+        button_frame = ctk.CTkFrame(account_frame, fg_color="transparent")
+        button_frame.pack(side="right", padx=15, pady=10)
+        
+        for text, color, hover_color, func, side_pady in [
+            ("✅ Approve", ("#28a745", "#20c997"), ("#218838", "#1dd1a1"), 
+             lambda acc=account['account_number']: self.approve_account(acc), (0, 5)),
+            ("❌ Reject", ("#dc3545", "#e74c3c"), ("#c82333", "#c0392b"), 
+             lambda acc=account['account_number']: self.reject_account_with_reason(acc), (0, 0))
+        ]:
+            ctk.CTkButton(button_frame, text=text, font=ctk.CTkFont(size=11, weight="bold"), 
+                         height=30, width=80, fg_color=color, hover_color=hover_color, 
+                         command=func).pack(side="top", pady=side_pady)
+        return account_frame
+
     def refresh_all_users(self):
         try:
             for widget in self.users_frame.winfo_children():
                 widget.destroy()
+            self.user_rows.reset()
             
             all_users = self.admin_service.get_all_users()
             
@@ -272,60 +311,65 @@ class AdminDashboard:
                         font=ctk.CTkFont(size=12, weight="bold", family="Courier"), 
                         text_color=("#495057", "#6c757d")).pack(pady=10, padx=15, anchor="w")
             
+            self.user_rows.reset(anchor=header_frame)
             for user in all_users:
-                user_frame = ctk.CTkFrame(self.users_frame)
-                user_frame.pack(fill="x", padx=10, pady=2)
-                
-                # Left side: User info
-                info_frame = ctk.CTkFrame(user_frame, fg_color="transparent")
-                info_frame.pack(side="left", fill="both", expand=True, padx=15, pady=8)
-                
-                status = "✅ Active" if user['is_approved'] else "⏸️ Suspended"
-                status_color = ("#28a745", "#20c997") if user['is_approved'] else ("#ffc107", "#f39c12")
-                
-                # Truncate long names for display
-                display_name = user['name'][:15] + "..." if len(user['name']) > 15 else user['name']
-                info_text = f"{user['account_number']:<12} {display_name:<18} ₱{user['balance']:<11.2f} {status}"
-                
-                ctk.CTkLabel(info_frame, text=info_text,
-                            font=ctk.CTkFont(size=11, family="Courier"),
-                            text_color=status_color).pack(anchor="w")
-                
-                # Right side: Action buttons
-                action_frame = ctk.CTkFrame(user_frame, fg_color="transparent")
-                action_frame.pack(side="right", padx=15, pady=5)
-                
-                # Edit button
-                ctk.CTkButton(action_frame, text="✏️ Edit", 
-                            font=ctk.CTkFont(size=10, weight="bold"),
-                            height=25, width=60,
-                            fg_color=("#17a2b8", "#1abc9c"),
-                            hover_color=("#138496", "#16a085"),
-                            command=lambda u=user: self.edit_user(u)).pack(side="left", padx=(0, 5))
-                
-                # Toggle Status button
-                toggle_text = "⏸️ Suspend" if user['is_approved'] else "✅ Activate"
-                toggle_color = ("#ffc107", "#f39c12") if user['is_approved'] else ("#28a745", "#20c997")
-                toggle_hover = ("#e0a800", "#e67e22") if user['is_approved'] else ("#218838", "#1dd1a1")
-                
-                ctk.CTkButton(action_frame, text=toggle_text,
-                            font=ctk.CTkFont(size=10, weight="bold"),
-                            height=25, width=70,
-                            fg_color=toggle_color,
-                            hover_color=toggle_hover,
-                            command=lambda acc=user['account_number']: self.toggle_user_status(acc)).pack(side="left", padx=(0, 5))
-                
-                # Delete button
-                ctk.CTkButton(action_frame, text="🗑️ Delete",
-                            font=ctk.CTkFont(size=10, weight="bold"),
-                            height=25, width=70,
-                            fg_color=("#dc3545", "#e74c3c"),
-                            hover_color=("#c82333", "#c0392b"),
-                            command=lambda acc=user['account_number'], name=user['name']: self.delete_user(acc, name)).pack(side="left")
+                self.user_rows.add(user)
                 
         except Exception as e:
             messagebox.showerror("Error", f"Error refreshing users: {str(e)}")
 
+    def _build_user_row(self, user):
+        user_frame = ctk.CTkFrame(self.users_frame)
+        user_frame.pack(fill="x", padx=10, pady=2)
+        
+        # Left side: User info
+        info_frame = ctk.CTkFrame(user_frame, fg_color="transparent")
+        info_frame.pack(side="left", fill="both", expand=True, padx=15, pady=8)
+        
+        status = "✅ Active" if user['is_approved'] else "⏸️ Suspended"
+        status_color = ("#28a745", "#20c997") if user['is_approved'] else ("#ffc107", "#f39c12")
+        
+        # Truncate long names for display
+        display_name = user['name'][:15] + "..." if len(user['name']) > 15 else user['name']
+        info_text = f"{user['account_number']:<12} {display_name:<18} ₱{user['balance']:<11.2f} {status}"
+        
+        ctk.CTkLabel(info_frame, text=info_text,
+                    font=ctk.CTkFont(size=11, family="Courier"),
+                    text_color=status_color).pack(anchor="w")
+        
+        # Right side: Action buttons
+        action_frame = ctk.CTkFrame(user_frame, fg_color="transparent")
+        action_frame.pack(side="right", padx=15, pady=5)
+        
+        # Edit button
+        ctk.CTkButton(action_frame, text="✏️ Edit", 
+                    font=ctk.CTkFont(size=10, weight="bold"),
+                    height=25, width=60,
+                    fg_color=("#17a2b8", "#1abc9c"),
+                    hover_color=("#138496", "#16a085"),
+                    command=lambda u=user: self.edit_user(u)).pack(side="left", padx=(0, 5))
+        
+        # Toggle Status button
+        toggle_text = "⏸️ Suspend" if user['is_approved'] else "✅ Activate"
+        toggle_color = ("#ffc107", "#f39c12") if user['is_approved'] else ("#28a745", "#20c997")
+        toggle_hover = ("#e0a800", "#e67e22") if user['is_approved'] else ("#218838", "#1dd1a1")
+        
+        ctk.CTkButton(action_frame, text=toggle_text,
+                    font=ctk.CTkFont(size=10, weight="bold"),
+                    height=25, width=70,
+                    fg_color=toggle_color,
+                    hover_color=toggle_hover,
+                    command=lambda acc=user['account_number']: self.toggle_user_status(acc)).pack(side="left", padx=(0, 5))
+        
+        # Delete button
+        ctk.CTkButton(action_frame, text="🗑️ Delete",
+                    font=ctk.CTkFont(size=10, weight="bold"),
+                    height=25, width=70,
+                    fg_color=("#dc3545", "#e74c3c"),
+                    hover_color=("#c82333", "#c0392b"),
+                    command=lambda acc=user['account_number'], name=user['name']: self.delete_user(acc, name)).pack(side="left")
+        return user_frame
+
     def edit_user(self, user):
         """Open edit dialog for user"""
         # Create edit dialog window
@@ -390,12 +434,13 @@ class AdminDashboard:
                     dialog.destroy()
                     return
                 
-                if self.admin_service.update_user_details(user['account_number'], new_name, new_balance):
+                if self.admin_service.update_user_details(user['account_number'], new_name, new_balance,
+                                                          user.get('version'), user['balance']):
                     messagebox.showinfo("Success", f"User {new_name} updated successfully!")
                     dialog.destroy()
-                    self.refresh_all_users()
                 else:
-                    messagebox.showerror("Error", "Failed to update user details.")
+                    messagebox.showerror("Error", "Failed to update user details. "
+                                         "If the balance changed meanwhile, refresh and try again.")
                     
             except ValueError:
                 messagebox.showerror("Error", "Please enter a valid balance amount!")
@@ -421,7 +466,6 @@ class AdminDashboard:
         try:
             if self.admin_service.toggle_user_status(account_number):
                 messagebox.showinfo("Success", "User status updated successfully!")
-                self.refresh_all_users()
             else:
                 messagebox.showerror("Error", "Failed to update user status.")
         except Exception as e:
@@ -457,7 +501,6 @@ class AdminDashboard:
                     try:
                         if self.admin_service.delete_user_account(account_number):
                             messagebox.showinfo("Success", f"User {name} deleted successfully!")
-                            self.refresh_all_users()
                         else:
                             messagebox.showerror("Error", "Failed to delete user account.")
                     except Exception as e:
@@ -471,8 +514,6 @@ class AdminDashboard:
         try:
             if self.admin_service.approve_account(account_number):
                 messagebox.showinfo("Success", f"Account {account_number} approved successfully!")
-                self.refresh_pending_accounts()
-                self.refresh_all_users()
             else:
                 messagebox.showerror("Error", "Account not found or already approved.")
         except Exception as e:
@@ -486,8 +527,6 @@ class AdminDashboard:
             try:
                 if self.admin_service.reject_account(account_number, reason):
                     messagebox.showinfo("Success", f"Account {account_number} rejected successfully!")
-                    self.refresh_pending_accounts()
-                    self.refresh_all_users()
                 else:
                     messagebox.showerror("Error", "Account not found.")
             except Exception as e:
@@ -508,21 +547,30 @@ class AdminDashboard:
 
     def setup_pending_loans_tab(self):
         tab = self.loan_tabview.tab("⏳ Pending Loans")
-        self.create_tab_header(tab, "💰 Loan Applications Awaiting Approval", self.refresh_pending_loans)
+        header_frame = self.create_tab_header(tab, "💰 Loan Applications Awaiting Approval", self.refresh_pending_loans)
+        ctk.CTkButton(header_frame, text="✅ Approve All", font=ctk.CTkFont(size=12), height=30, width=110,
+                     fg_color=("#28a745", "#20c997"), hover_color=("#218838", "#1dd1a1"),
+                     command=lambda: self.show_approve_loan_dialog(None, None)).pack(side="right", padx=(0, 5), pady=10)
         self.pending_loans_frame = ctk.CTkScrollableFrame(tab)
         self.pending_loans_frame.pack(fill="both", expand=True, padx=10, pady=(5, 10))
+        self.pending_loan_rows = KeyedRows(self.pending_loans_frame, self._build_pending_loan_row,
+                                           key=lambda loan: loan['id'])
 
     def setup_active_loans_tab(self):
         tab = self.loan_tabview.tab("✅ Active Loans")
         self.create_tab_header(tab, "🏦 Currently Active Loans", self.refresh_active_loans)
         self.active_loans_frame = ctk.CTkScrollableFrame(tab)
         self.active_loans_frame.pack(fill="both", expand=True, padx=10, pady=(5, 10))
+        self.active_loan_rows = KeyedRows(self.active_loans_frame, self._build_active_loan_row,
+                                          key=lambda loan: loan['id'])
 
     def setup_loan_history_tab(self):
         tab = self.loan_tabview.tab("📋 Application History")
         self.create_tab_header(tab, "📊 Complete Loan Application History", self.refresh_loan_history)
         self.loan_history_frame = ctk.CTkScrollableFrame(tab)
         self.loan_history_frame.pack(fill="both", expand=True, padx=10, pady=(5, 10))
+        self.history_rows = KeyedRows(self.loan_history_frame, self._build_history_row,
+                                      key=lambda app: app['id'], newest_first=True)
 
     def refresh_loan_data(self):
         self.refresh_pending_loans()
@@ -533,6 +581,7 @@ class AdminDashboard:
         try:
             for widget in self.pending_loans_frame.winfo_children():
                 widget.destroy()
+            self.pending_loan_rows.reset()
             
             pending_loans = self.get_pending_loans()
             
@@ -542,43 +591,48 @@ class AdminDashboard:
                 return
             
             for loan in pending_loans:
-                loan_frame = ctk.CTkFrame(self.pending_loans_frame)
-                loan_frame.pack(fill="x", padx=10, pady=8)
-                
-                info_frame = ctk.CTkFrame(loan_frame, fg_color="transparent")
-                info_frame.pack(side="left", fill="both", expand=True, padx=15, pady=15)
-                
-                for text, size, color, pady in [
-                    (f"👤 {loan['applicant_name']} (Account: {loan['account_number']})", 14, None, 0),
-                    (f"💰 Amount: ₱{loan['amount']:,.2f}", 13, ("#007bff", "#0066cc"), 3),
-                    (f"📋 Purpose: {loan['purpose']}", 12, None, 0),
-                    (f"💼 Monthly Income: ₱{loan['monthly_income']:,.2f} | Status: {loan['employment_status']}", 11, ("gray60", "gray40"), 0),
-                    (f"📅 Applied: {loan['applied_at']}", 11, ("gray60", "gray40"), 0)
-                ]:
-                    label = ctk.CTkLabel(info_frame, text=text, font=ctk.CTkFont(size=size, weight="bold" if size>=13 else "normal"))
-                    if color: label.configure(text_color=color)
-                    label.pack(anchor="w", pady=(pady, 0))
-                
-                button_frame = ctk.CTkFrame(loan_frame, fg_color="transparent")
-                button_frame.pack(side="right", padx=15, pady=15)
-                
-                for text, color, hover_color, func, pady in [
-                    ("✅ Approve", ("#28a745", "#20c997"), ("#218838", "#1dd1a1"), 
-                     lambda loan_id=loan['id'], loan_data=loan: self.show_approve_loan_dialog(loan_id, loan_data), (0, 8)),
-                    ("❌ Decline", ("#dc3545", "#e74c3c"), ("#c82333", "#c0392b"), 
-                     lambda loan_id=loan['id']: self.decline_loan_application(loan_id), (0, 0))
-                ]:
-                    ctk.CTkButton(button_frame, text=text, font=ctk.CTkFont(size=11, weight="bold"), 
-                                 height=35, width=90, fg_color=color, hover_color=hover_color, 
-                                 command=func).pack(side="top", pady=pady)
+                self.pending_loan_rows.add(loan)
                 
         except Exception as e:
             messagebox.showerror("Error", f"Error refreshing pending loans: {str(e)}")
 
+    def _build_pending_loan_row(self, loan):
+        loan_frame = ctk.CTkFrame(self.pending_loans_frame)
+        loan_frame.pack(fill="x", padx=10, pady=8)
+        
+        info_frame = ctk.CTkFrame(loan_frame, fg_color="transparent")
+        info_frame.pack(side="left", fill="both", expand=True, padx=15, pady=15)
+        
+        for text, size, color, pady in [
+            (f"👤 {loan['applicant_name']} (Account: {loan['account_number']})", 14, None, 0),
+            (f"💰 Amount: ₱{loan['amount']:,.2f}", 13, ("#007bff", "#0066cc"), 3),
+            (f"📋 Purpose: {loan['purpose']}", 12, None, 0),
+            (f"💼 Monthly Income: ₱{loan['monthly_income']:,.2f} | Status: {loan['employment_status']}", 11, ("gray60", "gray40"), 0),
+            (f"📅 Applied: {loan['applied_at']}", 11, ("gray60", "gray40"), 0)
+        ]:
+            label = ctk.CTkLabel(info_frame, text=text, font=ctk.CTkFont(size=size, weight="bold" if size>=13 else "normal"))
+            if color: label.configure(text_color=color)
+            label.pack(anchor="w", pady=(pady, 0))
+        
+        button_frame = ctk.CTkFrame(loan_frame, fg_color="transparent")
+        button_frame.pack(side="right", padx=15, pady=15)
+        
+        for text, color, hover_color, func, pady in [
+            ("✅ Approve", ("#28a745", "#20c997"), ("#218838", "#1dd1a1"), 
+             lambda loan_id=loan['id'], loan_data=loan: self.show_approve_loan_dialog(loan_id, loan_data), (0, 8)),
+            ("❌ Decline", ("#dc3545", "#e74c3c"), ("#c82333", "#c0392b"), 
+             lambda loan_id=loan['id'], account=loan['account_number']: self.decline_loan_application(loan_id, account), (0, 0))
+        ]:
+            ctk.CTkButton(button_frame, text=text, font=ctk.CTkFont(size=11, weight="bold"), 
+                         height=35, width=90, fg_color=color, hover_color=hover_color, 
+                         command=func).pack(side="top", pady=pady)
+        return loan_frame
+
     def refresh_active_loans(self):
         try:
             for widget in self.active_loans_frame.winfo_children():
                 widget.destroy()
+            self.active_loan_rows.reset()
             
             active_loans = self.get_active_loans()
             
@@ -594,35 +648,41 @@ class AdminDashboard:
             ctk.CTkLabel(header_frame, text=header_text, font=ctk.CTkFont(size=11, weight="bold", family="Courier"), 
                         text_color=("#495057", "#6c757d")).pack(pady=8)
             
+            self.active_loan_rows.reset(anchor=header_frame)
             for loan in active_loans:
-                loan_frame = ctk.CTkFrame(self.active_loans_frame)
-                loan_frame.pack(fill="x", padx=10, pady=3)
-                
-                progress = ((loan['principal_amount'] - loan['remaining_balance']) / loan['principal_amount']) * 100
-                
-                loan_text = (f"{loan['borrower_name']:<20} "
-                            f"₱{loan['principal_amount']:<11,.0f} "
-                            f"₱{loan['remaining_balance']:<11,.2f} "
-                            f"{loan['interest_rate']:<5.1f}% "
-                            f"₱{loan['monthly_payment']:<9,.0f} "
-                            f"{loan['next_payment_date']}")
-                
-                ctk.CTkLabel(loan_frame, text=loan_text, font=ctk.CTkFont(size=10, family="Courier")).pack(pady=8, padx=15, anchor="w")
-                
-                progress_bar = ctk.CTkProgressBar(loan_frame, width=200, height=8)
-                progress_bar.set(progress / 100)
-                progress_bar.pack(pady=(0, 8), padx=15, anchor="w")
-                
-                ctk.CTkLabel(loan_frame, text=f"Paid: {progress:.1f}%", font=ctk.CTkFont(size=9), 
-                            text_color=("gray60", "gray40")).pack(pady=(0, 8), padx=15, anchor="w")
+                self.active_loan_rows.add(loan)
                 
         except Exception as e:
             messagebox.showerror("Error", f"Error refreshing active loans: {str(e)}")
 
+    def _build_active_loan_row(self, loan):
+        loan_frame = ctk.CTkFrame(self.active_loans_frame)
+        loan_frame.pack(fill="x", padx=10, pady=3)
+        
+        progress = ((loan['principal_amount'] - loan['remaining_balance']) / loan['principal_amount']) * 100
+        
+        loan_text = (f"{loan['borrower_name']:<20} "
+                    f"₱{loan['principal_amount']:<11,.0f} "
+                    f"₱{loan['remaining_balance']:<11,.2f} "
+                    f"{loan['interest_rate']:<5.1f}% "
+                    f"₱{loan['monthly_payment']:<9,.0f} "
+                    f"{loan['next_payment_date']}")
+        
+        ctk.CTkLabel(loan_frame, text=loan_text, font=ctk.CTkFont(size=10, family="Courier")).pack(pady=8, padx=15, anchor="w")
+        
+        progress_bar = ctk.CTkProgressBar(loan_frame, width=200, height=8)
+        progress_bar.set(progress / 100)
+        progress_bar.pack(pady=(0, 8), padx=15, anchor="w")
+        
+        ctk.CTkLabel(loan_frame, text=f"Paid: {progress:.1f}%", font=ctk.CTkFont(size=9), 
+                    text_color=("gray60", "gray40")).pack(pady=(0, 8), padx=15, anchor="w")
+        return loan_frame
+
     def refresh_loan_history(self):
         try:
             for widget in self.loan_history_frame.winfo_children():
                 widget.destroy()
+            self.history_rows.reset()
             
             loan_history = self.get_loan_application_history()
             
@@ -637,79 +697,98 @@ class AdminDashboard:
             ctk.CTkLabel(header_frame, text="Complete Loan Application History (Most Recent First)", 
                         font=ctk.CTkFont(size=13, weight="bold"), text_color=("#495057", "#6c757d")).pack(pady=10)
             
+            self.history_rows.reset(anchor=header_frame)
             for app in loan_history:
-                app_frame = ctk.CTkFrame(self.loan_history_frame)
-                app_frame.pack(fill="x", padx=10, pady=5)
-                
-                status_data = {
-                    'approved': (("#28a745", "#20c997"), "✅"),
-                    'rejected': (("#dc3545", "#e74c3c"), "❌"),
-                    'pending': (("#ffc107", "#f39c12"), "⏳")
-                }
-                status_color, status_icon = status_data.get(app['status'], status_data['pending'])
-                
-                info_frame = ctk.CTkFrame(app_frame, fg_color="transparent")
-                info_frame.pack(fill="both", expand=True, padx=15, pady=12)
-                
-                row1_frame = ctk.CTkFrame(info_frame, fg_color="transparent")
-                row1_frame.pack(fill="x", anchor="w")
-                
-                ctk.CTkLabel(row1_frame, text=f"{status_icon} {app['applicant_name']} - ₱{app['amount']:,.2f} - {app['status'].upper()}", 
-                            font=ctk.CTkFont(size=13, weight="bold"), text_color=status_color).pack(side="left")
+                self.history_rows.add(app)
                 
-                ctk.CTkLabel(row1_frame, text=f"Applied: {app['applied_at']}", font=ctk.CTkFont(size=11), 
-                            text_color=("gray60", "gray40")).pack(side="right")
-                
-                ctk.CTkLabel(info_frame, text=f"Account: {app['account_number']} | Purpose: {app['purpose']} | Income: ₱{app['monthly_income']:,.2f}", 
-                            font=ctk.CTkFont(size=11), text_color=("gray70", "gray50")).pack(anchor="w", pady=(3, 0))
-                
-                if app['status'] == 'approved' and app['processed_at']:
-                    ctk.CTkLabel(info_frame, text=f"Approved: {app['processed_at']} | Rate: {app['interest_rate']}% | Term: {app['term_months']} months | Payment: ₱{app['monthly_payment']:,.2f}", 
-                                font=ctk.CTkFont(size=10), text_color=("#28a745", "#20c997")).pack(anchor="w", pady=(2, 0))
-                
-                if app['admin_notes']:
-                    ctk.CTkLabel(info_frame, text=f"Notes: {app['admin_notes']}", font=ctk.CTkFont(size=10), 
-                                text_color=("gray60", "gray40")).pack(anchor="w", pady=(2, 0))
-                    
         except Exception as e:
             messagebox.showerror("Error", f"Error refreshing loan history: {str(e)}")
 
-    def get_pending_loans(self):
-        query = """
+    def _build_history_row(self, app):
+        app_frame = ctk.CTkFrame(self.loan_history_frame)
+        app_frame.pack(fill="x", padx=10, pady=5)
+        
+        status_data = {
+            'approved': (("#28a745", "#20c997"), "✅"),
+            'rejected': (("#dc3545", "#e74c3c"), "❌"),
+            'pending': (("#ffc107", "#f39c12"), "⏳")
+        }
+        status_color, status_icon = status_data.get(app['status'], status_data['pending'])
+        
+        info_frame = ctk.CTkFrame(app_frame, fg_color="transparent")
+        info_frame.pack(fill="both", expand=True, padx=15, pady=12)
+        
+        row1_frame = ctk.CTkFrame(info_frame, fg_color="transparent")
+        row1_frame.pack(fill="x", anchor="w")
+        
+        ctk.CTkLabel(row1_frame, text=f"{status_icon} {app['applicant_name']} - ₱{app['amount']:,.2f} - {app['status'].upper()}", 
+                    font=ctk.CTkFont(size=13, weight="bold"), text_color=status_color).pack(side="left")
+        
+        ctk.CTkLabel(row1_frame, text=f"Applied: {app['applied_at']}", font=ctk.CTkFont(size=11), 
+                    text_color=("gray60", "gray40")).pack(side="right")
+        
+        ctk.CTkLabel(info_frame, text=f"Account: {app['account_number']} | Purpose: {app['purpose']} | Income: ₱{app['monthly_income']:,.2f}", 
+                    font=ctk.CTkFont(size=11), text_color=("gray70", "gray50")).pack(anchor="w", pady=(3, 0))
+        
+        if app['status'] == 'approved' and app['processed_at']:
+            ctk.CTkLabel(info_frame, text=f"Approved: {app['processed_at']} | Rate: {app['interest_rate']}% | Term: {app['term_months']} months | Payment: ₱{app['monthly_payment']:,.2f}", 
+                        font=ctk.CTkFont(size=10), text_color=("#28a745", "#20c997")).pack(anchor="w", pady=(2, 0))
+        
+        if app['admin_notes']:
+            ctk.CTkLabel(info_frame, text=f"Notes: {app['admin_notes']}", font=ctk.CTkFont(size=10), 
+                        text_color=("gray60", "gray40")).pack(anchor="w", pady=(2, 0))
+        return app_frame
+
+    def get_pending_loans(self, account_numbers=None):
+        scope, params = self.admin_service.account_scope('la.account_number', account_numbers)
+        query = f"""
             SELECT la.id, la.account_number, la.amount, la.purpose, la.monthly_income, 
                 la.employment_status, la.applied_at, a.name as applicant_name
             FROM loan_applications la
             JOIN accounts a ON la.account_number = a.account_number
-            WHERE la.status = 'pending'
+            WHERE la.status = 'pending'{scope}
             ORDER BY la.applied_at ASC
         """
-        return self.admin_service.db.fetch_all(query)
+        return self.admin_service.scan(query, params, account_numbers, 'applied_at')
 
-    def get_active_loans(self):
-        query = """
+    def get_active_loans(self, account_numbers=None):
+        scope, params = self.admin_service.account_scope('l.account_number', account_numbers)
+        query = f"""
             SELECT l.id, l.account_number, l.principal_amount, l.interest_rate, 
                 l.term_months, l.monthly_payment, l.remaining_balance, 
                 l.next_payment_date, l.disbursed_at, a.name as borrower_name
             FROM loans l
             JOIN accounts a ON l.account_number = a.account_number
-            WHERE l.status = 'active'
+            WHERE l.status = 'active'{scope}
             ORDER BY l.next_payment_date ASC
         """
-        return self.admin_service.db.fetch_all(query)
+        return self.admin_service.scan(query, params, account_numbers, 'next_payment_date')
 
-    def get_loan_application_history(self):
-        query = """
+    def get_loan_application_history(self, account_numbers=None):
+        scope, params = self.admin_service.account_scope('la.account_number', account_numbers)
+        query = f"""
             SELECT la.id, la.account_number, la.amount, la.purpose, la.monthly_income,
                 la.employment_status, la.status, la.interest_rate, la.term_months,
                 la.monthly_payment, la.admin_notes, la.applied_at, la.processed_at,
                 a.name as applicant_name
             FROM loan_applications la
             JOIN accounts a ON la.account_number = a.account_number
+            WHERE 1 = 1{scope}
             ORDER BY la.applied_at DESC
         """
-        return self.admin_service.db.fetch_all(query)
+        return self.admin_service.scan(query, params, account_numbers, 'applied_at', descending=True)
 
     def show_approve_loan_dialog(self, loan_id, loan_data):
+        # loan_id None approves every pending application with the same terms
+        if loan_id is None:
+            pending_loans = self.get_pending_loans()
+            if not pending_loans:
+                messagebox.showinfo("Info", "No pending loan applications to approve.")
+                return
+            summary = f"Applications: {len(pending_loans)}\nTotal Amount: ₱{sum(float(loan['amount']) for loan in pending_loans):,.2f}"
+        else:
+            summary = f"Applicant: {loan_data['applicant_name']}\nAmount: ₱{loan_data['amount']:,.2f}\nPurpose: {loan_data['purpose']}"
+        
         dialog = ctk.CTkToplevel(self.parent)
         dialog.title("Approve Loan Application")
         dialog.geometry("400x500")
@@ -724,7 +803,7 @@ class AdminDashboard:
         main_frame.pack(fill="both", expand=True, padx=20, pady=20)
         
         ctk.CTkLabel(main_frame, text="Approve Loan Application", font=ctk.CTkFont(size=18, weight="bold")).pack(pady=(10, 20))
-        ctk.CTkLabel(main_frame, text=f"Applicant: {loan_data['applicant_name']}\nAmount: ₱{loan_data['amount']:,.2f}\nPurpose: {loan_data['purpose']}", font=ctk.CTkFont(size=12), justify="left").pack(pady=(0, 20))
+        ctk.CTkLabel(main_frame, text=summary, font=ctk.CTkFont(size=12), justify="left").pack(pady=(0, 20))
         
         ctk.CTkLabel(main_frame, text="Interest Rate (% annually):", font=ctk.CTkFont(size=12)).pack(anchor="w", padx=20)
         rate_entry = ctk.CTkEntry(main_frame, placeholder_text="e.g., 15.0")
@@ -748,9 +827,12 @@ class AdminDashboard:
                 interest_rate = float(rate_entry.get())
                 term_months = int(term_entry.get())
                 admin_notes = notes_entry.get("1.0", "end-1c").strip()
-                if self.approve_loan_application(loan_id, interest_rate, term_months, admin_notes):
+                if loan_id is None:
+                    approved = self.approve_all_pending_loans(interest_rate, term_months, admin_notes)
+                    dialog.destroy()
+                    messagebox.showinfo("Success", f"Approved {approved} loan application(s).")
+                elif self.approve_loan_application(loan_id, loan_data['account_number'], interest_rate, term_months, admin_notes):
                     dialog.destroy()
-                    self.refresh_loan_data()
                     messagebox.showinfo("Success", "Loan approved successfully!")
                 else:
                     messagebox.showerror("Error", "Failed to approve loan.")
@@ -762,40 +844,31 @@ class AdminDashboard:
         ctk.CTkButton(button_frame, text="Cancel", font=ctk.CTkFont(size=12), height=35, width=100, fg_color=("gray60", "gray40"), command=dialog.destroy).pack(side="left", padx=(0, 10))
         ctk.CTkButton(button_frame, text="Approve Loan", font=ctk.CTkFont(size=12, weight="bold"), height=35, width=120, fg_color=("#28a745", "#20c997"), hover_color=("#218838", "#1dd1a1"), command=approve_loan).pack(side="right")
 
-    def approve_loan_application(self, loan_id, interest_rate, term_months, admin_notes):
+    def approve_loan_application(self, loan_id, account_number, interest_rate, term_months, admin_notes):
         try:
-            self.admin_service.db.begin_transaction()
-            loan_data = self.admin_service.db.fetch_one("SELECT amount, account_number FROM loan_applications WHERE id = %s", (loan_id,))
-            if not loan_data:
-                raise Exception("Loan application not found")
-            
-            principal = float(loan_data['amount'])
-            monthly_rate = interest_rate / 100 / 12
-            monthly_payment = principal * (monthly_rate * (1 + monthly_rate)**term_months) / ((1 + monthly_rate)**term_months - 1) if monthly_rate > 0 else principal / term_months
-            
-            self.admin_service.db.execute_query("UPDATE loan_applications SET status = 'approved', interest_rate = %s, term_months = %s, monthly_payment = %s, admin_notes = %s, processed_at = NOW() WHERE id = %s", (interest_rate, term_months, monthly_payment, admin_notes, loan_id))
-            
-            import datetime
-            next_payment_date = datetime.date.today() + datetime.timedelta(days=30)
-            self.admin_service.db.execute_query("INSERT INTO loans (application_id, account_number, principal_amount, interest_rate, term_months, monthly_payment, remaining_balance, next_payment_date) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)", (loan_id, loan_data['account_number'], principal, interest_rate, term_months, monthly_payment, principal, next_payment_date))
-            
-            self.admin_service.db.execute_query("UPDATE accounts SET balance = balance + %s WHERE account_number = %s", (principal, loan_data['account_number']))
-            self.admin_service.db.execute_query("INSERT INTO transactions (account_number, type, amount) VALUES (%s, 'loan_disbursement', %s)", (loan_data['account_number'], principal))
-            
-            self.admin_service.db.commit_transaction()
-            return True
+            return self.loan_service.approve_application(loan_id, account_number, interest_rate, term_months, admin_notes)
         except Exception as e:
-            self.admin_service.db.rollback_transaction()
             print(f"Error approving loan: {str(e)}")
             return False
 
-    def decline_loan_application(self, loan_id):
+    def approve_all_pending_loans(self, interest_rate, term_months, admin_notes):
+        try:
+            approved = self.loan_service.approve_applications([
+                {'application_id': loan['id'], 'account_number': loan['account_number'], 'interest_rate': interest_rate,
+                 'term_months': term_months, 'admin_notes': admin_notes}
+                for loan in self.get_pending_loans()
+            ])
+            return len(approved)
+        except Exception as e:
+            print(f"Error approving loans: {str(e)}")
+            return 0
+
+    def decline_loan_application(self, loan_id, account_number):
         reason = ctk.CTkInputDialog(text="Enter reason for declining loan application:", title="Decline Loan Application").get_input()
         if reason:
             try:
-                if self.admin_service.db.execute_query("UPDATE loan_applications SET status = 'rejected', admin_notes = %s, processed_at = NOW() WHERE id = %s", (reason, loan_id)):
+                if self.loan_service.decline_application(loan_id, account_number, reason):
                     messagebox.showinfo("Success", "Loan application declined.")
-                    self.refresh_loan_data()
                 else:
                     messagebox.showerror("Error", "Failed to decline loan application.")
             except Exception as e:
@@ -818,6 +891,8 @@ class AdminDashboard:
         
         self.users_list_frame = ctk.CTkScrollableFrame(left_frame)
         self.users_list_frame.pack(fill="both", expand=True, padx=10, pady=(5, 10))
+        self.transaction_user_rows = KeyedRows(self.users_list_frame, self._build_transaction_user_row,
+                                               key=lambda user: user['account_number'], newest_first=True)
         
         # Right section - Transaction details
         right_frame = ctk.CTkFrame(main_container)
@@ -833,6 +908,7 @@ class AdminDashboard:
         try:
             for widget in self.users_list_frame.winfo_children():
                 widget.destroy()
+            self.transaction_user_rows.reset()
             
             all_users = self.admin_service.get_all_users()
             approved_users = [user for user in all_users if user['is_approved']]
@@ -843,27 +919,32 @@ class AdminDashboard:
                 return
             
             for user in approved_users:
-                user_frame = ctk.CTkFrame(self.users_list_frame)
-                user_frame.pack(fill="x", padx=5, pady=3)
-                
-                tx_summary = self.admin_service.get_user_transaction_summary(user['account_number'])
-                
-                user_button = ctk.CTkButton(
-                    user_frame,
-                    text=f"👤 {user['name']}\nAccount: {user['account_number']}\nTransactions: {tx_summary['total']}",
-                    font=ctk.CTkFont(size=11),
-                    height=60,
-                    fg_color=("gray70", "gray30"),
-                    hover_color=("#007bff", "#0066cc"),
-                    command=lambda acc=user['account_number'], name=user['name']: self.show_user_transactions(acc, name)
-                )
-                user_button.pack(fill="x", padx=10, pady=8)
+                self.transaction_user_rows.add(user)
                 
         except Exception as e:
             import tkinter.messagebox as messagebox
             messagebox.showerror("Error", f"Error refreshing user transactions: {str(e)}")
 
+    def _build_transaction_user_row(self, user):
+        user_frame = ctk.CTkFrame(self.users_list_frame)
+        user_frame.pack(fill="x", padx=5, pady=3)
+        
+        tx_summary = self.admin_service.get_user_transaction_summary(user['account_number'])
+        
+        user_button = ctk.CTkButton(
+            user_frame,
+            text=f"👤 {user['name']}\nAccount: {user['account_number']}\nTransactions: {tx_summary['total']}",
+            font=ctk.CTkFont(size=11),
+            height=60,
+            fg_color=("gray70", "gray30"),
+            hover_color=("#007bff", "#0066cc"),
+            command=lambda acc=user['account_number'], name=user['name']: self.show_user_transactions(acc, name)
+        )
+        user_button.pack(fill="x", padx=10, pady=8)
+        return user_frame
+
     def show_empty_transaction_state(self):
+        self.shown_transactions = None
         for widget in self.transaction_details_frame.winfo_children():
             widget.destroy()
         
@@ -875,6 +956,7 @@ class AdminDashboard:
         ).pack(expand=True)
 
     def show_user_transactions(self, account_number: str, user_name: str):
+        self.shown_transactions = (account_number, user_name)
         try:
             # Clear the transaction details frame
             for widget in self.transaction_details_frame.winfo_children():
@@ -994,6 +1076,157 @@ class AdminDashboard:
                 text_color=("#dc3545", "#e74c3c")
             ).pack(expand=True)
 
+    def on_tab_changed(self):
+        # Analytics may have history to roll up, so it loads when first opened
+        if self.tabview.get() == "📈 Analytics" and not self.analytics_loaded:
+            self.refresh_analytics()
+
+    def setup_analytics_tab(self):
+        tab = self.tabview.tab("📈 Analytics")
+        header_frame = self.create_tab_header(tab, "📈 Ledger Volume by Type", self.refresh_analytics)
+        self.analytics_view = ctk.CTkSegmentedButton(header_frame, values=list(ANALYTICS_VIEWS),
+                                                     command=lambda _: self.refresh_analytics())
+        self.analytics_view.set("Daily")
+        self.analytics_view.pack(side="right", padx=(0, 5), pady=10)
+        
+        self.percentiles_label = ctk.CTkLabel(tab, text="", font=ctk.CTkFont(size=11, family="Courier"),
+                                              justify="left", text_color=("#495057", "#6c757d"))
+        self.percentiles_label.pack(fill="x", padx=25, pady=(5, 0), anchor="w")
+        
+        self.analytics_frame = ctk.CTkScrollableFrame(tab)
+        self.analytics_frame.pack(fill="both", expand=True, padx=10, pady=(5, 10))
+
+    def refresh_analytics(self):
+        try:
+            for widget in self.analytics_frame.winfo_children():
+                widget.destroy()
+            self.analytics_loaded = True
+            
+            granularity, buckets, label_format = ANALYTICS_VIEWS[self.analytics_view.get()]
+            start, end = self.analytics_service.recent_range(granularity, buckets)
+            series = self.analytics_service.get_series(granularity, start, end)
+            percentiles = self.analytics_service.get_size_percentiles(start, end)
+            
+            def format_percentiles(values):
+                return "  ".join(f"p{p}: " + (f"₱{value:,.2f}" if value is not None else "-") for p, value in values.items())
+            self.percentiles_label.configure(text="\n".join(
+                f"{name:<18} {format_percentiles(percentiles[key])}"
+                for name, key in [("All transactions", 'all'), ("Deposit", 'deposit'), ("Withdrawal", 'withdrawal'),
+                                  ("Transfer", 'transfer_out'), ("Loan payment", 'loan_payment')]))
+            
+            header_frame = ctk.CTkFrame(self.analytics_frame)
+            header_frame.pack(fill="x", padx=10, pady=(10, 5))
+            show_closing = granularity == 'day'
+            header_text = (f"{'Period':<17} {'Count':>7} {'Deposits':>15} {'Withdrawals':>15} "
+                           f"{'Transfers':>15} {'Loans Out':>15} {'Loan Payments':>15}")
+            if show_closing:
+                header_text += f" {'Closing Balance':>18}"
+            ctk.CTkLabel(header_frame, text=header_text, font=ctk.CTkFont(size=11, weight="bold", family="Courier"),
+                        text_color=("#495057", "#6c757d")).pack(pady=8, padx=15, anchor="w")
+            
+            for entry in reversed(series):
+                totals = entry['totals']
+                row_text = (f"{entry['bucket'].strftime(label_format):<17} {sum(entry['counts'].values()):>7} "
+                            f"₱{totals['deposit']:>14,.2f} ₱{totals['withdrawal']:>14,.2f} "
+                            f"₱{totals['transfer_out']:>14,.2f} ₱{totals['loan_disbursement']:>14,.2f} "
+                            f"₱{totals['loan_payment']:>14,.2f}")
+                if show_closing:
+                    closing = entry.get('closing_balance')
+                    row_text += f" ₱{closing:>17,.2f}" if closing is not None else f" {'-':>18}"
+                row_frame = ctk.CTkFrame(self.analytics_frame)
+                row_frame.pack(fill="x", padx=10, pady=1)
+                ctk.CTkLabel(row_frame, text=row_text, font=ctk.CTkFont(size=10, family="Courier")).pack(pady=4, padx=15, anchor="w")
+                
+        except Exception as e:
+            messagebox.showerror("Error", f"Error loading analytics: {str(e)}")
+
+    def setup_risk_tab(self):
+        tab = self.tabview.tab("🚨 Risk")
+        self.create_tab_header(tab, "🚨 Velocity Checks", self.refresh_risk)
+        self.risk_frame = ctk.CTkScrollableFrame(tab)
+        self.risk_frame.pack(fill="both", expand=True, padx=10, pady=(5, 10))
+
+    def refresh_risk(self):
+        for widget in self.risk_frame.winfo_children():
+            widget.destroy()
+        
+        if self.velocity is None:
+            ctk.CTkLabel(self.risk_frame, text="Velocity checks are disabled (VELOCITY_ENABLED=0)",
+                        font=ctk.CTkFont(size=14), text_color=("gray60", "gray40")).pack(pady=50)
+            return
+        
+        def section(title, header_text, lines):
+            ctk.CTkLabel(self.risk_frame, text=title, font=ctk.CTkFont(size=14, weight="bold")).pack(
+                anchor="w", padx=15, pady=(15, 5))
+            header_frame = ctk.CTkFrame(self.risk_frame)
+            header_frame.pack(fill="x", padx=10, pady=(0, 5))
+            ctk.CTkLabel(header_frame, text=header_text, font=ctk.CTkFont(size=11, weight="bold", family="Courier"),
+                        text_color=("#495057", "#6c757d")).pack(pady=8, padx=15, anchor="w")
+            if not lines:
+                ctk.CTkLabel(self.risk_frame, text="None", font=ctk.CTkFont(size=11),
+                            text_color=("gray60", "gray40")).pack(anchor="w", padx=25, pady=4)
+            for text, color in lines:
+                row_frame = ctk.CTkFrame(self.risk_frame)
+                row_frame.pack(fill="x", padx=10, pady=1)
+                ctk.CTkLabel(row_frame, text=text, font=ctk.CTkFont(size=10, family="Courier"),
+                            text_color=color).pack(pady=4, padx=15, anchor="w")
+        
+        alert_colors = {'blocked': ("#dc3545", "#e74c3c"), 'flagged': ("#fd7e14", "#f39c12")}
+        section("Recent Alerts", f"{'Time':<20} {'Account':<11} {'Operation':<11} {'Amount':>15} {'Score':>6}  Reasons",
+                [(f"{datetime.datetime.fromtimestamp(alert['at']).strftime('%Y-%m-%d %H:%M:%S'):<20} "
+                  f"{alert['account_number']:<11} {alert['operation']:<11} ₱{alert['amount']:>14,.2f} "
+                  f"{alert['score']:>6}  {alert['outcome'].upper()}: {'; '.join(alert['reasons'])}",
+                  alert_colors[alert['outcome']])
+                 for alert in reversed(self.velocity.alerts)])
+        section("Highest Current Scores",
+                f"{'Account':<11} {'Score':>6} {'Withdrawals':>12} {'Withdrawn':>15} {'Transfers':>10} "
+                f"{'Transferred':>15} {'New Recipients':>15}",
+                [(f"{entry['account_number']:<11} {entry['score']:>6} {entry['withdrawals']:>12} "
+                  f"₱{entry['withdrawn']:>14,.2f} {entry['transfers']:>10} ₱{entry['transferred']:>14,.2f} "
+                  f"{entry['new_recipients']:>15}", None)
+                 for entry in self.velocity.scores(20)])
+
+    def apply_changes(self, events):
+        """Patch the rows of the accounts named by a batch of committed change events"""
+        if any(event['type'] == 'velocity_alert' for event in events):
+            self.refresh_risk()
+            events = [event for event in events if event['type'] != 'velocity_alert']
+            if not events:
+                return
+        accounts = {event['account_number'] for event in events}
+        account_events = {event['account_number'] for event in events if event['type'] == 'account_changed'}
+        declined = {event['account_number'] for event in events if event.get('declined')}
+        loan_accounts = {event['account_number'] for event in events if event['type'] in LOAN_EVENTS}
+
+        users = self.admin_service.get_all_users(list(accounts))
+        self._patch(self.user_rows, accounts, users, self.refresh_all_users)
+        self._patch(self.transaction_user_rows, accounts, [user for user in users if user['is_approved']],
+                    self.refresh_user_transactions)
+        if account_events:
+            self._patch(self.pending_rows, account_events,
+                        self.admin_service.get_pending_accounts(list(account_events)), self.refresh_pending_accounts)
+        if declined:
+            self._patch(self.declined_rows, declined,
+                        self.admin_service.get_declined_accounts(list(declined)), self.refresh_declined_accounts)
+        if loan_accounts:
+            scope = list(loan_accounts)
+            self._patch(self.pending_loan_rows, loan_accounts, self.get_pending_loans(scope), self.refresh_pending_loans)
+            self._patch(self.active_loan_rows, loan_accounts, self.get_active_loans(scope), self.refresh_active_loans)
+            self._patch(self.history_rows, loan_accounts, self.get_loan_application_history(scope),
+                        self.refresh_loan_history)
+
+        if self.shown_transactions and self.shown_transactions[0] in accounts:
+            if self.shown_transactions[0] in {user['account_number'] for user in users}:
+                self.show_user_transactions(*self.shown_transactions)
+            else:
+                self.show_empty_transaction_state()
+
+    @staticmethod
+    def _patch(rows, accounts, records, rebuild):
+        if not rows.patch(accounts, records):
+            rebuild()
+
     def destroy(self):
+        self.live_updates.close()
         if hasattr(self, 'main_frame'):
             self.main_frame.destroy()
\ No newline at end of file
@@ -2,6 +2,8 @@ import customtkinter as ctk
 from typing import Dict, Callable, Any
 import tkinter.messagebox as messagebox
 from datetime import datetime
+from ..utils.live_updates import LiveUpdates
+from transactions.transfer_saga import TransferPendingError
 
 class UserDashboard:
     def __init__(self, parent, callbacks: Dict[str, Callable], user_data: Dict[str, Any], services: Dict):
@@ -10,6 +12,7 @@ class UserDashboard:
         self.user_data = user_data
         self.services = services
         self.setup_ui()
+        self.live_updates = LiveUpdates(self.main_frame, self.apply_changes)
     
     def setup_ui(self):
         """Setup the user dashboard UI"""
@@ -462,6 +465,15 @@ class UserDashboard:
             self.recipient_entry.delete(0, 'end')
             self.transfer_entry.delete(0, 'end')
             
+        except TransferPendingError:
+            # Debited already; the recipient is credited (or the amount returned) shortly
+            self.user_data['balance'] -= amount
+            self.update_balance_display()
+            messagebox.showinfo("Transfer Pending",
+                                f"Your transfer of ₱{amount:.2f} to {recipient} is being processed "
+                                "and will complete shortly.")
+            self.recipient_entry.delete(0, 'end')
+            self.transfer_entry.delete(0, 'end')
         except ValueError:
             messagebox.showerror("Input Error", "Please enter a valid amount.")
         except Exception as e:
@@ -569,6 +581,14 @@ class UserDashboard:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to refresh balance: {str(e)}")
     
+    def apply_changes(self, events):
+        """Re-read the balance once if any committed change touched this account"""
+        if any(event['account_number'] == self.user_data['account_number'] for event in events):
+            user = self.services['user_service'].get_user_by_account(self.user_data['account_number'])
+            if user:
+                self.user_data['balance'] = user['balance']
+                self.update_balance_display()
+    
     def update_balance_display(self):
         """Update balance display in UI"""
         self.balance_label.configure(text=f"💰 Balance: ₱{self.user_data['balance']:.2f}")
@@ -1327,5 +1347,6 @@ class UserDashboard:
 
     def destroy(self):
         """Clean up the window"""
+        self.live_updates.close()
         if hasattr(self, 'main_frame'):
             self.main_frame.destroy()
\ No newline at end of file
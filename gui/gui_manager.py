@@ -85,7 +85,10 @@ class GUIManager:
             self.root,
             self._get_callbacks(),
             admin_data,
-            self.banking_app.admin_service
+            self.banking_app.admin_service,
+            self.banking_app.loan_service,
+            self.banking_app.analytics_service,
+            self.banking_app.velocity
         )
     
     def logout(self):
@@ -2,11 +2,49 @@ from typing import Optional, Dict, Any, List
 from decimal import Decimal
 from datetime import datetime, timedelta
 from db.database import Database
+from db.retry import RetryPolicy
+from db.idempotency import IdempotencyStore
+from db.records import record_type, optional_float
+from db.shard_router import route_by
+from db.accounts import balance_assignment, BalanceAdjustmentLog
+from db.columns import CREDIT_TYPES
+from archive.archive_service import ArchiveService
+from transactions.hot_account_service import HotAccountService
+from events.outbox_service import OutboxService
+from monitoring.metrics import track_operation
+from monitoring.tracing import trace_methods
 
+LoanApplicationRecord = record_type(
+    'LoanApplicationRecord',
+    ('id', 'amount', 'purpose', 'monthly_income', 'employment_status', 'status', 'interest_rate',
+     'term_months', 'monthly_payment', 'admin_notes', 'applied_at', 'processed_at'),
+    amount=float, monthly_income=float, interest_rate=optional_float, monthly_payment=optional_float)
+LoanRecord = record_type(
+    'LoanRecord',
+    ('id', 'application_id', 'principal_amount', 'interest_rate', 'term_months', 'monthly_payment',
+     'remaining_balance', 'next_payment_date', 'status', 'disbursed_at', 'purpose'),
+    principal_amount=float, interest_rate=float, monthly_payment=float, remaining_balance=float)
+LoanPaymentRecord = record_type(
+    'LoanPaymentRecord',
+    ('id', 'loan_id', 'payment_amount', 'principal_portion', 'interest_portion', 'remaining_balance',
+     'payment_date', 'payment_type'),
+    payment_amount=float, principal_portion=float, interest_portion=float, remaining_balance=float)
+
+@trace_methods
 class LoanService:
-    def __init__(self, database: Database):
+    # Applications approved per set-based statement group in approve_applications
+    APPROVAL_BATCH_SIZE = 500
+
+    def __init__(self, database: Database, hot_accounts: HotAccountService = None):
         self.db = database
+        self.retry = RetryPolicy()
+        self.hot_accounts = hot_accounts or HotAccountService(database)
+        self.idempotency = IdempotencyStore(database)
+        self.outbox = OutboxService(database)
+        self.archive = ArchiveService(database)
+        self.adjustments = BalanceAdjustmentLog(database)
 
+    @route_by()
     def apply_for_loan(self, account_number: str, amount: float, purpose: str, 
                       monthly_income: float, employment_status: str) -> int:
         """Submit a new loan application"""
@@ -16,14 +54,156 @@ class LoanService:
             VALUES (%s, %s, %s, %s, %s)
         """
         
-        if not self.db.execute_query(query, (account_number, amount, purpose, 
-                                           monthly_income, employment_status)):
-            raise Exception("Failed to submit loan application")
+        with self.db.unit_of_work():
+            if not self.db.execute_query(query, (account_number, amount, purpose, 
+                                               monthly_income, employment_status)):
+                raise Exception("Failed to submit loan application")
+            
+            # Get the application ID
+            result = self.db.fetch_one("SELECT LAST_INSERT_ID() as id")
+            application_id = result['id'] if result else None
+            self.outbox.record('loan_application_changed', account_number, 0, application_id=application_id)
+        return application_id
+
+    def approve_application(self, application_id: int, account_number: str, interest_rate: float,
+                            term_months: int, admin_notes: str = '') -> bool:
+        """Approve a pending loan application (of account_number) and disburse the principal"""
+        approved = self.approve_applications([{
+            'application_id': application_id,
+            'account_number': account_number,
+            'interest_rate': interest_rate,
+            'term_months': term_months,
+            'admin_notes': admin_notes
+        }])
+        if application_id not in approved:
+            raise Exception("Loan application not found or already processed")
+        return True
+
+    @route_by()
+    def decline_application(self, application_id: int, account_number: str, reason: str) -> bool:
+        """Decline a pending loan application (of account_number) with the admin's reason"""
+        with self.db.unit_of_work():
+            application = self.db.fetch_one("""
+                SELECT account_number FROM loan_applications
+                WHERE id = %s AND account_number = %s AND status = 'pending' FOR UPDATE
+            """, (application_id, account_number))
+            if not application:
+                return False
+            if not self.db.execute_query("""
+                UPDATE loan_applications SET status = 'rejected', admin_notes = %s, processed_at = NOW()
+                WHERE id = %s
+            """, (reason, application_id)):
+                raise Exception("Failed to decline loan application")
+            self.outbox.record('loan_application_changed', application['account_number'], 0,
+                               application_id=application_id)
+        return True
+
+    def approve_applications(self, approvals: List[Dict[str, Any]]) -> List[int]:
+        """
+        Approve many pending loan applications in one transaction
+        Each approval has application_id, the applicant's account_number, interest_rate,
+        term_months and optional admin_notes.
+        Statements are set-based, so the round trips do not grow with the number of
+        applications. Returns the ids that were approved; ids that are missing or no
+        longer pending are skipped.
+        """
+        for approval in approvals:
+            if int(approval['term_months']) <= 0 or float(approval['interest_rate']) < 0:
+                raise ValueError("Loan term must be positive and interest rate cannot be negative")
         
-        # Get the application ID
-        result = self.db.fetch_one("SELECT LAST_INSERT_ID() as id")
-        return result['id'] if result else None
+        terms = {int(a['application_id']): a for a in approvals}
+        if not terms:
+            return []
+
+        # Applications live on their applicant's shard; each shard's approvals commit on their own
+        by_shard: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        for application_id, approval in terms.items():
+            by_shard.setdefault(id(self.db.for_account(approval['account_number'])), {})[application_id] = approval
+        approved = []
+        for shard_terms in by_shard.values():
+            with self.db.routed(next(iter(shard_terms.values()))['account_number']):
+                approved.extend(self.retry.call(self._apply_approvals, shard_terms))
+        return approved
 
+    def _apply_approvals(self, terms: Dict[int, Dict[str, Any]]) -> List[int]:
+        """Approve applications in one unit of work (re-run by the retry policy on deadlock)"""
+        approved = []
+        # Sorted ids give concurrent approvals a consistent lock order
+        ids = sorted(terms)
+        with self.db.unit_of_work():
+            for start in range(0, len(ids), self.APPROVAL_BATCH_SIZE):
+                approved.extend(self._approve_batch(ids[start:start + self.APPROVAL_BATCH_SIZE], terms))
+        return approved
+
+    def _approve_batch(self, ids: List[int], terms: Dict[int, Dict[str, Any]]) -> List[int]:
+        """Approve one batch of applications inside the caller's unit of work"""
+        placeholders = ', '.join(['%s'] * len(ids))
+        applications = self.db.fetch_all(f"""
+            SELECT id, account_number, amount
+            FROM loan_applications
+            WHERE id IN ({placeholders}) AND status = 'pending'
+            FOR UPDATE
+        """, tuple(ids))
+        if not applications:
+            return []
+
+        next_payment_date = datetime.now().date() + timedelta(days=30)
+        application_rows = []
+        loan_rows = []
+        disbursements: Dict[str, float] = {}
+        for app in applications:
+            approval = terms[app['id']]
+            principal = float(app['amount'])
+            interest_rate = float(approval['interest_rate'])
+            term_months = int(approval['term_months'])
+            monthly_payment = self.calculate_monthly_payment(principal, interest_rate, term_months)
+
+            application_rows.append((app['id'], interest_rate, term_months, monthly_payment,
+                                     approval.get('admin_notes') or ''))
+            loan_rows.append((app['id'], app['account_number'], principal, interest_rate, term_months,
+                              monthly_payment, principal, next_payment_date))
+            disbursements[app['account_number']] = disbursements.get(app['account_number'], 0.0) + principal
+
+        derived = ' UNION ALL '.join(
+            ['SELECT %s AS id, %s AS interest_rate, %s AS term_months, %s AS monthly_payment, %s AS admin_notes']
+            * len(application_rows))
+        if not self.db.execute_query(f"""
+            UPDATE loan_applications la
+            JOIN ({derived}) d ON la.id = d.id
+            SET la.status = 'approved', la.interest_rate = d.interest_rate, la.term_months = d.term_months,
+                la.monthly_payment = d.monthly_payment, la.admin_notes = d.admin_notes, la.processed_at = NOW()
+        """, tuple(value for row in application_rows for value in row)):
+            raise Exception("Failed to update loan applications")
+
+        if not self.db.execute_many("""
+            INSERT INTO loans (application_id, account_number, principal_amount, interest_rate,
+                term_months, monthly_payment, remaining_balance, next_payment_date)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """, loan_rows):
+            raise Exception("Failed to create loans")
+
+        # One credit per account even when a borrower has several approvals in the batch
+        derived = ' UNION ALL '.join(['SELECT %s AS account_number, %s AS amount'] * len(disbursements))
+        if not self.db.execute_query(f"""
+            UPDATE accounts a
+            JOIN ({derived}) d ON a.account_number = d.account_number
+            SET {balance_assignment('a.balance + d.amount', alias='a.')}
+        """, tuple(value for item in disbursements.items() for value in item)):
+            raise Exception("Failed to disburse loans")
+
+        if not self.db.execute_many("""
+            INSERT INTO transactions (account_number, type, amount)
+            VALUES (%s, 'loan_disbursement', %s)
+        """, [(row[1], row[2]) for row in loan_rows]):
+            raise Exception("Failed to record disbursements")
+        self.outbox.record_many([('loan_disbursement', row[1], row[2], {'application_id': row[0]})
+                                 for row in loan_rows])
+        self.outbox.record_many([('loan_application_changed', app['account_number'], 0, {'application_id': app['id']})
+                                 for app in applications])
+
+        return [app['id'] for app in applications]
+
+    @route_by()
     def get_loan_applications(self, account_number: str) -> List[Dict[str, Any]]:
         """Get all loan applications for an account"""
         query = """
@@ -35,22 +215,9 @@ class LoanService:
             ORDER BY applied_at DESC
         """
         
-        results = self.db.fetch_all(query, (account_number,))
-        return [{
-            'id': row['id'],
-            'amount': float(row['amount']),
-            'purpose': row['purpose'],
-            'monthly_income': float(row['monthly_income']),
-            'employment_status': row['employment_status'],
-            'status': row['status'],
-            'interest_rate': float(row['interest_rate']) if row['interest_rate'] else None,
-            'term_months': row['term_months'],
-            'monthly_payment': float(row['monthly_payment']) if row['monthly_payment'] else None,
-            'admin_notes': row['admin_notes'],
-            'applied_at': row['applied_at'],
-            'processed_at': row['processed_at']
-        } for row in results]
+        return self.db.fetch_records(LoanApplicationRecord, query, (account_number,))
 
+    @route_by()
     def get_active_loans(self, account_number: str) -> List[Dict[str, Any]]:
         """Get all active loans for an account"""
         query = """
@@ -64,77 +231,87 @@ class LoanService:
             ORDER BY l.disbursed_at DESC
         """
         
-        results = self.db.fetch_all(query, (account_number,))
-        return [{
-            'id': row['id'],
-            'application_id': row['application_id'],
-            'principal_amount': float(row['principal_amount']),
-            'interest_rate': float(row['interest_rate']),
-            'term_months': row['term_months'],
-            'monthly_payment': float(row['monthly_payment']),
-            'remaining_balance': float(row['remaining_balance']),
-            'next_payment_date': row['next_payment_date'],
-            'status': row['status'],
-            'disbursed_at': row['disbursed_at'],
-            'purpose': row['purpose']
-        } for row in results]
+        return self.db.fetch_records(LoanRecord, query, (account_number,))
 
+    @track_operation('loan_payment')
+    @route_by()
     def make_loan_payment(self, loan_id: int, account_number: str, 
-                        payment_amount: float, payment_type: str = 'regular') -> bool:
-        """Process a loan payment - FIXED VERSION"""
+                        payment_amount: float, payment_type: str = 'regular',
+                        idempotency_key: str = None) -> bool:
+        """Process a loan payment - FIXED VERSION (a repeated idempotency_key returns the original result)"""
         try:
+            if idempotency_key and not self.idempotency.ensure_schema():
+                raise Exception("Idempotency keys are unavailable")
+            return self.retry.call(self._apply_loan_payment, loan_id, account_number,
+                                  payment_amount, payment_type, idempotency_key)
+        except Exception as e:
+            raise Exception(f"Payment processing failed: {str(e)}")
+
+    def _apply_loan_payment(self, loan_id: int, account_number: str,
+                            payment_amount: float, payment_type: str, idempotency_key: str = None) -> bool:
+        """Apply a loan payment in one unit of work (re-run by the retry policy on deadlock)"""
+        # Locks the loan and account rows so concurrent payments cannot both read the old balances
+        with self.db.unit_of_work():
+            if idempotency_key and self.idempotency.seen(idempotency_key, 'loan_payment', loan_id,
+                                                         account_number, payment_amount, payment_type):
+                return True
+        
             # Get loan details
             loan_query = """
                 SELECT remaining_balance, interest_rate, monthly_payment, next_payment_date
                 FROM loans 
                 WHERE id = %s AND account_number = %s AND status = 'active'
+                FOR UPDATE
             """
             loan = self.db.fetch_one(loan_query, (loan_id, account_number))
-            
+        
             if not loan:
                 raise Exception("Loan not found or not active")
-            
+        
             # Check if account has sufficient balance
-            account_query = "SELECT balance FROM accounts WHERE account_number = %s"
+            account_query = "SELECT balance FROM accounts WHERE account_number = %s FOR UPDATE"
             account = self.db.fetch_one(account_query, (account_number,))
-            
+        
             if not account:
                 raise Exception("Account not found")
-            
+        
             current_balance = float(account['balance'])
+            if current_balance < payment_amount:
+                # A hot account's recent credits may still sit in its balance slots
+                current_balance += self.hot_accounts.fold(account_number)
             if current_balance < payment_amount:
                 raise Exception("Insufficient funds for loan payment")
-            
+        
             remaining_balance = float(loan['remaining_balance'])
             interest_rate = float(loan['interest_rate'])
-            
+        
             # FIXED: Calculate interest portion based on remaining balance
             # Monthly interest rate calculation
             monthly_interest_rate = interest_rate / 100 / 12
             interest_portion = remaining_balance * monthly_interest_rate
-            
+        
             # Principal portion is what's left after interest
             principal_portion = payment_amount - interest_portion
-            
+        
             # Ensure principal portion is not negative (shouldn't happen with proper payments)
             if principal_portion < 0:
                 principal_portion = 0
                 interest_portion = payment_amount
-            
+        
             # Calculate new remaining balance
             new_loan_balance = max(0, remaining_balance - principal_portion)
-            
+        
             # CRITICAL FIX: Update account balance FIRST, then record everything else
             new_account_balance = current_balance - payment_amount
-            update_account_query = """
+            update_account_query = f"""
                 UPDATE accounts 
-                SET balance = %s 
+                SET {balance_assignment('%s')} 
                 WHERE account_number = %s
             """
-            
+        
             if not self.db.execute_query(update_account_query, (new_account_balance, account_number)):
                 raise Exception("Failed to update account balance")
-            
+        
             # Record the payment in loan_payments table
             payment_query = """
                 INSERT INTO loan_payments 
@@ -142,77 +319,67 @@ class LoanService:
                 interest_portion, remaining_balance, payment_type)
                 VALUES (%s, %s, %s, %s, %s, %s, %s)
             """
-            
+        
             if not self.db.execute_query(payment_query, (
                 loan_id, account_number, payment_amount, principal_portion,
                 interest_portion, new_loan_balance, payment_type
             )):
                 raise Exception("Failed to record payment")
-            
+        
             # Update loan table with new balance and next payment date
             next_payment_date = loan['next_payment_date']
             if isinstance(next_payment_date, str):
                 next_payment_date = datetime.strptime(next_payment_date, '%Y-%m-%d').date()
-            
+        
             new_next_payment = next_payment_date + timedelta(days=30)
             loan_status = 'paid_off' if new_loan_balance == 0 else 'active'
-            
+        
             update_loan_query = """
                 UPDATE loans 
                 SET remaining_balance = %s, next_payment_date = %s, status = %s
                 WHERE id = %s
             """
-            
+        
             if not self.db.execute_query(update_loan_query, (
                 new_loan_balance, new_next_payment, loan_status, loan_id
             )):
                 raise Exception("Failed to update loan")
-            
+        
             # Record transaction
             transaction_query = """
                 INSERT INTO transactions (account_number, type, amount)
                 VALUES (%s, 'loan_payment', %s)
             """
-            
-            self.db.execute_query(transaction_query, (account_number, payment_amount))
-            
-            return True
-            
-        except Exception as e:
-            raise Exception(f"Payment processing failed: {str(e)}")
+        
+            if not self.db.execute_query(transaction_query, (account_number, payment_amount)):
+                raise Exception("Failed to record transaction")
+            self.outbox.record('loan_payment', account_number, payment_amount, loan_id=loan_id,
+                               principal=principal_portion, interest=interest_portion)
+        return True
 
+    @route_by()
     def get_loan_payment_history(self, account_number: str, loan_id: int = None) -> List[Dict[str, Any]]:
         """Get payment history for loans"""
         if loan_id:
             query = """
-                SELECT lp.*, l.principal_amount
+                SELECT lp.id, lp.loan_id, lp.payment_amount, lp.principal_portion, lp.interest_portion,
+                       lp.remaining_balance, lp.payment_date, lp.payment_type
                 FROM loan_payments lp
-                JOIN loans l ON lp.loan_id = l.id
                 WHERE lp.account_number = %s AND lp.loan_id = %s
                 ORDER BY lp.payment_date DESC
             """
             params = (account_number, loan_id)
         else:
             query = """
-                SELECT lp.*, l.principal_amount
+                SELECT lp.id, lp.loan_id, lp.payment_amount, lp.principal_portion, lp.interest_portion,
+                       lp.remaining_balance, lp.payment_date, lp.payment_type
                 FROM loan_payments lp
-                JOIN loans l ON lp.loan_id = l.id
                 WHERE lp.account_number = %s
                 ORDER BY lp.payment_date DESC
             """
             params = (account_number,)
         
-        results = self.db.fetch_all(query, params)
-        return [{
-            'id': row['id'],
-            'loan_id': row['loan_id'],
-            'payment_amount': float(row['payment_amount']),
-            'principal_portion': float(row['principal_portion']),
-            'interest_portion': float(row['interest_portion']),
-            'remaining_balance': float(row['remaining_balance']),
-            'payment_date': row['payment_date'],
-            'payment_type': row['payment_type']
-        } for row in results]
+        return self.db.fetch_records(LoanPaymentRecord, query, params)
 
     def calculate_monthly_payment(self, principal: float, annual_rate: float, months: int) -> float:
         """Calculate monthly payment using loan formula"""
@@ -224,6 +391,7 @@ class LoanService:
                  ((1 + monthly_rate) ** months - 1)
         return round(payment, 2)
 
+    @route_by()
     def validate_account_loan_sync(self, account_number: str) -> Dict[str, Any]:
         """
         Validate that account balance and loan data are properly synchronized
@@ -232,37 +400,13 @@ class LoanService:
         account_query = "SELECT balance FROM accounts WHERE account_number = %s"
         account = self.db.fetch_one(account_query, (account_number,))
         current_account_balance = float(account['balance']) if account else 0
+        current_account_balance += self.hot_accounts.pending_credits(account_number)
         
-        # Get all loan disbursements (money added to account)
-        disbursement_query = """
-            SELECT COALESCE(SUM(amount), 0) as total_disbursed
-            FROM transactions 
-            WHERE account_number = %s AND type = 'loan_disbursement'
-        """
-        disbursement = self.db.fetch_one(disbursement_query, (account_number,))
-        total_disbursed = float(disbursement['total_disbursed']) if disbursement else 0
-        
-        # Get all loan payments made (money deducted from account)
-        payment_query = """
-            SELECT COALESCE(SUM(amount), 0) as total_payments
-            FROM transactions 
-            WHERE account_number = %s AND type = 'loan_payment'
-        """
-        payment = self.db.fetch_one(payment_query, (account_number,))
-        total_payments = float(payment['total_payments']) if payment else 0
-        
-        # Get other transactions to calculate what account balance should be
-        other_transactions_query = """
-            SELECT COALESCE(SUM(CASE 
-                WHEN type IN ('deposit', 'transfer_in', 'loan_disbursement') THEN amount
-                WHEN type IN ('withdrawal', 'transfer_out', 'loan_payment') THEN -amount
-                ELSE 0 
-            END), 0) as net_transactions
-            FROM transactions 
-            WHERE account_number = %s
-        """
-        other_transactions = self.db.fetch_one(other_transactions_query, (account_number,))
-        expected_balance_from_transactions = float(other_transactions['net_transactions']) if other_transactions else 0
+        # Ledger totals by type (archived months included), plus balance edits
+        totals = self._ledger_totals(account_number)
+        total_disbursed = totals.get('loan_disbursement', 0.0)
+        total_payments = totals.get('loan_payment', 0.0)
+        expected_balance_from_transactions = round(self._net(totals) + self._adjustments(account_number), 2)
         
         # Get current loan balances
         loan_balance_query = """
@@ -284,34 +428,50 @@ class LoanService:
             'net_cash_position': current_account_balance - total_loan_balance
         }
 
+    @route_by()
     def repair_account_balance(self, account_number: str) -> bool:
         """
         Repair account balance based on transaction history
         Use this if you suspect the account balance is incorrect
         """
         try:
-            # Calculate correct balance from all transactions
-            transaction_query = """
-                SELECT COALESCE(SUM(CASE 
-                    WHEN type IN ('deposit', 'transfer_in', 'loan_disbursement') THEN amount
-                    WHEN type IN ('withdrawal', 'transfer_out', 'loan_payment') THEN -amount
-                    ELSE 0 
-                END), 0) as correct_balance
-                FROM transactions 
-                WHERE account_number = %s
-            """
-            
-            result = self.db.fetch_one(transaction_query, (account_number,))
-            correct_balance = float(result['correct_balance']) if result else 0
+            # Calculate correct balance from all transactions (archived months included) and balance edits
+            correct_balance = round(self._net(self._ledger_totals(account_number)) +
+                                    self._adjustments(account_number), 2)
             
             # Update account balance
-            update_query = """
+            update_query = f"""
                 UPDATE accounts 
-                SET balance = %s 
+                SET {balance_assignment('%s')} 
                 WHERE account_number = %s
             """
             
             return self.db.execute_query(update_query, (correct_balance, account_number))
             
         except Exception as e:
-            raise Exception(f"Failed to repair account balance: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Failed to repair account balance: {str(e)}")
+
+    def _ledger_totals(self, account_number: str) -> Dict[str, float]:
+        """Sum of the account's transactions by type over the hot and archived tiers"""
+        window, window_params = self.archive.hot_window()
+        rows = self.db.fetch_all(f"""
+            SELECT type, COALESCE(SUM(amount), 0) as total
+            FROM transactions 
+            WHERE account_number = %s{window}
+            GROUP BY type
+        """, (account_number,) + window_params)
+        totals = {row['type']: float(row['total']) for row in rows}
+        for tx in self.archive.get_archived_transactions(account_number):
+            totals[tx['type']] = totals.get(tx['type'], 0.0) + tx['amount']
+        return totals
+
+    @staticmethod
+    def _net(totals: Dict[str, float]) -> float:
+        """Balance effect of per-type totals"""
+        return round(sum(total if name in CREDIT_TYPES else -total for name, total in totals.items()), 2)
+
+    def _adjustments(self, account_number: str) -> float:
+        """Net of the account's absolute balance edits (kept out of the transactions ledger)"""
+        if not self.adjustments.ensure_schema():
+            raise Exception("Could not create the balance adjustment table")
+        return self.adjustments.total(account_number)
@@ -7,11 +7,22 @@ Now uses GUI interface instead of command-line interface
 from auth.auth_service import AuthService
 from users.user_service import UserService
 from transactions.transaction_service import TransactionService
+from transactions.deposit_batcher import DepositBatcher
+from transactions.hot_account_service import HotAccountService
+from transactions.transfer_saga import TransferPendingError
+from events.change_feed import ChangeFeed
 from statements.statement_service import StatementService
 from admin.admin_service import AdminService
 from loans.loan_service import LoanService
-from db.database import Database
+from analytics.analytics_service import AnalyticsService
+from eod.eod_service import EndOfDayService
+from fraud.velocity_engine import VelocityEngine
+from db.shard_router import open_database
+from db.errors import DatabaseUnavailableError
 from gui.gui_manager import GUIManager
+from monitoring.metrics import registry, track_operation
+from monitoring.tracing import traced
+from config.settings import Settings
 from typing import Dict, Any
 import sys
 import logging
@@ -27,24 +38,76 @@ logging.basicConfig(
 )
 
 class BankingApp:
-    def __init__(self):
-        """Initialize the banking application with all services"""
+    def __init__(self, headless: bool = False):
+        """Initialize the banking application with all services (headless skips the GUI, e.g. for load tests)"""
         try:
             # Initialize database and services
-            self.db = Database()
-            self.auth_service = AuthService(self.db)
-            self.user_service = UserService(self.db)
-            self.transaction_service = TransactionService(self.db)
+            self.db = open_database()
+            # One hot account list cache for every service
+            self.hot_accounts = HotAccountService(self.db)
+            self.auth_service = AuthService(self.db, self.hot_accounts)
+            self.user_service = UserService(self.db, self.hot_accounts)
+            self.velocity = VelocityEngine() if Settings.VELOCITY_ENABLED else None
+            # The batcher writes through one connection, so it only runs unsharded
+            self.transaction_service = TransactionService(
+                self.db, DepositBatcher(self.db) if Settings.DEPOSIT_BATCHING and not Settings.DB_SHARDS else None,
+                self.velocity, self.hot_accounts)
             self.statement_service = StatementService(self.db)
-            self.admin_service = AdminService(self.db)
-            self.loan_service = LoanService(self.db)
+            self.admin_service = AdminService(self.db, self.hot_accounts)
+            self.loan_service = LoanService(self.db, self.hot_accounts)
+            self.eod_service = EndOfDayService(self.db)
+            self.analytics_service = AnalyticsService(self.db, self.eod_service)
+            
+            # Live views also patch changes other processes commit (read from the outbox)
+            self.change_feed = ChangeFeed(self.db) if Settings.OUTBOX_ENABLED and not headless else None
             
             # User session management
             self.current_user = None
             self.is_admin = False
             
             # Initialize GUI manager
-            self.gui_manager = GUIManager(self)
+            self.gui_manager = None if headless else GUIManager(self)
+            
+            # Expose metrics on a local port if configured
+            if Settings.METRICS_PORT:
+                registry.start_http_server(Settings.METRICS_PORT)
+                logging.info(f"Metrics available at http://127.0.0.1:{Settings.METRICS_PORT}/metrics")
+            
+            # Money-moving operations write ledger events to the outbox table (tables missing
+            # here are created again on first use)
+            try:
+                if Settings.OUTBOX_ENABLED and not self.transaction_service.outbox.ensure_schema():
+                    logging.warning("Could not create the outbox tables yet; will retry on first use")
+                if not self.transaction_service.limits.ensure_schema():
+                    logging.warning("Could not create the limit counter table yet; will retry on first use")
+            except DatabaseUnavailableError as e:
+                # Start anyway: calls fail fast until the circuit breaker sees the database again
+                logging.warning(f"{str(e)}; starting without it")
+            
+            # Finish cross-shard transfers a previous run left half-done
+            if len(self.db.shards) > 1:
+                try:
+                    outcomes = self.transaction_service.recover_transfers()
+                    logging.info(f"Running on {len(self.db.shards)} shards; transfer sagas recovered: {outcomes}")
+                except Exception as e:
+                    logging.warning(f"Could not recover pending cross-shard transfers: {str(e)}")
+            
+            # Velocity windows start from the recent ledger so a restart does not reset them
+            if self.velocity is not None:
+                try:
+                    replayed = self.velocity.rebuild(self.db)
+                    logging.info(f"Velocity checks rebuilt from {replayed} recent ledger rows")
+                except Exception as e:
+                    logging.warning(f"Could not rebuild velocity windows, starting empty: {str(e)}")
+            
+            # Fold hot account balance slots in the background (load tests run their own)
+            if not headless and Settings.HOT_ACCOUNT_COMPACTION_SECONDS > 0:
+                self.transaction_service.hot_accounts.start_compactor()
+            if self.change_feed is not None:
+                self.change_feed.start()
+            # Keep finishing transfers whose credit step failed while running
+            if not headless and len(self.db.shards) > 1 and Settings.SAGA_RECOVERY_INTERVAL_SECONDS > 0:
+                self.transaction_service.start_recovery()
             
             logging.info("Banking application initialized successfully")
             
@@ -73,9 +136,24 @@ class BankingApp:
             self.current_user = None
             self.is_admin = False
             
+            self.transaction_service.hot_accounts.stop_compactor()
+            self.transaction_service.stop_recovery()
+            if self.change_feed is not None:
+                self.change_feed.stop()
+            if self.transaction_service.deposit_batcher:
+                self.transaction_service.deposit_batcher.stop()
+            # Stop any admin report still running and drop its snapshot connections
+            self.admin_service.reports.cancel()
+            self.admin_service.reports.close()
+            
             # Close database connection if needed
             if hasattr(self.db, 'close'):
                 self.db.close()
+            
+            # Persist final metrics if configured
+            if Settings.METRICS_FILE:
+                registry.write_to_file(Settings.METRICS_FILE)
+            registry.stop_http_server()
                 
             logging.info("Banking application shutdown complete")
             
@@ -109,7 +187,7 @@ class BankingApp:
         if amount <= 0:
             return False, "Amount must be positive"
         
-        if amount > 1000000:  # 1 million limit
+        if amount > Settings.MAX_TRANSACTION_AMOUNT:
             return False, "Amount exceeds maximum transaction limit"
         
         # Check for reasonable decimal places (max 2)
@@ -131,6 +209,8 @@ class BankingApp:
         
         return True, "Valid account number"
 
+    @traced('BankingApp.perform_deposit')
+    @track_operation('deposit', layer='app')
     def perform_deposit(self, account_number: str, amount: float) -> tuple[bool, str]:
         """Perform deposit operation with validation"""
         try:
@@ -154,6 +234,8 @@ class BankingApp:
             logging.error(f"Deposit failed: {account_number} - {str(e)}")
             return False, f"Deposit failed: {str(e)}"
 
+    @traced('BankingApp.perform_withdrawal')
+    @track_operation('withdrawal', layer='app')
     def perform_withdrawal(self, account_number: str, amount: float) -> tuple[bool, str]:
         """Perform withdrawal operation with validation"""
         try:
@@ -162,12 +244,7 @@ class BankingApp:
             if not is_valid:
                 return False, message
             
-            # Check balance
-            current_balance = self.get_user_balance(account_number)
-            if amount > current_balance:
-                return False, "Insufficient balance"
-            
-            # Perform withdrawal
+            # Perform withdrawal (the debit itself refuses to overdraw)
             self.transaction_service.withdraw(account_number, amount)
             
             # Update current user balance if it's the same user
@@ -182,6 +259,8 @@ class BankingApp:
             logging.error(f"Withdrawal failed: {account_number} - {str(e)}")
             return False, f"Withdrawal failed: {str(e)}"
 
+    @traced('BankingApp.perform_transfer')
+    @track_operation('transfer', layer='app')
     def perform_transfer(self, from_account: str, to_account: str, amount: float) -> tuple[bool, str]:
         """Perform transfer operation with validation"""
         try:
@@ -208,12 +287,7 @@ class BankingApp:
             if not recipient.get('is_approved', False):
                 return False, "Recipient account is not approved"
             
-            # Check sender balance
-            current_balance = self.get_user_balance(from_account)
-            if amount > current_balance:
-                return False, "Insufficient balance"
-            
-            # Perform transfer
+            # Perform transfer (the debit itself refuses to overdraw)
             self.transaction_service.transfer(from_account, to_account, amount)
             
             # Update current user balance if it's the sender
@@ -224,6 +298,13 @@ class BankingApp:
             logging.info(f"Transfer successful: {from_account} -> {to_account} - ₱{amount:.2f}")
             return True, f"Successfully transferred ₱{amount:.2f} to {to_account}"
             
+        except TransferPendingError as e:
+            if (self.current_user and 
+                self.current_user.get('account_number') == from_account):
+                self.current_user['balance'] -= amount
+            logging.warning(f"Transfer pending: {from_account} -> {to_account} - ₱{amount:.2f} (saga {e.saga_id})")
+            return True, f"Transfer of ₱{amount:.2f} to {to_account} is pending and will complete shortly"
+            
         except Exception as e:
             logging.error(f"Transfer failed: {from_account} -> {to_account} - {str(e)}")
             return False, f"Transfer failed: {str(e)}"
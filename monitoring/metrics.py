@@ -0,0 +1,408 @@
+# banking_app/monitoring/metrics.py
+"""
+Metrics registry
+Counters, gauges and histograms with Prometheus text exposition.
+Recording goes to per-thread cells so hot paths never wait on a lock;
+cells are only summed when metrics are collected.
+"""
+
+import os
+import time
+import threading
+import functools
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple, Optional, Callable, Any
+
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Known failure messages mapped to low-cardinality reason labels
+FAILURE_REASONS = (
+    ('velocity checks', 'velocity_blocked'),
+    ('insufficient', 'insufficient_balance'),
+    ('recipient account not found', 'recipient_not_found'),
+    ('not approved', 'account_not_approved'),
+    ('account not found', 'account_not_found'),
+    ('same account', 'same_account'),
+    ('exceeds', 'limit_exceeded'),
+    ('must be positive', 'invalid_amount'),
+    ('decimal places', 'invalid_amount'),
+    ('invalid recipient', 'invalid_account_number'),
+    ('invalid account number or password', 'invalid_credentials'),
+    ('pending approval', 'pending_approval'),
+    ('declined', 'account_declined'),
+    ('required', 'missing_input'),
+    ('loan not found', 'loan_not_found'),
+    ('deadlock', 'deadlock'),
+    ('lock wait', 'lock_timeout'),
+)
+
+
+def failure_reason(message: Any) -> str:
+    """Map a failure message or exception to a low-cardinality reason label"""
+    text = str(message).lower()
+    for needle, reason in FAILURE_REASONS:
+        if needle in text:
+            return reason
+    return 'error'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _ShardedCells:
+    """Per-thread accumulator cells; each thread only ever writes its own cell"""
+
+    def __init__(self, width: int):
+        self._width = width
+        self._local = threading.local()
+        self._cells: List[List[float]] = []
+        self._lock = threading.Lock()
+
+    def cell(self) -> List[float]:
+        cell = getattr(self._local, 'cell', None)
+        if cell is None:
+            cell = [0.0] * self._width
+            with self._lock:
+                self._cells.append(cell)
+            self._local.cell = cell
+        return cell
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            cells = list(self._cells)
+        totals = [0.0] * self._width
+        for cell in cells:
+            for i, value in enumerate(cell):
+                totals[i] += value
+        return totals
+
+    def reset(self):
+        with self._lock:
+            for cell in self._cells:
+                for i in range(self._width):
+                    cell[i] = 0.0
+
+
+class _Metric:
+    metric_type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values, **kwargs):
+        """Get the child metric for a label combination"""
+        if kwargs:
+            values = tuple(str(kwargs[name]) for name in self.labelnames)
+        else:
+            values = tuple(str(value) for value in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._new_child()
+        return child
+
+    def _default(self):
+        return self.labels() if not self.labelnames else None
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}",
+                 f"# TYPE {self.name} {self.metric_type}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, values))
+        return lines
+
+    def reset(self):
+        for child in list(self._children.values()):
+            child.cells.reset()
+
+
+class _CounterChild:
+    def __init__(self):
+        self.cells = _ShardedCells(1)
+
+    def inc(self, amount: float = 1):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        self.cells.cell()[0] += amount
+
+    def value(self) -> float:
+        return self.cells.totals()[0]
+
+    def render(self, name, labelnames, values) -> List[str]:
+        return [f"{name}{_format_labels(labelnames, values)} {_format_value(self.value())}"]
+
+
+class Counter(_Metric):
+    metric_type = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+
+class _GaugeChild:
+    def __init__(self):
+        # Gauges are set as well as incremented, so they keep one shared value
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float):
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1):
+        self.inc(-amount)
+
+    def value(self) -> float:
+        return self._value
+
+    def render(self, name, labelnames, values) -> List[str]:
+        return [f"{name}{_format_labels(labelnames, values)} {_format_value(self._value)}"]
+
+
+class Gauge(_Metric):
+    metric_type = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1):
+        self._default().dec(amount)
+
+    def reset(self):
+        for child in list(self._children.values()):
+            child.set(0.0)
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # Layout: one slot per bucket plus +Inf (non-cumulative), then sum, then count
+        self.cells = _ShardedCells(len(buckets) + 3)
+
+    def observe(self, value: float):
+        cell = self.cells.cell()
+        index = 0
+        for bound in self.buckets:
+            if value <= bound:
+                break
+            index += 1
+        cell[index] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """Estimate a percentile by linear interpolation inside the matching bucket"""
+        totals = self.cells.totals()
+        count = totals[-1]
+        if not count:
+            return 0.0
+
+        target = fraction * count
+        seen = 0.0
+        lower = 0.0
+        for bound, hits in zip(self.buckets, totals):
+            if hits and seen + hits >= target:
+                return lower + (bound - lower) * ((target - seen) / hits)
+            seen += hits
+            lower = bound
+        return self.buckets[-1]
+
+    def render(self, name, labelnames, values) -> List[str]:
+        totals = self.cells.totals()
+        lines = []
+        cumulative = 0.0
+        for bound, hits in zip(self.buckets + (float('inf'),), totals):
+            cumulative += hits
+            labels = _format_labels(labelnames, values, f'le="{_format_value(bound)}"')
+            lines.append(f"{name}_bucket{labels} {_format_value(cumulative)}")
+        labels = _format_labels(labelnames, values)
+        lines.append(f"{name}_sum{labels} {_format_value(totals[-2])}")
+        lines.append(f"{name}_count{labels} {_format_value(totals[-1])}")
+        return lines
+
+
+class Histogram(_Metric):
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, tuple(labelnames), **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.metric_type}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames=(),
+                  buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+    def write_to_file(self, path: str):
+        """Dump the current metrics to a file (atomically replaced)"""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def reset(self):
+        """Zero every metric (mainly for benchmarks and tests)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+    def start_http_server(self, port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+        """Serve /metrics on a local port from a daemon thread"""
+        if self._server:
+            return self._server
+
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True).start()
+        return self._server
+
+    def stop_http_server(self):
+        """Stop the /metrics HTTP server if running"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+# Default process-wide registry
+registry = MetricsRegistry()
+
+OPERATIONS = registry.counter(
+    'irnvault_operations_total', 'Banking operations by layer, operation and outcome',
+    ('layer', 'operation', 'outcome'))
+OPERATION_FAILURES = registry.counter(
+    'irnvault_operation_failures_total', 'Failed banking operations by reason',
+    ('layer', 'operation', 'reason'))
+OPERATION_LATENCY = registry.histogram(
+    'irnvault_operation_duration_seconds', 'Banking operation latency in seconds',
+    ('layer', 'operation'))
+
+
+def record_operation(layer: str, operation: str, elapsed: float, failure: Any = None):
+    """Record one operation's outcome and latency"""
+    OPERATION_LATENCY.labels(layer, operation).observe(elapsed)
+    if failure is None:
+        OPERATIONS.labels(layer, operation, 'success').inc()
+    else:
+        OPERATIONS.labels(layer, operation, 'failure').inc()
+        OPERATION_FAILURES.labels(layer, operation, failure_reason(failure)).inc()
+
+
+def track_operation(operation: str, layer: str = 'service') -> Callable:
+    """
+    Decorator recording throughput, latency and failures for an operation.
+    Raised exceptions count as failures; so do (False, message) results,
+    which is how BankingApp reports failed operations.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                record_operation(layer, operation, time.perf_counter() - started, e)
+                raise
+
+            failure = None
+            if isinstance(result, tuple) and result and result[0] is False:
+                failure = result[1] if len(result) > 1 else 'error'
+            record_operation(layer, operation, time.perf_counter() - started, failure)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,250 @@
+# banking_app/monitoring/tracing.py
+"""
+Request tracing
+Context-local spans around service methods and Database calls, exported
+to a local file as Chrome trace events or OTLP-JSON.
+
+Sampling: a trace is kept when its root span was head-sampled
+(TRACE_SAMPLE_RATE) or when the root took at least TRACE_SLOW_THRESHOLD_MS,
+so slow requests are always captured even at a low sample rate.
+"""
+
+import os
+import json
+import time
+import random
+import inspect
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Callable
+from config.settings import Settings
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar('irnvault_current_span', default=None)
+
+# Offset to turn perf_counter_ns readings into wall-clock nanoseconds for OTLP
+_EPOCH_OFFSET_NS = time.time_ns() - time.perf_counter_ns()
+
+
+class Span:
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'start_ns', 'end_ns',
+                 'attributes', 'thread_id', 'error', 'trace')
+
+    def __init__(self, name: str, trace: '_Trace', parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace = trace
+        self.trace_id = trace.trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.thread_id = threading.get_ident()
+        self.error = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return (end - self.start_ns) / 1e6
+
+
+class _Trace:
+    """Spans of one trace, buffered until the root span finishes"""
+    __slots__ = ('trace_id', 'head_sampled', 'spans', 'lock')
+
+    def __init__(self, head_sampled: bool):
+        self.trace_id = f"{random.getrandbits(128):032x}"
+        self.head_sampled = head_sampled
+        self.spans: List[Span] = []
+        self.lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self.lock:
+            if len(self.spans) < Settings.TRACE_MAX_SPANS_PER_TRACE:
+                self.spans.append(span)
+
+
+class TraceFileExporter:
+    """Append finished traces to a local file"""
+
+    def __init__(self, path: str, trace_format: str = 'chrome'):
+        self.path = path
+        self.trace_format = trace_format
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def export(self, spans: List[Span]):
+        if self.trace_format == 'otlp':
+            lines = [json.dumps(self._to_otlp(spans), separators=(',', ':'))]
+        else:
+            lines = [json.dumps(self._to_chrome_event(span), separators=(',', ':')) + ',' for span in spans]
+
+        with self._lock:
+            new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            with open(self.path, 'a', encoding='utf-8') as f:
+                # Chrome's JSON Array Format tolerates a missing closing bracket,
+                # which keeps the file appendable while the app is running
+                if new_file and self.trace_format != 'otlp':
+                    f.write('[\n')
+                f.write('\n'.join(lines) + '\n')
+
+    def _to_chrome_event(self, span: Span) -> Dict[str, Any]:
+        args = dict(span.attributes)
+        args['trace_id'] = span.trace_id
+        args['span_id'] = span.span_id
+        if span.parent_id:
+            args['parent_id'] = span.parent_id
+        if span.error:
+            args['error'] = span.error
+        return {
+            'name': span.name,
+            'cat': span.name.split('.')[0],
+            'ph': 'X',
+            'ts': span.start_ns / 1000,
+            'dur': (span.end_ns - span.start_ns) / 1000,
+            'pid': self._pid,
+            'tid': span.thread_id,
+            'args': args
+        }
+
+    def _to_otlp(self, spans: List[Span]) -> Dict[str, Any]:
+        def attribute(key, value):
+            if isinstance(value, bool):
+                typed = {'boolValue': value}
+            elif isinstance(value, int):
+                typed = {'intValue': str(value)}
+            elif isinstance(value, float):
+                typed = {'doubleValue': value}
+            else:
+                typed = {'stringValue': str(value)}
+            return {'key': key, 'value': typed}
+
+        otlp_spans = []
+        for span in spans:
+            otlp_span = {
+                'traceId': span.trace_id,
+                'spanId': span.span_id,
+                'name': span.name,
+                'kind': 1,
+                'startTimeUnixNano': str(span.start_ns + _EPOCH_OFFSET_NS),
+                'endTimeUnixNano': str(span.end_ns + _EPOCH_OFFSET_NS),
+                'attributes': [attribute(k, v) for k, v in span.attributes.items()],
+                'status': {'code': 2, 'message': span.error} if span.error else {'code': 1}
+            }
+            if span.parent_id:
+                otlp_span['parentSpanId'] = span.parent_id
+            otlp_spans.append(otlp_span)
+
+        return {'resourceSpans': [{
+            'resource': {'attributes': [attribute('service.name', Settings.APP_NAME)]},
+            'scopeSpans': [{'scope': {'name': 'irnvault.tracing'}, 'spans': otlp_spans}]
+        }]}
+
+
+class Tracer:
+    def __init__(self, enabled: bool = None, sample_rate: float = None,
+                 slow_threshold_ms: float = None, exporter: TraceFileExporter = None):
+        self.enabled = Settings.TRACE_ENABLED if enabled is None else enabled
+        self.sample_rate = Settings.TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.slow_threshold_ms = (Settings.TRACE_SLOW_THRESHOLD_MS
+                                  if slow_threshold_ms is None else slow_threshold_ms)
+        self.exporter = exporter or TraceFileExporter(Settings.TRACE_FILE, Settings.TRACE_FORMAT)
+
+    def configure(self, enabled: bool = None, sample_rate: float = None,
+                  slow_threshold_ms: float = None, path: str = None, trace_format: str = None):
+        """Adjust sampling and export settings at runtime"""
+        if enabled is not None:
+            self.enabled = enabled
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if slow_threshold_ms is not None:
+            self.slow_threshold_ms = slow_threshold_ms
+        if path is not None or trace_format is not None:
+            self.exporter = TraceFileExporter(path or self.exporter.path,
+                                              trace_format or self.exporter.trace_format)
+
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+
+    @contextmanager
+    def span(self, name: str, force_sample: bool = False, **attributes):
+        """Open a span; starts a new trace when there is no active span"""
+        if not self.enabled:
+            yield None
+            return
+
+        parent = _current_span.get()
+        if parent is not None:
+            trace = parent.trace
+            parent_id = parent.span_id
+        else:
+            trace = _Trace(force_sample or random.random() < self.sample_rate)
+            parent_id = None
+
+        span = Span(name, trace, parent_id, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end_ns = time.perf_counter_ns()
+            _current_span.reset(token)
+            trace.add(span)
+            if parent is None:
+                self._finish_trace(trace, span)
+
+    def record_span(self, name: str, start_ns: int, end_ns: int = None,
+                    error: str = None, **attributes):
+        """Record an already-finished leaf span under the active span (no-op without one)"""
+        parent = _current_span.get()
+        if parent is None or not self.enabled:
+            return
+
+        span = Span(name, parent.trace, parent.span_id, attributes)
+        span.start_ns = start_ns
+        span.end_ns = end_ns if end_ns is not None else time.perf_counter_ns()
+        span.error = error
+        parent.trace.add(span)
+
+    def _finish_trace(self, trace: _Trace, root: Span):
+        keep = trace.head_sampled or (self.slow_threshold_ms > 0 and root.duration_ms >= self.slow_threshold_ms)
+        if not keep:
+            return
+        try:
+            self.exporter.export(sorted(trace.spans, key=lambda s: s.start_ns))
+        except OSError as e:
+            print(f"Trace export error: {e}")
+
+
+# Default process-wide tracer
+tracer = Tracer()
+
+
+def traced(name: str = None) -> Callable:
+    """Decorator wrapping a function call in a span"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with tracer.span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_methods(cls):
+    """Class decorator wrapping every public method in a span named 'Class.method'"""
+    for attr_name, member in list(vars(cls).items()):
+        if attr_name.startswith('_') or not inspect.isfunction(member):
+            continue
+        setattr(cls, attr_name, traced(f"{cls.__name__}.{attr_name}")(member))
+    return cls
@@ -4,119 +4,180 @@ Statement service
 Handles mini statements and transaction filtering
 """
 
-from typing import List, Dict, Any
-from datetime import datetime, timedelta
-from db.database import Database
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import date, datetime, timedelta
+from db.database import Database, read_only
+from db.records import TransactionRecord
+from db.shard_router import route_by
+from db.columns import TRANSACTION_TYPES, TYPE_CODES, TYPE_CODE_SQL, INT, SMALL_INT, FLOAT, sum_by
+from monitoring.tracing import trace_methods
+from archive.archive_service import ArchiveService
+from eod.eod_service import EndOfDayService
 
+@trace_methods
 class StatementService:
     def __init__(self, database: Database):
         self.db = database
+        self.archive = ArchiveService(database)
+        self.eod = EndOfDayService(database)
 
-    def get_daily_statement(self, account_number: str) -> List[Dict[str, Any]]:
-        """Get today's transactions"""
-        query = """
-            SELECT type, amount, timestamp 
+    @staticmethod
+    def _range_filter(account_number: str, start: datetime = None, end: datetime = None) -> tuple:
+        """WHERE clause and params selecting an account's transactions in [start, end)"""
+        # Plain range predicates (no DATE()/YEAR() wrappers) so MySQL can
+        # prune partitions and use the (account_number, timestamp) index
+        conditions = ["account_number = %s"]
+        params = [account_number]
+        if start is not None:
+            conditions.append("timestamp >= %s")
+            params.append(start)
+        if end is not None:
+            conditions.append("timestamp < %s")
+            params.append(end)
+        return ' AND '.join(conditions), tuple(params)
+
+    @route_by()
+    @read_only
+    def _get_transactions(self, account_number: str, start: datetime = None,
+                          end: datetime = None) -> List[Dict[str, Any]]:
+        """Get transactions in [start, end) from the hot table and the archive"""
+        where, params = self._range_filter(account_number, start, end)
+        query = f"""
+            SELECT id, type, amount, timestamp 
             FROM transactions 
-            WHERE account_number = %s 
-            AND DATE(timestamp) = CURDATE()
+            WHERE {where}
             ORDER BY timestamp DESC
         """
-        results = self.db.fetch_all(query, (account_number,))
+        transactions = self.db.fetch_records(TransactionRecord, query, params)
         
-        return [{
-            'type': row['type'],
-            'amount': float(row['amount']),
-            'timestamp': row['timestamp']
-        } for row in results]
+        return self.archive.merge_with_archive(transactions, account_number, start, end)
+
+    def _period_range(self, period: str) -> tuple:
+        """[start, end) of the current day, month or year (None, None for all time)"""
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
+        if period == 'daily':
+            return today, today + timedelta(days=1)
+        if period == 'monthly':
+            month_start = today.replace(day=1)
+            return month_start, (month_start + timedelta(days=32)).replace(day=1)
+        if period == 'yearly':
+            year_start = today.replace(month=1, day=1)
+            return year_start, year_start.replace(year=year_start.year + 1)
+        return None, None
+
+    @route_by()
+    @read_only
+    def get_type_totals(self, account_number: str, start: datetime = None,
+                        end: datetime = None) -> Dict[str, Any]:
+        """
+        Transaction count and total amount per type in [start, end): whole
+        days already closed come from their end-of-day snapshots, the rest
+        from the hot table and the archive
+        """
+        totals = [0.0] * len(TRANSACTION_TYPES)
+        count = 0
+        closed = self._closed_days(start, end)
+        if closed:
+            closed_set = set(closed)
+            for day in self.eod.get_account_days(account_number, closed[0], closed[-1] + timedelta(days=1)):
+                if day['business_date'] in closed_set:
+                    count += day['count']
+                    for code, name in enumerate(TRANSACTION_TYPES):
+                        totals[code] += day['totals'][name]
+
+        for open_start, open_end in self._open_ranges(closed, start, end):
+            count += self._scan_type_totals(account_number, open_start, open_end, totals)
+        return {'count': count, 'totals': dict(zip(TRANSACTION_TYPES, totals))}
+
+    def _scan_type_totals(self, account_number: str, start: Optional[datetime], end: Optional[datetime],
+                          totals: List[float]) -> int:
+        """Add the ledger's per-type totals for [start, end) to totals; returns the row count"""
+        where, params = self._range_filter(account_number, start, end)
+        columns = self.db.fetch_columns({'id': INT, 'type_code': SMALL_INT, 'amount': FLOAT}, f"""
+            SELECT id, {TYPE_CODE_SQL}, CAST(amount AS DOUBLE)
+            FROM transactions
+            WHERE {where}
+        """, params)
+        for code, total in enumerate(sum_by(columns['type_code'], columns['amount'], len(TRANSACTION_TYPES))):
+            totals[code] += total
+        count = len(columns['id'])
+
+        archived = self.archive.get_archived_transactions(account_number, start, end)
+        if archived:
+            # A month can briefly be in both tiers (see merge_with_archive)
+            hot_ids = set(columns['id'].tolist())
+            for row in archived:
+                if row['id'] not in hot_ids:
+                    totals[TYPE_CODES[row['type']]] += row['amount']
+                    count += 1
+        return count
+
+    def _closed_days(self, start: datetime = None, end: datetime = None) -> List[date]:
+        """Closed business days lying wholly inside [start, end)"""
+        first = None
+        if start is not None:
+            first = start.date() if start.time() == datetime.min.time() else start.date() + timedelta(days=1)
+        return self.eod.closed_days(first, end.date() if end is not None else None)
+
+    @staticmethod
+    def _open_ranges(closed: List[date], start: datetime = None,
+                     end: datetime = None) -> List[Tuple[Optional[datetime], Optional[datetime]]]:
+        """The parts of [start, end) not covered by the (sorted) closed days"""
+        ranges = []
+        cursor = start
+        for day in closed:
+            day_start = datetime.combine(day, datetime.min.time())
+            if cursor is None or cursor < day_start:
+                ranges.append((cursor, day_start))
+            cursor = day_start + timedelta(days=1)
+        if end is None or cursor is None or cursor < end:
+            ranges.append((cursor, end))
+        return ranges
+
+    @route_by()
+    @read_only
+    def get_daily_balances(self, account_number: str, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        """Closing balance and per-type totals for each closed day from start_date to end_date"""
+        start = datetime.strptime(str(start_date), '%Y-%m-%d').date()
+        end = datetime.strptime(str(end_date), '%Y-%m-%d').date() + timedelta(days=1)
+        return self.eod.get_account_days(account_number, start, end)
+
+    def get_daily_statement(self, account_number: str) -> List[Dict[str, Any]]:
+        """Get today's transactions"""
+        return self._get_transactions(account_number, *self._period_range('daily'))
 
     def get_monthly_statement(self, account_number: str) -> List[Dict[str, Any]]:
         """Get this month's transactions"""
-        query = """
-            SELECT type, amount, timestamp 
-            FROM transactions 
-            WHERE account_number = %s 
-            AND YEAR(timestamp) = YEAR(CURDATE()) 
-            AND MONTH(timestamp) = MONTH(CURDATE())
-            ORDER BY timestamp DESC
-        """
-        results = self.db.fetch_all(query, (account_number,))
-        
-        return [{
-            'type': row['type'],
-            'amount': float(row['amount']),
-            'timestamp': row['timestamp']
-        } for row in results]
+        return self._get_transactions(account_number, *self._period_range('monthly'))
 
     def get_yearly_statement(self, account_number: str) -> List[Dict[str, Any]]:
         """Get this year's transactions"""
-        query = """
-            SELECT type, amount, timestamp 
-            FROM transactions 
-            WHERE account_number = %s 
-            AND YEAR(timestamp) = YEAR(CURDATE())
-            ORDER BY timestamp DESC
-        """
-        results = self.db.fetch_all(query, (account_number,))
-        
-        return [{
-            'type': row['type'],
-            'amount': float(row['amount']),
-            'timestamp': row['timestamp']
-        } for row in results]
+        return self._get_transactions(account_number, *self._period_range('yearly'))
 
     def get_all_transactions(self, account_number: str) -> List[Dict[str, Any]]:
         """Get all transactions for account"""
-        query = """
-            SELECT type, amount, timestamp 
-            FROM transactions 
-            WHERE account_number = %s 
-            ORDER BY timestamp DESC
-        """
-        results = self.db.fetch_all(query, (account_number,))
-        
-        return [{
-            'type': row['type'],
-            'amount': float(row['amount']),
-            'timestamp': row['timestamp']
-        } for row in results]
+        return self._get_transactions(account_number)
 
     def get_statement_by_date_range(self, account_number: str, start_date: str, end_date: str) -> List[Dict[str, Any]]:
         """Get transactions within date range"""
-        query = """
-            SELECT type, amount, timestamp 
-            FROM transactions 
-            WHERE account_number = %s 
-            AND DATE(timestamp) BETWEEN %s AND %s
-            ORDER BY timestamp DESC
-        """
-        results = self.db.fetch_all(query, (account_number, start_date, end_date))
-        
-        return [{
-            'type': row['type'],
-            'amount': float(row['amount']),
-            'timestamp': row['timestamp']
-        } for row in results]
+        start = datetime.strptime(str(start_date), '%Y-%m-%d')
+        end = datetime.strptime(str(end_date), '%Y-%m-%d') + timedelta(days=1)
+        return self._get_transactions(account_number, start, end)
 
+    @route_by()
+    @read_only
     def get_statement_summary(self, account_number: str, period: str = 'monthly') -> Dict[str, Any]:
         """Get transaction summary for specified period"""
-        if period == 'daily':
-            transactions = self.get_daily_statement(account_number)
-        elif period == 'monthly':
-            transactions = self.get_monthly_statement(account_number)
-        elif period == 'yearly':
-            transactions = self.get_yearly_statement(account_number)
-        else:
-            transactions = self.get_all_transactions(account_number)
-        
-        # Calculate summary
-        total_deposits = sum(t['amount'] for t in transactions if t['type'] == 'deposit')
-        total_withdrawals = sum(t['amount'] for t in transactions if t['type'] == 'withdrawal')
-        total_transfers_in = sum(t['amount'] for t in transactions if t['type'] == 'transfer_in')
-        total_transfers_out = sum(t['amount'] for t in transactions if t['type'] == 'transfer_out')
+        type_totals = self.get_type_totals(account_number, *self._period_range(period))
+        totals = type_totals['totals']
+        total_deposits = totals['deposit']
+        total_withdrawals = totals['withdrawal']
+        total_transfers_in = totals['transfer_in']
+        total_transfers_out = totals['transfer_out']
         
         return {
             'period': period,
-            'total_transactions': len(transactions),
+            'total_transactions': type_totals['count'],
             'total_deposits': total_deposits,
             'total_withdrawals': total_withdrawals,
             'total_transfers_in': total_transfers_in,
@@ -124,6 +185,8 @@ class StatementService:
             'net_amount': total_deposits + total_transfers_in - total_withdrawals - total_transfers_out
         }
 
+    @route_by()
+    @read_only
     def export_statement(self, account_number: str, period: str = 'monthly') -> str:
         """Export statement as formatted string"""
         if period == 'daily':
@@ -0,0 +1,21 @@
+# banking_app/tests/conftest.py
+"""
+Shared test setup
+Puts the application root on sys.path (modules import as db.…, eod.…)
+and provides the fixture that runs a test on both column backends.
+"""
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def columns_backend(request, monkeypatch):
+    """Run the test with NumPy columns (skipped when NumPy is missing) and with the pure-Python fallback"""
+    import db.columns
+    np = pytest.importorskip('numpy') if request.param == 'numpy' else None
+    monkeypatch.setattr(db.columns, 'np', np)
+    return np
@@ -0,0 +1,144 @@
+# banking_app/tests/fake_database.py
+"""
+In-memory stand-in for one MySQL node
+FakeDatabase is a Database whose statements run against a few Python
+dicts instead of a server: enough of the accounts, ledger and saga SQL
+for the shard router and the transfer saga to run unchanged. A unit of
+work snapshots the state and a rollback restores it. Any statement it
+does not know fails the test.
+"""
+
+import copy
+import threading
+import pytest
+
+pytest.importorskip('mysql.connector')
+
+from db.database import Database
+
+
+class FakeDatabase(Database):
+    def __init__(self, name: str = None):
+        super().__init__(config={'host': 'fake', 'port': 0}, name=name, replicas=[])
+        self.state = {'accounts': {}, 'transactions': [], 'sagas': {}, 'saga_credits': set(),
+                      'idempotency_keys': {}, 'outbox_events': [], 'balance_adjustments': []}
+        # Session auto_increment_increment (the shard count when shards interleave ids)
+        self.auto_increment_increment = 1
+        # Credits to fail with a lost connection before the next one succeeds
+        self.failing_credits = 0
+        # Threads that ran statements here (gather runs each shard on its own)
+        self.threads = set()
+        self._saved = None
+
+    def add_account(self, account_number: str, balance: float = 0.0):
+        self.state['accounts'][account_number] = float(balance)
+
+    def balance(self, account_number: str) -> float:
+        return self.state['accounts'][account_number]
+
+    def add_event(self, event_id: int, age_seconds: float = 0.0):
+        """A committed outbox row, created age_seconds ago"""
+        self.state['outbox_events'].append({'id': event_id, 'event_type': 'deposit', 'account_number': None,
+                                            'amount': 1, 'payload': None, 'created_at': None,
+                                            'age_seconds': age_seconds})
+
+    def connect(self) -> bool:
+        return True
+
+    def disconnect(self):
+        pass
+
+    def begin_transaction(self, consistent_snapshot: bool = False, read_only: bool = False):
+        self._saved = copy.deepcopy(self.state)
+
+    def commit_transaction(self):
+        self._saved = None
+
+    def rollback_transaction(self):
+        self.state, self._saved = self._saved, None
+
+    def execute_update(self, query: str, params: tuple = None):
+        self.threads.add(threading.get_ident())
+        sql = ' '.join(query.split())
+        accounts = self.state['accounts']
+        if sql.startswith('CREATE'):
+            return 0
+        if sql.startswith('UPDATE accounts') and 'balance = balance - %s' in sql:
+            amount, account_number, _ = params
+            if accounts.get(account_number, -1) < amount:
+                return 0
+            accounts[account_number] -= amount
+            return 1
+        if sql.startswith('UPDATE accounts') and 'balance = balance + %s' in sql:
+            if self.failing_credits:
+                self.failing_credits -= 1
+                raise Exception("Lost connection to MySQL server during query")
+            amount, account_number = params
+            if account_number not in accounts:
+                return 0
+            accounts[account_number] += amount
+            return 1
+        if sql.startswith('INSERT INTO transactions'):
+            self.state['transactions'].append(tuple(params))
+            return 1
+        if sql.startswith('INSERT INTO transfer_sagas'):
+            saga_id, from_account, to_account, amount = params
+            self.state['sagas'][saga_id] = {'id': saga_id, 'from_account': from_account, 'to_account': to_account,
+                                            'amount': amount, 'status': 'debited',
+                                            'created_at': len(self.state['sagas'])}
+            return 1
+        if sql.startswith('INSERT INTO balance_adjustments'):
+            self.state['balance_adjustments'].append(tuple(params))
+            return 1
+        if sql.startswith('INSERT IGNORE INTO saga_credits'):
+            if params[0] in self.state['saga_credits']:
+                return 0
+            self.state['saga_credits'].add(params[0])
+            return 1
+        if sql.startswith('INSERT IGNORE INTO idempotency_keys'):
+            key, operation, request_hash, _ = params
+            if key in self.state['idempotency_keys']:
+                return 0
+            self.state['idempotency_keys'][key] = {'operation': operation, 'request_hash': request_hash}
+            return 1
+        if sql.startswith('UPDATE transfer_sagas SET status'):
+            status, saga_id, from_status = params
+            saga = self.state['sagas'].get(saga_id)
+            if not saga or saga['status'] != from_status:
+                return 0
+            saga['status'] = status
+            return 1
+        raise AssertionError(f"Unexpected statement: {sql}")
+
+    def execute_many(self, query: str, params_list: list) -> bool:
+        return all(self.execute_update(query, params) is not None for params in params_list)
+
+    def fetch_one(self, query: str, params: tuple = None):
+        self.threads.add(threading.get_ident())
+        sql = ' '.join(query.split())
+        if 'information_schema.TABLES' in sql:
+            return {'present': 0}
+        if sql.startswith('SELECT 1 FROM accounts WHERE account_number = %s'):
+            return {'1': 1} if params[0] in self.state['accounts'] else None
+        if sql.startswith('SELECT @@auto_increment_increment'):
+            return {'step': self.auto_increment_increment}
+        if sql.startswith('SELECT COALESCE(SUM(amount), 0) as total FROM balance_adjustments'):
+            return {'total': sum(amount for account_number, amount in self.state['balance_adjustments']
+                                 if account_number == params[0])}
+        if sql.startswith('SELECT operation, request_hash FROM idempotency_keys'):
+            key = self.state['idempotency_keys'].get(params[0])
+            return dict(key) if key else None
+        raise AssertionError(f"Unexpected query: {sql}")
+
+    def fetch_all(self, query: str, params: tuple = None):
+        self.threads.add(threading.get_ident())
+        sql = ' '.join(query.split())
+        if sql.startswith('SELECT id, from_account, to_account, amount, created_at FROM transfer_sagas'):
+            return [dict(saga) for saga in self.state['sagas'].values() if saga['status'] == 'debited']
+        if sql.startswith('SELECT id, event_type, account_number, amount, payload, created_at'):
+            after, limit = params
+            return [dict(event) for event in sorted(self.state['outbox_events'], key=lambda event: event['id'])
+                    if event['id'] > after][:limit]
+        if sql.startswith('SELECT account_number FROM accounts'):
+            return [{'account_number': account_number} for account_number in sorted(self.state['accounts'])]
+        raise AssertionError(f"Unexpected query: {sql}")
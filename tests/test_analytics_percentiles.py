@@ -0,0 +1,59 @@
+# banking_app/tests/test_analytics_percentiles.py
+"""Analytics size histograms: binning, encoding and percentiles, on NumPy and on the pure-Python fallback"""
+
+import pytest
+
+pytest.importorskip('mysql.connector')
+
+import analytics.analytics_service
+from db.columns import new_columns, finish_columns, TYPE_CODES, INT, SMALL_INT, FLOAT
+from analytics.analytics_service import (_aggregate, _size_bins, _encode_histogram, _decode_into, _percentile,
+                                         SIZE_BINS, SIZE_BINS_PER_DECADE)
+
+
+@pytest.fixture
+def backend(columns_backend, monkeypatch):
+    monkeypatch.setattr(analytics.analytics_service, 'np', columns_backend)
+    return columns_backend
+
+
+def bins(amounts):
+    return [int(b) for b in _size_bins(amounts)]
+
+
+def test_amounts_fall_in_log_spaced_bins(backend):
+    # One decade is SIZE_BINS_PER_DECADE bins; the ends are clamped
+    assert bins([0.01, 0.1, 1.0, 100.0]) == [0, SIZE_BINS_PER_DECADE, 2 * SIZE_BINS_PER_DECADE,
+                                             4 * SIZE_BINS_PER_DECADE]
+    assert bins([0.0, 1e12]) == [0, SIZE_BINS - 1]
+
+
+def test_percentiles_are_bin_midpoints_within_a_bin_width():
+    histogram = [0] * SIZE_BINS
+    for amount, count in ((10.0, 50), (100.0, 40), (1000.0, 10)):
+        histogram[bins([amount])[0]] += count
+    for p, amount in ((50, 10.0), (90, 100.0), (99, 1000.0)):
+        assert abs(_percentile(histogram, p) - amount) / amount < 0.07
+    assert _percentile([0] * SIZE_BINS, 50) is None
+
+
+def test_histograms_survive_encoding_and_merge():
+    histogram = [0] * SIZE_BINS
+    histogram[3], histogram[150] = 2, 7
+    merged = [0] * SIZE_BINS
+    _decode_into(_encode_histogram(histogram), merged)
+    _decode_into(_encode_histogram(histogram), merged)
+    assert merged == [2 * count for count in histogram]
+    assert _encode_histogram([0] * SIZE_BINS) == ''
+
+
+def test_hours_aggregate_per_type(backend):
+    buffers = new_columns({'hour': INT, 'type_code': SMALL_INT, 'amount': FLOAT})
+    for hour, kind, amount in ((0, 'deposit', 10.0), (0, 'deposit', 30.0), (1, 'withdrawal', 5.0)):
+        buffers['hour'].append(hour)
+        buffers['type_code'].append(TYPE_CODES[kind])
+        buffers['amount'].append(amount)
+    rows = _aggregate(finish_columns(buffers), 2)
+    assert [(hour, code, count, total) for hour, code, count, total, _ in rows] == \
+           [(0, TYPE_CODES['deposit'], 2, 40.0), (1, TYPE_CODES['withdrawal'], 1, 5.0)]
+    assert [sum(histogram) for *_, histogram in rows] == [2, 1]
@@ -0,0 +1,89 @@
+# banking_app/tests/test_archive_service.py
+"""Archive service: a month written to segment files reads back the same, and the hot window past it"""
+
+from datetime import datetime
+import pytest
+from fake_database import FakeDatabase
+from config.settings import Settings
+from archive.archive_service import ArchiveService
+
+ALICE, BOB = '1000000001', '1000000002'
+
+
+class PartitionedNode(FakeDatabase):
+    """A shard whose transactions table has one monthly partition, p202401"""
+
+    def __init__(self, rows):
+        super().__init__('shard-0')
+        self.rows = rows
+        self.dropped = False
+
+    def execute_query(self, query: str, params: tuple = None) -> bool:
+        assert ' '.join(query.split()) == "ALTER TABLE transactions DROP PARTITION p202401"
+        self.dropped = True
+        return True
+
+    def fetch_one(self, query: str, params: tuple = None):
+        sql = ' '.join(query.split())
+        assert sql.startswith("SELECT COUNT(*) as total FROM transactions PARTITION (p202401)"), sql
+        return {'total': len(self.rows)}
+
+    def fetch_all(self, query: str, params: tuple = None):
+        sql = ' '.join(query.split())
+        if 'information_schema.PARTITIONS' in sql:
+            return [] if self.dropped else [{'name': 'p202401'}]
+        assert sql.startswith("SELECT id, account_number, type, amount, timestamp FROM transactions PARTITION (p202401)")
+        after, limit = params
+        return [dict(row) for row in self.rows if row['id'] > after][:limit]
+
+
+def row(row_id, account_number, transaction_type, amount, day):
+    return {'id': row_id, 'account_number': account_number, 'type': transaction_type, 'amount': amount,
+            'timestamp': datetime(2024, 1, day, 12, 0, 0)}
+
+
+@pytest.fixture
+def archived(tmp_path, monkeypatch):
+    # Three rows per segment, so each account spans several segments
+    monkeypatch.setattr(Settings, 'ARCHIVE_SEGMENT_ROWS', 3)
+    rows = [row(1, ALICE, 'deposit', '100.00', 2), row(2, BOB, 'deposit', '50.00', 3),
+            row(3, ALICE, 'withdrawal', '20.50', 5), row(4, ALICE, 'transfer_out', '10.00', 9),
+            row(5, BOB, 'transfer_in', '10.00', 9), row(6, ALICE, 'deposit', '5.25', 30),
+            row(7, BOB, 'loan_disbursement', '1000.00', 31)]
+    node = PartitionedNode(rows)
+    service = ArchiveService(node, str(tmp_path))
+    assert service.archive_month(2024, 1) == len(rows)
+    return node, service, rows
+
+
+def test_archived_month_reads_back_every_row(archived):
+    node, service, rows = archived
+    assert node.dropped
+    assert service.get_archived_months() == [(2024, 1)]
+    assert service.archived_row_count() == len(rows)
+    for account_number in (ALICE, BOB):
+        expected = sorted((r for r in rows if r['account_number'] == account_number),
+                          key=lambda r: r['timestamp'], reverse=True)
+        assert [(tx['id'], tx['type'], tx['amount'], tx['timestamp'])
+                for tx in service.get_archived_transactions(account_number)] == \
+               [(r['id'], r['type'], float(r['amount']), r['timestamp']) for r in expected]
+
+
+def test_archived_reads_honour_the_range(archived):
+    _, service, _ = archived
+    within = service.get_archived_transactions(ALICE, datetime(2024, 1, 5), datetime(2024, 1, 30))
+    assert [tx['id'] for tx in within] == [4, 3]
+    assert service.get_archived_transactions(ALICE, datetime(2024, 2, 1)) == []
+
+
+def test_merge_skips_rows_still_in_the_hot_tier(archived):
+    _, service, _ = archived
+    hot = service.get_archived_transactions(BOB)[:1]
+    merged = service.merge_with_archive(hot, BOB)
+    assert [tx['id'] for tx in merged] == [7, 5, 2]
+
+
+def test_hot_window_starts_after_the_archive(archived, tmp_path):
+    _, service, _ = archived
+    assert service.hot_window() == (" AND timestamp >= %s", (datetime(2024, 2, 1),))
+    assert ArchiveService(FakeDatabase('shard-1'), str(tmp_path)).hot_window() == ("", ())
@@ -0,0 +1,24 @@
+# banking_app/tests/test_balance_adjustments.py
+"""Balance adjustments: absolute edits are logged as signed differences, outside the ledger"""
+
+from fake_database import FakeDatabase
+from db.accounts import BalanceAdjustmentLog
+
+ACCOUNT = '1000000001'
+
+
+def test_edits_are_logged_as_signed_differences_outside_the_ledger():
+    node = FakeDatabase('shard-0')
+    log = BalanceAdjustmentLog(node)
+    assert log.ensure_schema()
+    assert log.post(ACCOUNT, 100.0, 250.5)
+    assert log.post(ACCOUNT, 250.5, 200)
+    assert node.state['balance_adjustments'] == [(ACCOUNT, 150.5), (ACCOUNT, -50.5)]
+    assert node.state['transactions'] == []
+    assert log.total(ACCOUNT) == 100.0
+
+
+def test_an_unchanged_balance_logs_nothing():
+    node = FakeDatabase('shard-0')
+    assert BalanceAdjustmentLog(node).post(ACCOUNT, 80.0, '80.00')
+    assert node.state['balance_adjustments'] == []
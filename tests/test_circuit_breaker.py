@@ -0,0 +1,60 @@
+# banking_app/tests/test_circuit_breaker.py
+"""Circuit breaker: opening at the threshold, the half-open probe and the growing backoff"""
+
+import pytest
+from db import circuit_breaker as breaker_module
+from db.circuit_breaker import CircuitBreaker, CLOSED, HALF_OPEN, OPEN
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(breaker_module.time, 'monotonic', lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker('db:3306', failure_threshold=3, base_delay_ms=1000, max_delay_ms=4000)
+
+
+def test_opens_after_the_threshold_of_failures_in_a_row(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+    assert 0.5 <= breaker.retry_in() <= 1.0
+
+
+def test_a_success_resets_the_count(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.failures == 1
+
+
+def test_half_open_lets_one_probe_through(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure()
+    clock[0] += 1.0
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow() and breaker.opens == 0
+
+
+def test_failed_probe_reopens_for_longer(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure()
+    clock[0] += 1.0
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.opens == 2
+    assert 1.0 <= breaker.retry_in() <= 2.0
+
+
+def test_backoff_is_capped():
+    breaker = CircuitBreaker('db:3306', failure_threshold=1, base_delay_ms=1000, max_delay_ms=4000)
+    assert all(2.0 <= breaker.backoff(opens) <= 4.0 for opens in (3, 4, 10) for _ in range(20))
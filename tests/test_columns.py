@@ -0,0 +1,49 @@
+# banking_app/tests/test_columns.py
+"""Columnar group-by helpers on NumPy and on the pure-Python fallback"""
+
+import re
+from db.columns import new_columns, finish_columns, sum_by, count_by, FLOAT, SMALL_INT, TYPE_CODES, TYPE_CODE_SQL
+
+
+def columns(codes, values):
+    buffers = new_columns({'code': SMALL_INT, 'value': FLOAT})
+    buffers['code'].extend(codes)
+    buffers['value'].extend(values)
+    return finish_columns(buffers)
+
+
+def test_sum_by_adds_values_per_code(columns_backend):
+    data = columns([0, 2, 2, 1, 0], [1.5, 2.0, 3.0, 4.0, 0.5])
+    assert sum_by(data['code'], data['value'], 3) == [2.0, 4.0, 5.0]
+
+
+def test_count_by_counts_rows_per_code(columns_backend):
+    data = columns([0, 2, 2, 1, 0], [0, 0, 0, 0, 0])
+    assert count_by(data['code'], 4) == [2, 1, 2, 0]
+
+
+def test_codes_outside_the_range_are_ignored(columns_backend):
+    data = columns([-1, 0, 3, 5, 1], [10.0, 1.0, 10.0, 10.0, 2.0])
+    assert sum_by(data['code'], data['value'], 3) == [1.0, 2.0, 0.0]
+    assert count_by(data['code'], 3) == [1, 1, 0]
+
+
+def test_empty_columns_give_zeros(columns_backend):
+    data = columns([], [])
+    assert sum_by(data['code'], data['value'], 2) == [0.0, 0.0]
+    assert count_by(data['code'], 2) == [0, 0]
+
+
+def test_columns_use_numpy_only_when_available(columns_backend):
+    data = columns([1], [1.0])
+    if columns_backend is None:
+        assert data['code'].typecode == SMALL_INT
+    else:
+        assert isinstance(data['code'], columns_backend.ndarray)
+
+
+def test_type_codes_are_looked_up_by_name():
+    # FIELD() is 1-based and 0 for a type it does not list, which the group-by helpers ignore as -1
+    names = re.findall(r"'(\w+)'", TYPE_CODE_SQL)
+    assert TYPE_CODE_SQL.startswith("FIELD(type, ") and TYPE_CODE_SQL.endswith(") - 1")
+    assert {name: code for code, name in enumerate(names)} == TYPE_CODES
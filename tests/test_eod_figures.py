@@ -0,0 +1,69 @@
+# banking_app/tests/test_eod_figures.py
+"""End-of-day per-account figures on NumPy and on the pure-Python fallback"""
+
+import pytest
+
+pytest.importorskip('mysql.connector')
+
+import eod.eod_service
+from db.columns import new_columns, finish_columns, TYPE_CODES, INT, SMALL_INT, FLOAT
+from eod.eod_service import _day_figures, _TYPE_COUNT
+
+
+@pytest.fixture
+def backend(columns_backend, monkeypatch):
+    monkeypatch.setattr(eod.eod_service, 'np', columns_backend)
+    return columns_backend
+
+
+def ledger(rows):
+    """Columns as close_range fetches them, from (account, after the day, type, amount) rows"""
+    buffers = new_columns({'account': INT, 'after': SMALL_INT, 'type_code': SMALL_INT, 'amount': FLOAT})
+    for account, after, kind, amount in rows:
+        buffers['account'].append(account)
+        buffers['after'].append(after)
+        buffers['type_code'].append(TYPE_CODES[kind])
+        buffers['amount'].append(amount)
+    return finish_columns(buffers)
+
+
+ACCOUNTS = [{'account_number': '1000000001'}, {'account_number': '1000000005'}, {'account_number': '1000000009'}]
+
+
+def test_day_totals_counts_and_later_net_per_account(backend):
+    figures = _day_figures(ACCOUNTS, ledger([
+        (1000000001, 0, 'deposit', 100.0),
+        (1000000001, 0, 'withdrawal', 30.0),
+        (1000000001, 1, 'deposit', 50.0),
+        (1000000001, 1, 'transfer_out', 20.0),
+        (1000000009, 0, 'loan_disbursement', 500.0),
+        (1000000009, 1, 'loan_payment', 45.5),
+    ]))
+    first, second, third = figures
+
+    count, totals, later = first
+    assert count == 2
+    assert totals[TYPE_CODES['deposit']] == 100.0 and totals[TYPE_CODES['withdrawal']] == 30.0
+    assert later == 30.0
+
+    assert second == (0, [0.0] * _TYPE_COUNT, 0.0)
+
+    count, totals, later = third
+    assert count == 1 and totals[TYPE_CODES['loan_disbursement']] == 500.0
+    assert later == -45.5
+
+
+def test_rows_of_accounts_outside_the_range_are_ignored(backend):
+    figures = _day_figures(ACCOUNTS[:2], ledger([
+        (1000000000, 0, 'deposit', 10.0),
+        (1000000003, 0, 'deposit', 10.0),
+        (1000000005, 0, 'transfer_in', 7.0),
+        (1000000009, 1, 'deposit', 10.0),
+    ]))
+    assert [count for count, _, _ in figures] == [0, 1]
+    assert figures[1][1][TYPE_CODES['transfer_in']] == 7.0
+    assert [later for _, _, later in figures] == [0.0, 0.0]
+
+
+def test_no_ledger_rows(backend):
+    assert _day_figures(ACCOUNTS, ledger([])) == [(0, [0.0] * _TYPE_COUNT, 0.0)] * len(ACCOUNTS)
@@ -0,0 +1,52 @@
+# banking_app/tests/test_idempotency.py
+"""Idempotency keys: request fingerprints, claiming a key and reusing it"""
+
+from decimal import Decimal
+import pytest
+from fake_database import FakeDatabase
+from db.idempotency import IdempotencyStore
+
+fingerprint = IdempotencyStore._fingerprint
+
+
+def test_amounts_match_by_value_to_the_cent():
+    assert fingerprint('withdrawal', ('1000000001', 100)) == \
+           fingerprint('withdrawal', ('1000000001', 100.0)) == \
+           fingerprint('withdrawal', ('1000000001', Decimal('100.00')))
+    assert fingerprint('withdrawal', ('1000000001', 100)) != fingerprint('withdrawal', ('1000000001', 100.01))
+
+
+def test_operation_and_parameter_order_are_part_of_the_request():
+    assert fingerprint('withdrawal', ('1000000001', 50)) != fingerprint('deposit', ('1000000001', 50))
+    assert fingerprint('transfer', ('1000000001', '1000000002', 50)) != \
+           fingerprint('transfer', ('1000000002', '1000000001', 50))
+
+
+def test_booleans_are_not_amounts():
+    assert fingerprint('op', (True,)) != fingerprint('op', (1,))
+
+
+@pytest.fixture
+def store():
+    return IdempotencyStore(FakeDatabase('shard-0'))
+
+
+def test_a_key_is_claimed_once_and_replays_afterwards(store):
+    assert store.committed('key-1', 'withdrawal', '1000000001', 100) is False
+    assert store.seen('key-1', 'withdrawal', '1000000001', 100) is False
+    assert store.seen('key-1', 'withdrawal', '1000000001', 100.0) is True
+    assert store.committed('key-1', 'withdrawal', '1000000001', Decimal('100.00')) is True
+
+
+def test_a_key_reused_for_another_request_is_refused(store):
+    store.seen('key-1', 'withdrawal', '1000000001', 100)
+    with pytest.raises(ValueError):
+        store.seen('key-1', 'withdrawal', '1000000001', 200)
+    with pytest.raises(ValueError):
+        store.committed('key-1', 'transfer', '1000000001', 100)
+
+
+@pytest.mark.parametrize('key', ['', 'k' * 65])
+def test_key_length_is_checked(store, key):
+    with pytest.raises(ValueError):
+        store.seen(key, 'withdrawal', '1000000001', 100)
@@ -0,0 +1,76 @@
+# banking_app/tests/test_limit_service.py
+"""Limit service: daily and rolling 24-hour totals and the limit boundary"""
+
+import datetime
+import pytest
+
+pytest.importorskip('mysql.connector')
+
+from config.settings import Settings
+from transactions.limit_service import LimitService
+
+NOW = datetime.datetime(2026, 3, 10, 9, 30)
+
+
+def hour(day: int, at: int) -> datetime.datetime:
+    return datetime.datetime(2026, 3, day, at)
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(Settings, 'DAILY_WITHDRAWAL_LIMIT', 1000)
+    monkeypatch.setattr(Settings, 'ROLLING_WITHDRAWAL_LIMIT', 1500)
+    monkeypatch.setattr(Settings, 'DAILY_TRANSFER_LIMIT', 0)
+    monkeypatch.setattr(Settings, 'ROLLING_TRANSFER_LIMIT', 0)
+    return LimitService(database=None)
+
+
+def test_totals_split_today_from_the_rolling_window(limits):
+    buckets = {hour(9, 9): 400.0, hour(9, 10): 300.0, hour(9, 23): 200.0, hour(10, 0): 100.0, hour(10, 9): 50.0}
+    # 09:00 yesterday is 24 hours before this hour's start, so only the window's 23 earlier hours count
+    assert limits._totals(buckets, NOW) == (150.0, 650.0)
+
+
+def test_totals_of_no_counters(limits):
+    assert limits._totals({}, NOW) == (0, 0)
+
+
+def test_daily_limit_boundary(limits):
+    buckets = {hour(10, 8): 600.0}
+    limits._enforce('withdrawal', buckets, 400.0, NOW)
+    with pytest.raises(Exception, match="daily withdrawal limit"):
+        limits._enforce('withdrawal', buckets, 400.01, NOW)
+
+
+def test_rolling_limit_boundary(limits):
+    buckets = {hour(9, 20): 1000.0, hour(10, 1): 100.0}
+    limits._enforce('withdrawal', buckets, 400.0, NOW)
+    with pytest.raises(Exception, match="24-hour withdrawal limit"):
+        limits._enforce('withdrawal', buckets, 401.0, NOW)
+
+
+def test_unlimited_kind_is_never_refused(limits):
+    assert not limits.enforced('transfer_out')
+    limits._enforce('transfer_out', {hour(10, 8): 10 ** 9}, 10 ** 9, NOW)
+
+
+def test_retried_request_skips_screening_its_own_posting_would_fail(monkeypatch):
+    from fake_database import FakeDatabase
+    from fraud.velocity_engine import VelocityEngine
+    from transactions.transaction_service import TransactionService
+    for name in ('DAILY_WITHDRAWAL_LIMIT', 'ROLLING_WITHDRAWAL_LIMIT'):
+        monkeypatch.setattr(Settings, name, 0)
+    monkeypatch.setattr(Settings, 'OUTBOX_ENABLED', False)
+    monkeypatch.setattr(Settings, 'VELOCITY_MAX_WITHDRAWALS', 1)
+    database = FakeDatabase()
+    database.add_account('1000000001', 100.0)
+    service = TransactionService(database, velocity=VelocityEngine())
+
+    assert service.withdraw('1000000001', 10, idempotency_key='retry-me') is True
+    # The first posting now fills the velocity window, yet the retry still gets its success
+    assert service.withdraw('1000000001', 10, idempotency_key='retry-me') is True
+    assert database.balance('1000000001') == 90.0
+    with pytest.raises(Exception, match="Blocked by velocity checks"):
+        service.withdraw('1000000001', 10, idempotency_key='another')
+    with pytest.raises(Exception, match="different request"):
+        service.withdraw('1000000001', 20, idempotency_key='retry-me')
@@ -0,0 +1,72 @@
+# banking_app/tests/test_metrics.py
+"""Metrics registry: Prometheus text exposition, per-thread cells and failure reasons"""
+
+import threading
+import pytest
+from monitoring.metrics import MetricsRegistry, failure_reason
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+def test_counter_and_gauge_exposition(registry):
+    requests = registry.counter('app_requests_total', 'Requests by outcome', ('outcome',))
+    requests.labels('success').inc()
+    requests.labels(outcome='success').inc(2)
+    requests.labels('failure').inc()
+    registry.gauge('app_queue_depth', 'Queued items').set(4.5)
+    assert registry.render_prometheus() == (
+        '# HELP app_queue_depth Queued items\n'
+        '# TYPE app_queue_depth gauge\n'
+        'app_queue_depth 4.5\n'
+        '# HELP app_requests_total Requests by outcome\n'
+        '# TYPE app_requests_total counter\n'
+        'app_requests_total{outcome="failure"} 1\n'
+        'app_requests_total{outcome="success"} 3\n')
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    latency = registry.histogram('app_latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        latency.observe(value)
+    lines = registry.render_prometheus().splitlines()
+    assert lines[2:] == ['app_latency_seconds_bucket{le="0.1"} 1',
+                         'app_latency_seconds_bucket{le="1"} 3',
+                         'app_latency_seconds_bucket{le="+Inf"} 4',
+                         'app_latency_seconds_sum 4.25',
+                         'app_latency_seconds_count 4']
+
+
+def test_label_values_are_escaped(registry):
+    registry.counter('app_errors_total', 'Errors', ('message',)).labels('say "hi"\\\n').inc()
+    assert 'app_errors_total{message="say \\"hi\\"\\\\\\n"} 1' in registry.render_prometheus()
+
+
+def test_counts_from_every_thread_are_summed(registry):
+    counter = registry.counter('app_events_total', 'Events')
+    threads = [threading.Thread(target=lambda: [counter.inc() for _ in range(1000)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert 'app_events_total 4000' in registry.render_prometheus()
+    registry.reset()
+    assert 'app_events_total 0' in registry.render_prometheus()
+
+
+def test_registration_is_checked(registry):
+    assert registry.counter('app_total', 'Total') is registry.counter('app_total', 'Total')
+    with pytest.raises(ValueError):
+        registry.gauge('app_total', 'Total')
+    with pytest.raises(ValueError):
+        registry.counter('app_labelled_total', 'Labelled', ('a', 'b')).labels('only-one')
+    with pytest.raises(ValueError):
+        registry.counter('app_total', 'Total').inc(-1)
+
+
+def test_failure_messages_map_to_reasons():
+    assert failure_reason(Exception("Insufficient funds")) == 'insufficient_balance'
+    assert failure_reason("Recipient account not found") == 'recipient_not_found'
+    assert failure_reason("something else") == 'error'
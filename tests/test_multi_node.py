@@ -0,0 +1,82 @@
+# banking_app/tests/test_multi_node.py
+"""
+Cross-shard transfer and loan approval against real MySQL shards
+Needs at least two servers named in DB_SHARDS, e.g. the containers from
+
+    python -m benchmarks.mysql_server --shards 2
+
+with the DB_USER/DB_PASSWORD/DB_SHARDS it prints exported. Skipped otherwise.
+"""
+
+import os
+import random
+import pytest
+
+pytest.importorskip('mysql.connector')
+if len([entry for entry in os.getenv('DB_SHARDS', '').split(',') if entry.strip()]) < 2:
+    pytest.skip("DB_SHARDS does not name two or more shards", allow_module_level=True)
+
+from db.shard_router import ShardRouter
+from transactions.transaction_service import TransactionService
+from transactions.transfer_saga import TransferSagaLog
+from loans.loan_service import LoanService
+
+
+@pytest.fixture
+def router():
+    database = ShardRouter.from_settings()
+    if not database.connect():
+        pytest.skip("The shards in DB_SHARDS are not reachable")
+    yield database
+    database.disconnect()
+
+
+@pytest.fixture
+def accounts(router):
+    """Two new approved accounts on different shards, removed afterwards"""
+    created = {}
+    while len(created) < 2:
+        account_number = f"{random.randint(2000000000, 9999999999)}"
+        index = router.shard_index(account_number)
+        if index in (0, 1) and index not in created:
+            created[index] = account_number
+    for account_number in created.values():
+        with router.routed(account_number):
+            assert router.execute_query("""
+                INSERT INTO accounts (account_number, name, hashed_pin, balance, is_approved)
+                VALUES (%s, 'Shard test', 'x', 100.00, 1)
+            """, (account_number,))
+    yield created[0], created[1]
+    for account_number in created.values():
+        with router.routed(account_number):
+            for table in ('transactions', 'loans', 'loan_applications', 'accounts'):
+                router.execute_query(f"DELETE FROM {table} WHERE account_number = %s", (account_number,))
+
+
+def balance(router: ShardRouter, account_number: str) -> float:
+    with router.routed(account_number):
+        return float(router.fetch_one("SELECT balance FROM accounts WHERE account_number = %s",
+                                      (account_number,))['balance'])
+
+
+def test_cross_shard_transfer_completes_on_both_shards(router, accounts):
+    sender, recipient = accounts
+    service = TransactionService(router)
+    assert service.transfer(sender, recipient, 25) is True
+    assert balance(router, sender) == 75.0
+    assert balance(router, recipient) == 125.0
+    with router.routed(sender):
+        saga = router.fetch_one("""
+            SELECT status FROM transfer_sagas WHERE from_account = %s AND to_account = %s
+        """, (sender, recipient))
+    assert saga['status'] == 'completed'
+    assert not [pending for pending in TransferSagaLog(router).pending(older_than=0)
+                if pending['from_account'] == sender]
+
+
+def test_loan_approval_routes_by_the_applicant(router, accounts):
+    service = LoanService(router)
+    for account_number in accounts:
+        application_id = service.apply_for_loan(account_number, 1000, 'Shard test', 5000, 'employed')
+        assert service.approve_application(application_id, account_number, 5.0, 12) is True
+        assert balance(router, account_number) == 1100.0
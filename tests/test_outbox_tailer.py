@@ -0,0 +1,61 @@
+# banking_app/tests/test_outbox_tailer.py
+"""Outbox tailer: contiguous ids, interleaved shard ids and waiting at a gap"""
+
+import pytest
+from fake_database import FakeDatabase
+from config.settings import Settings
+from events.outbox_service import OutboxTailer
+
+
+@pytest.fixture
+def tailer():
+    node = FakeDatabase('shard-0')
+    tailer = OutboxTailer(node, 'test', durable=False)
+    tailer.position = 0
+    return node, tailer
+
+
+def ids(events):
+    return [event['id'] for event in events]
+
+
+def test_reads_contiguous_ids(tailer):
+    node, tailer = tailer
+    for event_id in (1, 2, 3):
+        node.add_event(event_id)
+    assert ids(tailer.poll()) == [1, 2, 3]
+
+
+def test_steps_by_the_node_auto_increment_increment(tailer):
+    node, tailer = tailer
+    # The second of three shards: ids 2, 5, 8, ...
+    node.auto_increment_increment = 3
+    for event_id in (2, 5, 8):
+        node.add_event(event_id)
+    events = tailer.poll()
+    assert ids(events) == [2, 5, 8]
+    tailer.ack(events)
+
+    # A missing id one step on is still a gap
+    node.add_event(14)
+    assert tailer.poll() == []
+    node.add_event(11)
+    assert ids(tailer.poll()) == [11, 14]
+
+
+def test_waits_at_a_gap_until_it_is_old_enough(tailer, monkeypatch):
+    node, tailer = tailer
+    monkeypatch.setattr(Settings, 'OUTBOX_GAP_WAIT_SECONDS', 5)
+    node.add_event(1)
+    node.add_event(3, age_seconds=1)
+    node.add_event(4, age_seconds=1)
+    # Id 2 may still commit: stop before 3
+    events = tailer.poll()
+    assert ids(events) == [1]
+    tailer.ack(events)
+    assert tailer.poll() == []
+
+    # Past the wait, 2 is taken to have rolled back
+    for event in node.state['outbox_events']:
+        event['age_seconds'] = 6
+    assert ids(tailer.poll()) == [3, 4]
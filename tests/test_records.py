@@ -0,0 +1,35 @@
+# banking_app/tests/test_records.py
+"""Compact records: dict-style access, converters applied on read and derived fields"""
+
+from decimal import Decimal
+import pytest
+from db.records import record_type, optional_float, TransactionRecord
+
+LoanRow = record_type('LoanRow', ('id', 'amount', 'rate'), derived={'label': lambda row: f"#{row['id']}"},
+                      amount=float, rate=optional_float)
+
+
+def test_values_convert_on_read_and_stay_raw_underneath():
+    row = LoanRow(7, Decimal('1500.50'), None)
+    assert row['amount'] == 1500.5 and isinstance(row['amount'], float)
+    assert row.amount == 1500.5
+    assert tuple.__getitem__(row, 1) == Decimal('1500.50')
+    assert row['rate'] is None and LoanRow(7, 0, Decimal('0')).rate is None
+
+
+def test_dict_style_access():
+    row = LoanRow(7, Decimal('10'), Decimal('5.5'))
+    assert 'amount' in row and 'label' in row and 'missing' not in row
+    assert row.get('missing', 'default') == 'default'
+    assert row['label'] == '#7'
+    assert row.keys() == ['id', 'amount', 'rate', 'label']
+    assert row.to_dict() == {'id': 7, 'amount': 10.0, 'rate': 5.5, 'label': '#7'}
+    with pytest.raises(KeyError):
+        row['missing']
+
+
+def test_records_are_still_tuples():
+    row = TransactionRecord(1, 'deposit', Decimal('25.00'), None)
+    assert row[1] == 'deposit' and len(row) == 4
+    assert row._replace(amount=Decimal('30'))['amount'] == 30.0
+    assert TransactionRecord._make((2, 'withdrawal', '5', None))['amount'] == 5.0
@@ -0,0 +1,72 @@
+# banking_app/tests/test_retry.py
+"""Retry policy: which failures are retried, how often, and the backoff ceiling"""
+
+import pytest
+from db import retry as retry_module
+from db.errors import TransientDatabaseError, DEADLOCK
+from db.retry import RetryPolicy
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(retry_module.time, 'sleep', slept.append)
+    return slept
+
+
+def deadlock(rolled_back: bool = True) -> TransientDatabaseError:
+    error = TransientDatabaseError("Deadlock found when trying to get lock", DEADLOCK)
+    error.rolled_back = rolled_back
+    return error
+
+
+def failing(times: int, rolled_back: bool = True):
+    calls = []
+
+    def unit_of_work():
+        calls.append(1)
+        if len(calls) <= times:
+            raise deadlock(rolled_back)
+        return 'done'
+    return unit_of_work, calls
+
+
+def test_retries_a_rolled_back_unit_until_it_succeeds(sleeps):
+    func, calls = failing(2)
+    assert RetryPolicy(max_attempts=3, base_delay_ms=10, max_delay_ms=100).call(func) == 'done'
+    assert len(calls) == 3 and len(sleeps) == 2
+
+
+def test_gives_up_after_the_last_attempt(sleeps):
+    func, calls = failing(5)
+    with pytest.raises(TransientDatabaseError):
+        RetryPolicy(max_attempts=3, base_delay_ms=10, max_delay_ms=100).call(func)
+    assert len(calls) == 3 and len(sleeps) == 2
+
+
+def test_error_inside_an_open_unit_is_left_to_its_owner(sleeps):
+    func, calls = failing(1, rolled_back=False)
+    with pytest.raises(TransientDatabaseError):
+        RetryPolicy(max_attempts=3).call(func)
+    assert len(calls) == 1 and sleeps == []
+
+
+def test_other_errors_are_not_retried(sleeps):
+    calls = []
+
+    def unit_of_work():
+        calls.append(1)
+        raise ValueError("Insufficient funds")
+    with pytest.raises(ValueError):
+        RetryPolicy(max_attempts=3).call(unit_of_work)
+    assert len(calls) == 1 and sleeps == []
+
+
+def test_backoff_doubles_up_to_the_maximum():
+    policy = RetryPolicy(max_attempts=5, base_delay_ms=10, max_delay_ms=40)
+    for attempt, ceiling in ((1, 0.01), (2, 0.02), (3, 0.04), (4, 0.04)):
+        assert all(0 <= policy.backoff(attempt) <= ceiling for _ in range(50))
+
+
+def test_at_least_one_attempt():
+    assert RetryPolicy(max_attempts=0).max_attempts == 1
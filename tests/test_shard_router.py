@@ -0,0 +1,130 @@
+# banking_app/tests/test_shard_router.py
+"""Shard router: the hash ring, account routing, route_by and gather"""
+
+import threading
+import contextvars
+from collections import Counter
+import pytest
+from fake_database import FakeDatabase
+from db.shard_router import ShardRouter, route_by
+
+ACCOUNTS = [f"{number:010d}" for number in range(1000000001, 1000000001 + 3000 * 7919, 7919)]
+
+
+def make_router(count: int = 3) -> ShardRouter:
+    return ShardRouter([FakeDatabase(f"shard-{index}") for index in range(count)], virtual_nodes=64)
+
+
+def accounts_on(router: ShardRouter, index: int):
+    return [account for account in ACCOUNTS if router.shard_index(account) == index]
+
+
+def test_ring_spreads_accounts_over_every_shard():
+    router = make_router(3)
+    counts = Counter(router.shard_index(account) for account in ACCOUNTS)
+    assert set(counts) == {0, 1, 2}
+    for count in counts.values():
+        assert 0.2 < count / len(ACCOUNTS) < 0.47
+
+
+def test_ring_is_deterministic_across_routers():
+    first, second = make_router(3), make_router(3)
+    assert [first.shard_index(account) for account in ACCOUNTS] == \
+           [second.shard_index(account) for account in ACCOUNTS]
+
+
+def test_appending_a_shard_only_moves_accounts_to_it():
+    before, after = make_router(3), make_router(4)
+    moved = [account for account in ACCOUNTS if before.shard_index(account) != after.shard_index(account)]
+    assert moved
+    assert all(after.shard_index(account) == 3 for account in moved)
+    assert len(moved) / len(ACCOUNTS) < 0.4
+
+
+def test_for_account_and_routed_pin_the_owning_shard():
+    router = make_router(2)
+    first, second = accounts_on(router, 0)[0], accounts_on(router, 1)[0]
+    assert router.for_account(first) is router.nodes[0]
+    assert router.for_account(second) is router.nodes[1]
+
+    assert router.node is router.nodes[0]
+    with router.routed(second):
+        assert router.node is router.nodes[1]
+        with router.routed(first):
+            assert router.node is router.nodes[0]
+        assert router.node is router.nodes[1]
+    assert router.node is router.nodes[0]
+
+
+def test_routed_pin_is_per_thread():
+    router = make_router(2)
+    second = accounts_on(router, 1)[0]
+    seen = []
+    with router.routed(second):
+        thread = threading.Thread(target=lambda: seen.append(router.node))
+        thread.start()
+        thread.join()
+    assert seen == [router.nodes[0]]
+
+
+class _Service:
+    def __init__(self, database):
+        self.db = database
+
+    @route_by()
+    def owner(self, account_number: str, note: str = ''):
+        return self.db.node
+
+    @route_by('to_account')
+    def recipient_owner(self, from_account: str, to_account: str):
+        return self.db.node
+
+
+def test_route_by_resolves_positional_and_keyword_arguments():
+    router = make_router(2)
+    service = _Service(router)
+    first, second = accounts_on(router, 0)[0], accounts_on(router, 1)[0]
+    assert service.owner(second) is router.nodes[1]
+    assert service.owner(account_number=second, note='x') is router.nodes[1]
+    assert service.recipient_owner(second, first) is router.nodes[0]
+    assert service.recipient_owner(first, to_account=second) is router.nodes[1]
+    # The pin ends with the call
+    assert router.node is router.nodes[0]
+
+
+def test_route_by_rejects_an_unknown_argument():
+    with pytest.raises(ValueError):
+        class _Broken:
+            @route_by('missing')
+            def method(self, account_number):
+                pass
+
+
+def test_gather_concatenates_in_shard_order_off_the_calling_thread():
+    router = make_router(3)
+    for index in range(3):
+        router.nodes[index].add_account(accounts_on(router, index)[0])
+    rows = router.gather(lambda: router.fetch_all("SELECT account_number FROM accounts"))
+    assert [row['account_number'] for row in rows] == [accounts_on(router, index)[0] for index in range(3)]
+    assert all(node.threads and threading.get_ident() not in node.threads for node in router.nodes)
+
+
+def test_gather_workers_see_the_caller_context():
+    router = make_router(3)
+    request = contextvars.ContextVar('request', default=None)
+    request.set('r-1')
+    assert router.gather(lambda: [request.get()]) == ['r-1', 'r-1', 'r-1']
+
+
+def test_gather_limited_to_owning_shards():
+    router = make_router(3)
+    owned = accounts_on(router, 2)[0]
+    visited = router.gather(lambda: [router.node], account_numbers=[owned])
+    assert visited == [router.nodes[2]]
+    assert router.gather(lambda: [router.node], account_numbers=[]) == []
+
+
+def test_gather_cannot_be_nested():
+    router = make_router(2)
+    with pytest.raises(RuntimeError):
+        router.gather(lambda: router.gather(lambda: []))
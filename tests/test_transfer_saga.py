@@ -0,0 +1,112 @@
+# banking_app/tests/test_transfer_saga.py
+"""Cross-shard transfers: credit once, compensation and recovery after a partial failure"""
+
+import pytest
+from fake_database import FakeDatabase
+from config.settings import Settings
+from db.shard_router import ShardRouter
+from transactions.transaction_service import TransactionService
+from transactions.transfer_saga import TransferPendingError
+
+ACCOUNTS = [f"{number:010d}" for number in range(2000000001, 2000000001 + 200 * 7919, 7919)]
+
+
+@pytest.fixture
+def bank(monkeypatch):
+    # Only the saga's own statements: no limits, outbox rows or velocity checks
+    for name in ('DAILY_WITHDRAWAL_LIMIT', 'ROLLING_WITHDRAWAL_LIMIT', 'DAILY_TRANSFER_LIMIT',
+                 'ROLLING_TRANSFER_LIMIT'):
+        monkeypatch.setattr(Settings, name, 0)
+    monkeypatch.setattr(Settings, 'OUTBOX_ENABLED', False)
+    router = ShardRouter([FakeDatabase('shard-0'), FakeDatabase('shard-1')], virtual_nodes=64)
+    sender = next(account for account in ACCOUNTS if router.shard_index(account) == 0)
+    neighbour = next(account for account in ACCOUNTS if router.shard_index(account) == 0 and account != sender)
+    recipient = next(account for account in ACCOUNTS if router.shard_index(account) == 1)
+    for account in (sender, neighbour, recipient):
+        router.for_account(account).add_account(account, 100.0)
+    service = TransactionService(router)
+    return router, service, sender, neighbour, recipient
+
+
+def sagas(router: ShardRouter):
+    return list(router.nodes[0].state['sagas'].values())
+
+
+def test_same_shard_transfer_does_not_start_a_saga(bank):
+    router, service, sender, neighbour, _ = bank
+    assert service.transfer(sender, neighbour, 10) is True
+    assert router.nodes[0].balance(sender) == 90.0
+    assert router.nodes[0].balance(neighbour) == 110.0
+    assert sagas(router) == []
+
+
+def test_cross_shard_transfer_credits_once(bank):
+    router, service, sender, _, recipient = bank
+    assert service.transfer(sender, recipient, 25) is True
+    assert router.nodes[0].balance(sender) == 75.0
+    assert router.nodes[1].balance(recipient) == 125.0
+    [saga] = sagas(router)
+    assert saga['status'] == 'completed'
+
+    # Replaying the credit step (as a recovery racing the original would) changes nothing
+    with router.routed(recipient):
+        assert service._saga_credit(saga['id'], sender, recipient, 25) is True
+    assert router.nodes[1].balance(recipient) == 125.0
+    assert service.recover_transfers(older_than=0) == {'completed': 0, 'compensated': 0, 'failed': 0}
+    assert [row for row in router.nodes[1].state['transactions'] if row[0] == recipient] == \
+           [(recipient, 'transfer_in', 25)]
+
+
+def test_missing_recipient_is_refused_before_the_debit(bank):
+    router, service, sender, _, _ = bank
+    missing = next(account for account in ACCOUNTS if router.shard_index(account) == 1
+                   and account not in router.nodes[1].state['accounts'])
+    with pytest.raises(Exception, match="Recipient account not found"):
+        service.transfer(sender, missing, 10)
+    assert router.nodes[0].balance(sender) == 100.0
+    assert sagas(router) == []
+
+
+def test_failed_credit_leaves_the_transfer_pending_until_recovered(bank):
+    router, service, sender, _, recipient = bank
+    router.nodes[1].failing_credits = 1
+    with pytest.raises(TransferPendingError) as pending:
+        service.transfer(sender, recipient, 30)
+    [saga] = sagas(router)
+    assert saga['id'] == pending.value.saga_id and saga['status'] == 'debited'
+    assert router.nodes[0].balance(sender) == 70.0
+    # The failed credit rolled back, claim included
+    assert router.nodes[1].balance(recipient) == 100.0
+    assert router.nodes[1].state['saga_credits'] == set()
+
+    assert service.recover_transfers(older_than=0) == {'completed': 1, 'compensated': 0, 'failed': 0}
+    assert router.nodes[1].balance(recipient) == 130.0
+    assert saga['status'] == 'completed'
+    assert service.recover_transfers(older_than=0) == {'completed': 0, 'compensated': 0, 'failed': 0}
+    assert router.nodes[1].balance(recipient) == 130.0
+
+
+def test_recovery_refunds_the_sender_when_the_recipient_is_gone(bank):
+    router, service, sender, _, recipient = bank
+    router.nodes[1].failing_credits = 1
+    with pytest.raises(TransferPendingError):
+        service.transfer(sender, recipient, 40)
+    del router.nodes[1].state['accounts'][recipient]
+
+    assert service.recover_transfers(older_than=0) == {'completed': 0, 'compensated': 1, 'failed': 0}
+    assert router.nodes[0].balance(sender) == 100.0
+    assert sagas(router)[0]['status'] == 'compensated'
+    assert router.nodes[0].state['transactions'][-1] == (sender, 'transfer_in', 40)
+    assert service.recover_transfers(older_than=0) == {'completed': 0, 'compensated': 0, 'failed': 0}
+    assert router.nodes[0].balance(sender) == 100.0
+
+
+def test_recovery_counts_a_saga_it_cannot_finish_yet(bank):
+    router, service, sender, _, recipient = bank
+    router.nodes[1].failing_credits = 2
+    with pytest.raises(TransferPendingError):
+        service.transfer(sender, recipient, 5)
+    assert service.recover_transfers(older_than=0) == {'completed': 0, 'compensated': 0, 'failed': 1}
+    assert sagas(router)[0]['status'] == 'debited'
+    assert service.recover_transfers(older_than=0) == {'completed': 1, 'compensated': 0, 'failed': 0}
+    assert router.nodes[1].balance(recipient) == 105.0
@@ -0,0 +1,103 @@
+# banking_app/tests/test_velocity_engine.py
+"""Velocity engine: sliding window buckets, LRU bounds and the block boundary"""
+
+import time
+import pytest
+
+pytest.importorskip('mysql.connector')
+
+from config.settings import Settings
+from fraud.velocity_engine import SlidingWindow, VelocityEngine, WINDOW_BUCKETS
+
+
+def test_window_sums_the_last_buckets():
+    window = SlidingWindow()
+    window.add(100, 10.0)
+    window.add(100, 5.0)
+    window.add(105, 1.0)
+    assert window.totals(105) == (3, 16.0)
+    # Not yet seen buckets of the future do not count
+    assert window.totals(99) == (0, 0.0)
+
+
+def test_window_buckets_expire():
+    window = SlidingWindow()
+    window.add(100, 10.0)
+    window.add(101, 1.0)
+    assert window.totals(100 + WINDOW_BUCKETS - 1) == (2, 11.0)
+    assert window.totals(100 + WINDOW_BUCKETS) == (1, 1.0)
+    assert window.totals(101 + WINDOW_BUCKETS) == (0, 0.0)
+
+
+def test_reused_bucket_starts_from_zero():
+    window = SlidingWindow()
+    window.add(100, 10.0)
+    window.add(100 + WINDOW_BUCKETS, 2.0)
+    assert window.totals(100 + WINDOW_BUCKETS) == (1, 2.0)
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setattr(Settings, 'VELOCITY_WINDOW_SECONDS', 600)
+    monkeypatch.setattr(Settings, 'VELOCITY_MAX_WITHDRAWALS', 10)
+    monkeypatch.setattr(Settings, 'VELOCITY_MAX_WITHDRAWAL_AMOUNT', 1000)
+    monkeypatch.setattr(Settings, 'VELOCITY_MAX_TRANSFERS', 10)
+    monkeypatch.setattr(Settings, 'VELOCITY_MAX_TRANSFER_AMOUNT', 1000)
+    monkeypatch.setattr(Settings, 'VELOCITY_MAX_NEW_RECIPIENTS', 2)
+    monkeypatch.setattr(Settings, 'VELOCITY_FLAG_SCORE', 80)
+    return VelocityEngine(max_accounts=3, max_pairs=2)
+
+
+def test_old_activity_leaves_the_window(engine):
+    engine.record_withdrawal('1000000001', 900, at=time.time() - 2 * Settings.VELOCITY_WINDOW_SECONDS)
+    check = engine.check_withdrawal('1000000001', 100)
+    assert check.score == 10 and not check.blocked
+
+
+def test_least_recently_used_account_is_evicted(engine):
+    for account_number in ('1000000001', '1000000002', '1000000003'):
+        engine.record_withdrawal(account_number, 500)
+    # Touching the oldest keeps it; the next new account evicts the second
+    engine.record_withdrawal('1000000001', 1)
+    engine.record_withdrawal('1000000004', 1)
+    assert list(engine._accounts) == ['1000000003', '1000000001', '1000000004']
+    assert engine.check_withdrawal('1000000002', 100).score == 10
+
+
+def test_least_recently_paid_pair_is_forgotten(engine):
+    engine.record_transfer('1000000001', '2000000001', 10)
+    engine.record_transfer('1000000001', '2000000002', 10)
+    engine.record_transfer('1000000001', '2000000003', 10)
+    assert list(engine._pairs) == [('1000000001', '2000000002'), ('1000000001', '2000000003')]
+
+
+def test_reaching_a_limit_flags_and_passing_it_blocks(engine):
+    for _ in range(9):
+        engine.record_withdrawal('1000000001', 10)
+    at_limit = engine.check_withdrawal('1000000001', 10)
+    assert at_limit.score == 100 and not at_limit.blocked and at_limit.reasons
+    engine.record_withdrawal('1000000001', 10)
+    over = engine.check_withdrawal('1000000001', 10)
+    assert over.score == 110 and over.blocked
+
+
+def test_amount_limit_boundary(engine):
+    engine.record_withdrawal('1000000001', 600)
+    assert not engine.check_withdrawal('1000000001', 400).blocked
+    assert engine.check_withdrawal('1000000001', 400.01).blocked
+    assert engine.check_withdrawal('1000000002', 700).score == 70
+    assert engine.check_withdrawal('1000000002', 700).reasons == []
+
+
+def test_only_new_recipients_count_against_the_new_recipient_limit(engine):
+    engine.record_transfer('1000000001', '2000000001', 10)
+    engine.record_transfer('1000000001', '2000000002', 10)
+    assert engine.check_transfer('1000000001', '2000000002', 10).score == 30
+    check = engine.check_transfer('1000000001', '2000000003', 10)
+    assert check.score == 150 and check.blocked
+
+
+def test_scores_skip_a_limit_set_to_zero(engine, monkeypatch):
+    monkeypatch.setattr(Settings, 'VELOCITY_MAX_WITHDRAWALS', 0)
+    engine.record_withdrawal('1000000001', 250)
+    assert [(entry['account_number'], entry['score']) for entry in engine.scores()] == [('1000000001', 25)]
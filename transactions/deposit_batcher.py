@@ -0,0 +1,193 @@
+# banking_app/transactions/deposit_batcher.py
+"""
+Deposit batcher
+Optional group-commit front end for deposits. Requests arriving within a
+few milliseconds of each other are written together: one balance UPDATE
+per batch (same-account deltas merged), one multi-row ledger INSERT and a
+single commit. Each caller blocks on a future that is resolved only after
+that commit, so a True result still means the deposit is durable. The
+batch commits on the batcher's own connection, so before the futures
+resolve it marks the application's Database as written: the caller's
+next replica read then waits for a replica that has the deposit.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+from db.database import Database
+from db.retry import RetryPolicy
+from db.accounts import balance_assignment
+from config.settings import Settings
+from transactions.hot_account_service import HotAccountService
+from events.outbox_service import OutboxService
+from monitoring.metrics import registry
+
+BATCH_SIZE = registry.histogram(
+    'irnvault_deposit_batch_size', 'Deposits written per group commit',
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500))
+
+_STOP = object()
+
+
+class DepositBatcher:
+    def __init__(self, database: Database = None, max_delay_ms: float = None, max_batch: int = None):
+        """database is the application's Database: the batcher writes on a clone and marks it written"""
+        self.session = database
+        self.max_delay = (Settings.DEPOSIT_BATCH_MAX_DELAY_MS if max_delay_ms is None else max_delay_ms) / 1000
+        self.max_batch = max(1, Settings.DEPOSIT_BATCH_MAX_SIZE if max_batch is None else max_batch)
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, account_number: str, amount: float) -> Future:
+        """Queue a deposit; the future resolves to True once its batch has committed"""
+        if amount <= 0:
+            raise ValueError("Deposit amount must be positive")
+        self._start()
+        future = Future()
+        self._queue.put((account_number, amount, future))
+        return future
+
+    def deposit(self, account_number: str, amount: float, timeout: float = 30) -> bool:
+        """Queue a deposit and wait for its batch to commit"""
+        return self.submit(account_number, amount).result(timeout)
+
+    def stop(self):
+        """Write whatever is still queued, then stop the worker"""
+        with self._lock:
+            worker, self._worker = self._worker, None
+        if worker:
+            self._queue.put(_STOP)
+            worker.join(timeout=10)
+
+    def _start(self):
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='deposit-batcher', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        # Database connections are not thread-safe, so the batcher writes on its own
+        writer = _BatchWriter(self.session.clone() if self.session is not None else Database(), self.session)
+        try:
+            stopping = False
+            while not stopping:
+                batch, stopping = self._collect()
+                if batch:
+                    writer.write(batch)
+        finally:
+            writer.db.disconnect()
+
+    def _collect(self) -> Tuple[List[tuple], bool]:
+        """Block for the first request, then gather more until the delay or size limit is hit"""
+        first = self._queue.get()
+        if first is _STOP:
+            return self._drain(), True
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch + self._drain(), True
+            batch.append(item)
+        return batch, False
+
+    def _drain(self) -> List[tuple]:
+        items = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return items
+            if item is not _STOP:
+                items.append(item)
+
+
+class _BatchWriter:
+    """Writes batches of deposits, each batch in one unit of work"""
+
+    def __init__(self, database: Database, session: Database = None):
+        self.db = database
+        # The Database whose callers' reads must see each committed batch
+        self.session = session
+        self.retry = RetryPolicy()
+        self.hot_accounts = HotAccountService(database)
+        self.outbox = OutboxService(database)
+
+    def write(self, batch: List[tuple]):
+        pending = [item for item in batch if item[2].set_running_or_notify_cancel()]
+        if not pending:
+            return
+        BATCH_SIZE.observe(len(pending))
+        try:
+            missing = self.retry.call(self._apply_batch, pending)
+        except Exception as e:
+            for _, _, future in pending:
+                future.set_exception(Exception(f"Deposit failed: {e}"))
+            return
+
+        # Only reached after the commit
+        if self.session is not None:
+            self.session.mark_written()
+        for account_number, _, future in pending:
+            if account_number in missing:
+                future.set_exception(Exception("Deposit failed: Account not found"))
+            else:
+                future.set_result(True)
+
+    def _apply_batch(self, batch: List[tuple]) -> set:
+        """Credit and record a batch of deposits; returns the accounts that do not exist"""
+        # Merged per account, credited in account order so concurrent batches lock rows in the same order
+        deltas: Dict[str, float] = {}
+        for account_number, amount, _ in batch:
+            deltas[account_number] = deltas.get(account_number, 0) + amount
+        accounts = sorted(deltas)
+
+        with self.db.unit_of_work():
+            # Not locked: the UPDATE below locks the rows it credits, and hot accounts must stay unlocked
+            placeholders = ', '.join(['%s'] * len(accounts))
+            found = self.db.fetch_all(f"""
+                SELECT account_number FROM accounts
+                WHERE account_number IN ({placeholders})
+            """, tuple(accounts))
+            existing = {row['account_number'] for row in found}
+            missing = set(accounts) - existing
+
+            plain = []
+            for account_number in accounts:
+                if account_number in missing:
+                    continue
+                # credit() is False when the account left hot mode since our list was loaded
+                if not (self.hot_accounts.is_hot(account_number)
+                        and self.hot_accounts.credit(account_number, deltas[account_number])):
+                    plain.append((account_number, deltas[account_number]))
+
+            if plain:
+                derived = ' UNION ALL '.join(['SELECT %s AS account_number, %s AS amount'] * len(plain))
+                if not self.db.execute_query(f"""
+                    UPDATE accounts a
+                    JOIN ({derived}) d ON a.account_number = d.account_number
+                    SET {balance_assignment('a.balance + d.amount', alias='a.')}
+                """, tuple(value for item in plain for value in item)):
+                    raise Exception("Failed to update balances")
+
+            # One ledger row and event per deposit, as if each had been posted on its own
+            posted = [(account_number, amount) for account_number, amount, _ in batch
+                      if account_number not in missing]
+            if not self.db.execute_many("""
+                INSERT INTO transactions (account_number, type, amount)
+                VALUES (%s, 'deposit', %s)
+            """, posted):
+                raise Exception("Failed to record transactions")
+            if posted:
+                self.outbox.record_many([('deposit', account_number, amount, {})
+                                         for account_number, amount in posted])
+        return missing
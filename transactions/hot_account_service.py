@@ -0,0 +1,320 @@
+# banking_app/transactions/hot_account_service.py
+"""
+Hot account service
+Opt-in split balances for accounts that receive a high rate of credits
+(e.g. a popular merchant). Credits to a hot account land in one of N
+balance slots chosen at random, so concurrent incoming payments lock
+different rows instead of queueing on the single accounts row.
+
+The spendable balance is accounts.balance plus the slots. Slots only ever
+hold credits, so a debit that fits in accounts.balance alone is always
+safe; otherwise the debit folds the slots back first. A background
+compactor folds all hot accounts periodically.
+
+The hot list is cached, so it can be stale: a credit only goes to a slot
+while the account's hot_accounts row still exists (checked in the same
+statement), and falls back to the accounts row otherwise. Services share
+one instance so they share one cache.
+"""
+
+import time
+import random
+import threading
+from typing import Dict, List, Any, Optional
+from db.database import Database
+from db.errors import DatabaseUnavailableError
+from db.retry import RetryPolicy
+from db.accounts import balance_assignment
+from db.shard_router import route_by
+from monitoring.tracing import trace_methods
+from config.settings import Settings
+
+
+@trace_methods
+class HotAccountService:
+    def __init__(self, database: Database):
+        self.db = database
+        self.retry = RetryPolicy()
+        # Hot account lists per shard (keyed by shard name; None when unsharded)
+        self._slots: Dict[Optional[str], Dict[str, int]] = {}
+        self._loaded_at: Dict[Optional[str], float] = {}
+        self._schema_present: Dict[Optional[str], bool] = {}
+        self._compactor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def on(self, database: Database) -> 'HotAccountService':
+        """The same service (and hot list cache) working through another connection"""
+        service = HotAccountService(database)
+        service._slots, service._loaded_at, service._schema_present = \
+            self._slots, self._loaded_at, self._schema_present
+        return service
+
+    def ensure_schema(self) -> bool:
+        """Create the hot account tables if they do not exist (DDL; never call inside a unit of work)"""
+        return (self.db.execute_query("""
+            CREATE TABLE IF NOT EXISTS hot_accounts (
+                account_number VARCHAR(10) NOT NULL PRIMARY KEY,
+                slots SMALLINT NOT NULL,
+                enabled_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB
+        """) and self.db.execute_query("""
+            CREATE TABLE IF NOT EXISTS account_balance_slots (
+                account_number VARCHAR(10) NOT NULL,
+                slot SMALLINT NOT NULL,
+                balance DECIMAL(15, 2) NOT NULL DEFAULT 0.00,
+                PRIMARY KEY (account_number, slot)
+            ) ENGINE=InnoDB
+        """))
+
+    def _hot(self) -> Dict[str, int]:
+        """The current shard's hot accounts and their slot counts, refreshed every HOT_ACCOUNT_REFRESH_SECONDS"""
+        shard = self.db.node.name
+        now = time.monotonic()
+        loaded_at = self._loaded_at.get(shard)
+        if loaded_at is not None and now - loaded_at < Settings.HOT_ACCOUNT_REFRESH_SECONDS:
+            return self._slots[shard]
+
+        # Checked through information_schema so installs that never opted in see no errors
+        exists = self.db.fetch_one("""
+            SELECT COUNT(*) as present
+            FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'hot_accounts'
+        """)
+        self._schema_present[shard] = bool(exists and exists['present'])
+        if self._schema_present[shard]:
+            rows = self.db.fetch_all("SELECT account_number, slots FROM hot_accounts")
+            self._slots[shard] = {row['account_number']: int(row['slots']) for row in rows}
+        else:
+            self._slots[shard] = {}
+        self._loaded_at[shard] = now
+        return self._slots[shard]
+
+    def is_hot(self, account_number: str) -> bool:
+        return account_number in self._hot()
+
+    def get_hot_accounts(self) -> List[Dict[str, Any]]:
+        """List hot accounts on every shard with their slot count and credits not yet folded in"""
+        def shard_accounts() -> List[Dict[str, Any]]:
+            pending = self.pending_credits_by_account()
+            return [{
+                'account_number': account_number,
+                'slots': slots,
+                'pending_credits': pending.get(account_number, 0.0)
+            } for account_number, slots in self._hot().items()]
+        return sorted(self.db.gather(shard_accounts), key=lambda account: account['account_number'])
+
+    @route_by()
+    def enable(self, account_number: str, slots: int = None) -> bool:
+        """Put an account in hot mode with the given number of balance slots"""
+        slots = slots or Settings.HOT_ACCOUNT_SLOTS
+        if slots < 1:
+            raise ValueError("A hot account needs at least one balance slot")
+        if not self.ensure_schema():
+            return False
+
+        with self.db.unit_of_work():
+            if not self.db.fetch_one("SELECT 1 FROM accounts WHERE account_number = %s", (account_number,)):
+                raise ValueError("Account not found")
+            if not self.db.execute_query("""
+                INSERT INTO hot_accounts (account_number, slots) VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE slots = VALUES(slots)
+            """, (account_number, slots)):
+                raise Exception("Failed to enable hot account")
+            if not self.db.execute_many("""
+                INSERT IGNORE INTO account_balance_slots (account_number, slot, balance)
+                VALUES (%s, %s, 0)
+            """, [(account_number, slot) for slot in range(slots)]):
+                raise Exception("Failed to create balance slots")
+
+        self._loaded_at.pop(self.db.node.name, None)
+        return True
+
+    @route_by()
+    def disable(self, account_number: str) -> bool:
+        """Fold the slots back into the account and leave hot mode"""
+        if not self.is_hot(account_number):
+            return False
+
+        with self.db.unit_of_work():
+            # Held until commit: credits check this row, so none can land in the slots being removed
+            if not self.db.fetch_one("SELECT slots FROM hot_accounts WHERE account_number = %s FOR UPDATE",
+                                     (account_number,)):
+                return False
+            self.fold(account_number)
+            if not self.db.execute_query("DELETE FROM account_balance_slots WHERE account_number = %s",
+                                         (account_number,)):
+                raise Exception("Failed to remove balance slots")
+            if not self.db.execute_query("DELETE FROM hot_accounts WHERE account_number = %s", (account_number,)):
+                raise Exception("Failed to disable hot account")
+
+        self._loaded_at.pop(self.db.node.name, None)
+        return True
+
+    def credit(self, account_number: str, amount: float) -> bool:
+        """
+        Add a credit to one randomly chosen balance slot if the account is
+        still hot; False when it is not (credit the accounts row instead).
+        Reading hot_accounts in the same statement share-locks its row, so a
+        concurrent disable() either waits for this credit or wins and makes it
+        match nothing.
+        """
+        rows = self.db.execute_update("""
+            INSERT INTO account_balance_slots (account_number, slot, balance)
+            SELECT account_number, MOD(%s, slots), %s
+            FROM hot_accounts
+            WHERE account_number = %s
+            ON DUPLICATE KEY UPDATE balance = balance + VALUES(balance)
+        """, (random.randrange(1 << 15), amount, account_number))
+        if rows is None:
+            raise Exception("Failed to credit balance slot")
+        if rows == 0:
+            # Our hot list was stale
+            self._loaded_at.pop(self.db.node.name, None)
+        return rows > 0
+
+    def pending_credits(self, account_number: str) -> float:
+        """Credits sitting in the balance slots (0 for normal accounts, without a query)"""
+        if not self.is_hot(account_number):
+            return 0.0
+        result = self.db.fetch_one("""
+            SELECT COALESCE(SUM(balance), 0) as pending
+            FROM account_balance_slots
+            WHERE account_number = %s
+        """, (account_number,))
+        return float(result['pending']) if result else 0.0
+
+    def pending_credits_by_account(self) -> Dict[str, float]:
+        """Slot credits for every hot account on the current shard (empty, without a query, when there are none)"""
+        if not self._hot():
+            return {}
+        rows = self.db.fetch_all("""
+            SELECT account_number, SUM(balance) as pending
+            FROM account_balance_slots
+            GROUP BY account_number
+        """)
+        return {row['account_number']: float(row['pending']) for row in rows}
+
+    def with_pending_credits(self, records: List[Any]) -> List[Any]:
+        """Add slot credits to the balance of account records (only hot accounts' records are rebuilt)"""
+        pending = self.pending_credits_by_account()
+        if not pending:
+            return records
+        return [record._replace(balance=float(record['balance']) + pending[record['account_number']])
+                if record['account_number'] in pending else record
+                for record in records]
+
+    def total_pending_credits(self) -> float:
+        """Slot credits not yet folded in, across every shard"""
+        return sum(self.db.gather(lambda: self.pending_credits_by_account().values()))
+
+    def fold(self, account_number: str) -> float:
+        """
+        Move slot credits into accounts.balance and return the amount moved
+        Joins the caller's unit of work when there is one. Locks the accounts
+        row before the slots so debits and the compactor take locks in the
+        same order.
+        """
+        # Not gated on the (possibly stale) hot list: slots are read under lock
+        self._hot()
+        if not self._schema_present[self.db.node.name]:
+            return 0.0
+        return self._fold(account_number)
+
+    def _fold(self, account_number: str) -> float:
+        with self.db.unit_of_work():
+            self.db.fetch_one("SELECT balance FROM accounts WHERE account_number = %s FOR UPDATE",
+                              (account_number,))
+            result = self.db.fetch_one("""
+                SELECT COALESCE(SUM(balance), 0) as pending
+                FROM account_balance_slots
+                WHERE account_number = %s
+                FOR UPDATE
+            """, (account_number,))
+            pending = float(result['pending']) if result else 0.0
+            if not pending:
+                return 0.0
+
+            if not self.db.execute_query(f"UPDATE accounts SET {balance_assignment('balance + %s')} "
+                                         "WHERE account_number = %s", (pending, account_number)):
+                raise Exception("Failed to fold balance slots")
+            if not self.db.execute_query("UPDATE account_balance_slots SET balance = 0 WHERE account_number = %s",
+                                         (account_number,)):
+                raise Exception("Failed to reset balance slots")
+        return pending
+
+    def compact(self) -> float:
+        """Fold every account with slot credits on every shard; returns the total moved"""
+        return sum(self.db.gather(lambda: [self._compact_shard()]))
+
+    def _compact_shard(self) -> float:
+        """Fold the current shard's accounts with slot credits, each in its own short unit of work
+
+        Works from the slots table rather than the hot list, so credits made by
+        another process just before an account left hot mode are folded too.
+        """
+        self._hot()
+        if not self._schema_present[self.db.node.name]:
+            return 0.0
+
+        rows = self.db.fetch_all("SELECT DISTINCT account_number FROM account_balance_slots WHERE balance <> 0")
+        moved = 0.0
+        for row in rows:
+            account_number = row['account_number']
+            try:
+                moved += self.retry.call(self._fold, account_number)
+            except Exception as e:
+                print(f"Hot account compaction error for {account_number}: {e}")
+        return moved
+
+    def start_compactor(self, interval: float = None):
+        """Compact hot accounts periodically from a daemon thread on its own connection"""
+        if self._compactor and self._compactor.is_alive():
+            return
+        interval = interval or Settings.HOT_ACCOUNT_COMPACTION_SECONDS
+        self._stop.clear()
+        self._compactor = threading.Thread(target=self._compaction_loop, args=(interval,),
+                                           name='hot-account-compactor', daemon=True)
+        self._compactor.start()
+
+    def stop_compactor(self):
+        self._stop.set()
+        if self._compactor:
+            self._compactor.join(timeout=5)
+            self._compactor = None
+
+    def _compaction_loop(self, interval: float):
+        # Database connections are not thread-safe, so the compactor never shares ours
+        worker = HotAccountService(self.db.clone())
+        try:
+            while not self._stop.wait(interval):
+                try:
+                    worker.compact()
+                except DatabaseUnavailableError:
+                    # Credits stay in their slots until the database is back
+                    continue
+        finally:
+            worker.db.disconnect()
+
+
+if __name__ == "__main__":
+    import argparse
+    from db.shard_router import open_database
+
+    parser = argparse.ArgumentParser(description="Hot account split balances")
+    parser.add_argument('command', choices=['enable', 'disable', 'compact', 'list'])
+    parser.add_argument('account_number', nargs='?')
+    parser.add_argument('--slots', type=int, default=None)
+    args = parser.parse_args()
+
+    service = HotAccountService(open_database())
+    if args.command in ('enable', 'disable') and not args.account_number:
+        parser.error(f"{args.command} needs an account number")
+    if args.command == 'enable':
+        print("Enabled" if service.enable(args.account_number, args.slots) else "Failed")
+    elif args.command == 'disable':
+        print("Disabled" if service.disable(args.account_number) else "Not a hot account")
+    elif args.command == 'compact':
+        print(f"Folded ₱{service.compact():,.2f} of slot credits")
+    else:
+        for account in service.get_hot_accounts():
+            print(f"{account['account_number']}  slots={account['slots']}  pending=₱{account['pending_credits']:,.2f}")
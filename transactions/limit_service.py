@@ -0,0 +1,197 @@
+# banking_app/transactions/limit_service.py
+"""
+Limit service
+Per-account daily and rolling 24-hour limits by transaction type. Each
+posting adds its amount to an hourly counter row in the same unit of work,
+so usage is never computed by scanning the ledger: the current calendar
+day and the rolling window (the current hour and the 23 before it) are
+the sum of at most 24 counter rows, read with one primary-key range read.
+
+A small in-memory front keeps each account's recent counters so requests
+that are clearly over a limit are refused before a transaction is opened;
+the counter read inside the unit of work stays the authority, as other
+processes post to the same accounts.
+"""
+
+import time
+import datetime
+import threading
+from collections import OrderedDict
+from typing import Dict, Tuple
+from db.database import Database
+from db.shard_router import route_by
+from config.settings import Settings
+from monitoring.tracing import trace_methods
+
+ROLLING_HOURS = 24
+
+
+def _limits(kind: str) -> Tuple[float, float]:
+    """(daily, rolling 24h) limits for a counted type; 0 means no limit"""
+    return {
+        'withdrawal': (Settings.DAILY_WITHDRAWAL_LIMIT, Settings.ROLLING_WITHDRAWAL_LIMIT),
+        'transfer_out': (Settings.DAILY_TRANSFER_LIMIT, Settings.ROLLING_TRANSFER_LIMIT)
+    }.get(kind, (0, 0))
+
+
+@trace_methods
+class LimitService:
+    def __init__(self, database: Database):
+        self.db = database
+        self._schema_ready = False
+        # (account_number, kind) -> (loaded at, {hour: total}) for recently active accounts
+        self._front: "OrderedDict[Tuple[str, str], Tuple[float, Dict[datetime.datetime, float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def ensure_schema(self) -> bool:
+        """Create the counter table on every shard if needed (DDL; never call inside a unit of work)"""
+        if not self._schema_ready:
+            self._schema_ready = all([node.execute_query("""
+                CREATE TABLE IF NOT EXISTS transaction_limit_counters (
+                    account_number VARCHAR(10) NOT NULL,
+                    kind VARCHAR(16) NOT NULL,
+                    bucket_start DATETIME NOT NULL,
+                    total_amount DECIMAL(17, 2) NOT NULL,
+                    tx_count INT UNSIGNED NOT NULL,
+                    PRIMARY KEY (account_number, kind, bucket_start)
+                ) ENGINE=InnoDB
+            """) for node in self.db.shards])
+        return self._schema_ready
+
+    def enforced(self, kind: str) -> bool:
+        return any(_limits(kind))
+
+    def check(self, account_number: str, kind: str, amount: float):
+        """
+        Refuse a posting that would exceed a limit, judged from the in-memory
+        front. Called before the posting's unit of work opens, so it also
+        creates the counter table on first use.
+        """
+        if not self.enforced(kind):
+            return
+        if not self.ensure_schema():
+            raise Exception("Transaction limits are unavailable")
+        now = self._now()
+        with self._lock:
+            cached = self._front.get((account_number, kind))
+            fresh = cached and time.monotonic() - cached[0] < Settings.LIMIT_CACHE_SECONDS
+            buckets = dict(cached[1]) if fresh else None
+        if buckets is None:
+            buckets = self._read(account_number, kind, now)
+            self._remember(account_number, kind, buckets)
+        self._enforce(kind, buckets, amount, now)
+
+    def record(self, account_number: str, kind: str, amount: float):
+        """
+        Add a posting to its hourly counter inside the caller's unit of work
+        and refuse it if the account is now over a limit (rolling the unit
+        back). The counter row lock serialises concurrent postings for the
+        same account and type until commit.
+        """
+        if not self.enforced(kind):
+            return
+        now = self._now()
+        if self.db.execute_update("""
+            INSERT INTO transaction_limit_counters (account_number, kind, bucket_start, total_amount, tx_count)
+            VALUES (%s, %s, %s, %s, 1)
+            ON DUPLICATE KEY UPDATE total_amount = total_amount + VALUES(total_amount), tx_count = tx_count + 1
+        """, (account_number, kind, self._hour(now), amount)) is None:
+            raise Exception("Failed to update limit counters")
+        buckets = self._read(account_number, kind, now, lock=True)
+        before = dict(buckets)
+        before[self._hour(now)] = before.get(self._hour(now), 0) - amount
+        self._enforce(kind, before, amount, now)
+        self.db.on_commit(lambda: self._remember(account_number, kind, buckets))
+
+    @route_by()
+    def get_usage(self, account_number: str, kind: str) -> Dict[str, float]:
+        """Amounts used and limits for today and the rolling window"""
+        now = self._now()
+        buckets = self._read(account_number, kind, now)
+        daily_limit, rolling_limit = _limits(kind)
+        used_today, used_rolling = self._totals(buckets, now)
+        return {'used_today': used_today, 'daily_limit': daily_limit,
+                'used_rolling': used_rolling, 'rolling_limit': rolling_limit}
+
+    def purge_expired(self, batch_size: int = 1000) -> int:
+        """Delete counters that have left every window, in small batches"""
+        purged = 0
+        while True:
+            deleted = self.db.execute_update("""
+                DELETE FROM transaction_limit_counters
+                WHERE bucket_start < NOW() - INTERVAL 2 DAY
+                LIMIT %s
+            """, (batch_size,))
+            if not deleted:
+                return purged
+            purged += deleted
+            if deleted < batch_size:
+                return purged
+
+    def _read(self, account_number: str, kind: str, now: datetime.datetime,
+              lock: bool = False) -> Dict[datetime.datetime, float]:
+        """The account's counters for the rolling window (one primary-key range read)"""
+        rows = self.db.fetch_all(f"""
+            SELECT bucket_start, total_amount
+            FROM transaction_limit_counters
+            WHERE account_number = %s AND kind = %s AND bucket_start > %s
+            {'FOR UPDATE' if lock else ''}
+        """, (account_number, kind, self._hour(now) - datetime.timedelta(hours=ROLLING_HOURS)))
+        return {row['bucket_start']: float(row['total_amount']) for row in rows}
+
+    def _enforce(self, kind: str, buckets: Dict[datetime.datetime, float], amount: float, now: datetime.datetime):
+        daily_limit, rolling_limit = _limits(kind)
+        used_today, used_rolling = self._totals(buckets, now)
+        label = kind.split('_')[0]
+        if daily_limit and used_today + amount > daily_limit:
+            raise Exception(f"Amount exceeds the daily {label} limit "
+                            f"(₱{used_today:,.2f} of ₱{daily_limit:,.2f} used today)")
+        if rolling_limit and used_rolling + amount > rolling_limit:
+            raise Exception(f"Amount exceeds the 24-hour {label} limit "
+                            f"(₱{used_rolling:,.2f} of ₱{rolling_limit:,.2f} used)")
+
+    def _totals(self, buckets: Dict[datetime.datetime, float], now: datetime.datetime) -> Tuple[float, float]:
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        window_start = self._hour(now) - datetime.timedelta(hours=ROLLING_HOURS - 1)
+        used_today = sum(total for hour, total in buckets.items() if hour >= midnight)
+        used_rolling = sum(total for hour, total in buckets.items() if hour >= window_start)
+        return used_today, used_rolling
+
+    def _remember(self, account_number: str, kind: str, buckets: Dict[datetime.datetime, float]):
+        with self._lock:
+            self._front[(account_number, kind)] = (time.monotonic(), buckets)
+            self._front.move_to_end((account_number, kind))
+            while len(self._front) > Settings.LIMIT_CACHE_ACCOUNTS:
+                self._front.popitem(last=False)
+
+    @staticmethod
+    def _hour(moment: datetime.datetime) -> datetime.datetime:
+        return moment.replace(minute=0, second=0, microsecond=0)
+
+    @staticmethod
+    def _now() -> datetime.datetime:
+        return datetime.datetime.now()
+
+
+if __name__ == "__main__":
+    import argparse
+    from db.shard_router import open_database
+
+    parser = argparse.ArgumentParser(description="Transaction limit counters")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    usage_parser = subparsers.add_parser('usage', help="show an account's usage against its limits")
+    usage_parser.add_argument('account_number')
+    purge_parser = subparsers.add_parser('purge', help="delete counters older than every window")
+    purge_parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    db = open_database()
+    service = LimitService(db)
+    if args.command == 'usage':
+        for kind in ('withdrawal', 'transfer_out'):
+            usage = service.get_usage(args.account_number, kind)
+            print(f"{kind:<13} today ₱{usage['used_today']:,.2f} / ₱{usage['daily_limit']:,.2f}   "
+                  f"24h ₱{usage['used_rolling']:,.2f} / ₱{usage['rolling_limit']:,.2f}")
+    else:
+        purged = sum(db.gather(lambda: [service.purge_expired(args.batch_size)]))
+        print(f"Purged {purged} expired limit counters")
@@ -4,31 +4,70 @@ Transaction service
 Handles all banking transactions (deposit, withdrawal, transfer)
 """
 
-from typing import Dict, Any, List
+import uuid
+import logging
+import threading
+from typing import Dict, Any, List, Optional
 from decimal import Decimal
 from db.database import Database
+from db.accounts import balance_assignment
+from db.retry import RetryPolicy
+from db.idempotency import IdempotencyStore
+from db.shard_router import route_by
+from db.errors import DatabaseUnavailableError
+from config.settings import Settings
+from transactions.hot_account_service import HotAccountService
+from transactions.limit_service import LimitService
+from transactions.transfer_saga import TransferSagaLog, TransferPendingError
+from events.outbox_service import OutboxService
+from monitoring.metrics import track_operation
+from monitoring.tracing import trace_methods
 
+@trace_methods
 class TransactionService:
-    def __init__(self, database: Database):
+    def __init__(self, database: Database, deposit_batcher: Optional[Any] = None, velocity: Optional[Any] = None,
+                 hot_accounts: Optional[HotAccountService] = None):
         self.db = database
+        self.retry = RetryPolicy()
+        self.hot_accounts = hot_accounts or HotAccountService(database)
+        self.idempotency = IdempotencyStore(database)
+        self.outbox = OutboxService(database)
+        self.limits = LimitService(database)
+        self.sagas = TransferSagaLog(database)
+        # Optional DepositBatcher: deposits are group-committed on its own connection
+        self.deposit_batcher = deposit_batcher
+        # Optional VelocityEngine: withdrawals and transfers are screened before posting
+        self.velocity = velocity
+        self._recovery: Optional[threading.Thread] = None
+        self._stop = threading.Event()
 
-    def deposit(self, account_number: str, amount: float) -> bool:
-        """Process deposit transaction"""
+    @track_operation('deposit')
+    def deposit(self, account_number: str, amount: float, idempotency_key: str = None) -> bool:
+        """Process deposit transaction (a repeated idempotency_key returns the original result)"""
         if amount <= 0:
             raise ValueError("Deposit amount must be positive")
         
+        # Keyed deposits bypass the batcher so the key commits with its own posting
+        if self.deposit_batcher is not None and not idempotency_key:
+            return self.deposit_batcher.deposit(account_number, amount)
+        
         try:
-            self.db.begin_transaction()
-            
+            with self.db.routed(account_number):
+                self._prepare_idempotency(idempotency_key)
+                return self.retry.call(self._apply_deposit, account_number, amount, idempotency_key)
+        except Exception as e:
+            raise Exception(f"Deposit failed: {str(e)}")
+
+    def _apply_deposit(self, account_number: str, amount: float, idempotency_key: str = None) -> bool:
+        """Apply a deposit in one unit of work (re-run by the retry policy on deadlock)"""
+        with self.db.unit_of_work():
+            if idempotency_key and self.idempotency.seen(idempotency_key, 'deposit', account_number, amount):
+                return True
+        
             # Update account balance
-            query = """
-                UPDATE accounts 
-                SET balance = balance + %s 
-                WHERE account_number = %s
-            """
-            if not self.db.execute_query(query, (amount, account_number)):
-                raise Exception("Failed to update balance")
-            
+            if not self._credit(account_number, amount):
+                raise Exception("Account not found")
+        
             # Record transaction
             query = """
                 INSERT INTO transactions (account_number, type, amount) 
@@ -36,42 +75,39 @@ class TransactionService:
             """
             if not self.db.execute_query(query, (account_number, 'deposit', amount)):
                 raise Exception("Failed to record transaction")
-            
-            self.db.commit_transaction()
-            return True
-            
-        except Exception as e:
-            self.db.rollback_transaction()
-            raise Exception(f"Deposit failed: {str(e)}")
+            self.outbox.record('deposit', account_number, amount)
+        return True
 
-    def withdraw(self, account_number: str, amount: float) -> bool:
-        """Process withdrawal transaction"""
+    @track_operation('withdrawal')
+    def withdraw(self, account_number: str, amount: float, idempotency_key: str = None) -> bool:
+        """Process withdrawal transaction (a repeated idempotency_key returns the original result)"""
         if amount <= 0:
             raise ValueError("Withdrawal amount must be positive")
         
         try:
-            self.db.begin_transaction()
-            
-            # Check current balance
-            query = "SELECT balance FROM accounts WHERE account_number = %s"
-            result = self.db.fetch_one(query, (account_number,))
-            
-            if not result:
-                raise Exception("Account not found")
-            
-            current_balance = float(result['balance'])
-            if current_balance < amount:
-                raise Exception("Insufficient balance")
-            
-            # Update account balance
-            query = """
-                UPDATE accounts 
-                SET balance = balance - %s 
-                WHERE account_number = %s
-            """
-            if not self.db.execute_query(query, (amount, account_number)):
-                raise Exception("Failed to update balance")
-            
+            with self.db.routed(account_number):
+                self._prepare_idempotency(idempotency_key)
+                # A retry of a committed request succeeds again, whatever its first posting did to the limits
+                if idempotency_key and self.idempotency.committed(idempotency_key, 'withdrawal',
+                                                                  account_number, amount):
+                    return True
+                if self.velocity is not None:
+                    self._screen(self.velocity.check_withdrawal(account_number, amount))
+                self.limits.check(account_number, 'withdrawal', amount)
+                return self.retry.call(self._apply_withdrawal, account_number, amount, idempotency_key)
+        except Exception as e:
+            raise Exception(f"Withdrawal failed: {str(e)}")
+
+    def _apply_withdrawal(self, account_number: str, amount: float, idempotency_key: str = None) -> bool:
+        """Apply a withdrawal in one unit of work (re-run by the retry policy on deadlock)"""
+        with self.db.unit_of_work():
+            if idempotency_key and self.idempotency.seen(idempotency_key, 'withdrawal', account_number, amount):
+                return True
+        
+            # Update account balance if it covers the amount
+            self._debit(account_number, amount, "Account not found")
+            self.limits.record(account_number, 'withdrawal', amount)
+        
             # Record transaction
             query = """
                 INSERT INTO transactions (account_number, type, amount) 
@@ -79,16 +115,14 @@ class TransactionService:
             """
             if not self.db.execute_query(query, (account_number, 'withdrawal', amount)):
                 raise Exception("Failed to record transaction")
-            
-            self.db.commit_transaction()
-            return True
-            
-        except Exception as e:
-            self.db.rollback_transaction()
-            raise Exception(f"Withdrawal failed: {str(e)}")
+            self.outbox.record('withdrawal', account_number, amount)
+            if self.velocity is not None:
+                self.db.on_commit(lambda: self.velocity.record_withdrawal(account_number, amount))
+        return True
 
-    def transfer(self, from_account: str, to_account: str, amount: float) -> bool:
-        """Process transfer transaction"""
+    @track_operation('transfer')
+    def transfer(self, from_account: str, to_account: str, amount: float, idempotency_key: str = None) -> bool:
+        """Process transfer transaction (a repeated idempotency_key returns the original result)"""
         if amount <= 0:
             raise ValueError("Transfer amount must be positive")
         
@@ -96,42 +130,40 @@ class TransactionService:
             raise ValueError("Cannot transfer to the same account")
         
         try:
-            self.db.begin_transaction()
-            
-            # Check sender balance
-            query = "SELECT balance FROM accounts WHERE account_number = %s"
-            result = self.db.fetch_one(query, (from_account,))
-            
-            if not result:
-                raise Exception("Sender account not found")
-            
-            sender_balance = float(result['balance'])
-            if sender_balance < amount:
-                raise Exception("Insufficient balance")
-            
-            # Check recipient exists
-            query = "SELECT account_number FROM accounts WHERE account_number = %s"
-            if not self.db.fetch_one(query, (to_account,)):
+            with self.db.routed(from_account):
+                self._prepare_idempotency(idempotency_key)
+                # A retry of a committed request succeeds again, whatever its first posting did to the limits
+                if idempotency_key and self.idempotency.committed(idempotency_key, 'transfer',
+                                                                  from_account, to_account, amount):
+                    return True
+                if self.velocity is not None:
+                    self._screen(self.velocity.check_transfer(from_account, to_account, amount))
+                self.limits.check(from_account, 'transfer_out', amount)
+                if self.db.for_account(to_account) is not self.db.node:
+                    return self._transfer_across_shards(from_account, to_account, amount, idempotency_key)
+                return self.retry.call(self._apply_transfer, from_account, to_account, amount, idempotency_key)
+        except TransferPendingError:
+            # Not a failure: the money has left the sender and the recovery finishes the transfer
+            raise
+        except Exception as e:
+            raise Exception(f"Transfer failed: {str(e)}")
+
+    def _apply_transfer(self, from_account: str, to_account: str, amount: float,
+                        idempotency_key: str = None) -> bool:
+        """Apply a transfer in one unit of work (re-run by the retry policy on deadlock)"""
+        with self.db.unit_of_work():
+            if idempotency_key and self.idempotency.seen(idempotency_key, 'transfer',
+                                                         from_account, to_account, amount):
+                return True
+        
+            # Update sender balance if it covers the amount
+            self._debit(from_account, amount, "Sender account not found")
+            self.limits.record(from_account, 'transfer_out', amount)
+        
+            # Update recipient balance (rolls the debit back if the recipient is missing)
+            if not self._credit(to_account, amount):
                 raise Exception("Recipient account not found")
-            
-            # Update sender balance
-            query = """
-                UPDATE accounts 
-                SET balance = balance - %s 
-                WHERE account_number = %s
-            """
-            if not self.db.execute_query(query, (amount, from_account)):
-                raise Exception("Failed to update sender balance")
-            
-            # Update recipient balance
-            query = """
-                UPDATE accounts 
-                SET balance = balance + %s 
-                WHERE account_number = %s
-            """
-            if not self.db.execute_query(query, (amount, to_account)):
-                raise Exception("Failed to update recipient balance")
-            
+        
             # Record sender transaction
             query = """
                 INSERT INTO transactions (account_number, type, amount) 
@@ -139,18 +171,206 @@ class TransactionService:
             """
             if not self.db.execute_query(query, (from_account, 'transfer_out', amount)):
                 raise Exception("Failed to record sender transaction")
-            
+        
             # Record recipient transaction
             if not self.db.execute_query(query, (to_account, 'transfer_in', amount)):
                 raise Exception("Failed to record recipient transaction")
-            
-            self.db.commit_transaction()
+            self.outbox.record_many([
+                ('transfer_out', from_account, amount, {'counterparty': to_account}),
+                ('transfer_in', to_account, amount, {'counterparty': from_account})
+            ])
+            if self.velocity is not None:
+                self.db.on_commit(lambda: self.velocity.record_transfer(from_account, to_account, amount))
+        return True
+
+    def _transfer_across_shards(self, from_account: str, to_account: str, amount: float,
+                                idempotency_key: str = None) -> bool:
+        """
+        Transfer between accounts on different shards as a saga (see
+        transactions/transfer_saga.py): debit and log on the sender's shard,
+        then credit on the recipient's. Call routed to the sender's shard.
+        Raises TransferPendingError when the credit step fails after the debit.
+        """
+        if not self.sagas.ensure_schema():
+            raise Exception("Cross-shard transfers are unavailable")
+        # Checked up front so a mistyped account number is refused, not debited and refunded
+        with self.db.routed(to_account):
+            if not self.db.fetch_one("SELECT 1 FROM accounts WHERE account_number = %s", (to_account,)):
+                raise Exception("Recipient account not found")
+
+        saga_id = uuid.uuid4().hex
+        if not self.retry.call(self._saga_debit, saga_id, from_account, to_account, amount, idempotency_key):
             return True
-            
+        # The debit has committed: from here a failure leaves the saga for recover_transfers()
+        try:
+            status = self._finish_saga(saga_id, from_account, to_account, amount)
         except Exception as e:
-            self.db.rollback_transaction()
-            raise Exception(f"Transfer failed: {str(e)}")
+            logging.warning(f"Transfer saga {saga_id} left pending for recovery: {e}")
+            raise TransferPendingError(saga_id)
+        if status == 'compensated':
+            raise Exception("Recipient account not found; the amount was returned")
+        return True
+
+    def _saga_debit(self, saga_id: str, from_account: str, to_account: str, amount: float,
+                    idempotency_key: str = None) -> bool:
+        """Debit the sender and log the saga in one unit of work (False for a repeated key)"""
+        with self.db.unit_of_work():
+            if idempotency_key and self.idempotency.seen(idempotency_key, 'transfer',
+                                                         from_account, to_account, amount):
+                return False
+
+            self._debit(from_account, amount, "Sender account not found")
+            self.limits.record(from_account, 'transfer_out', amount)
+            if not self.db.execute_query("""
+                INSERT INTO transactions (account_number, type, amount)
+                VALUES (%s, %s, %s)
+            """, (from_account, 'transfer_out', amount)):
+                raise Exception("Failed to record sender transaction")
+            self.outbox.record('transfer_out', from_account, amount, counterparty=to_account, saga_id=saga_id)
+            self.sagas.begin(saga_id, from_account, to_account, amount)
+            if self.velocity is not None:
+                self.db.on_commit(lambda: self.velocity.record_transfer(from_account, to_account, amount))
+        return True
+
+    def _finish_saga(self, saga_id: str, from_account: str, to_account: str, amount: float) -> str:
+        """Credit a debited saga's recipient, or refund the sender if the recipient is gone; returns the status"""
+        with self.db.routed(to_account):
+            credited = self.retry.call(self._saga_credit, saga_id, from_account, to_account, amount)
+        with self.db.routed(from_account):
+            if credited:
+                self.sagas.mark(saga_id, 'completed')
+                return 'completed'
+            self.retry.call(self._saga_compensate, saga_id, from_account, to_account, amount)
+            return 'compensated'
+
+    def _saga_credit(self, saga_id: str, from_account: str, to_account: str, amount: float) -> bool:
+        """Credit the recipient once per saga (True if credited now or before, False if it no longer exists)"""
+        with self.db.unit_of_work():
+            if not self.db.fetch_one("SELECT 1 FROM accounts WHERE account_number = %s", (to_account,)):
+                return False
+            if not self.sagas.claim_credit(saga_id):
+                return True
+            if not self._credit(to_account, amount):
+                raise Exception("Recipient account not found")
+            if not self.db.execute_query("""
+                INSERT INTO transactions (account_number, type, amount)
+                VALUES (%s, %s, %s)
+            """, (to_account, 'transfer_in', amount)):
+                raise Exception("Failed to record recipient transaction")
+            self.outbox.record('transfer_in', to_account, amount, counterparty=from_account, saga_id=saga_id)
+        return True
+
+    def _saga_compensate(self, saga_id: str, from_account: str, to_account: str, amount: float):
+        """Refund the sender of a saga whose recipient is gone"""
+        with self.db.unit_of_work():
+            if not self.sagas.mark(saga_id, 'compensated'):
+                return
+            if not self._credit(from_account, amount):
+                raise Exception("Sender account not found")
+            if not self.db.execute_query("""
+                INSERT INTO transactions (account_number, type, amount)
+                VALUES (%s, %s, %s)
+            """, (from_account, 'transfer_in', amount)):
+                raise Exception("Failed to record refund transaction")
+            self.outbox.record('transfer_in', from_account, amount, counterparty=to_account, reversal_of=saga_id)
+
+    def recover_transfers(self, older_than: int = None) -> Dict[str, int]:
+        """Finish cross-shard transfers left half-done; returns how many completed, were compensated or failed"""
+        outcomes = {'completed': 0, 'compensated': 0, 'failed': 0}
+        if len(self.db.shards) < 2 or not self.sagas.ensure_schema():
+            return outcomes
+        for saga in self.sagas.pending(older_than):
+            try:
+                outcomes[self._finish_saga(saga['id'], saga['from_account'], saga['to_account'], saga['amount'])] += 1
+            except Exception as e:
+                logging.warning(f"Transfer saga {saga['id']} recovery error: {e}")
+                outcomes['failed'] += 1
+        return outcomes
+
+    def start_recovery(self, interval: float = None):
+        """Recover pending cross-shard transfers periodically from a daemon thread on its own connections"""
+        if self._recovery and self._recovery.is_alive():
+            return
+        interval = interval or Settings.SAGA_RECOVERY_INTERVAL_SECONDS
+        self._stop.clear()
+        self._recovery = threading.Thread(target=self._recovery_loop, args=(interval,),
+                                          name='transfer-saga-recovery', daemon=True)
+        self._recovery.start()
+
+    def stop_recovery(self):
+        self._stop.set()
+        if self._recovery:
+            self._recovery.join(timeout=5)
+            self._recovery = None
+
+    def _recovery_loop(self, interval: float):
+        # Database connections are not thread-safe, so the recovery never shares ours
+        database = self.db.clone()
+        worker = TransactionService(database, hot_accounts=self.hot_accounts.on(database))
+        try:
+            while not self._stop.wait(interval):
+                try:
+                    outcomes = worker.recover_transfers()
+                except DatabaseUnavailableError:
+                    # Pending sagas wait in the log until the database is back
+                    continue
+                except Exception as e:
+                    logging.warning(f"Transfer saga recovery failed: {e}")
+                    continue
+                if outcomes['completed'] or outcomes['compensated'] or outcomes['failed']:
+                    logging.info(f"Transfer sagas recovered: {outcomes}")
+        finally:
+            database.disconnect()
+
+    def _screen(self, check):
+        """Refuse an operation the velocity engine blocked"""
+        if check.blocked:
+            raise Exception(f"Blocked by velocity checks: {'; '.join(check.reasons)}")
+
+    def _prepare_idempotency(self, idempotency_key: str):
+        """Make sure the key table exists before a keyed request opens its unit of work"""
+        if idempotency_key and not self.idempotency.ensure_schema():
+            raise Exception("Idempotency keys are unavailable")
+
+    def _debit(self, account_number: str, amount: float, not_found_message: str):
+        """
+        Debit an account with one guarded UPDATE that only matches while the
+        balance covers the amount, so no read is needed and concurrent debits
+        cannot overdraw. Only a failed debit reads, to explain why it failed.
+        """
+        query = f"""
+            UPDATE accounts 
+            SET {balance_assignment('balance - %s')} 
+            WHERE account_number = %s AND balance >= %s
+        """
+        params = (amount, account_number, amount)
+        rows = self.db.execute_update(query, params)
+        # A hot account's recent credits may still sit in its balance slots
+        if rows == 0 and self.hot_accounts.fold(account_number):
+            rows = self.db.execute_update(query, params)
+        if rows is None:
+            raise Exception("Failed to update balance")
+        if rows == 0:
+            query = "SELECT 1 FROM accounts WHERE account_number = %s"
+            if not self.db.fetch_one(query, (account_number,)):
+                raise Exception(not_found_message)
+            raise Exception("Insufficient balance")
+
+    def _credit(self, account_number: str, amount: float) -> bool:
+        """Credit an account (False if it does not exist); hot accounts take credits in a random balance slot"""
+        if self.hot_accounts.is_hot(account_number) and self.hot_accounts.credit(account_number, amount):
+            return True
+        query = f"""
+            UPDATE accounts 
+            SET {balance_assignment('balance + %s')} 
+            WHERE account_number = %s
+        """
+        rows = self.db.execute_update(query, (amount, account_number))
+        if rows is None:
+            raise Exception("Failed to update balance")
+        return rows > 0
 
+    @route_by()
     def get_transaction_history(self, account_number: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Get transaction history for account"""
         query = """
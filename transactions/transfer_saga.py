@@ -0,0 +1,126 @@
+# banking_app/transactions/transfer_saga.py
+"""
+Transfer saga log
+A transfer between accounts on different shards cannot commit on both in
+one transaction, so it runs as two local steps: the debit (with a saga row
+in status 'debited') commits on the sender's shard, then the credit commits
+on the recipient's shard, guarded by a saga_credits row so it applies at
+most once. The saga is then marked 'completed', or 'compensated' when the
+recipient is gone and the sender has been refunded.
+
+A saga left 'debited' by a crash or lost connection is finished by
+TransactionService.recover_transfers(), which is safe to run at any time
+and runs periodically in the background (start_recovery()). A transfer
+whose credit step failed raises TransferPendingError: the sender has been
+debited and the recovery will credit the recipient or refund the sender.
+"""
+
+from typing import Any, Dict, List
+from db.database import Database
+from config.settings import Settings
+from monitoring.tracing import trace_methods
+
+STATUSES = ('debited', 'completed', 'compensated')
+
+
+class TransferPendingError(Exception):
+    """A cross-shard transfer was debited but not yet credited; the saga recovery will finish it"""
+
+    def __init__(self, saga_id: str):
+        super().__init__("The transfer was debited and will be credited shortly")
+        self.saga_id = saga_id
+
+
+@trace_methods
+class TransferSagaLog:
+    def __init__(self, database: Database):
+        self.db = database
+        self._schema_ready = False
+
+    def ensure_schema(self) -> bool:
+        """Create the saga tables on every shard if needed (DDL; never call inside a unit of work)"""
+        if not self._schema_ready:
+            self._schema_ready = all([node.execute_query("""
+                CREATE TABLE IF NOT EXISTS transfer_sagas (
+                    id CHAR(32) NOT NULL PRIMARY KEY,
+                    from_account VARCHAR(10) NOT NULL,
+                    to_account VARCHAR(10) NOT NULL,
+                    amount DECIMAL(15, 2) NOT NULL,
+                    status ENUM('debited', 'completed', 'compensated') NOT NULL,
+                    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                    INDEX idx_sagas_status (status, created_at)
+                ) ENGINE=InnoDB
+            """) and node.execute_query("""
+                CREATE TABLE IF NOT EXISTS saga_credits (
+                    saga_id CHAR(32) NOT NULL PRIMARY KEY,
+                    credited_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                ) ENGINE=InnoDB
+            """) for node in self.db.shards])
+        return self._schema_ready
+
+    def begin(self, saga_id: str, from_account: str, to_account: str, amount: float):
+        """Log a saga as debited; call inside the sender shard's debit unit of work"""
+        if not self.db.execute_query("""
+            INSERT INTO transfer_sagas (id, from_account, to_account, amount, status)
+            VALUES (%s, %s, %s, %s, 'debited')
+        """, (saga_id, from_account, to_account, amount)):
+            raise Exception("Failed to record transfer saga")
+
+    def claim_credit(self, saga_id: str) -> bool:
+        """Claim a saga's credit on the recipient's shard; False if it was already applied"""
+        rows = self.db.execute_update("INSERT IGNORE INTO saga_credits (saga_id) VALUES (%s)", (saga_id,))
+        if rows is None:
+            raise Exception("Failed to claim transfer saga credit")
+        return rows == 1
+
+    def mark(self, saga_id: str, status: str, from_status: str = 'debited') -> bool:
+        """Move a saga on from from_status; False if another run already moved it"""
+        rows = self.db.execute_update("UPDATE transfer_sagas SET status = %s WHERE id = %s AND status = %s",
+                                      (status, saga_id, from_status))
+        if rows is None:
+            raise Exception("Failed to update transfer saga")
+        return rows == 1
+
+    def pending(self, older_than: int = None, limit: int = 500) -> List[Dict[str, Any]]:
+        """Sagas still 'debited' after older_than seconds, on every shard, oldest first"""
+        older_than = Settings.SAGA_RECOVERY_AFTER_SECONDS if older_than is None else older_than
+        sagas = self.db.gather(lambda: self.db.fetch_all("""
+            SELECT id, from_account, to_account, amount, created_at
+            FROM transfer_sagas
+            WHERE status = 'debited' AND created_at < NOW() - INTERVAL %s SECOND
+            ORDER BY created_at
+            LIMIT %s
+        """, (older_than, limit)))
+        for saga in sagas:
+            saga['amount'] = float(saga['amount'])
+        return sorted(sagas, key=lambda saga: saga['created_at'])
+
+    def get_counts(self) -> Dict[str, int]:
+        """Number of sagas in each status across the shards"""
+        counts = dict.fromkeys(STATUSES, 0)
+        for row in self.db.gather(lambda: self.db.fetch_all(
+                "SELECT status, COUNT(*) as sagas FROM transfer_sagas GROUP BY status")):
+            counts[row['status']] += int(row['sagas'])
+        return counts
+
+
+if __name__ == "__main__":
+    import argparse
+    from db.shard_router import open_database
+    from transactions.transaction_service import TransactionService
+
+    parser = argparse.ArgumentParser(description="Cross-shard transfer sagas")
+    parser.add_argument('command', choices=['recover', 'status'])
+    parser.add_argument('--older-than', type=int, default=None,
+                        help="only sagas debited at least this many seconds ago")
+    args = parser.parse_args()
+
+    db = open_database()
+    if args.command == 'recover':
+        outcomes = TransactionService(db).recover_transfers(args.older_than)
+        print(f"Completed {outcomes['completed']}, compensated {outcomes['compensated']}, "
+              f"failed {outcomes['failed']}")
+    else:
+        for status, count in TransferSagaLog(db).get_counts().items():
+            print(f"{status:<12} {count}")
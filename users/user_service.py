@@ -5,12 +5,25 @@ Handles user account management and operations
 """
 
 from typing import Optional, Dict, Any, List
-from db.database import Database
+from db.database import Database, read_only
+from db.records import record_type
+from db.shard_router import route_by
+from db.accounts import balance_assignment, BalanceAdjustmentLog
+from transactions.hot_account_service import HotAccountService
+from monitoring.tracing import trace_methods
 
+UserRecord = record_type('UserRecord', ('account_number', 'name', 'balance', 'is_approved', 'created_at'),
+                         balance=float)
+
+@trace_methods
 class UserService:
-    def __init__(self, database: Database):
+    def __init__(self, database: Database, hot_accounts: HotAccountService = None):
         self.db = database
+        self.hot_accounts = hot_accounts or HotAccountService(database)
+        self.adjustments = BalanceAdjustmentLog(database)
 
+    @route_by()
+    @read_only
     def get_user_by_account(self, account_number: str) -> Optional[Dict[str, Any]]:
         """Get user by account number"""
         query = "SELECT * FROM accounts WHERE account_number = %s"
@@ -20,34 +33,55 @@ class UserService:
             return {
                 'account_number': user['account_number'],
                 'name': user['name'],
-                'balance': float(user['balance']),
+                'balance': float(user['balance']) + self.hot_accounts.pending_credits(account_number),
                 'is_approved': user['is_approved'],
                 'created_at': user['created_at']
             }
         return None
 
+    @route_by()
     def update_balance(self, account_number: str, new_balance: float) -> bool:
-        """Update user balance"""
-        query = "UPDATE accounts SET balance = %s WHERE account_number = %s"
-        return self.db.execute_query(query, (new_balance, account_number))
+        """Update user balance, recording the difference as a balance adjustment"""
+        query = f"UPDATE accounts SET {balance_assignment('%s')} WHERE account_number = %s"
+        try:
+            if not self.adjustments.ensure_schema():
+                return False
+            with self.db.unit_of_work():
+                # A hot account's slot credits would otherwise be added on top of the new balance
+                self.hot_accounts.fold(account_number)
+                previous = self.db.fetch_one(
+                    "SELECT balance FROM accounts WHERE account_number = %s FOR UPDATE", (account_number,))
+                if not previous or not self.db.execute_query(query, (new_balance, account_number)):
+                    return False
+                if not self.adjustments.post(account_number, previous['balance'], new_balance):
+                    raise Exception("Failed to record the balance adjustment")
+                return True
+        except Exception:
+            return False
 
+    @route_by()
+    @read_only
     def get_balance(self, account_number: str) -> Optional[float]:
         """Get current balance for account"""
         query = "SELECT balance FROM accounts WHERE account_number = %s"
         result = self.db.fetch_one(query, (account_number,))
-        return float(result['balance']) if result else None
+        return float(result['balance']) + self.hot_accounts.pending_credits(account_number) if result else None
 
+    @route_by()
     def account_exists(self, account_number: str) -> bool:
         """Check if account exists"""
         query = "SELECT 1 FROM accounts WHERE account_number = %s"
         return self.db.fetch_one(query, (account_number,)) is not None
 
+    @route_by()
     def is_account_approved(self, account_number: str) -> bool:
         """Check if account is approved"""
         query = "SELECT is_approved FROM accounts WHERE account_number = %s"
         result = self.db.fetch_one(query, (account_number,))
         return result['is_approved'] if result else False
 
+    @route_by()
+    @read_only
     def get_user_profile(self, account_number: str) -> Optional[Dict[str, Any]]:
         """Get complete user profile"""
         user = self.get_user_by_account(account_number)
@@ -61,6 +95,7 @@ class UserService:
         
         return user
 
+    @read_only
     def search_users(self, search_term: str) -> List[Dict[str, Any]]:
         """Search users by name"""
         query = """
@@ -69,16 +104,12 @@ class UserService:
             WHERE name LIKE %s AND account_number != '0000000001'
             ORDER BY name
         """
-        results = self.db.fetch_all(query, (f"%{search_term}%",))
-        
-        return [{
-            'account_number': row['account_number'],
-            'name': row['name'],
-            'balance': float(row['balance']),
-            'is_approved': row['is_approved'],
-            'created_at': row['created_at']
-        } for row in results]
+        results = self.db.gather(lambda: self.hot_accounts.with_pending_credits(
+            self.db.fetch_records(UserRecord, query, (f"%{search_term}%",))))
+        return sorted(results, key=lambda user: user['name'].lower())
 
+    @route_by()
+    @read_only
     def get_account_summary(self, account_number: str) -> Optional[Dict[str, Any]]:
         """Get account summary with transaction statistics"""
         user = self.get_user_by_account(account_number)
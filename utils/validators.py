@@ -5,6 +5,7 @@ Input validation utilities
 
 import re
 from typing import Optional, Tuple
+from config.settings import Settings
 
 class Validators:
     @staticmethod
@@ -32,7 +33,7 @@ class Validators:
             if amount_float <= 0:
                 return False, "Amount must be positive", None
             
-            if amount_float > 1000000:
+            if amount_float > Settings.MAX_TRANSACTION_AMOUNT:
                 return False, "Amount exceeds maximum limit", None
             
             # Check for reasonable decimal places